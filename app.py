@@ -65,8 +65,6 @@
 
 import streamlit as st
 import sys
-import os
-import base64
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -75,7 +73,7 @@ import streamlit.components.v1 as components
 from io import BytesIO
 
 # === i18n ===
-from utils.i18n import t, init_language, set_language, get_current_lang, apply_language_css, SUPPORTED_LANGUAGES, get_language_display_name, is_rtl, clear_translations_cache, rtl_tabs
+from utils.i18n import t, init_language, set_language, get_current_lang, apply_language_css, SUPPORTED_LANGUAGES, get_language_display_name, is_rtl, rtl_tabs
 
 # === Components ===
 from components.html_components import *
@@ -112,6 +110,8 @@ from utils.validation import validate_car_image, ImageValidator
 # from utils.pdf_generator import InvoiceGenerator
 from utils.notifier import NotificationManager
 from utils.cache_manager import CacheManager
+from utils.logger import new_correlation_id, set_correlation_id
+from utils import metrics
 
 
 # ======================
@@ -171,17 +171,10 @@ def init_session_state():
         'uploaded_image': None,
         'analysis_result': None,
         'last_transaction_id': None,
-        'logo_base64': "",
-        'language': 'de'  # اللغة الافتراضية
+        'language': 'de',  # اللغة الافتراضية
+        'correlation_id': new_correlation_id()  # يربط سجلات هذه الجلسة ببعضها
     }
     
-    # تحميل اللوغو مرة واحدة
-    if not st.session_state.get('logo_base64'):
-        logo_path = r"C:\Users\Osama\Desktop\SmartCar_AI_Dealer\logs\logo.png"
-        if os.path.exists(logo_path):
-            with open(logo_path, "rb") as f:
-                st.session_state.logo_base64 = base64.b64encode(f.read()).decode()
-    
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
@@ -219,6 +212,7 @@ def main():
     # تهيئة النظام
     init_system()
     init_session_state()
+    set_correlation_id(st.session_state.correlation_id)
     
     # تهيئة اللغة
     init_language()
@@ -262,7 +256,8 @@ def main():
         current_page = st.session_state.page
         
         if current_page in page_handlers:
-            page_handlers[current_page]()
+            with metrics.timer('page_render_seconds', page=current_page):
+                page_handlers[current_page]()
 
         else:
             navigate_to('home')
@@ -277,7 +272,8 @@ def main():
         current_page = st.session_state.page
         
         if current_page in page_handlers:
-            page_handlers[current_page]()
+            with metrics.timer('page_render_seconds', page=current_page):
+                page_handlers[current_page]()
         else:
             navigate_to('login')
 
@@ -3,8 +3,7 @@ components/car_comparison.py - Side-by-Side Car Comparison
 SmartCar AI-Dealer - مقارنة السيارات
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -17,10 +16,8 @@ def render_car_comparison():
     </div>
     """, unsafe_allow_html=True)
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cars = conn.execute("SELECT id, brand, model, manufacture_year, estimated_price FROM transactions WHERE estimated_price > 0 ORDER BY created_at DESC LIMIT 50").fetchall()
-    conn.close()
+    db = DatabaseManager()
+    cars = db.fetch_all("SELECT id, brand, model, manufacture_year, estimated_price FROM transactions WHERE estimated_price > 0 ORDER BY created_at DESC LIMIT 50")
     
     car_options = {f"{c['brand']} {c['model']} ({c['manufacture_year']}) - €{c['estimated_price']:,.0f}": c['id'] for c in cars}
     
@@ -32,11 +29,8 @@ def render_car_comparison():
         car2_label = st.selectbox(f"🚗 {t('compare.car2', 'Car 2')}", list(car_options.keys()), key="cmp_car2", index=min(1, len(car_options)-1))
     
     if car1_label and car2_label and st.button(f"📊 {t('compare.compare', 'Compare')}", type="primary", use_container_width=True):
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        c1 = dict(conn.execute("SELECT * FROM transactions WHERE id=?", (car_options[car1_label],)).fetchone())
-        c2 = dict(conn.execute("SELECT * FROM transactions WHERE id=?", (car_options[car2_label],)).fetchone())
-        conn.close()
+        c1 = db.fetch_one("SELECT * FROM transactions WHERE id=?", (car_options[car1_label],))
+        c2 = db.fetch_one("SELECT * FROM transactions WHERE id=?", (car_options[car2_label],))
         
         specs = [
             ('🏷️', 'Brand', 'brand'),
@@ -3,22 +3,16 @@ components/css_styles.py - أنماط CSS المخصصة
 SmartCar AI-Dealer
 """
 
-import streamlit as st
-import os
-import base64
+from config import Config
+from utils.static_assets import inject_css
 
 
 def load_custom_css():
-    """تحميل أنماط CSS مخصصة والعلامة المائية - نظام التصميم المحسّن"""
-    # تحويل اللوغو إلى Base64 للعلامة المائية
-    logo_path = r"C:\Users\Osama\Desktop\SmartCar_AI_Dealer\logs\logo.png"
-    logo_base64 = ""
-    if os.path.exists(logo_path):
-        with open(logo_path, "rb") as f:
-            logo_base64 = base64.b64encode(f.read()).decode()
-            
-    st.markdown("""
-    <style>
+    """تحميل أنماط CSS مخصصة والعلامة المائية - نظام التصميم المحسّن
+
+    الكتلة تُبنى مرة واحدة لكل عملية (مصغّرة، والشعار ملف ثابت في app/static بدل Base64)
+    """
+    inject_css('custom', """
         /* ═══════════════════════════════════════════════════════════════════════
            🎨 المرحلة الأولى: نظام التصميم الأساسي (Design System Foundation)
            ═══════════════════════════════════════════════════════════════════════ */
@@ -185,7 +179,7 @@ def load_custom_css():
            ═══════════════════════════════════════════════════════════════════════ */
         
         .stApp {
-            background-image: linear-gradient(rgba(14, 17, 23, 0.95), rgba(14, 17, 23, 0.95)), url("data:image/png;base64,[LOGO_B64]");
+            background-image: linear-gradient(rgba(14, 17, 23, 0.95), rgba(14, 17, 23, 0.95)), url("[LOGO_URL]");
             background-repeat: no-repeat;
             background-position: center;
             background-size: 800px;
@@ -1308,9 +1302,9 @@ def load_custom_css():
         /* دعم الوضع الداكن للنظام */
         @media (prefers-color-scheme: dark) {
             .stApp {
-                background-image: linear-gradient(rgba(20, 20, 30, 0.92), rgba(20, 20, 30, 0.92)), url("data:image/png;base64,[LOGO_B64]");
+                background-image: linear-gradient(rgba(20, 20, 30, 0.92), rgba(20, 20, 30, 0.92)), url("[LOGO_URL]");
             }
         }
         
-    </style>
-    """.replace("[LOGO_B64]", logo_base64), unsafe_allow_html=True)
+    """, assets={'LOGO_URL': Config.LOGO_PATH},
+        fonts={'Cairo': {400: Config.FONTS_DIR / Config.FONT_REGULAR, 700: Config.FONTS_DIR / Config.FONT_BOLD}})
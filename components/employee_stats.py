@@ -3,8 +3,7 @@ components/employee_stats.py - Personal Employee Dashboard
 SmartCar AI-Dealer - لوحة الموظف الشخصية
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -20,13 +19,14 @@ def render_employee_stats(employee_id: int = None):
     </div>
     """, unsafe_allow_html=True)
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
+    db = DatabaseManager()
     
     # Personal stats
-    total = conn.execute("SELECT COUNT(*) FROM transactions WHERE employee_id=?", (employee_id,)).fetchone()[0]
-    revenue = conn.execute("SELECT COALESCE(SUM(estimated_price),0) FROM transactions WHERE employee_id=?", (employee_id,)).fetchone()[0]
-    avg = conn.execute("SELECT COALESCE(AVG(estimated_price),0) FROM transactions WHERE employee_id=?", (employee_id,)).fetchone()[0]
-    this_month = conn.execute("SELECT COUNT(*) FROM transactions WHERE employee_id=? AND created_at >= date('now','start of month')", (employee_id,)).fetchone()[0]
+    with db.get_read_connection() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM transactions WHERE employee_id=?", (employee_id,)).fetchone()[0]
+        revenue = conn.execute("SELECT COALESCE(SUM(estimated_price),0) FROM transactions WHERE employee_id=?", (employee_id,)).fetchone()[0]
+        avg = conn.execute("SELECT COALESCE(AVG(estimated_price),0) FROM transactions WHERE employee_id=?", (employee_id,)).fetchone()[0]
+        this_month = conn.execute("SELECT COUNT(*) FROM transactions WHERE employee_id=? AND created_at >= date('now','start of month')", (employee_id,)).fetchone()[0]
     
     c1, c2, c3, c4 = st.columns(4)
     
@@ -51,21 +51,19 @@ def render_employee_stats(employee_id: int = None):
     
     # Recent sales
     st.markdown(f"### 🕐 {t('emp_stats.recent', 'Recent Sales')}")
-    recent = conn.execute("""
+    recent = db.fetch_all("""
         SELECT brand, model, estimated_price, created_at FROM transactions 
         WHERE employee_id=? ORDER BY created_at DESC LIMIT 10
-    """, (employee_id,)).fetchall()
+    """, (employee_id,))
     
     for r in recent:
         st.markdown(f"""
         <div style="background: #16213e; padding: 8px 12px; border-radius: 8px; margin: 4px 0; display: flex; justify-content: space-between;">
-            <span style="color: white;">🏎️ {r[0]} {r[1]}</span>
-            <span style="color: #4CAF50;">€{(r[2] or 0):,.0f}</span>
-            <span style="color: #a0a0c0; font-size: 0.8em;">{(r[3] or '')[:10]}</span>
+            <span style="color: white;">🏎️ {r['brand']} {r['model']}</span>
+            <span style="color: #4CAF50;">€{(r['estimated_price'] or 0):,.0f}</span>
+            <span style="color: #a0a0c0; font-size: 0.8em;">{(r['created_at'] or '')[:10]}</span>
         </div>
         """, unsafe_allow_html=True)
     
     if not recent:
         st.info(t('emp_stats.no_sales', 'No sales yet'))
-    
-    conn.close()
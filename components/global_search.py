@@ -3,84 +3,91 @@ components/global_search.py - Universal Search
 SmartCar AI-Dealer - بحث شامل
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
+PAGE_SIZE = 10
+
+
+def _pages(kind: str, query: str) -> int:
+    """Number of result pages shown for a section (reset when the query changes)"""
+    state = st.session_state.setdefault('global_search_pages', {})
+    if state.get('_query') != query:
+        state.clear()
+        state['_query'] = query
+    return state.get(kind, 1)
+
+
+def _more_button(kind: str, has_more: bool):
+    if has_more and st.button(t('search.more', 'Show more'), key=f"global_search_more_{kind}"):
+        state = st.session_state['global_search_pages']
+        state[kind] = state.get(kind, 1) + 1
+        st.rerun()
+
 
 def render_global_search():
-    """Render universal search across all data"""
+    """Render universal search across all data (ranked, typo-tolerant FTS5 index)"""
     query = st.text_input(f"🔍 {t('search.placeholder', 'Search cars, customers, transactions...')}", key="global_search")
-    
-    if not query or len(query) < 2:
+
+    if not query or len(query.strip()) < 2:
         return
-    
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    q = f"%{query}%"
-    
+    query = query.strip()
+
+    db = DatabaseManager()
     results_found = False
-    
+
     # Search transactions
     try:
-        cars = conn.execute("""
-            SELECT id, brand, model, manufacture_year, estimated_price, color 
-            FROM transactions WHERE brand LIKE ? OR model LIKE ? OR color LIKE ? OR car_type LIKE ?
-            LIMIT 10
-        """, (q, q, q, q)).fetchall()
-        
-        if cars:
+        cars = db.search('cars', query, limit=PAGE_SIZE * _pages('cars', query))
+
+        if cars['items']:
             results_found = True
-            st.markdown(f"### 🚗 {t('search.cars', 'Cars')} ({len(cars)})")
-            for c in cars:
+            st.markdown(f"### 🚗 {t('search.cars', 'Cars')} ({len(cars['items'])}{'+' if cars['has_more'] else ''})")
+            for c in cars['items']:
                 st.markdown(f"""
                 <div style="background: #16213e; padding: 8px 12px; border-radius: 8px; margin: 3px 0; border-left: 3px solid #D4AF37;">
-                    🏎️ <b style="color: white;">{c['brand']} {c['model']}</b> ({c['manufacture_year']}) 
+                    🏎️ <b style="color: white;">{c['brand']} {c['model']}</b> ({c['manufacture_year']})
                     <span style="color: #4CAF50;">€{(c['estimated_price'] or 0):,.0f}</span>
                     <span style="color: #a0a0c0;">🎨 {c['color'] or ''}</span>
                 </div>""", unsafe_allow_html=True)
-    except: pass
-    
+            _more_button('cars', cars['has_more'])
+    except Exception as e:
+        db.logger.warning(f"Global search (cars) failed: {e}")
+
     # Search users
     try:
-        users = conn.execute("""
-            SELECT id, username, full_name, email, phone, role
-            FROM users WHERE username LIKE ? OR full_name LIKE ? OR email LIKE ? OR phone LIKE ?
-            LIMIT 10
-        """, (q, q, q, q)).fetchall()
-        
-        if users:
+        users = db.search('customers', query, limit=PAGE_SIZE * _pages('customers', query))
+
+        if users['items']:
             results_found = True
-            st.markdown(f"### 👥 {t('search.users', 'Users')} ({len(users)})")
-            for u in users:
+            st.markdown(f"### 👥 {t('search.users', 'Users')} ({len(users['items'])}{'+' if users['has_more'] else ''})")
+            for u in users['items']:
                 st.markdown(f"""
                 <div style="background: #16213e; padding: 8px 12px; border-radius: 8px; margin: 3px 0; border-left: 3px solid #3498db;">
                     👤 <b style="color: white;">{u['full_name'] or u['username']}</b>
                     <span style="color: #a0a0c0;">📧 {u['email'] or ''} 📞 {u['phone'] or ''}</span>
                     <span style="color: #9b59b6;">{u['role']}</span>
                 </div>""", unsafe_allow_html=True)
-    except: pass
-    
+            _more_button('customers', users['has_more'])
+    except Exception as e:
+        db.logger.warning(f"Global search (customers) failed: {e}")
+
     # Search employees
     try:
-        emps = conn.execute("""
-            SELECT id, first_name, last_name, position, phone
-            FROM employees WHERE first_name LIKE ? OR last_name LIKE ? OR position LIKE ?
-            LIMIT 10
-        """, (q, q, q)).fetchall()
-        
-        if emps:
+        emps = db.search('employees', query, limit=PAGE_SIZE * _pages('employees', query))
+
+        if emps['items']:
             results_found = True
-            st.markdown(f"### 👔 {t('search.employees', 'Employees')} ({len(emps)})")
-            for e in emps:
+            st.markdown(f"### 👔 {t('search.employees', 'Employees')} ({len(emps['items'])}{'+' if emps['has_more'] else ''})")
+            for e in emps['items']:
                 st.markdown(f"""
                 <div style="background: #16213e; padding: 8px 12px; border-radius: 8px; margin: 3px 0; border-left: 3px solid #27ae60;">
                     👔 <b style="color: white;">{e['first_name']} {e['last_name'] or ''}</b>
-                    <span style="color: #a0a0c0;">{e['position'] or ''} 📞 {e['phone'] or ''}</span>
+                    <span style="color: #a0a0c0;">{e['job_title'] or ''} 📞 {e['phone'] or ''}</span>
                 </div>""", unsafe_allow_html=True)
-    except: pass
-    
-    conn.close()
-    
+            _more_button('employees', emps['has_more'])
+    except Exception as e:
+        db.logger.warning(f"Global search (employees) failed: {e}")
+
     if not results_found:
         st.info(f"🔍 {t('search.no_results', 'No results found for')} \"{query}\"")
@@ -4,11 +4,11 @@ SmartCar AI-Dealer
 تم استخراجها من app.py لتحسين الأداء
 """
 
-import os
-import base64
 import streamlit as st
 import streamlit.components.v1 as components
+from config import Config
 from utils.i18n import t, get_current_lang, is_rtl
+from utils.static_assets import data_uri
 
 
 def get_clock_html():
@@ -435,12 +435,8 @@ def render_universal_header(page_title: str, subtitle: str = ""):
         page_title: The title to display on the left side of the header
         subtitle: Optional subtitle to display below the title
     """
-    # Load logo
-    header_logo_path = r"C:\Users\Osama\Desktop\SmartCar_AI_Dealer\logs\osamaslogo.png"
-    header_logo_img = ""
-    if os.path.exists(header_logo_path):
-        with open(header_logo_path, "rb") as image_file:
-            header_logo_img = base64.b64encode(image_file.read()).decode()
+    # Load logo (encoded once per process, not on every rerun)
+    header_logo_img = data_uri(Config.HEADER_LOGO_PATH)
     
     # Determine language direction
     lang_code = st.session_state.get('language', 'de')
@@ -743,7 +739,7 @@ def render_universal_header(page_title: str, subtitle: str = ""):
                 </div>
             </div>
             <div class="header-right">
-                <img src="data:image/png;base64,{header_logo_img}" alt="SmartCar Logo">
+                <img src="{header_logo_img}" alt="SmartCar Logo">
             </div>
         </div>
         <script>
@@ -0,0 +1,90 @@
+"""
+components/job_status.py - Background job progress & delivery
+SmartCar AI-Dealer - متابعة مهام الطابور الخلفي وتسليم الملف الناتج في الصفحة
+"""
+from pathlib import Path
+from typing import Optional
+
+import streamlit as st
+
+from utils.i18n import t
+from utils.job_queue import ACTIVE_STATUSES, poll_job, retry
+
+POLL_SECONDS = 2
+
+# st.fragment (1.37+) يعيد رسم جزء التقدم فقط كل ثانيتين بدل إعادة تشغيل الصفحة كاملة
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+
+
+def _progress_view(job_id: int):
+    job = poll_job(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        # انتهت المهمة: إعادة تشغيل الصفحة لعرض زر التنزيل مكان شريط التقدم
+        st.rerun()
+    text = t('jobs.running', 'Generating...') if job['status'] == 'running' else t('jobs.queued', 'Waiting in queue...')
+    st.progress(float(job['progress'] or 0), text=text)
+    st.caption(t('jobs.queued_hint', 'You can keep using the app; the file will appear here when it is ready.'))
+
+
+try:
+    _live_progress = _fragment(run_every=POLL_SECONDS)(_progress_view) if _fragment else None
+except TypeError:
+    # إصدارات experimental_fragment بدون run_every
+    _live_progress = None
+
+
+def job_panel(job_id: Optional[int], download_label: Optional[str] = None, file_name: Optional[str] = None,
+              mime: str = 'application/pdf', key: Optional[str] = None, primary: bool = False) -> Optional[dict]:
+    """
+    عرض حالة مهمة خلفية: شريط تقدم يتحدث تلقائياً أثناء الانتظار، ثم زر تنزيل للملف الناتج (result['path'])
+    إذا أُعطي download_label. تعيد المهمة عند انتهائها بنجاح، وإلا None.
+    """
+    if not job_id:
+        return None
+    key = key or f"job_{job_id}"
+    job = poll_job(job_id)
+    if job is None:
+        return None
+
+    if job['status'] in ACTIVE_STATUSES:
+        if _live_progress:
+            _live_progress(job_id)
+        else:
+            _progress_view_static(job, key)
+        return None
+
+    if job['status'] == 'done':
+        path = (job['result'] or {}).get('path') if isinstance(job['result'], dict) else None
+        if download_label and path and Path(path).exists():
+            st.download_button(download_label, Path(path).read_bytes(), file_name=file_name or Path(path).name, mime=mime,
+                               use_container_width=True, type="primary" if primary else "secondary", key=f"{key}_dl")
+        return job
+
+    st.warning(f"⚠️ {t('jobs.failed', 'The job could not be completed')}: {job['error'] or job['status']}")
+    if st.button(f"🔄 {t('jobs.retry', 'Try again')}", key=f"{key}_retry", use_container_width=True):
+        retry(job_id)
+        st.rerun()
+    return None
+
+
+def _progress_view_static(job: dict, key: str):
+    st.progress(float(job['progress'] or 0), text=t('jobs.queued', 'Waiting in queue...'))
+    if st.button(f"🔄 {t('jobs.refresh', 'Refresh')}", key=f"{key}_refresh", use_container_width=True):
+        st.rerun()
+
+
+def session_image_path(data: dict) -> str:
+    """
+    مسار صورة السيارة لمهمة PDF: العامل لا يرى st.session_state، فالصورة المرفوعة في الجلسة فقط
+    تُحفظ في مخزن الصور ويُمرر مسارها ضمن payload.
+    """
+    path = data.get('image_path') or st.session_state.get('car_image_path', '')
+    if path and path != 'stored_in_session':
+        return path
+    uploaded = st.session_state.get('uploaded_image')
+    if isinstance(uploaded, bytes) and uploaded:
+        from db_manager import DatabaseManager
+        from utils.image_store import put_image
+        with DatabaseManager().get_connection() as conn:
+            return put_image(conn, uploaded)
+    return ''
@@ -3,9 +3,8 @@ components/live_dashboard.py - Live Auto-Refreshing Dashboard
 SmartCar AI-Dealer - لوحة مباشرة
 """
 import streamlit as st
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -25,16 +24,17 @@ def render_live_dashboard():
         st.empty()
         time.sleep(0)  # Placeholder - actual refresh via st.rerun below
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
+    db = DatabaseManager()
     
     # Row 1: Key metrics
     m1, m2, m3, m4 = st.columns(4)
     
     try:
-        total_trans = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
-        today_trans = conn.execute("SELECT COUNT(*) FROM transactions WHERE created_at >= date('now')").fetchone()[0]
-        total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-        revenue = conn.execute("SELECT COALESCE(SUM(estimated_price),0) FROM transactions").fetchone()[0]
+        with db.get_read_connection() as conn:
+            total_trans = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+            today_trans = conn.execute("SELECT COUNT(*) FROM transactions WHERE created_at >= date('now')").fetchone()[0]
+            total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            revenue = conn.execute("SELECT COALESCE(SUM(estimated_price),0) FROM transactions").fetchone()[0]
     except:
         total_trans = today_trans = total_users = 0; revenue = 0
     
@@ -68,17 +68,17 @@ def render_live_dashboard():
     st.markdown(f"### 🔔 {t('live.recent', 'Recent Activity')}")
     
     try:
-        recent = conn.execute("""
+        recent = db.fetch_all("""
             SELECT brand, model, estimated_price, created_at FROM transactions 
             ORDER BY created_at DESC LIMIT 5
-        """).fetchall()
+        """)
         
         for r in recent:
-            price = r[2] or 0
-            date = (r[3] or '')[:16]
+            price = r['estimated_price'] or 0
+            date = (r['created_at'] or '')[:16]
             st.markdown(f"""
             <div style="background: #16213e; padding: 8px 12px; border-radius: 8px; margin: 4px 0; border-left: 3px solid #D4AF37; display: flex; justify-content: space-between;">
-                <span style="color: white;">🏎️ {r[0]} {r[1]}</span>
+                <span style="color: white;">🏎️ {r['brand']} {r['model']}</span>
                 <span style="color: #4CAF50; font-weight: bold;">€{price:,.0f}</span>
                 <span style="color: #a0a0c0; font-size: 0.8em;">🕐 {date}</span>
             </div>
@@ -86,8 +86,6 @@ def render_live_dashboard():
     except:
         st.info("No recent activity")
     
-    conn.close()
-    
     # Status bar
     st.markdown(f"""
     <div style="text-align: center; padding: 10px; color: #a0a0c0; font-size: 0.8em;">
@@ -3,53 +3,28 @@ components/notifications_bell.py - In-App Push Notifications
 SmartCar AI-Dealer - إشعارات داخل التطبيق
 """
 import streamlit as st
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
-def _ensure_notifications_table():
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            message TEXT,
-            type TEXT DEFAULT 'info',
-            read INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
 def push_notification(user_id: int, title: str, message: str, notif_type: str = 'info'):
     """Create a new notification for a user"""
-    _ensure_notifications_table()
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.execute("INSERT INTO notifications (user_id, title, message, type) VALUES (?, ?, ?, ?)",
-                 (user_id, title, message, notif_type))
-    conn.commit()
-    conn.close()
+    DatabaseManager().execute("INSERT INTO notifications (user_id, title, message, type) VALUES (?, ?, ?, ?)",
+                              (user_id, title, message, notif_type))
 
 
 def render_notification_bell():
     """Render notification bell in sidebar"""
-    _ensure_notifications_table()
     user = st.session_state.get('user', {})
     if not user:
         return
     
     user_id = user.get('id')
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    db = DatabaseManager()
     
-    unread = conn.execute("SELECT COUNT(*) as cnt FROM notifications WHERE user_id=? AND read=0", (user_id,)).fetchone()['cnt']
-    notifications = conn.execute("SELECT * FROM notifications WHERE user_id=? ORDER BY created_at DESC LIMIT 10", (user_id,)).fetchall()
-    conn.close()
+    unread = db.fetch_value("SELECT COUNT(*) as cnt FROM notifications WHERE user_id=? AND read=0", (user_id,), default=0)
+    notifications = db.fetch_all("SELECT * FROM notifications WHERE user_id=? ORDER BY created_at DESC LIMIT 10", (user_id,))
     
     with st.sidebar:
         badge = f" ({unread})" if unread > 0 else ""
@@ -58,9 +33,7 @@ def render_notification_bell():
             st.session_state['show_notifications'] = not st.session_state.get('show_notifications', False)
             # Mark all as read
             if unread > 0:
-                conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                conn2.execute("UPDATE notifications SET read=1 WHERE user_id=? AND read=0", (user_id,))
-                conn2.commit(); conn2.close()
+                db.execute("UPDATE notifications SET read=1 WHERE user_id=? AND read=0", (user_id,))
             st.rerun()
     
     if st.session_state.get('show_notifications', False):
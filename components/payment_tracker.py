@@ -3,8 +3,7 @@ components/payment_tracker.py - Payment Tracking Dashboard
 SmartCar AI-Dealer - تتبع المدفوعات
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -16,12 +15,12 @@ def render_payment_tracker():
     </div>
     """, unsafe_allow_html=True)
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
+    db = DatabaseManager()
     
     try:
         # Overview metrics
-        total_due = conn.execute("SELECT COALESCE(SUM(estimated_price),0) FROM transactions WHERE estimated_price > 0").fetchone()[0]
-        total_paid = conn.execute("SELECT COALESCE(SUM(amount_paid),0) FROM transactions WHERE amount_paid > 0").fetchone()[0]
+        total_due = db.fetch_value("SELECT COALESCE(SUM(estimated_price),0) FROM transactions WHERE estimated_price > 0", default=0)
+        total_paid = db.fetch_value("SELECT COALESCE(SUM(amount_paid),0) FROM transactions WHERE amount_paid > 0", default=0)
         outstanding = total_due - total_paid
         
         m1, m2, m3 = st.columns(3)
@@ -45,16 +44,17 @@ def render_payment_tracker():
         
         # Overdue list
         st.markdown(f"### ⚠️ {t('payments.overdue', 'Pending Payments')}")
-        overdue = conn.execute("""
-            SELECT t.id, t.brand, t.model, t.estimated_price, 
-                   COALESCE(t.amount_paid, 0) as paid,
-                   u.full_name, t.created_at
-            FROM transactions t
-            LEFT JOIN users u ON t.user_id = u.id
-            WHERE t.estimated_price > COALESCE(t.amount_paid, 0)
-            ORDER BY (t.estimated_price - COALESCE(t.amount_paid, 0)) DESC
-            LIMIT 20
-        """).fetchall()
+        with db.get_read_connection() as conn:
+            overdue = conn.execute("""
+                SELECT t.id, t.brand, t.model, t.estimated_price, 
+                       COALESCE(t.amount_paid, 0) as paid,
+                       u.full_name, t.created_at
+                FROM transactions t
+                LEFT JOIN users u ON t.user_id = u.id
+                WHERE t.estimated_price > COALESCE(t.amount_paid, 0)
+                ORDER BY (t.estimated_price - COALESCE(t.amount_paid, 0)) DESC
+                LIMIT 20
+            """).fetchall()
         
         for o in overdue:
             remaining = (o[3] or 0) - (o[4] or 0)
@@ -77,4 +77,3 @@ def render_payment_tracker():
             st.success(t('payments.all_paid', 'All payments up to date! ✅'))
     except Exception as e:
         st.info(f"Payment tracking: {e}")
-    conn.close()
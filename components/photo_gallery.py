@@ -3,8 +3,9 @@ components/photo_gallery.py - Car Photo Gallery
 SmartCar AI-Dealer - معرض صور السيارة
 """
 import streamlit as st
-import os, base64
+import os
 from utils.i18n import t
+from utils.image_store import load_variant
 
 
 def render_photo_gallery(transaction_id: int = None, image_path: str = None):
@@ -45,24 +46,9 @@ def render_photo_gallery(transaction_id: int = None, image_path: str = None):
         img_path = images[selected_idx]
         
         try:
-            with open(img_path, 'rb') as f:
-                img_bytes = f.read()
-            b64 = base64.b64encode(img_bytes).decode()
-            ext = img_path.split('.')[-1].lower()
-            mime = 'jpeg' if ext in ('jpg', 'jpeg') else ext
-            
-            st.markdown(f"""
-            <div style="text-align: center; background: #16213e; padding: 15px; border-radius: 15px;">
-                <img src="data:image/{mime};base64,{b64}" 
-                     style="max-width: 100%; max-height: 500px; border-radius: 10px; cursor: zoom-in;
-                            transition: transform 0.3s;"
-                     onclick="this.style.transform = this.style.transform === 'scale(2)' ? 'scale(1)' : 'scale(2)'"
-                     alt="Car Photo {selected_idx + 1}">
-                <p style="color: #a0a0c0; margin-top: 8px;">
-                    📷 {t('gallery.photo', 'Photo')} {selected_idx + 1} / {len(images)}
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            # النسخة المتوسطة من مخزن الصور تُقدَّم كرابط media (بدون base64 داخل HTML)، والتكبير عبر زر ملء الشاشة
+            st.image(load_variant(img_path, 'medium') or img_path,
+                     caption=f"📷 {t('gallery.photo', 'Photo')} {selected_idx + 1} / {len(images)}")
         except Exception as e:
             st.error(f"❌ {e}")
     
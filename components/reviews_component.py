@@ -3,32 +3,13 @@ components/reviews_component.py - Customer Reviews System
 SmartCar AI-Dealer - نظام تقييمات العملاء
 """
 import streamlit as st
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
-def _ensure_reviews_table():
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            username TEXT,
-            rating INTEGER NOT NULL CHECK(rating >= 1 AND rating <= 5),
-            comment TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
 def render_reviews():
     """Render reviews section"""
-    _ensure_reviews_table()
     user = st.session_state.get('user', {})
     
     st.markdown(f"""
@@ -38,9 +19,8 @@ def render_reviews():
     """, unsafe_allow_html=True)
     
     # Stats
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    stats = conn.execute("SELECT COUNT(*) as cnt, AVG(rating) as avg_r FROM reviews").fetchone()
+    db = DatabaseManager()
+    stats = db.fetch_one("SELECT COUNT(*) as cnt, AVG(rating) as avg_r FROM reviews")
     total = stats['cnt']
     avg = stats['avg_r'] or 0
     
@@ -59,10 +39,8 @@ def render_reviews():
                 
                 if st.form_submit_button(f"✅ {t('reviews.submit', 'Submit')}", use_container_width=True, type="primary"):
                     try:
-                        conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                        conn2.execute("INSERT INTO reviews (user_id, username, rating, comment) VALUES (?, ?, ?, ?)",
+                        db.execute("INSERT INTO reviews (user_id, username, rating, comment) VALUES (?, ?, ?, ?)",
                             (user['id'], user.get('full_name', user.get('username', '')), rating, comment))
-                        conn2.commit(); conn2.close()
                         st.success(f"✅ {t('reviews.thanks', 'Thank you for your review!')}")
                         st.rerun()
                     except Exception as e:
@@ -71,8 +49,7 @@ def render_reviews():
     st.markdown("---")
     
     # Show reviews
-    reviews = conn.execute("SELECT * FROM reviews ORDER BY created_at DESC LIMIT 20").fetchall()
-    conn.close()
+    reviews = db.fetch_all("SELECT * FROM reviews ORDER BY created_at DESC LIMIT 20")
     
     for rev in reviews:
         stars = '⭐' * rev['rating'] + '☆' * (5 - rev['rating'])
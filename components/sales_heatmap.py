@@ -3,8 +3,7 @@ components/sales_heatmap.py - Sales Heatmap by Day/Hour
 SmartCar AI-Dealer
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -12,22 +11,20 @@ def render_sales_heatmap():
     """Render sales heatmap chart"""
     st.markdown(f"### 📊 {t('heatmap.title', 'Sales Heatmap')}")
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    
     try:
         import pandas as pd
         import plotly.express as px
         
-        df = pd.read_sql_query("SELECT created_at FROM transactions WHERE created_at IS NOT NULL", conn)
+        # Pre-aggregated weekday x hour buckets (weekday 0 = Sunday, as in SQLite %w)
+        rollup = DatabaseManager().get_sales_rollup('weekday_hour')
+        df = pd.DataFrame([r for r in rollup if r['weekday'] >= 0 and r['hour'] >= 0])
         if df.empty:
-            st.info("No data"); conn.close(); return
+            st.info("No data"); return
         
-        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-        df = df.dropna(subset=['created_at'])
-        df['day'] = df['created_at'].dt.day_name()
-        df['hour'] = df['created_at'].dt.hour
+        day_names = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+        df['day'] = df['weekday'].map(lambda d: day_names[d])
         
-        heatmap_data = df.groupby(['day', 'hour']).size().reset_index(name='count')
+        heatmap_data = df[['day', 'hour', 'sales_count']].rename(columns={'sales_count': 'count'})
         days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         heatmap_data['day'] = pd.Categorical(heatmap_data['day'], categories=days_order, ordered=True)
         
@@ -40,4 +37,3 @@ def render_sales_heatmap():
         st.plotly_chart(fig, use_container_width=True)
     except Exception as e:
         st.info(f"Heatmap unavailable: {e}")
-    conn.close()
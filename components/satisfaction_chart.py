@@ -3,8 +3,7 @@ components/satisfaction_chart.py - Customer Satisfaction Analysis
 SmartCar AI-Dealer - تحليل رضا العملاء
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -16,18 +15,16 @@ def render_satisfaction_analysis():
     </div>
     """, unsafe_allow_html=True)
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    
     try:
         import pandas as pd
         import plotly.express as px
         import plotly.graph_objects as go
         
-        df = pd.read_sql_query("SELECT * FROM reviews ORDER BY created_at", conn)
+        with DatabaseManager().get_read_connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM reviews ORDER BY created_at", conn)
         
         if df.empty:
             st.info(t('satisfaction.no_data', 'No reviews data yet'))
-            conn.close()
             return
         
         c1, c2 = st.columns(2)
@@ -89,5 +86,3 @@ def render_satisfaction_analysis():
     
     except Exception as e:
         st.info(f"Reviews table not available: {e}")
-    
-    conn.close()
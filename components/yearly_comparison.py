@@ -3,8 +3,7 @@ components/yearly_comparison.py - Year-over-Year Comparison
 SmartCar AI-Dealer - مقارنة سنة بسنة
 """
 import streamlit as st
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
@@ -16,28 +15,27 @@ def render_yearly_comparison():
     </div>
     """, unsafe_allow_html=True)
     
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    
     try:
         import pandas as pd
         import plotly.graph_objects as go
         
-        df = pd.read_sql_query("SELECT * FROM transactions WHERE created_at IS NOT NULL AND estimated_price > 0", conn)
+        # One row per month from the sales rollup instead of every transaction
+        rollup = DatabaseManager().get_sales_rollup('monthly')
+        df = pd.DataFrame([r for r in rollup if r['month'] and r['priced_count'] > 0])
         if df.empty:
-            st.info("No data"); conn.close(); return
+            st.info("No data"); return
         
-        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-        df['year'] = df['created_at'].dt.year
-        df['month'] = df['created_at'].dt.month
+        df['year'] = df['month'].str[:4].astype(int)
+        df['month'] = df['month'].str[5:7].astype(int)
         
-        years = sorted(df['year'].dropna().unique())
+        years = sorted(df['year'].unique())
         
         if len(years) < 2:
             st.info(t('yearly.need_two_years', 'Need at least 2 years of data'))
             # Show current year stats anyway
             year_data = df[df['year'] == years[0]]
-            st.metric(f"📊 {years[0]}", f"{len(year_data)} transactions | €{year_data['estimated_price'].sum():,.0f}")
-            conn.close(); return
+            st.metric(f"📊 {years[0]}", f"{year_data['priced_count'].sum()} transactions | €{year_data['total_sales'].sum():,.0f}")
+            return
         
         # Monthly comparison chart
         fig = go.Figure()
@@ -45,8 +43,7 @@ def render_yearly_comparison():
         month_names = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
         
         for i, year in enumerate(years[-4:]):  # Last 4 years max
-            year_data = df[df['year'] == year]
-            monthly = year_data.groupby('month').agg({'estimated_price': ['count', 'sum']}).reset_index()
+            monthly = df[df['year'] == year][['month', 'priced_count', 'total_sales']]
             monthly.columns = ['month', 'count', 'revenue']
             
             fig.add_trace(go.Bar(
@@ -67,9 +64,9 @@ def render_yearly_comparison():
         
         for year in reversed(years[-4:]):
             year_data = df[df['year'] == year]
-            count = len(year_data)
-            revenue = year_data['estimated_price'].sum()
-            avg = year_data['estimated_price'].mean()
+            count = year_data['priced_count'].sum()
+            revenue = year_data['total_sales'].sum()
+            avg = revenue / count if count else 0
             
             st.markdown(f"""
             <div style="background: #16213e; padding: 12px; border-radius: 10px; margin: 5px 0; display: flex; justify-content: space-around;">
@@ -82,4 +79,3 @@ def render_yearly_comparison():
     
     except Exception as e:
         st.info(f"Comparison unavailable: {e}")
-    conn.close()
@@ -28,19 +28,127 @@ class Config:
     LOGS_DIR = BASE_DIR / "logs"
     UPLOADS_DIR = BASE_DIR / "uploads"
     IMAGES_DIR = DATA_DIR / "images"
+    # مخزن الصور حسب بصمة المحتوى (utils/image_store.py)
+    IMAGE_STORE_DIR = IMAGES_DIR / "store"
+    # ملفات أرشيف المستندات عند استخدام المخزن المحلي (utils/blob_store.py)
+    DOCUMENTS_DIR = DATA_DIR / "documents"
+    # ملفات التصدير المؤقتة (Excel / DATEV) قبل تنزيلها (utils/export_stream.py)
+    EXPORTS_DIR = DATA_DIR / "exports"
+    # لقطة مقاييس الأداء لكل عملية (utils/metrics.py)
+    METRICS_DIR = DATA_DIR / "metrics"
+    # أرشيف شهري مضغوط لسجل التدقيق وجلسات الدخول، وأحداث لم تُكتب عند الإغلاق (utils/event_writer.py)
+    EVENT_ARCHIVE_DIR = DATA_DIR / "archive"
+    EVENT_SPOOL_DIR = DATA_DIR / "spool"
+    # ملفات ثابتة تُقدَّم عبر app/static (server.enableStaticServing)
+    STATIC_DIR = BASE_DIR / "static"
+    LOGO_PATH = LOGS_DIR / "logo.png"
+    HEADER_LOGO_PATH = LOGS_DIR / "osamaslogo.png"
     
     # ===== 2. إعدادات الهوية والأمان =====
     APP_NAME = os.getenv("APP_NAME", "SmartCar AI-Dealer")
     APP_SECRET_KEY = os.getenv("APP_SECRET_KEY", "default-secret-key-change-me")
     DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # السجلات تمر عبر طابور (QueueHandler) ويكتبها خيط مستقل؛ عند امتلاء الطابور تُسقط السجلات بدل حجب الصفحة
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json (سطر JSON لكل سجل في app.log) أو text
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))  # اقتطاع الرسائل الطويلة (مثل ردود النموذج)
+    # أخذ عينات للأحداث الكثيرة: بادئة الرسالة=N تعني تسجيل سجل واحد من كل N (مستويات ما دون WARNING فقط)
+    LOG_SAMPLE_EVERY = os.getenv("LOG_SAMPLE_EVERY", "[CACHE]=20,[IMG]=10")
+    # مقاييس الأداء داخل العملية (utils/metrics.py): تُكتب لقطة كل METRICS_FLUSH_SECONDS وتُدمج في /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "15"))
+    METRICS_STALE_SECONDS = float(os.getenv("METRICS_STALE_SECONDS", "300"))  # لقطات العمليات المتوقفة تُهمل ثم تُحذف
+    METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "500"))  # حد السلاسل لكل مقياس (مثل نصوص الاستعلامات)
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # إذا حُدد يتطلب /metrics الترويسة Authorization: Bearer
     
     # قاعدة البيانات
     DATABASE_PATH = BASE_DIR / os.getenv("DATABASE_PATH", "smartcar.db")
+    # مجمع الاتصالات (Connection Pool) - تُطبَّق الإعدادات مرة واحدة لكل اتصال
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "30000"))
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+    DB_MMAP_SIZE_MB = int(os.getenv("DB_MMAP_SIZE_MB", "128"))
+    DB_BUSY_RETRIES = int(os.getenv("DB_BUSY_RETRIES", "3"))
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+    # مخزن ملفات المستندات خارج قاعدة البيانات: local (DOCUMENTS_DIR) أو s3 (AWS أو خادم متوافق مثل MinIO)
+    DOCUMENT_STORE = os.getenv("DOCUMENT_STORE", "local").lower()
+    DOCUMENT_S3_BUCKET = os.getenv("DOCUMENT_S3_BUCKET", "")
+    DOCUMENT_S3_PREFIX = os.getenv("DOCUMENT_S3_PREFIX", "documents/")
+    DOCUMENT_S3_ENDPOINT_URL = os.getenv("DOCUMENT_S3_ENDPOINT_URL", "")  # فارغ = AWS
+    BLOB_CHUNK_SIZE = int(os.getenv("BLOB_CHUNK_SIZE", str(1024 * 1024)))
+    # النسخ الاحتياطي عبر SQLite Backup API (utils/backup_manager.py): نسخ على دفعات من لقطة قراءة ثابتة
+    BACKUP_COMPRESS = os.getenv("BACKUP_COMPRESS", "True").lower() == "true"  # ملف .db.gz بدل .db
+    BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+    BACKUP_STEP_SLEEP_MS = float(os.getenv("BACKUP_STEP_SLEEP_MS", "5"))
+    BACKUP_CHECKPOINT = os.getenv("BACKUP_CHECKPOINT", "passive").lower()  # passive / truncate / none
+    BACKUP_VERIFY = os.getenv("BACKUP_VERIFY", "quick").lower()  # quick / full / none
+    # سياسة الاحتفاظ: آخر N نسخة + آخر نسخة من كل يوم وكل أسبوع للمدد المحددة
+    BACKUP_KEEP_LAST = int(os.getenv("BACKUP_KEEP_LAST", "10"))
+    BACKUP_KEEP_DAILY = int(os.getenv("BACKUP_KEEP_DAILY", "7"))
+    BACKUP_KEEP_WEEKLY = int(os.getenv("BACKUP_KEEP_WEEKLY", "4"))
+    # التصدير المتدفق (utils/excel_export.py و utils/datev_export.py): مؤشر على دفعات بدل تحميل الجداول كاملة
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+    EXPORT_COMPRESS = os.getenv("EXPORT_COMPRESS", "True").lower() == "true"  # ملف .zip بدل .csv / .xlsx
+    EXPORT_TTL_HOURS = int(os.getenv("EXPORT_TTL_HOURS", "24"))  # ملفات التصدير الأقدم تُحذف
+    EXPORT_LINK_TTL_MINUTES = int(os.getenv("EXPORT_LINK_TTL_MINUTES", "30"))  # صلاحية رابط التنزيل الموقّع
+    # استيراد CSV المجمّع (utils/csv_importer.py): قراءة على دفعات + executemany في معاملة واحدة لكل دفعة
+    IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "20000"))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))  # عدد أخطاء الصفوف المحفوظة في التقرير
+    # طابور المهام الخلفية (utils/job_queue.py + worker.py): الاستطلاع، إعادة المحاولة بتأخير أسي، والمهلات
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+    JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))  # مهمة قيد التنفيذ بلا تحديث = عامل متوقف
+    JOB_WORKER_TIMEOUT_SECONDS = int(os.getenv("JOB_WORKER_TIMEOUT_SECONDS", "30"))
+    JOB_IDEMPOTENCY_TTL_SECONDS = int(os.getenv("JOB_IDEMPOTENCY_TTL_SECONDS", "600"))
+    JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+    # بدون عامل يعمل تُنفَّذ المهمة داخل جلسة Streamlit (السلوك السابق) بدل بقائها في الطابور
+    JOB_INLINE_FALLBACK = os.getenv("JOB_INLINE_FALLBACK", "True").lower() == "true"
+    # كاتب الأحداث المجمّع (utils/event_writer.py): سجل التدقيق وجلسات الدخول تُكتب على دفعات بدل commit لكل حدث
+    EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "200"))  # كتابة فورية عند بلوغ هذا العدد
+    EVENT_FLUSH_SECONDS = float(os.getenv("EVENT_FLUSH_SECONDS", "2"))  # وإلا كل هذه المدة
+    EVENT_MAX_PENDING = int(os.getenv("EVENT_MAX_PENDING", "20000"))  # بعده يكتب المستدعي بنفسه (لا يُسقط أي حدث)
+    # الاحتفاظ: آخر N شهراً في الجداول، والأقدم يُنقل إلى ملفات شهرية تُحذف بعد EVENT_ARCHIVE_KEEP_MONTHS (0 = للأبد)
+    EVENT_HOT_MONTHS = int(os.getenv("EVENT_HOT_MONTHS", "3"))
+    EVENT_ARCHIVE_KEEP_MONTHS = int(os.getenv("EVENT_ARCHIVE_KEEP_MONTHS", "24"))
     
     # ===== 3. الذكاء الاصطناعي (Groq) =====
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")  # فارغ = الخادم الرسمي (يُستخدم لخادم بديل محلي للاختبار)
+    # طبقة الطلبات: مهلة كل طلب، إعادة المحاولة عند 429/5xx بتأخير أسي عشوائي، والحد الأقصى للطلبات المتزامنة
+    GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "60"))
+    GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+    GROQ_RETRY_BACKOFF_SECONDS = float(os.getenv("GROQ_RETRY_BACKOFF_SECONDS", "1.0"))
+    GROQ_RETRY_MAX_SECONDS = float(os.getenv("GROQ_RETRY_MAX_SECONDS", "20"))
+    GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+    # ذاكرة مؤقتة لردود تحليل الصور (مفتاحها SHA-256 للصورة + إصدار البرومبت + النموذج)
+    AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "True").lower() == "true"
+    AI_CACHE_TTL_HOURS = float(os.getenv("AI_CACHE_TTL_HOURS", "168"))
+    AI_CACHE_MAX_MB = float(os.getenv("AI_CACHE_MAX_MB", "50"))
+    # تجهيز الصور قبل الرفع: أقصى طول للحافة، صيغة الترميز، والجودة (تنخفض تدريجياً حتى الحجم المستهدف)
+    AI_IMAGE_MAX_EDGE = int(os.getenv("AI_IMAGE_MAX_EDGE", "1536"))
+    AI_IMAGE_FORMAT = os.getenv("AI_IMAGE_FORMAT", "JPEG")
+    AI_IMAGE_QUALITY = int(os.getenv("AI_IMAGE_QUALITY", "85"))
+    AI_IMAGE_MIN_QUALITY = int(os.getenv("AI_IMAGE_MIN_QUALITY", "60"))
+    AI_IMAGE_TARGET_KB = int(os.getenv("AI_IMAGE_TARGET_KB", "400"))
+    # نسخ العرض المشتقة في مخزن الصور: أقصى حافة للمصغرة والمتوسطة، وجودة WebP
+    IMAGE_THUMB_EDGE = int(os.getenv("IMAGE_THUMB_EDGE", "320"))
+    IMAGE_MEDIUM_EDGE = int(os.getenv("IMAGE_MEDIUM_EDGE", "1024"))
+    IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    # بوابة الصور المحلية (utils/image_gate.py): الحدة بتباين Laplacian على صورة 512px، التعريض بنسبة البكسلات
+    # المشبعة (أسود/أبيض). بين عتبتي الرفض والقبول = غير حاسم فيُسأل النموذج (quick_validate_image)
+    IMAGE_MIN_EDGE = int(os.getenv("IMAGE_MIN_EDGE", "300"))
+    IMAGE_MIN_CONTRAST = float(os.getenv("IMAGE_MIN_CONTRAST", "8"))
+    IMAGE_BLUR_REJECT = float(os.getenv("IMAGE_BLUR_REJECT", "10"))
+    IMAGE_BLUR_PASS = float(os.getenv("IMAGE_BLUR_PASS", "100"))
+    IMAGE_CLIPPED_REJECT = float(os.getenv("IMAGE_CLIPPED_REJECT", "0.9"))
+    IMAGE_CLIPPED_PASS = float(os.getenv("IMAGE_CLIPPED_PASS", "0.4"))
+    IMAGE_PHASH_DISTANCE = int(os.getenv("IMAGE_PHASH_DISTANCE", "8"))  # بت من 64: نفس الصورة بعد ضغط أو تصغير
+    IMAGE_PHASH_MEMORY = int(os.getenv("IMAGE_PHASH_MEMORY", "5000"))  # آخر N حكم تُقارن بها الصورة
+    IMAGE_GATE_LLM_FALLBACK = os.getenv("IMAGE_GATE_LLM_FALLBACK", "True").lower() == "true"
     
     # ===== 4. نظام البريد الإلكتروني =====
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -48,6 +156,14 @@ class Config:
     SENDER_EMAIL = os.getenv("SENDER_EMAIL", "")
     SENDER_PASSWORD = os.getenv("SENDER_PASSWORD", "")
     SENDER_NAME = os.getenv("SENDER_NAME", "SmartCar AI-Dealer")
+    # التشفير: starttls (المنفذ 587) أو ssl (465) أو none (خادم محلي للتجربة مثل aiosmtpd بدون تسجيل دخول)
+    SMTP_SECURITY = os.getenv("SMTP_SECURITY", "starttls").lower()
+    SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "30"))
+    # مجمع الجلسات (utils/smtp_pool.py): جلسات مسجلة الدخول يُعاد استخدامها بدل اتصال + TLS + login لكل رسالة
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+    SMTP_IDLE_SECONDS = int(os.getenv("SMTP_IDLE_SECONDS", "60"))  # أغلب المزودين يغلقون الجلسة الخاملة بعد دقيقة أو أكثر
+    SMTP_RATE_PER_SECOND = float(os.getenv("SMTP_RATE_PER_SECOND", "5"))  # لكل خادم SMTP؛ 0 = بدون حد
     CONTACT_EMAIL = os.getenv("CONTACT_EMAIL", "support@smartcar-ai.com")
     SUPPORT_PHONE = os.getenv("SUPPORT_PHONE", "+49123456789")
 
@@ -315,6 +431,14 @@ class Config:
     MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
     MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
     ALLOWED_IMAGE_TYPES = os.getenv("ALLOWED_IMAGE_TYPES", "jpg,jpeg,png,webp").split(",")
+    # واجهة REST للقراءة (utils/api_server.py + wsgi.py)
+    API_DEBUG = os.getenv("API_DEBUG", "False").lower() == "true"
+    API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+    API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "200"))
+    API_GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", "1024"))
+    API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "0"))  # Cache-Control؛ 0 = يتحقق العميل بـ ETag في كل طلب
+    # عنوان الواجهة كما يراه المتصفح؛ إذا حُدد تُنزَّل ملفات التصدير منها على أجزاء عبر رابط موقّع
+    API_PUBLIC_URL = os.getenv("API_PUBLIC_URL", "").rstrip("/")
 
     # ===== 7. الخطوط (Fonts) =====
     FONT_REGULAR = "Cairo-Regular.ttf"
@@ -327,7 +451,7 @@ class Config:
     def create_directories(cls):
         """إنشاء مجلدات النظام آلياً لضمان عدم حدوث خطأ FileNotFoundError"""
         dirs = [cls.CACHE_DIR, cls.BACKUPS_DIR, cls.DATA_DIR, cls.FONTS_DIR, 
-                cls.INVOICES_DIR, cls.LOGS_DIR, cls.UPLOADS_DIR, cls.IMAGES_DIR]
+                cls.INVOICES_DIR, cls.LOGS_DIR, cls.UPLOADS_DIR, cls.IMAGES_DIR, cls.IMAGE_STORE_DIR]
         for d in dirs:
             d.mkdir(parents=True, exist_ok=True)
 
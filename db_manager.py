@@ -8,12 +8,266 @@ import sqlite3
 import threading
 import json
 import time
+import random
+import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Set
+from typing import Optional, List, Dict, Any, Iterator, Set, Tuple
 from contextlib import contextmanager
 
 from config import Config
+from db_migrations import apply_migrations, get_schema_version
+from db_rollups import ROLLUPS, add_to_rollups, rebuild_rollups, check_rollups
+from db_search import SEARCH_INDEXES, index_new_rows, search_ids, search_index_exists, text_filter, rebuild_search_index
+from db_versions import bump_data_version
+from utils.image_store import register_image, schedule_variants, store_original
+from utils import metrics
+
+_db_logger = logging.getLogger("SmartCarAI.DB")
+
+
+def _is_busy_error(exc: Exception) -> bool:
+    """هل الخطأ ناتج عن قفل قاعدة البيانات (SQLITE_BUSY / SQLITE_LOCKED)؟"""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    msg = str(exc).lower()
+    return 'database is locked' in msg or 'database is busy' in msg or 'database table is locked' in msg
+
+
+def _period_bounds(year: int, month: Optional[int] = None) -> Tuple[str, str]:
+    """حدود فترة نصف مفتوحة [start, end) لسنة أو شهر كنصوص ISO
+
+    المقارنة النصية created_at >= start AND created_at < end تعمل مع صيغتي
+    CURRENT_TIMESTAMP و isoformat() وتسمح باستخدام الفهرس بدل strftime() على كل صف.
+    """
+    if month is None:
+        return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    if month == 12:
+        return f"{year:04d}-12-01", f"{year + 1:04d}-01-01"
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month + 1:02d}-01"
+
+
+def _previous_month(year: int, month: int) -> Tuple[int, int]:
+    """(السنة، الشهر) للشهر السابق - للمقارنة مع _period_bounds"""
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """مؤشر يقيس زمن كل استعلام وعدد صفوفه (utils/metrics.py) ويسجّل الاستعلامات البطيئة"""
+
+    _query = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._query = _record_query(sql, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._query = _record_query(sql, time.perf_counter() - start, self.rowcount)
+
+    # صفوف SELECT تُعد عند جلبها (fetchone / fetchmany / fetchall)
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self._query:
+            metrics.inc('db_query_rows_total', 1, query=self._query)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._query:
+            metrics.inc('db_query_rows_total', len(rows), query=self._query)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self._query:
+            metrics.inc('db_query_rows_total', len(rows), query=self._query)
+        return rows
+
+
+class _TimedConnection(sqlite3.Connection):
+    """اتصال يُنشئ مؤشرات مُقاسة الزمن حتى عند استخدام conn.execute مباشرة"""
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _record_query(sql: str, elapsed: float, rowcount: int = -1) -> Optional[str]:
+    """يعيد وسم الاستعلام في المقاييس (أو None إذا كانت معطلة) ليعد المؤشر صفوفه"""
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms >= Config.DB_SLOW_QUERY_MS:
+        _db_logger.warning(f"🐢 Slow query ({elapsed_ms:.1f} ms): {' '.join(sql.split())[:300]}")
+    if not Config.METRICS_ENABLED:
+        return None
+    query = metrics.query_label(sql)
+    metrics.observe('db_query_seconds', elapsed, query=query)
+    if rowcount > 0:  # INSERT / UPDATE / DELETE
+        metrics.inc('db_query_rows_total', rowcount, query=query)
+    return query
+
+
+class ConnectionPool:
+    """مجمع اتصالات SQLite محدود الحجم: يُهيّأ كل اتصال مرة واحدة ويُعاد استخدامه بدل فتحه مع كل استعلام"""
+
+    def __init__(self, db_path: Path, max_size: int = 8, read_only: bool = False):
+        self.db_path = Path(db_path)
+        self.max_size = max(1, int(max_size))
+        self.read_only = read_only
+        self.timeout = Config.DB_BUSY_TIMEOUT_MS / 1000
+        self._idle: List[sqlite3.Connection] = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        # الاتصال الذي يحمله الخيط الحالي (لإعادة استخدامه في الاستدعاءات المتداخلة)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """فتح اتصال جديد وتطبيق إعدادات PRAGMA عليه مرة واحدة فقط"""
+        if self.read_only:
+            uri = f"{self.db_path.absolute().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout,
+                                   check_same_thread=False, factory=_TimedConnection)
+        else:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout,
+                                   check_same_thread=False, factory=_TimedConnection)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.read_only:
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        # قيمة سالبة = الحجم بالكيلوبايت
+        conn.execute(f"PRAGMA cache_size = -{int(Config.DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE_MB) * 1024 * 1024}")
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """فحص سريع للاتصال قبل تسليمه"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _checkout(self) -> sqlite3.Connection:
+        """سحب اتصال خامل أو إنشاء اتصال جديد ضمن الحد الأقصى، مع الانتظار عند امتلاء المجمع"""
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.OperationalError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("connection pool exhausted")
+                self._cond.wait(remaining)
+
+        if conn is not None:
+            if self._is_healthy(conn):
+                return conn
+            # اتصال تالف: نستبدله باتصال جديد في نفس الخانة
+            self._close_quietly(conn)
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: sqlite3.Connection):
+        """إعادة الاتصال إلى المجمع بعد التأكد من عدم وجود معاملة مفتوحة"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append(conn)
+            else:
+                self._close_quietly(conn)
+                self._created -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        توفير اتصال من المجمع مع إدارة المعاملة:
+        الاستدعاء الخارجي يقوم بـ commit/rollback، أما الاستدعاءات المتداخلة في نفس الخيط
+        فتشارك الاتصال نفسه بدل حجز اتصال ثانٍ (وتجنب قفل قاعدة البيانات على نفسها).
+        """
+        local = self._local
+        held = getattr(local, 'conn', None)
+        if held is not None:
+            local.depth += 1
+            try:
+                yield held
+            finally:
+                local.depth -= 1
+            return
+
+        conn = self._checkout()
+        local.conn, local.depth = conn, 1
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            local.conn, local.depth = None, 0
+            self._release(conn)
+
+    def holds_connection(self) -> bool:
+        """هل يحمل الخيط الحالي اتصالاً مفتوحاً من هذا المجمع (استدعاء متداخل)؟"""
+        return getattr(self._local, 'conn', None) is not None
+
+    def close(self):
+        """إغلاق جميع الاتصالات الخاملة؛ الاتصالات المستخدمة حالياً تُغلق عند إعادتها"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {'size': self._created, 'idle': len(self._idle), 'max_size': self.max_size}
+
 
 class DatabaseManager:
     """مدير قاعدة البيانات SQLite الاحترافي بنمط Singleton لضمان استقرار الاتصال"""
@@ -34,314 +288,149 @@ class DatabaseManager:
             if not DatabaseManager._initialized:
                 self.db_path = db_path or Config.DATABASE_PATH
                 self.logger = Config.logger
+                self._pool = ConnectionPool(self.db_path, Config.DB_POOL_SIZE)
+                self._read_pool = ConnectionPool(self.db_path, Config.DB_READ_POOL_SIZE, read_only=True)
+                self._search_indexed: Dict[str, bool] = {}
                 self._init_database()
                 DatabaseManager._initialized = True
 
     @contextmanager
     def get_connection(self):
-        """توفير اتصال آمن مع دعم نمط WAL لسرعة المعالجة المتزامنة"""
-        conn = None
-        try:
-            conn = sqlite3.connect(str(self.db_path), timeout=30)
-            conn.row_factory = sqlite3.Row
-            # تفعيل العلاقات المنطقية ونمط الكتابة السريع
-            conn.execute("PRAGMA foreign_keys = ON")
-            conn.execute("PRAGMA journal_mode = WAL")
+        """توفير اتصال آمن من المجمع (WAL مفعّل مسبقاً) مع commit تلقائي أو rollback عند الخطأ"""
+        with self._pool.connection() as conn:
             yield conn
-            conn.commit()
-        except Exception as e:
-            if conn: conn.rollback()
-            raise e
-        finally:
-            if conn: conn.close()
+
+    @contextmanager
+    def get_read_connection(self):
+        """اتصال للقراءة فقط من مجمع مشترك بين خيوط Streamlit (لا يحجز قفل الكتابة)"""
+        with self._read_pool.connection() as conn:
+            yield conn
+
+    def close_connections(self):
+        """إغلاق مجمعات الاتصالات وإعادة فتحها (قبل استعادة نسخة احتياطية مثلاً)"""
+        self._pool.close()
+        self._read_pool.close()
+        self._pool = ConnectionPool(self.db_path, Config.DB_POOL_SIZE)
+        self._read_pool = ConnectionPool(self.db_path, Config.DB_READ_POOL_SIZE, read_only=True)
+
+    def get_pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """إحصائيات مجمعات الاتصالات (للوحة الإدارة)"""
+        return {'write': self._pool.stats(), 'read': self._read_pool.stats()}
+
+    # ===== 0. طبقة الوصول الموحدة (Data Access Helpers) =====
+    # تستخدمها الوحدات في utils/ و components/ و pages_app/ بدل sqlite3.connect المباشر،
+    # فتحصل على المجمع وإعدادات PRAGMA وقياس الزمن وإعادة المحاولة عند قفل القاعدة.
+
+    def run_in_transaction(self, func, read_only: bool = False, retries: Optional[int] = None):
+        """تنفيذ func(conn) داخل معاملة واحدة مع إعادة المحاولة (Backoff) عند SQLITE_BUSY"""
+        pool = self._read_pool if read_only else self._pool
+        retries = Config.DB_BUSY_RETRIES if retries is None else retries
+        # داخل معاملة خارجية لا يمكن إعادة التنفيذ بأمان - نترك الخطأ للمستدعي الخارجي
+        if pool.holds_connection():
+            retries = 0
+        attempt = 0
+        while True:
+            try:
+                with pool.connection() as conn:
+                    return func(conn)
+            except sqlite3.OperationalError as e:
+                if not _is_busy_error(e) or attempt >= retries:
+                    raise
+                delay = 0.05 * (2 ** attempt) + random.uniform(0, 0.05)
+                _db_logger.warning(f"Database busy, retry {attempt + 1}/{retries} in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def execute(self, query: str, params=()) -> sqlite3.Cursor:
+        """تنفيذ أمر كتابة واحد (INSERT/UPDATE/DELETE/DDL)؛ المؤشر المعاد يحمل lastrowid و rowcount"""
+        return self.run_in_transaction(lambda conn: conn.execute(query, params))
+
+    def executemany(self, query: str, seq_of_params) -> sqlite3.Cursor:
+        """تنفيذ أمر كتابة لعدة صفوف داخل معاملة واحدة"""
+        rows = list(seq_of_params)
+        return self.run_in_transaction(lambda conn: conn.executemany(query, rows))
+
+    def fetch_all(self, query: str, params=()) -> List[Dict]:
+        """جلب جميع الصفوف كقواميس عبر مجمع القراءة"""
+        return self.run_in_transaction(
+            lambda conn: [dict(row) for row in conn.execute(query, params).fetchall()], read_only=True)
+
+    def fetch_one(self, query: str, params=()) -> Optional[Dict]:
+        """جلب صف واحد كقاموس (أو None)"""
+        def _fetch(conn):
+            row = conn.execute(query, params).fetchone()
+            return dict(row) if row else None
+        return self.run_in_transaction(_fetch, read_only=True)
+
+    def fetch_value(self, query: str, params=(), default: Any = None) -> Any:
+        """جلب قيمة واحدة (العمود الأول من الصف الأول)"""
+        def _fetch(conn):
+            row = conn.execute(query, params).fetchone()
+            return row[0] if row and row[0] is not None else default
+        return self.run_in_transaction(_fetch, read_only=True)
+
+    def iter_rows(self, query: str, params=(), chunk_size: Optional[int] = None) -> Iterator[sqlite3.Row]:
+        """
+        مرور على نتائج استعلام كبير بدفعات fetchmany بدل fetchall (ذاكرة ثابتة مهما كان عدد الصفوف).
+        يحجز اتصال قراءة حتى نهاية المرور؛ الاستعلام يقرأ من لقطة واحدة متسقة.
+        """
+        chunk_size = chunk_size or Config.EXPORT_CHUNK_ROWS
+        with self.get_read_connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+
+    def bulk_insert_transactions(self, query: str, rows: List[tuple]) -> int:
+        """
+        إدخال مجمّع في transactions (استيراد CSV) داخل معاملة واحدة: Triggers الإدخال لكل صف (التجميعات،
+        فهرس البحث، عداد الإصدار) تُحذف مؤقتاً داخل المعاملة نفسها، ثم تُطبَّق آثارها باستعلام واحد على الصفوف
+        الجديدة وتُعاد الـ Triggers قبل commit. أي خطأ يلغي المعاملة كاملة بما فيها حذف الـ Triggers.
+        """
+        search_triggers = {f"trg_{fts_table}_ai": kind for kind, (base_table, fts_table, _) in SEARCH_INDEXES.items()
+                           if base_table == 'transactions'}
+        suspended = ['trg_sales_rollup_insert', 'trg_data_version_transactions_insert', *search_triggers]
+
+        def _insert(conn):
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM transactions").fetchone()[0]
+            triggers = conn.execute(
+                f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(suspended))})",
+                suspended).fetchall()
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            conn.executemany(query, rows)
+            for _, sql in triggers:
+                conn.execute(sql)
+
+            dropped = {name for name, _ in triggers}
+            if 'trg_sales_rollup_insert' in dropped:
+                add_to_rollups(conn, "t.id >= ?", (first_id,))
+            for name, kind in search_triggers.items():
+                if name in dropped:
+                    index_new_rows(conn, kind, first_id)
+            if 'trg_data_version_transactions_insert' in dropped:
+                bump_data_version(conn, 'transactions')
+            return len(rows)
+        return self.run_in_transaction(_insert)
 
     def _init_database(self):
-        """تأسيس الجداول الأربعة الرئيسية للنظام (الأمن، العمليات، HR، الإعدادات)"""
+        """تأسيس مخطط قاعدة البيانات عبر محرك الترحيل المُرقّم (db_migrations.py)"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 1. جدول المستخدمين (الأمن والمصادقة)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL, 
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL, 
-                full_name TEXT,
-                phone TEXT,
-                role TEXT DEFAULT 'user',
-                is_active INTEGER DEFAULT 1, 
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP, 
-                failed_attempts INTEGER DEFAULT 0, 
-                locked_until TIMESTAMP,
-                id_number TEXT,
-                nationality TEXT,
-                birth_date TEXT,
-                expiry_date TEXT,
-                license_number TEXT,
-                license_type TEXT,
-                license_expiry TEXT,
-                issue_date TEXT
-            )''')
-            
-            # إضافة الأعمدة الجديدة للتوافق مع قواعد البيانات القديمة
-            new_columns = [
-                ('full_name', 'TEXT'),
-                ('phone', 'TEXT'), ('id_number', 'TEXT'), ('nationality', 'TEXT'),
-                ('birth_date', 'TEXT'), ('expiry_date', 'TEXT'), ('license_number', 'TEXT'),
-                ('license_type', 'TEXT'), ('license_expiry', 'TEXT'), ('issue_date', 'TEXT'),
-                ('date_of_birth', 'TEXT'), ('gender', 'TEXT'), ('address', 'TEXT'),
-                ('license_class', 'TEXT'), ('blood_type', 'TEXT'), ('preferred_language', 'TEXT'),
-                # حقول العنوان المنفصلة
-                ('street_name', 'TEXT'), ('building_number', 'TEXT'), 
-                ('postal_code', 'TEXT'), ('city', 'TEXT')
-            ]
-            for col_name, col_type in new_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}")
-                except sqlite3.OperationalError:
-                    pass  # العمود موجود مسبقاً
-
-
-            # 2. جدول المعاملات (تقييم السيارات)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                user_id INTEGER NOT NULL,
-                car_type TEXT, brand TEXT, model TEXT, 
-                manufacture_year INTEGER, 
-                mileage INTEGER, 
-                estimated_price REAL NOT NULL, 
-                condition_analysis TEXT,
-                image_path TEXT, 
-                invoice_path TEXT, 
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )''')
-            
-            # إضافة أعمدة جديدة لجدول المعاملات (نوع الوقود، الحالة، اللون، نسبة الربح، الموظف + المواصفات التقنية)
-            trans_new_columns = [
-                ('fuel_type', 'TEXT'),
-                ('condition', 'TEXT'),
-                ('color', 'TEXT'),
-                ('profit_margin', 'REAL'),  # نسبة الربح عند البيع
-                ('employee_id', 'INTEGER'),  # الموظف الذي أجرى البيع
-                # الحقول التقنية الجديدة
-                ('transmission', 'TEXT'),
-                ('drivetrain', 'TEXT'),
-                ('emissions_class', 'TEXT'),
-                ('engine_cc', 'INTEGER'),
-                ('horsepower', 'INTEGER'),
-                ('accident_history', 'TEXT'),
-                ('warranty', 'TEXT'),
-                ('service_book', 'TEXT'),
-                ('equipment', 'TEXT'),  # JSON list of equipment items
-            ]
-            for col_name, col_type in trans_new_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE transactions ADD COLUMN {col_name} {col_type}")
-                except sqlite3.OperationalError:
-                    pass  # العمود موجود مسبقاً
-
-            # 3. جدول الموظفين (النظام المالي - HR)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                first_name TEXT NOT NULL,
-                last_name TEXT,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                monthly_salary REAL DEFAULT 0, 
-                hire_date DATE, 
-                is_active INTEGER DEFAULT 1,
-                urlaubsgeld REAL DEFAULT 0, 
-                feiertags_geld REAL DEFAULT 0,
-                annual_leave INTEGER DEFAULT 30,
-                sick_leave INTEGER DEFAULT 0,
-                unpaid_leave INTEGER DEFAULT 0,
-                notes TEXT
-            )''')
-            
-            # إضافة الأعمدة الجديدة لجدول الموظفين للتوافق مع قواعد البيانات القديمة
-            emp_new_columns = [
-                ('last_name', 'TEXT'), ('phone', 'TEXT'), ('email', 'TEXT'),
-                ('address', 'TEXT'), ('annual_leave', 'INTEGER DEFAULT 30'),
-                ('sick_leave', 'INTEGER DEFAULT 0'), ('unpaid_leave', 'INTEGER DEFAULT 0'),
-                ('special_leave', 'INTEGER DEFAULT 0'),
-                ('job_title', 'TEXT'), ('user_id', 'INTEGER'),
-                ('notes', 'TEXT')
-            ]
-            for col_name, col_type in emp_new_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE employees ADD COLUMN {col_name} {col_type}")
-                except sqlite3.OperationalError:
-                    pass  # العمود موجود مسبقاً
-
-            # 3.5 جدول سجلات الإجازات المرضية (Sick Leave Records)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS sick_leave_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                user_id INTEGER,
-                start_date DATE NOT NULL,
-                end_date DATE NOT NULL,
-                days_count INTEGER NOT NULL,
-                reason TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id),
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )''')
-
-            # 3.6 جدول سجل الحضور (Attendance Logs)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS attendance_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                check_in DATETIME,
-                check_out DATETIME,
-                net_worked_hours REAL DEFAULT 0,
-                break_deducted INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'incomplete',
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id)
-            )''')
-
-            # 3.7 جدول تعديلات الراتب (Salary Adjustments)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS salary_adjustments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                adjustment_type TEXT NOT NULL,
-                hours REAL DEFAULT 0,
-                amount REAL DEFAULT 0,
-                description TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id)
-            )''')
-
-            # إضافة عمود QR للموظفين
-            try:
-                cursor.execute("ALTER TABLE employees ADD COLUMN qr_token TEXT UNIQUE")
-            except sqlite3.OperationalError:
-                pass
-
-            # 4. جدول الإعدادات العامة
-            cursor.execute('''CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY, 
-                value TEXT
-            )''')
-            
-            # 5. جدول العقود (نظام التقسيط المتقدم)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS contracts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                transaction_id INTEGER,
-                total_price REAL NOT NULL,
-                down_payment REAL DEFAULT 0,
-                remaining_amount REAL NOT NULL,
-                installment_count INTEGER NOT NULL,
-                monthly_installment REAL NOT NULL,
-                interest_rate REAL DEFAULT 0,
-                late_fee_type TEXT DEFAULT 'fixed',
-                late_fee_amount REAL DEFAULT 50,
-                grace_period_days INTEGER DEFAULT 3,
-                payment_due_day INTEGER DEFAULT 1,
-                status TEXT DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                closed_at TIMESTAMP,
-                vehicle_vin TEXT,
-                vehicle_type TEXT,
-                vehicle_model TEXT,
-                vehicle_plate TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (transaction_id) REFERENCES transactions(id)
-            )''')
-            
-            # 6. جدول الفواتير/الأقساط (Payment Schedule)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS invoices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                invoice_number TEXT UNIQUE NOT NULL,
-                contract_id INTEGER NOT NULL,
-                installment_number INTEGER NOT NULL,
-                amount_due REAL NOT NULL,
-                amount_paid REAL DEFAULT 0,
-                late_fee REAL DEFAULT 0,
-                due_date DATE NOT NULL,
-                payment_date DATE,
-                status TEXT DEFAULT 'pending',
-                qr_hash TEXT,
-                previous_qr_hash TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (contract_id) REFERENCES contracts(id)
-            )''')
-            
-            # 7. جدول الدفعات (Payment Records)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                contract_id INTEGER NOT NULL,
-                amount REAL NOT NULL,
-                payment_method TEXT NOT NULL,
-                proof_path TEXT,
-                reference_number TEXT,
-                status TEXT DEFAULT 'pending',
-                verified_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (contract_id) REFERENCES contracts(id)
-            )''')
-            
-            # ترقية جدول payments إذا كان موجوداً بدون بعض الأعمدة
-            try:
-                cursor.execute("SELECT proof_path FROM payments LIMIT 1")
-            except sqlite3.OperationalError:
-                # العمود غير موجود، أضفه
-                cursor.execute("ALTER TABLE payments ADD COLUMN proof_path TEXT")
-                
-            try:
-                cursor.execute("SELECT reference_number FROM payments LIMIT 1")
-            except sqlite3.OperationalError:
-                cursor.execute("ALTER TABLE payments ADD COLUMN reference_number TEXT")
-                
-            try:
-                cursor.execute("SELECT verified_at FROM payments LIMIT 1")
-            except sqlite3.OperationalError:
-                cursor.execute("ALTER TABLE payments ADD COLUMN verified_at TIMESTAMP")
-            
-            # ترقية جدول contracts لإضافة الأعمدة الجديدة
-            contracts_new_columns = [
-                ('car_details', 'TEXT'),
-                ('total_amount', 'REAL'),
-                ('paid_amount', 'REAL DEFAULT 0'),
-                ('next_payment_date', 'DATE'),
-                ('reschedule_reason', 'TEXT')
-            ]
-            for col_name, col_type in contracts_new_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE contracts ADD COLUMN {col_name} {col_type}")
-                except sqlite3.OperationalError:
-                    pass  # العمود موجود مسبقاً
-
-            # 8. جدول فواتير الرواتب (Salary Invoices)
-            cursor.execute('''CREATE TABLE IF NOT EXISTS salary_invoices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                month INTEGER NOT NULL,
-                year INTEGER NOT NULL,
-                gross_salary REAL NOT NULL,
-                feiertags_geld REAL DEFAULT 0,
-                urlaubsgeld REAL DEFAULT 0,
-                deductions REAL DEFAULT 0,
-                tax_amount REAL DEFAULT 0,
-                insurance_amount REAL DEFAULT 0,
-                net_salary REAL NOT NULL,
-                pdf_path TEXT,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id)
-            )''')
+            apply_migrations(conn)
+
+    def get_schema_version(self) -> int:
+        """رقم آخر ترحيل مطبق على قاعدة البيانات"""
+        with self.get_connection() as conn:
+            return get_schema_version(conn)
 
     # ===== 1. إدارة المستخدمين والأمان =====
     
     def get_user_by_username(self, username: str) -> Optional[Dict]:
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM users WHERE username = ? OR email = ?', (username, username))
             row = cursor.fetchone()
@@ -349,7 +438,7 @@ class DatabaseManager:
 
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """جلب بيانات المستخدم بواسطة المعرف الفريد"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
             row = cursor.fetchone()
@@ -357,7 +446,7 @@ class DatabaseManager:
 
     def get_all_users(self) -> List[Dict]:
         """جلب جميع المستخدمين مرتبين حسب تاريخ الإنشاء"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM users ORDER BY created_at DESC')
             return [dict(row) for row in cursor.fetchall()]
@@ -418,33 +507,22 @@ class DatabaseManager:
 
     def create_transaction(self, user_id: int, car_data: Dict, estimated_price: float, condition_analysis: Dict, car_image_bytes: bytes = None, employee_id: int = None) -> int:
         """إنشاء سجل معاملة جديد وحفظ البيانات مع ربط الموظف للعمولة"""
-        
-        # حفظ الصورة كملف فعلي في data/images/
-        image_path = None
+
+        # جلب نسبة الربح الحالية لحفظها مع المعاملة
+        current_profit_margin = self.get_setting('company_profit_margin', 0.20)
+
+        # حفظ الأصل في مخزن الصور (data/images/store) قبل المعاملة - نفس الصورة تُحفظ مرة واحدة مهما تكرر تقييمها.
+        # داخل المعاملة تُسجَّل البصمة فقط، ونسخ WebP تُرمَّز بعد الحفظ خارج قفل الكتابة
+        stored_image = None
         if car_image_bytes:
             try:
-                images_dir = Config.IMAGES_DIR
-                images_dir.mkdir(parents=True, exist_ok=True)
-                
-                # إنشاء اسم ملف فريد
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                brand = car_data.get('brand', 'car').replace(' ', '_')
-                model = car_data.get('model', '').replace(' ', '_')
-                filename = f"{brand}_{model}_{timestamp}.jpg"
-                
-                file_path = images_dir / filename
-                with open(file_path, 'wb') as img_file:
-                    img_file.write(car_image_bytes)
-                
-                image_path = str(file_path)
+                stored_image = store_original(car_image_bytes)
             except Exception as e:
                 self.logger.error(f"Failed to save car image: {e}")
-                image_path = None
-
-        # جلب نسبة الربح الحالية لحفظها مع المعاملة
-        current_profit_margin = self.get_setting('company_profit_margin', 0.20)
 
         with self.get_connection() as conn:
+            image_path = register_image(conn, stored_image, car_image_bytes) if stored_image else None
+
             cursor = conn.cursor()
             # تحويل قائمة التجهيزات إلى JSON
             equipment_json = json.dumps(car_data.get('equipment', []), ensure_ascii=False) if car_data.get('equipment') else '[]'
@@ -483,7 +561,14 @@ class DatabaseManager:
                 equipment_json,
                 employee_id
             ))
-            return cursor.lastrowid
+            transaction_id = cursor.lastrowid
+
+        if image_path:
+            try:
+                schedule_variants(image_path)
+            except Exception as e:
+                self.logger.warning(f"Image variants not scheduled: {e}")
+        return transaction_id
     
     def get_employee_by_user_id(self, user_id: int) -> Dict:
         """جلب سجل الموظف المرتبط بحساب مستخدم معين"""
@@ -555,7 +640,7 @@ class DatabaseManager:
 
     def get_user_transactions(self, user_id: int, limit: Optional[int] = None) -> List[Dict]:
         """جلب العمليات التاريخية للمستخدم مع إمكانية تحديد العدد"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             query = "SELECT * FROM transactions WHERE user_id = ? ORDER BY created_at DESC"
             params = [user_id]
@@ -679,48 +764,51 @@ class DatabaseManager:
             return {}
 
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             res = conn.execute("SELECT COUNT(*), SUM(estimated_price) FROM transactions WHERE user_id = ?", (user_id,)).fetchone()
             return {'count': res[0] or 0, 'total_val': res[1] or 0.0}
 
     def get_transactions_by_year(self, year: int) -> List[Dict]:
         """جلب جميع المعاملات لسنة معينة"""
-        with self.get_connection() as conn:
+        start, end = _period_bounds(year)
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT t.*, u.full_name, u.username
                 FROM transactions t
                 LEFT JOIN users u ON t.user_id = u.id
-                WHERE strftime('%Y', t.created_at) = ?
+                WHERE t.created_at >= ? AND t.created_at < ?
                 ORDER BY t.created_at DESC
-            ''', (str(year),))
+            ''', (start, end))
             return [dict(row) for row in cursor.fetchall()]
 
 
     def get_statistics(self) -> Dict[str, Any]:
         """تجميع إحصائيات النظام الشاملة للوحة تحكم المسؤول"""
         stats = {}
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             # إحصائيات عامة
             stats['total_users'] = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-            stats['total_transactions'] = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
-            stats['total_estimated_value'] = conn.execute("SELECT SUM(estimated_price) FROM transactions").fetchone()[0] or 0.0
+            # العدد والمجموع من جدول التجميع الشهري (صف لكل شهر بدل صف لكل معاملة)
+            totals = conn.execute(
+                "SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(total_sales), 0) FROM sales_rollup_monthly"
+            ).fetchone()
+            stats['total_transactions'] = totals[0]
+            stats['total_estimated_value'] = totals[1] or 0.0
             stats['total_invoices'] = conn.execute("SELECT COUNT(*) FROM transactions WHERE invoice_path IS NOT NULL").fetchone()[0]
-            
-            # إحصائيات زمنية (اليوم، الأسبوع، الشهر، السنة)
-            for period, fmt in [('today', '%Y-%m-%d'), ('week', '%Y-%W'), ('month', '%Y-%m'), ('year', '%Y')]:
-                current = datetime.now().strftime(fmt.replace('%', '')) # Simple approximation, better to use SQL strftime
-                # Using SQL strftime for accurate periods
-                if period == 'today':
-                    val = conn.execute("SELECT COUNT(*) FROM transactions WHERE date(created_at) = date('now')").fetchone()[0]
-                elif period == 'week':
-                    val = conn.execute("SELECT COUNT(*) FROM transactions WHERE strftime('%Y-%W', created_at) = strftime('%Y-%W', 'now')").fetchone()[0]
-                elif period == 'month':
-                    val = conn.execute("SELECT COUNT(*) FROM transactions WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')").fetchone()[0]
-                elif period == 'year':
-                    val = conn.execute("SELECT COUNT(*) FROM transactions WHERE strftime('%Y', created_at) = strftime('%Y', 'now')").fetchone()[0]
-                
-                stats[f'{period}_transactions'] = val
+
+            # إحصائيات زمنية (اليوم، الأسبوع، الشهر، السنة) كنطاقات نصف مفتوحة على التجميع اليومي
+            # الأسبوع يبدأ يوم الإثنين كما في %W
+            periods = {
+                'today': ("date('now')", "date('now', '+1 day')"),
+                'week': ("date('now', 'weekday 0', '-6 days')", "date('now', 'weekday 0', '+1 day')"),
+                'month': ("date('now', 'start of month')", "date('now', 'start of month', '+1 month')"),
+                'year': ("date('now', 'start of year')", "date('now', 'start of year', '+1 year')"),
+            }
+            for period, (start, end) in periods.items():
+                stats[f'{period}_transactions'] = conn.execute(
+                    f"SELECT COALESCE(SUM(sales_count), 0) FROM sales_rollup_daily WHERE day >= {start} AND day < {end}"
+                ).fetchone()[0]
                 
         return stats
 
@@ -728,9 +816,11 @@ class DatabaseManager:
 
     def get_annual_report(self, year: int) -> Dict[str, float]:
         """حساب إجمالي الدخل والمصاريف والأرباح السنوية"""
-        with self.get_connection() as conn:
-            # الدخل من عمليات تقييم السيارات
-            income = conn.execute("SELECT SUM(estimated_price) FROM transactions WHERE strftime('%Y', created_at) = ?", (str(year),)).fetchone()[0] or 0.0
+        start, end = _period_bounds(year)
+        with self.get_read_connection() as conn:
+            # الدخل من عمليات تقييم السيارات (من التجميع الشهري)
+            income = conn.execute("SELECT SUM(total_sales) FROM sales_rollup_monthly WHERE month >= ? AND month < ?",
+                                  (start[:7], end[:7])).fetchone()[0] or 0.0
             
             # المصاريف تشمل الرواتب السنوية والمكافآت (Urlaubsgeld/Feiertagsgeld)
             expenses = conn.execute("SELECT SUM(monthly_salary * 12 + urlaubsgeld + feiertags_geld) FROM employees WHERE is_active = 1").fetchone()[0] or 0.0
@@ -742,90 +832,107 @@ class DatabaseManager:
             }
 
     def get_available_years(self) -> List[int]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT strftime('%Y', created_at) as year FROM transactions")
-            years = [int(row['year']) for row in cursor.fetchall() if row['year']]
-            return sorted(years, reverse=True) if years else [datetime.now().year]
+        """السنوات التي تحتوي معاملات (من التجميع الشهري)"""
+        with self.get_read_connection() as conn:
+            rows = conn.execute("SELECT DISTINCT substr(month, 1, 4) FROM sales_rollup_monthly WHERE month != ''").fetchall()
+        years = [int(row[0]) for row in rows if row[0] and row[0].isdigit()]
+        return sorted(years, reverse=True) if years else [datetime.now().year]
 
-    # ===== 3.0.1 تقارير أرباح الشركة (Company Profit Reports) =====
+    # ===== 3.0.1 تجميعات المبيعات (Sales Rollups - db_rollups.py) =====
+
+    def get_sales_rollup(self, grain: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """قراءة تجميع المبيعات (daily / monthly / brand / employee / weekday_hour)
+
+        start / end نطاق نصف مفتوح على المفتاح الأول ('YYYY-MM-DD' لليومي، 'YYYY-MM' للبقية)
+        """
+        table, keys = ROLLUPS[grain]
+        query = f"SELECT * FROM {table} WHERE 1=1"
+        params = []
+        if start:
+            query += f" AND {keys[0][0]} >= ?"
+            params.append(start)
+        if end:
+            query += f" AND {keys[0][0]} < ?"
+            params.append(end)
+        query += f" ORDER BY {', '.join(k[0] for k in keys)}"
+        return self.fetch_all(query, params)
+
+    def rebuild_sales_rollups(self) -> Dict[str, int]:
+        """إعادة بناء جداول التجميع من transactions (عدد الفترات لكل تجميع)"""
+        with self.get_connection() as conn:
+            counts = rebuild_rollups(conn)
+        self.logger.info(f"Sales rollups rebuilt: {counts}")
+        return counts
+
+    def check_sales_rollups(self) -> Dict[str, List[Dict]]:
+        """فحص اتساق جداول التجميع مع transactions (قاموس فارغ = متسق)"""
+        with self.get_read_connection() as conn:
+            return check_rollups(conn)
+
+    # ===== 3.0.2 تقارير أرباح الشركة (Company Profit Reports) =====
+
+    def _monthly_sales_totals(self, year: int, default_margin: float) -> Dict[int, Dict]:
+        """أشهر السنة من التجميع الشهري: {رقم الشهر: {sales_count, total_sales, profit}}"""
+        start, end = _period_bounds(year)
+        with self.get_read_connection() as conn:
+            # الربح بنسبة الربح المحفوظة لكل معاملة (أو الافتراضية للمعاملات القديمة بدون نسبة)
+            rows = conn.execute("""
+                SELECT
+                    CAST(substr(month, 6, 2) AS INTEGER) as month,
+                    sales_count,
+                    total_sales,
+                    margin_sales + unmargined_sales * ? as total_profit
+                FROM sales_rollup_monthly
+                WHERE month >= ? AND month < ?
+            """, (float(default_margin), start[:7], end[:7])).fetchall()
+        return {
+            row['month']: {
+                'sales_count': row['sales_count'] or 0,
+                'total_sales': row['total_sales'] or 0,
+                'profit': row['total_profit'] or 0
+            }
+            for row in rows if row['month']
+        }
 
     def get_monthly_profits(self, year: int) -> List[Dict]:
         """حساب الأرباح لكل شهر في السنة المحددة (باستخدام نسبة الربح المحفوظة لكل معاملة)"""
         default_margin = self.get_setting('company_profit_margin', 0.20)
-        monthly_data = []
-        
-        with self.get_connection() as conn:
-            for month in range(1, 13):
-                month_str = f"{month:02d}"
-                # حساب الأرباح باستخدام نسبة الربح المحفوظة لكل معاملة (أو الافتراضية للقديمة)
-                result = conn.execute("""
-                    SELECT 
-                        COUNT(*) as sales_count, 
-                        COALESCE(SUM(estimated_price), 0) as total_sales,
-                        COALESCE(SUM(estimated_price * COALESCE(profit_margin, ?)), 0) as total_profit
-                    FROM transactions 
-                    WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
-                """, (float(default_margin), str(year), month_str)).fetchone()
-                
-                monthly_data.append({
-                    'month': month,
-                    'sales_count': result['sales_count'] or 0,
-                    'total_sales': result['total_sales'] or 0,
-                    'profit': result['total_profit'] or 0
-                })
-        
-        return monthly_data
+        totals = self._monthly_sales_totals(year, default_margin)
+        empty = {'sales_count': 0, 'total_sales': 0, 'profit': 0}
+        return [{'month': month, **totals.get(month, empty)} for month in range(1, 13)]
 
     def get_quarterly_profits(self, year: int) -> List[Dict]:
-        """حساب الأرباح لكل ربع في السنة (باستخدام نسبة الربح المحفوظة لكل معاملة)"""
+        """حساب الأرباح لكل ربع في السنة (تجميع نتائج المرور الشهري الواحد)"""
         default_margin = self.get_setting('company_profit_margin', 0.20)
-        quarters = [
-            {'quarter': 1, 'months': ['01', '02', '03'], 'name': 'Q1'},
-            {'quarter': 2, 'months': ['04', '05', '06'], 'name': 'Q2'},
-            {'quarter': 3, 'months': ['07', '08', '09'], 'name': 'Q3'},
-            {'quarter': 4, 'months': ['10', '11', '12'], 'name': 'Q4'}
-        ]
-        
+        totals = self._monthly_sales_totals(year, default_margin)
+
         quarterly_data = []
-        
-        with self.get_connection() as conn:
-            for q in quarters:
-                placeholders = ','.join(['?' for _ in q['months']])
-                params = [float(default_margin), str(year)] + q['months']
-                
-                result = conn.execute(f"""
-                    SELECT 
-                        COUNT(*) as sales_count, 
-                        COALESCE(SUM(estimated_price), 0) as total_sales,
-                        COALESCE(SUM(estimated_price * COALESCE(profit_margin, ?)), 0) as total_profit
-                    FROM transactions 
-                    WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) IN ({placeholders})
-                """, params).fetchone()
-                
-                quarterly_data.append({
-                    'quarter': q['quarter'],
-                    'name': q['name'],
-                    'sales_count': result['sales_count'] or 0,
-                    'total_sales': result['total_sales'] or 0,
-                    'profit': result['total_profit'] or 0
-                })
-        
+        for quarter in range(1, 5):
+            months = [totals[m] for m in range(quarter * 3 - 2, quarter * 3 + 1) if m in totals]
+            quarterly_data.append({
+                'quarter': quarter,
+                'name': f'Q{quarter}',
+                'sales_count': sum(m['sales_count'] for m in months),
+                'total_sales': sum(m['total_sales'] for m in months),
+                'profit': sum(m['profit'] for m in months)
+            })
+
         return quarterly_data
 
     def get_yearly_profit(self, year: int) -> Dict:
         """حساب إجمالي الربح السنوي (باستخدام نسبة الربح المحفوظة لكل معاملة)"""
         default_margin = self.get_setting('company_profit_margin', 0.20)
-        
-        with self.get_connection() as conn:
+        start, end = _period_bounds(year)
+
+        with self.get_read_connection() as conn:
             result = conn.execute("""
-                SELECT 
-                    COUNT(*) as sales_count, 
-                    COALESCE(SUM(estimated_price), 0) as total_sales,
-                    COALESCE(SUM(estimated_price * COALESCE(profit_margin, ?)), 0) as total_profit
-                FROM transactions 
-                WHERE strftime('%Y', created_at) = ?
-            """, (float(default_margin), str(year))).fetchone()
+                SELECT
+                    COALESCE(SUM(sales_count), 0) as sales_count,
+                    COALESCE(SUM(total_sales), 0) as total_sales,
+                    COALESCE(SUM(margin_sales + unmargined_sales * ?), 0) as total_profit
+                FROM sales_rollup_monthly
+                WHERE month >= ? AND month < ?
+            """, (float(default_margin), start[:7], end[:7])).fetchone()
             
             return {
                 'year': year,
@@ -835,6 +942,48 @@ class DatabaseManager:
                 'profit_margin': float(default_margin)  # النسبة الحالية للعرض
             }
 
+    # ===== 3.0.3 البحث النصي الكامل (Full-Text Search - db_search.py) =====
+
+    def _is_search_indexed(self, kind: str) -> bool:
+        """هل فهرس FTS5 للنوع موجود (يُحفظ بعد أول فحص؛ غيابه يعني SQLite بدون FTS5)"""
+        if kind not in self._search_indexed:
+            with self.get_read_connection() as conn:
+                self._search_indexed[kind] = search_index_exists(conn, kind)
+        return self._search_indexed[kind]
+
+    def search(self, kind: str, query: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        """بحث مرتب حسب الصلة في cars / customers / employees مع التقسيم إلى صفحات
+
+        Returns:
+            {'items': [صفوف الجدول الأصلي بترتيب الصلة], 'has_more': هل توجد صفحة تالية}
+        """
+        base_table = SEARCH_INDEXES[kind][0]
+        indexed = self._is_search_indexed(kind)
+
+        def _search(conn):
+            # صف إضافي لمعرفة وجود صفحة تالية بدون COUNT(*)
+            ids = search_ids(conn, kind, query, limit + 1, offset, indexed=indexed)
+            if not ids:
+                return {'items': [], 'has_more': False}
+            page = ids[:limit]
+            rows = conn.execute(f"SELECT * FROM {base_table} WHERE id IN ({','.join('?' * len(page))})",
+                                page).fetchall()
+            by_id = {row['id']: dict(row) for row in rows}
+            return {'items': [by_id[i] for i in page if i in by_id], 'has_more': len(ids) > limit}
+
+        return self.run_in_transaction(_search, read_only=True)
+
+    def search_filter(self, kind: str, query: str, columns: List[str], id_column: str = 'id') -> Tuple[str, list]:
+        """شرط WHERE لتصفية نص جزئي عبر فهرس البحث (بديل LOWER(col) LIKE LOWER('%q%'))"""
+        return text_filter(kind, query, columns, id_column, indexed=self._is_search_indexed(kind))
+
+    def rebuild_search_index(self) -> Dict[str, int]:
+        """إعادة بناء فهارس البحث من الجداول الأصلية (عدد الصفوف المفهرسة لكل نوع)"""
+        with self.get_connection() as conn:
+            counts = rebuild_search_index(conn)
+        self.logger.info(f"Search index rebuilt: {counts}")
+        return counts
+
     # ===== 3.1 إدارة الموظفين (Employee Management) =====
 
     def create_employee(self, **kwargs):
@@ -861,14 +1010,14 @@ class DatabaseManager:
 
     def get_all_employees(self) -> List[Dict]:
         """جلب جميع الموظفين"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM employees ORDER BY is_active DESC, first_name ASC")
             return [dict(row) for row in cursor.fetchall()]
 
     def get_employee(self, employee_id: int) -> Optional[Dict]:
         """جلب موظف واحد بالـ ID"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM employees WHERE id = ?", (employee_id,))
             row = cursor.fetchone()
@@ -1057,7 +1206,7 @@ class DatabaseManager:
 
     def get_setting(self, key: str, default: Any = None) -> Any:
         """جلب إعدادات النظام المخزنة بتنسيق JSON"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
             if row:
                 try:
@@ -1078,14 +1227,9 @@ class DatabaseManager:
     # ===== 5. العقود والدفعات =====
 
     def backup_database(self) -> str:
-        """إنشاء نسخة احتياطية من قاعدة البيانات"""
-        import shutil
-        from datetime import datetime
-        backup_dir = Path(__file__).parent / "backups"
-        backup_dir.mkdir(exist_ok=True)
-        backup_path = backup_dir / f"smartcar_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        shutil.copy2(self.db_path, backup_path)
-        return str(backup_path)
+        """إنشاء نسخة احتياطية متسقة أثناء العمل (SQLite Backup API) مع فحص السلامة والضغط"""
+        from utils.backup_manager import BackupManager
+        return BackupManager.create_backup(self.db_path)
 
     def create_contract(self, user_id: int, car_data: Dict, total_amount: float, **kwargs) -> int:
         """إنشاء عقد جديد مع جدول الأقساط"""
@@ -1547,6 +1691,42 @@ class DatabaseManager:
             ''')
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_payroll_batch(self, year: int, month: int, commission_rate: float = 0.0) -> List[Dict]:
+        """دفعة الرواتب الشهرية لكل الموظفين النشطين في استعلام واحد
+
+        كل صف يحتوي بيانات الموظف (كما في get_active_employees_for_payroll) مع مبيعات الشهر والعمولة
+        وفاتورة الراتب الموجودة إن وُجدت (invoice_id / invoice_net_salary / invoice_pdf_path).
+        """
+        start, end = _period_bounds(year, month)
+        with self.get_read_connection() as conn:
+            rows = conn.execute('''
+                SELECT e.id, e.first_name, e.last_name, e.email, e.phone, e.job_title,
+                       e.monthly_salary, e.feiertags_geld, e.urlaubsgeld, e.is_active,
+                       COALESCE(s.sales_count, 0) as sales_count,
+                       COALESCE(s.total_sales, 0) as total_sales,
+                       si.id as invoice_id, si.net_salary as invoice_net_salary, si.pdf_path as invoice_pdf_path
+                FROM employees e
+                LEFT JOIN sales_rollup_employee s
+                       ON s.employee_id = e.id AND s.month >= ? AND s.month < ?
+                LEFT JOIN salary_invoices si
+                       ON si.id = (SELECT MIN(id) FROM salary_invoices
+                                   WHERE employee_id = e.id AND year = ? AND month = ?)
+                WHERE e.is_active = 1 AND e.monthly_salary > 0
+                ORDER BY e.first_name, e.last_name
+            ''', (start[:7], end[:7], year, month)).fetchall()
+
+        batch = []
+        for row in rows:
+            item = dict(row)
+            item['commission'] = item['total_sales'] * commission_rate
+            batch.append(item)
+        return batch
+
+    _SALARY_INVOICE_COLUMNS = (
+        'employee_id', 'month', 'year', 'gross_salary', 'feiertags_geld', 'urlaubsgeld',
+        'deductions', 'tax_amount', 'insurance_amount', 'net_salary', 'pdf_path', 'notes'
+    )
+
     def create_salary_invoice(self, employee_id: int, month: int, year: int,
                               gross_salary: float, net_salary: float,
                               feiertags_geld: float = 0, urlaubsgeld: float = 0,
@@ -1556,14 +1736,37 @@ class DatabaseManager:
         """إنشاء فاتورة راتب جديدة"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO salary_invoices 
-                (employee_id, month, year, gross_salary, feiertags_geld, urlaubsgeld,
-                 deductions, tax_amount, insurance_amount, net_salary, pdf_path, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            cursor.execute(f'''
+                INSERT INTO salary_invoices ({', '.join(self._SALARY_INVOICE_COLUMNS)})
+                VALUES ({', '.join('?' * len(self._SALARY_INVOICE_COLUMNS))})
             ''', (employee_id, month, year, gross_salary, feiertags_geld, urlaubsgeld,
                   deductions, tax_amount, insurance_amount, net_salary, pdf_path, notes))
             return cursor.lastrowid
+
+    def create_salary_invoices(self, invoices: List[Dict]) -> int:
+        """إنشاء فواتير رواتب لعدة موظفين في معاملة واحدة
+
+        كل عنصر يحمل وسائط create_salary_invoice نفسها؛ الموظف الذي لديه فاتورة للشهر نفسه يُتخطى.
+        Returns:
+            عدد الفواتير المنشأة
+        """
+        defaults = {'feiertags_geld': 0, 'urlaubsgeld': 0, 'deductions': 0, 'tax_amount': 0,
+                    'insurance_amount': 0, 'pdf_path': None, 'notes': None}
+        rows = [tuple({**defaults, **inv}[col] for col in self._SALARY_INVOICE_COLUMNS) + (
+                    inv['employee_id'], inv['year'], inv['month']) for inv in invoices]
+        if not rows:
+            return 0
+        columns = ', '.join(self._SALARY_INVOICE_COLUMNS)
+        placeholders = ', '.join('?' * len(self._SALARY_INVOICE_COLUMNS))
+        with self.get_connection() as conn:
+            cursor = conn.executemany(f'''
+                INSERT INTO salary_invoices ({columns})
+                SELECT {placeholders}
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM salary_invoices WHERE employee_id = ? AND year = ? AND month = ?
+                )
+            ''', rows)
+            return cursor.rowcount
     
     def get_salary_invoices_by_month(self, year: int, month: int) -> List[Dict]:
         """جلب جميع فواتير الرواتب لشهر معين"""
@@ -1779,19 +1982,20 @@ class DatabaseManager:
 
     def get_monthly_attendance(self, employee_id: int, year: int, month: int) -> List[Dict]:
         """جلب سجل الحضور الشهري للموظف"""
+        start, end = _period_bounds(year, month)
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT * FROM attendance_logs 
-                WHERE employee_id = ? 
-                AND strftime('%Y', date) = ? 
-                AND strftime('%m', date) = ?
+                SELECT * FROM attendance_logs
+                WHERE employee_id = ?
+                AND date >= ? AND date < ?
                 ORDER BY date
-            ''', (employee_id, str(year), f'{month:02d}'))
+            ''', (employee_id, start, end))
             return [dict(row) for row in cursor.fetchall()]
 
     def get_monthly_adjustments(self, employee_id: int, year: int, month: int) -> Dict:
         """جلب ملخص تعديلات الراتب الشهرية"""
+        start, end = _period_bounds(year, month)
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -1800,10 +2004,9 @@ class DatabaseManager:
                 SELECT COALESCE(SUM(hours), 0) as total_hours, COALESCE(SUM(amount), 0) as total_amount
                 FROM salary_adjustments 
                 WHERE employee_id = ? 
-                AND strftime('%Y', date) = ? 
-                AND strftime('%m', date) = ?
+                AND date >= ? AND date < ?
                 AND adjustment_type = 'overtime'
-            ''', (employee_id, str(year), f'{month:02d}'))
+            ''', (employee_id, start, end))
             overtime = cursor.fetchone()
             
             # الخصومات
@@ -1811,10 +2014,9 @@ class DatabaseManager:
                 SELECT COALESCE(SUM(hours), 0) as total_hours, COALESCE(SUM(amount), 0) as total_amount
                 FROM salary_adjustments 
                 WHERE employee_id = ? 
-                AND strftime('%Y', date) = ? 
-                AND strftime('%m', date) = ?
+                AND date >= ? AND date < ?
                 AND adjustment_type = 'deduction'
-            ''', (employee_id, str(year), f'{month:02d}'))
+            ''', (employee_id, start, end))
             deductions = cursor.fetchone()
             
             return {
@@ -1860,28 +2062,33 @@ class DatabaseManager:
 
     # ===== تتبع مبيعات الموظفين (Employee Sales Tracking) =====
     
+    @staticmethod
+    def _sales_period_filter(month: int = None, year: int = None) -> Tuple[str, List[str]]:
+        """شرط الفترة على عمود month في sales_rollup_employee: (نص SQL، المعاملات)"""
+        if year:
+            start, end = _period_bounds(year, month)
+            return " AND month >= ? AND month < ?", [start[:7], end[:7]]
+        if month:
+            # شهر بدون سنة: نفس الشهر في كل السنوات
+            return " AND substr(month, 6, 2) = ?", [f"{month:02d}"]
+        return "", []
+
     def get_employee_sales(self, employee_id: int, month: int = None, year: int = None) -> Dict:
         """حساب مبيعات موظف معين في شهر/سنة محددة"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # بناء الاستعلام حسب المعايير
+
+            # بناء الاستعلام حسب المعايير (من تجميع مبيعات الموظفين الشهري)
+            period_sql, period_params = self._sales_period_filter(month, year)
             query = """
-                SELECT 
-                    COUNT(*) as sales_count,
-                    COALESCE(SUM(estimated_price), 0) as total_sales
-                FROM transactions 
+                SELECT
+                    COALESCE(SUM(sales_count), 0) as sales_count,
+                    COALESCE(SUM(total_sales), 0) as total_sales
+                FROM sales_rollup_employee
                 WHERE employee_id = ?
-            """
-            params = [employee_id]
-            
-            if year:
-                query += " AND strftime('%Y', created_at) = ?"
-                params.append(str(year))
-            if month:
-                query += " AND strftime('%m', created_at) = ?"
-                params.append(f"{month:02d}")
-            
+            """ + period_sql
+            params = [employee_id] + period_params
+
             result = cursor.execute(query, params).fetchone()
             
             return {
@@ -1891,24 +2098,35 @@ class DatabaseManager:
             }
     
     def get_all_employees_sales_summary(self, month: int = None, year: int = None, commission_rate: float = 0.03) -> List[Dict]:
-        """حصول على ملخص مبيعات جميع الموظفين مع الرواتب والعمولات"""
-        employees = self.get_all_employees()
+        """حصول على ملخص مبيعات جميع الموظفين مع الرواتب والعمولات (استعلام واحد مجمّع)"""
+        period_sql, period_params = self._sales_period_filter(month, year)
+        with self.get_read_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT e.id, e.first_name, e.last_name, COALESCE(e.monthly_salary, 0) as monthly_salary,
+                       COALESCE(s.sales_count, 0) as sales_count,
+                       COALESCE(s.total_sales, 0) as total_sales
+                FROM employees e
+                LEFT JOIN (
+                    SELECT employee_id, SUM(sales_count) as sales_count, SUM(total_sales) as total_sales
+                    FROM sales_rollup_employee
+                    WHERE 1=1{period_sql}
+                    GROUP BY employee_id
+                ) s ON s.employee_id = e.id
+                ORDER BY e.is_active DESC, e.first_name ASC
+            """, period_params).fetchall()
+
         summary = []
-        
-        for emp in employees:
-            sales_data = self.get_employee_sales(emp['id'], month, year)
-            commission = sales_data['total_sales'] * commission_rate
-            
+        for row in rows:
+            commission = row['total_sales'] * commission_rate
             summary.append({
-                'employee_id': emp['id'],
-                'name': f"{emp.get('first_name', '')} {emp.get('last_name', '')}".strip(),
-                'monthly_salary': emp.get('monthly_salary', 0),
-                'sales_count': sales_data['sales_count'],
-                'total_sales': sales_data['total_sales'],
+                'employee_id': row['id'],
+                'name': f"{row['first_name'] or ''} {row['last_name'] or ''}".strip(),
+                'monthly_salary': row['monthly_salary'],
+                'sales_count': row['sales_count'],
+                'total_sales': row['total_sales'],
                 'commission': commission,
-                'total_salary': emp.get('monthly_salary', 0) + commission
+                'total_salary': row['monthly_salary'] + commission
             })
-        
         return summary
     
     def assign_default_employee_to_transactions(self, default_employee_id: int) -> int:
@@ -0,0 +1,727 @@
+"""
+db_migrations.py - محرك ترحيل مخطط قاعدة البيانات (Schema Migrations)
+SmartCar AI-Dealer
+كل ترحيل له رقم إصدار ثابت، يُطبَّق مرة واحدة داخل معاملة ويُسجَّل في جدول schema_migrations
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Callable, List, Set, Tuple
+
+from db_rollups import create_rollup_schema, rebuild_rollups
+from db_search import create_search_schema, rebuild_search_index
+from db_versions import create_data_version_schema
+from utils.image_store import create_image_store_schema
+from utils.image_gate import create_image_gate_schema
+from utils.event_writer import create_event_schema, create_spool_replay_schema, rebuild_event_counts
+
+_logger = logging.getLogger("SmartCarAI.DB")
+
+
+# ===== أدوات مساعدة =====
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> Set[str]:
+    """أسماء أعمدة الجدول الحالية"""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: List[Tuple[str, str]]):
+    """إضافة الأعمدة الناقصة فقط (بديل حلقة try/except ALTER TABLE)"""
+    existing = _table_columns(conn, table)
+    for col_name, col_type in columns:
+        if col_name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
+            existing.add(col_name)
+
+
+# ===== 1. المخطط الأساسي (الأمن، العمليات، HR، الإعدادات، العقود) =====
+
+def _m001_core_schema(conn: sqlite3.Connection):
+    # 1. جدول المستخدمين (الأمن والمصادقة)
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        full_name TEXT,
+        phone TEXT,
+        role TEXT DEFAULT 'user',
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP,
+        failed_attempts INTEGER DEFAULT 0,
+        locked_until TIMESTAMP,
+        id_number TEXT,
+        nationality TEXT,
+        birth_date TEXT,
+        expiry_date TEXT,
+        license_number TEXT,
+        license_type TEXT,
+        license_expiry TEXT,
+        issue_date TEXT
+    )''')
+
+    # الأعمدة المضافة لاحقاً (للتوافق مع قواعد البيانات القديمة)
+    _add_missing_columns(conn, 'users', [
+        ('full_name', 'TEXT'),
+        ('phone', 'TEXT'), ('id_number', 'TEXT'), ('nationality', 'TEXT'),
+        ('birth_date', 'TEXT'), ('expiry_date', 'TEXT'), ('license_number', 'TEXT'),
+        ('license_type', 'TEXT'), ('license_expiry', 'TEXT'), ('issue_date', 'TEXT'),
+        ('date_of_birth', 'TEXT'), ('gender', 'TEXT'), ('address', 'TEXT'),
+        ('license_class', 'TEXT'), ('blood_type', 'TEXT'), ('preferred_language', 'TEXT'),
+        # حقول العنوان المنفصلة
+        ('street_name', 'TEXT'), ('building_number', 'TEXT'),
+        ('postal_code', 'TEXT'), ('city', 'TEXT'),
+        ('failed_attempts', 'INTEGER DEFAULT 0'), ('locked_until', 'TIMESTAMP'),
+    ])
+
+    # 2. جدول المعاملات (تقييم السيارات)
+    conn.execute('''CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        car_type TEXT, brand TEXT, model TEXT,
+        manufacture_year INTEGER,
+        mileage INTEGER,
+        estimated_price REAL NOT NULL,
+        condition_analysis TEXT,
+        image_path TEXT,
+        invoice_path TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )''')
+
+    # نوع الوقود، الحالة، اللون، نسبة الربح، الموظف + المواصفات التقنية
+    _add_missing_columns(conn, 'transactions', [
+        ('fuel_type', 'TEXT'),
+        ('condition', 'TEXT'),
+        ('color', 'TEXT'),
+        ('profit_margin', 'REAL'),  # نسبة الربح عند البيع
+        ('employee_id', 'INTEGER'),  # الموظف الذي أجرى البيع
+        ('transmission', 'TEXT'),
+        ('drivetrain', 'TEXT'),
+        ('emissions_class', 'TEXT'),
+        ('engine_cc', 'INTEGER'),
+        ('horsepower', 'INTEGER'),
+        ('accident_history', 'TEXT'),
+        ('warranty', 'TEXT'),
+        ('service_book', 'TEXT'),
+        ('equipment', 'TEXT'),  # JSON list of equipment items
+    ])
+
+    # 3. جدول الموظفين (النظام المالي - HR)
+    conn.execute('''CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT,
+        phone TEXT,
+        email TEXT,
+        address TEXT,
+        monthly_salary REAL DEFAULT 0,
+        hire_date DATE,
+        is_active INTEGER DEFAULT 1,
+        urlaubsgeld REAL DEFAULT 0,
+        feiertags_geld REAL DEFAULT 0,
+        annual_leave INTEGER DEFAULT 30,
+        sick_leave INTEGER DEFAULT 0,
+        unpaid_leave INTEGER DEFAULT 0,
+        notes TEXT
+    )''')
+
+    # qr_token: لا يسمح SQLite بإضافة عمود UNIQUE عبر ALTER، لذا يُفرض التفرد بفهرس فريد (انظر الترحيل 3)
+    _add_missing_columns(conn, 'employees', [
+        ('last_name', 'TEXT'), ('phone', 'TEXT'), ('email', 'TEXT'),
+        ('address', 'TEXT'), ('annual_leave', 'INTEGER DEFAULT 30'),
+        ('sick_leave', 'INTEGER DEFAULT 0'), ('unpaid_leave', 'INTEGER DEFAULT 0'),
+        ('special_leave', 'INTEGER DEFAULT 0'),
+        ('job_title', 'TEXT'), ('user_id', 'INTEGER'),
+        ('notes', 'TEXT'), ('qr_token', 'TEXT'),
+    ])
+
+    # 3.5 جدول سجلات الإجازات المرضية (Sick Leave Records)
+    conn.execute('''CREATE TABLE IF NOT EXISTS sick_leave_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER NOT NULL,
+        user_id INTEGER,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        days_count INTEGER NOT NULL,
+        reason TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (employee_id) REFERENCES employees(id),
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )''')
+
+    # 3.6 جدول سجل الحضور (Attendance Logs)
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        check_in DATETIME,
+        check_out DATETIME,
+        net_worked_hours REAL DEFAULT 0,
+        break_deducted INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'incomplete',
+        notes TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (employee_id) REFERENCES employees(id)
+    )''')
+
+    # 3.7 جدول تعديلات الراتب (Salary Adjustments)
+    conn.execute('''CREATE TABLE IF NOT EXISTS salary_adjustments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        adjustment_type TEXT NOT NULL,
+        hours REAL DEFAULT 0,
+        amount REAL DEFAULT 0,
+        description TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (employee_id) REFERENCES employees(id)
+    )''')
+
+    # 4. جدول الإعدادات العامة
+    conn.execute('''CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )''')
+
+    # 5. جدول العقود (نظام التقسيط المتقدم)
+    conn.execute('''CREATE TABLE IF NOT EXISTS contracts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        transaction_id INTEGER,
+        total_price REAL NOT NULL,
+        down_payment REAL DEFAULT 0,
+        remaining_amount REAL NOT NULL,
+        installment_count INTEGER NOT NULL,
+        monthly_installment REAL NOT NULL,
+        interest_rate REAL DEFAULT 0,
+        late_fee_type TEXT DEFAULT 'fixed',
+        late_fee_amount REAL DEFAULT 50,
+        grace_period_days INTEGER DEFAULT 3,
+        payment_due_day INTEGER DEFAULT 1,
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        closed_at TIMESTAMP,
+        vehicle_vin TEXT,
+        vehicle_type TEXT,
+        vehicle_model TEXT,
+        vehicle_plate TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (transaction_id) REFERENCES transactions(id)
+    )''')
+
+    _add_missing_columns(conn, 'contracts', [
+        ('car_details', 'TEXT'),
+        ('total_amount', 'REAL'),
+        ('paid_amount', 'REAL DEFAULT 0'),
+        ('next_payment_date', 'DATE'),
+        ('reschedule_reason', 'TEXT'),
+    ])
+
+    # 6. جدول الفواتير/الأقساط (Payment Schedule)
+    conn.execute('''CREATE TABLE IF NOT EXISTS invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        invoice_number TEXT UNIQUE NOT NULL,
+        contract_id INTEGER NOT NULL,
+        installment_number INTEGER NOT NULL,
+        amount_due REAL NOT NULL,
+        amount_paid REAL DEFAULT 0,
+        late_fee REAL DEFAULT 0,
+        due_date DATE NOT NULL,
+        payment_date DATE,
+        status TEXT DEFAULT 'pending',
+        qr_hash TEXT,
+        previous_qr_hash TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (contract_id) REFERENCES contracts(id)
+    )''')
+
+    # 7. جدول الدفعات (Payment Records)
+    conn.execute('''CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        contract_id INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        payment_method TEXT NOT NULL,
+        proof_path TEXT,
+        reference_number TEXT,
+        status TEXT DEFAULT 'pending',
+        verified_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (contract_id) REFERENCES contracts(id)
+    )''')
+
+    _add_missing_columns(conn, 'payments', [
+        ('proof_path', 'TEXT'),
+        ('reference_number', 'TEXT'),
+        ('verified_at', 'TIMESTAMP'),
+    ])
+
+    # 8. جدول فواتير الرواتب (Salary Invoices)
+    conn.execute('''CREATE TABLE IF NOT EXISTS salary_invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        gross_salary REAL NOT NULL,
+        feiertags_geld REAL DEFAULT 0,
+        urlaubsgeld REAL DEFAULT 0,
+        deductions REAL DEFAULT 0,
+        tax_amount REAL DEFAULT 0,
+        insurance_amount REAL DEFAULT 0,
+        net_salary REAL NOT NULL,
+        pdf_path TEXT,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (employee_id) REFERENCES employees(id)
+    )''')
+
+
+# ===== 2. جداول الوحدات الإضافية (كانت تُنشأ في _ensure_table داخل utils/ و components/ و pages_app/) =====
+
+def _m002_module_tables(conn: sqlite3.Connection):
+    # سجل التدقيق وسجل النشاط (كانا يُستخدمان دون إنشاء)
+    conn.execute('''CREATE TABLE IF NOT EXISTS audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        username TEXT,
+        action TEXT NOT NULL,
+        entity_type TEXT,
+        entity_id TEXT,
+        details TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS activity_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        action_type TEXT NOT NULL,
+        details TEXT,
+        ip_address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )''')
+
+    # المصادقة الثنائية (utils/two_factor.py)
+    _add_missing_columns(conn, 'users', [
+        ('totp_secret', 'TEXT'),
+        ('totp_enabled', 'INTEGER DEFAULT 0'),
+    ])
+
+    # سجل جلسات الدخول (utils/login_tracker.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS login_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        username TEXT,
+        action TEXT DEFAULT 'login',
+        ip_address TEXT,
+        user_agent TEXT,
+        success INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # قائمة فحص التسليم (utils/delivery_checklist.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS delivery_checklist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        item_key TEXT NOT NULL,
+        checked INTEGER DEFAULT 0,
+        checked_by TEXT,
+        checked_at TIMESTAMP,
+        notes TEXT
+    )''')
+
+    # مراحل السيارة (utils/car_pipeline.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS car_pipeline (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        stage TEXT DEFAULT 'received',
+        updated_by INTEGER,
+        notes TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (transaction_id) REFERENCES transactions(id)
+    )''')
+
+    # وسوم السيارات (utils/tags_system.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS car_tags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        tag TEXT NOT NULL,
+        color TEXT DEFAULT '#D4AF37',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # أرشيف المستندات (utils/document_archive.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER,
+        doc_type TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        file_data BLOB,
+        file_size INTEGER,
+        uploaded_by INTEGER,
+        notes TEXT,
+        expiry_date TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # سجل الصيانة (utils/maintenance_log.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS maintenance_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        service_type TEXT NOT NULL,
+        description TEXT,
+        cost REAL DEFAULT 0,
+        service_date TEXT,
+        next_service_date TEXT,
+        mechanic TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (transaction_id) REFERENCES transactions(id)
+    )''')
+
+    # رسائل العملاء (utils/customer_messages.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sender_id INTEGER NOT NULL,
+        sender_name TEXT,
+        receiver_id INTEGER,
+        subject TEXT,
+        body TEXT NOT NULL,
+        is_read INTEGER DEFAULT 0,
+        reply_to INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # الملاحظات الداخلية (utils/internal_notes.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS internal_notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity_type TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        user_id INTEGER,
+        username TEXT,
+        note TEXT NOT NULL,
+        priority TEXT DEFAULT 'normal',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # العروض وأكواد الخصم (utils/offers_system.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS offers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE NOT NULL,
+        description TEXT,
+        discount_type TEXT DEFAULT 'percentage',
+        discount_value REAL NOT NULL,
+        max_uses INTEGER DEFAULT 1,
+        current_uses INTEGER DEFAULT 0,
+        valid_from TEXT,
+        valid_until TEXT,
+        active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # النشرة البريدية والحملات (utils/newsletter.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS newsletter (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        name TEXT,
+        subscribed INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS campaigns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        sent_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # الإشعارات (components/notifications_bell.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        message TEXT,
+        type TEXT DEFAULT 'info',
+        read INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # التقييمات (components/reviews_component.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        username TEXT,
+        rating INTEGER NOT NULL CHECK(rating >= 1 AND rating <= 5),
+        comment TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )''')
+
+    # مهام الموظفين (pages_app/tasks_page.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        assigned_to INTEGER,
+        assigned_name TEXT,
+        created_by INTEGER,
+        priority TEXT DEFAULT 'normal',
+        status TEXT DEFAULT 'pending',
+        due_date TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (assigned_to) REFERENCES users(id)
+    )''')
+
+    # المواعيد (pages_app/appointments_page.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS appointments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        customer_name TEXT,
+        phone TEXT,
+        appointment_type TEXT NOT NULL,
+        preferred_date TEXT NOT NULL,
+        preferred_time TEXT NOT NULL,
+        car_brand TEXT,
+        car_model TEXT,
+        notes TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )''')
+
+
+# ===== 3. الفهارس الثانوية للاستعلامات الساخنة =====
+
+INDEXES = [
+    # المعاملات: سجل المستخدم، مبيعات الموظف، التقارير الزمنية
+    ('idx_transactions_user_created', 'transactions', 'user_id, created_at'),
+    ('idx_transactions_employee_created', 'transactions', 'employee_id, created_at'),
+    ('idx_transactions_created', 'transactions', 'created_at'),
+    ('idx_transactions_brand', 'transactions', 'brand'),
+    # العقود والفواتير والدفعات
+    ('idx_contracts_user_created', 'contracts', 'user_id, created_at'),
+    ('idx_contracts_transaction', 'contracts', 'transaction_id'),
+    ('idx_contracts_status', 'contracts', 'status'),
+    ('idx_invoices_contract_status', 'invoices', 'contract_id, status, installment_number'),
+    ('idx_invoices_status_due', 'invoices', 'status, due_date'),
+    ('idx_invoices_due_date', 'invoices', 'due_date'),
+    ('idx_payments_contract_status', 'payments', 'contract_id, status'),
+    # الموارد البشرية
+    ('idx_attendance_employee_date', 'attendance_logs', 'employee_id, date'),
+    ('idx_attendance_date', 'attendance_logs', 'date'),
+    ('idx_salary_adjustments_employee_date', 'salary_adjustments', 'employee_id, date'),
+    ('idx_salary_invoices_employee_period', 'salary_invoices', 'employee_id, year, month'),
+    ('idx_salary_invoices_period', 'salary_invoices', 'year, month'),
+    ('idx_sick_leave_employee', 'sick_leave_records', 'employee_id, start_date'),
+    ('idx_employees_user', 'employees', 'user_id'),
+    # السجلات
+    ('idx_audit_log_created', 'audit_log', 'created_at'),
+    ('idx_audit_log_action', 'audit_log', 'action'),
+    ('idx_activity_logs_user_created', 'activity_logs', 'user_id, created_at'),
+    ('idx_login_sessions_user_created', 'login_sessions', 'user_id, created_at'),
+    ('idx_login_sessions_created', 'login_sessions', 'created_at'),
+    # جداول الوحدات المرتبطة بالسيارة
+    ('idx_delivery_checklist_tx_item', 'delivery_checklist', 'transaction_id, item_key'),
+    ('idx_car_pipeline_tx_updated', 'car_pipeline', 'transaction_id, updated_at'),
+    ('idx_car_tags_tx_tag', 'car_tags', 'transaction_id, tag'),
+    ('idx_car_tags_tag', 'car_tags', 'tag'),
+    ('idx_documents_tx_created', 'documents', 'transaction_id, created_at'),
+    ('idx_documents_expiry', 'documents', 'expiry_date'),
+    ('idx_maintenance_log_tx_date', 'maintenance_log', 'transaction_id, service_date'),
+    ('idx_internal_notes_entity', 'internal_notes', 'entity_type, entity_id, created_at'),
+    # التواصل
+    ('idx_messages_sender', 'messages', 'sender_id, created_at'),
+    ('idx_messages_receiver', 'messages', 'receiver_id, created_at'),
+    ('idx_notifications_user_read', 'notifications', 'user_id, read, created_at'),
+    ('idx_tasks_assigned_status', 'tasks', 'assigned_to, status'),
+    ('idx_tasks_status', 'tasks', 'status'),
+    ('idx_appointments_user_date', 'appointments', 'user_id, preferred_date'),
+    ('idx_appointments_status_date', 'appointments', 'status, preferred_date'),
+]
+
+
+def _m003_indexes(conn: sqlite3.Connection):
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    # تفرد رمز QR للموظفين (القيم الفارغة مسموحة)
+    try:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_qr_token ON employees (qr_token)")
+    except sqlite3.IntegrityError:
+        # رموز مكررة في قاعدة بيانات قديمة: فهرس عادي بدل إيقاف الترحيل
+        _logger.warning("⚠️ Duplicate employees.qr_token values, creating non-unique index")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_employees_qr_token ON employees (qr_token)")
+
+
+# ===== 4. جداول تجميع المبيعات (db_rollups.py) =====
+
+def _m004_sales_rollups(conn: sqlite3.Connection):
+    create_rollup_schema(conn)
+    # تعبئة التجميعات من المعاملات الموجودة
+    rebuild_rollups(conn)
+
+
+# ===== 5. فهارس البحث النصي الكامل FTS5 (db_search.py) =====
+
+def _m005_search_index(conn: sqlite3.Connection):
+    # بدون FTS5 في نسخة SQLite يُسجَّل الترحيل ويبقى البحث على LIKE
+    if create_search_schema(conn):
+        rebuild_search_index(conn)
+
+
+# ===== 6. مخزن الصور حسب بصمة المحتوى (utils/image_store.py) =====
+
+def _m006_image_store(conn: sqlite3.Connection):
+    # الصور القديمة تبقى في مساراتها وتُنقل للمخزن عبر scripts/import_images.py
+    create_image_store_schema(conn)
+
+
+# ===== 7. ملفات أرشيف المستندات خارج قاعدة البيانات (utils/blob_store.py) =====
+
+def _m007_document_blob_store(conn: sqlite3.Connection):
+    # file_data يبقى للصفوف القديمة حتى تُنقل عبر scripts/migrate_documents.py
+    _add_missing_columns(conn, 'documents', [('storage_key', 'TEXT'), ('checksum', 'TEXT')])
+
+
+# ===== 8. طابور المهام الخلفية (utils/job_queue.py + worker.py) =====
+
+def _m008_job_queue(conn: sqlite3.Connection):
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL DEFAULT '{}',
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        idempotency_key TEXT UNIQUE,
+        user_id INTEGER,
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        result TEXT,
+        error TEXT,
+        run_after TEXT NOT NULL,
+        locked_by TEXT,
+        heartbeat_at TEXT,
+        created_at TEXT NOT NULL,
+        finished_at TEXT
+    )''')
+    # المهام المنتظرة فقط مفهرسة بترتيب السحب (الأولوية ثم الأقدم)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs(priority DESC, id) WHERE status = 'queued'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_finished ON jobs(status, finished_at)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS job_workers (
+        worker_id TEXT PRIMARY KEY,
+        pid INTEGER,
+        started_at TEXT,
+        heartbeat_at TEXT,
+        current_job INTEGER
+    )''')
+
+
+# ===== 9. عدادات إصدار البيانات لـ ETag وذاكرة الـ API (db_versions.py) =====
+
+def _m009_data_versions(conn: sqlite3.Connection):
+    create_data_version_schema(conn)
+
+
+# ===== 10. بصمات pHash لأحكام التحقق من الصور (utils/image_gate.py) =====
+
+def _m010_image_fingerprints(conn: sqlite3.Connection):
+    create_image_gate_schema(conn)
+
+
+# ===== 11. عدادات يومية لسجل التدقيق وجلسات الدخول (utils/event_writer.py) =====
+
+def _m011_event_counters(conn: sqlite3.Connection):
+    create_event_schema(conn)
+    rebuild_event_counts(conn)
+
+
+# ===== 12. ملفات spool المعاد كتابتها (إعادة آمنة بعد الانهيار، utils/event_writer.py) =====
+
+def _m012_event_spool_replays(conn: sqlite3.Connection):
+    create_spool_replay_schema(conn)
+
+
+# ===== 13. مبالغ التجميعات للمعاملات المسعّرة فقط (estimated_price > 0 في MEASURES) =====
+
+def _m013_priced_rollup_measures(conn: sqlite3.Connection):
+    # إعادة إنشاء الـ Triggers بالتعبيرات الجديدة ثم إعادة حساب الفترات المخزنة
+    create_rollup_schema(conn)
+    rebuild_rollups(conn)
+
+
+# ===== سجل الترحيلات =====
+# لا تُعدَّل الترحيلات المطبقة؛ أي تغيير جديد يُضاف كإصدار جديد في نهاية القائمة
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, 'core_schema', _m001_core_schema),
+    (2, 'module_tables', _m002_module_tables),
+    (3, 'hot_path_indexes', _m003_indexes),
+    (4, 'sales_rollups', _m004_sales_rollups),
+    (5, 'search_index', _m005_search_index),
+    (6, 'image_store', _m006_image_store),
+    (7, 'document_blob_store', _m007_document_blob_store),
+    (8, 'job_queue', _m008_job_queue),
+    (9, 'data_versions', _m009_data_versions),
+    (10, 'image_fingerprints', _m010_image_fingerprints),
+    (11, 'event_counters', _m011_event_counters),
+    (12, 'event_spool_replays', _m012_event_spool_replays),
+    (13, 'priced_rollup_measures', _m013_priced_rollup_measures),
+]
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """رقم آخر ترحيل مطبق (0 لقاعدة بيانات جديدة أو سابقة لنظام الترحيل)"""
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """تطبيق الترحيلات المعلقة بالترتيب ثم تحديث إحصائيات المخطط (ANALYZE)
+
+    كل ترحيل يعمل داخل معاملة BEGIN IMMEDIATE مستقلة، لذا إما أن يُطبق بالكامل أو لا يُطبق،
+    وتتحقق العملية من الإصدار بعد أخذ القفل حتى لا تطبّق عمليتان الترحيل نفسه معاً.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    _ensure_version_table(conn)
+    conn.commit()
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                         (version, name, datetime.now().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _logger.exception(f"❌ Migration {version} ({name}) failed")
+            raise
+        applied.append(version)
+        _logger.info(f"✅ Applied migration {version}: {name}")
+
+    if applied:
+        # تحديث إحصائيات المخطط حتى يختار المخطِّط الفهارس الجديدة
+        conn.execute("ANALYZE")
+    else:
+        conn.execute("PRAGMA optimize")
+    conn.commit()
+    return applied
@@ -0,0 +1,159 @@
+"""
+db_rollups.py - جداول تجميع المبيعات المحسوبة مسبقاً (Materialized Sales Rollups)
+SmartCar AI-Dealer
+لوحات التحكم والتقارير تقرأ من هذه الجداول (عدد صفوفها = عدد الفترات) بدل مسح جدول transactions كاملاً.
+تُحدَّث تزايدياً عبر Triggers على transactions، لذا تبقى متسقة مع كل مسارات الكتابة
+(create_transaction، update_transaction، delete_transaction، الاستيراد، SQL المباشر).
+"""
+
+import sqlite3
+from typing import Dict, List, Tuple
+
+# ===== تعريف التجميعات =====
+# كل تجميع: (اسم الجدول، أعمدة المفتاح [(الاسم، النوع، التعبير)])
+# التعبيرات تُكتب على صف transactions باسم {r} (NEW / OLD في الـ Triggers، أو t عند إعادة البناء)
+
+_MONTH_KEY = ('month', 'TEXT', "COALESCE(substr({r}.created_at, 1, 7), '')")
+
+ROLLUPS: Dict[str, Tuple[str, List[Tuple[str, str, str]]]] = {
+    'daily': ('sales_rollup_daily', [
+        ('day', 'TEXT', "COALESCE(substr({r}.created_at, 1, 10), '')"),
+    ]),
+    'monthly': ('sales_rollup_monthly', [_MONTH_KEY]),
+    'brand': ('sales_rollup_brand', [
+        _MONTH_KEY,
+        ('brand', 'TEXT', "COALESCE({r}.brand, '')"),
+    ]),
+    'employee': ('sales_rollup_employee', [
+        _MONTH_KEY,
+        ('employee_id', 'INTEGER', "COALESCE({r}.employee_id, 0)"),
+    ]),
+    # خريطة النشاط الحرارية: يوم الأسبوع (0 = الأحد) × الساعة
+    'weekday_hour': ('sales_rollup_weekday_hour', [
+        ('weekday', 'INTEGER', "COALESCE(CAST(strftime('%w', {r}.created_at) AS INTEGER), -1)"),
+        ('hour', 'INTEGER', "COALESCE(CAST(strftime('%H', {r}.created_at) AS INTEGER), -1)"),
+    ]),
+}
+
+# المقاييس المجمعة: الربح = margin_sales + نسبة الربح الافتراضية × unmargined_sales
+# المبالغ تحسب المعاملات المسعّرة فقط (estimated_price > 0) كما في الاستعلامات المباشرة السابقة
+MEASURES: List[Tuple[str, str]] = [
+    ('sales_count', "1"),
+    ('priced_count', "CASE WHEN {r}.estimated_price > 0 THEN 1 ELSE 0 END"),
+    ('total_sales', "CASE WHEN {r}.estimated_price > 0 THEN {r}.estimated_price ELSE 0 END"),
+    ('margin_sales', "CASE WHEN {r}.estimated_price > 0 AND {r}.profit_margin IS NOT NULL THEN {r}.estimated_price * {r}.profit_margin ELSE 0 END"),
+    ('unmargined_sales', "CASE WHEN {r}.estimated_price > 0 AND {r}.profit_margin IS NULL THEN {r}.estimated_price ELSE 0 END"),
+    ('margin_sum', "CASE WHEN {r}.estimated_price > 0 AND {r}.profit_margin IS NOT NULL THEN {r}.profit_margin ELSE 0 END"),
+    ('margin_count', "CASE WHEN {r}.estimated_price > 0 AND {r}.profit_margin IS NOT NULL THEN 1 ELSE 0 END"),
+]
+
+# الأعمدة التي تغيّر مفتاح التجميع أو قيمه عند التعديل
+_TRACKED_COLUMNS = 'created_at, brand, employee_id, estimated_price, profit_margin'
+
+# فرق مسموح لتراكم أخطاء الفاصلة العائمة في المجاميع التزايدية
+_TOLERANCE = 0.01
+
+
+def _upsert(table: str, keys: List[Tuple[str, str, str]], row: str, sign: str) -> str:
+    """إضافة (أو طرح) صف واحد إلى فترته في جدول التجميع"""
+    columns = [k[0] for k in keys] + [m[0] for m in MEASURES]
+    values = [k[2].format(r=row) for k in keys] + [f"{sign}({m[1].format(r=row)})" for m in MEASURES]
+    updates = ', '.join(f"{m[0]} = {m[0]} + excluded.{m[0]}" for m in MEASURES)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)}) "
+            f"ON CONFLICT({', '.join(k[0] for k in keys)}) DO UPDATE SET {updates};")
+
+
+def _prune(table: str, keys: List[Tuple[str, str, str]], row: str) -> str:
+    """حذف الفترة إذا أصبحت فارغة بعد الطرح"""
+    match = ' AND '.join(f"{k[0]} = {k[2].format(r=row)}" for k in keys)
+    return f"DELETE FROM {table} WHERE {match} AND sales_count = 0;"
+
+
+def create_rollup_schema(conn: sqlite3.Connection):
+    """إنشاء جداول التجميع والـ Triggers التي تحافظ عليها"""
+    for table, keys in ROLLUPS.values():
+        key_cols = ', '.join(f"{name} {col_type} NOT NULL" for name, col_type, _ in keys)
+        measure_cols = ', '.join(
+            f"{name} {'INTEGER' if name.endswith('count') else 'REAL'} NOT NULL DEFAULT 0" for name, _ in MEASURES
+        )
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+            {key_cols},
+            {measure_cols},
+            PRIMARY KEY ({', '.join(k[0] for k in keys)})
+        ) WITHOUT ROWID''')
+
+    add_new = '\n'.join(_upsert(t, k, 'NEW', '+') for t, k in ROLLUPS.values())
+    remove_old = '\n'.join(_upsert(t, k, 'OLD', '-') + '\n' + _prune(t, k, 'OLD') for t, k in ROLLUPS.values())
+
+    conn.execute("DROP TRIGGER IF EXISTS trg_sales_rollup_insert")
+    conn.execute("DROP TRIGGER IF EXISTS trg_sales_rollup_delete")
+    conn.execute("DROP TRIGGER IF EXISTS trg_sales_rollup_update")
+    conn.execute(f"CREATE TRIGGER trg_sales_rollup_insert AFTER INSERT ON transactions BEGIN\n{add_new}\nEND")
+    conn.execute(f"CREATE TRIGGER trg_sales_rollup_delete AFTER DELETE ON transactions BEGIN\n{remove_old}\nEND")
+    conn.execute(f"CREATE TRIGGER trg_sales_rollup_update AFTER UPDATE OF {_TRACKED_COLUMNS} ON transactions "
+                 f"BEGIN\n{remove_old}\n{add_new}\nEND")
+
+
+def _aggregate_select(keys: List[Tuple[str, str, str]], where: str = '') -> str:
+    """استعلام يحسب التجميع من الصفر على جدول transactions (أو على الصفوف المطابقة لـ where فقط)"""
+    key_exprs = [f"{k[2].format(r='t')} AS {k[0]}" for k in keys]
+    measure_exprs = [f"SUM({m[1].format(r='t')}) AS {m[0]}" for m in MEASURES]
+    return (f"SELECT {', '.join(key_exprs + measure_exprs)} FROM transactions t "
+            f"{f'WHERE {where} ' if where else ''}GROUP BY {', '.join(k[0] for k in keys)}")
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """إعادة بناء كل جداول التجميع من transactions (يُستدعى داخل معاملة كتابة)
+
+    Returns:
+        عدد الفترات في كل تجميع
+    """
+    counts = {}
+    for name, (table, keys) in ROLLUPS.items():
+        columns = ', '.join([k[0] for k in keys] + [m[0] for m in MEASURES])
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} ({columns}) {_aggregate_select(keys)}")
+        counts[name] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+
+def add_to_rollups(conn: sqlite3.Connection, where: str, params=()):
+    """
+    إضافة صفوف transactions المطابقة لـ where (مثل "t.id >= ?") إلى التجميعات باستعلام واحد لكل جدول؛
+    بديل trg_sales_rollup_insert عند الإدخال المجمّع (DatabaseManager.bulk_insert_transactions)
+    """
+    for table, keys in ROLLUPS.values():
+        columns = ', '.join([k[0] for k in keys] + [m[0] for m in MEASURES])
+        updates = ', '.join(f"{m[0]} = {m[0]} + excluded.{m[0]}" for m in MEASURES)
+        conn.execute(f"INSERT INTO {table} ({columns}) {_aggregate_select(keys, where)} "
+                     f"ON CONFLICT({', '.join(k[0] for k in keys)}) DO UPDATE SET {updates}", params)
+
+
+def check_rollups(conn: sqlite3.Connection) -> Dict[str, List[Dict]]:
+    """مقارنة جداول التجميع بالحساب الكامل من transactions
+
+    Returns:
+        {اسم التجميع: [{'key', 'expected', 'actual'}]} للفترات غير المتطابقة فقط (فارغ = متسق)
+    """
+    mismatches = {}
+    measure_names = [m[0] for m in MEASURES]
+    for name, (table, keys) in ROLLUPS.items():
+        key_count = len(keys)
+        key_names = ', '.join(k[0] for k in keys)
+        expected = {tuple(r[:key_count]): tuple(r[key_count:]) for r in conn.execute(_aggregate_select(keys))}
+        actual = {
+            tuple(r[:key_count]): tuple(r[key_count:])
+            for r in conn.execute(f"SELECT {key_names}, {', '.join(measure_names)} FROM {table}")
+        }
+        problems = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            exp, act = expected.get(key), actual.get(key)
+            if exp is None or act is None or any(abs((e or 0) - (a or 0)) > _TOLERANCE for e, a in zip(exp, act)):
+                problems.append({
+                    'key': key,
+                    'expected': dict(zip(measure_names, exp)) if exp else None,
+                    'actual': dict(zip(measure_names, act)) if act else None,
+                })
+        if problems:
+            mismatches[name] = problems
+    return mismatches
@@ -0,0 +1,206 @@
+"""
+db_search.py - فهرس البحث النصي الكامل (SQLite FTS5)
+SmartCar AI-Dealer
+فهارس FTS5 بمُجزِّئ trigram على السيارات والعملاء والموظفين بدل مسح LIKE '%q%' للجداول كاملة.
+تُحدَّث عبر Triggers على الجداول الأصلية (External Content)، وتدعم الترتيب حسب الصلة (bm25)،
+البحث الجزئي/البادئة (أي 3 أحرف متتالية)، والتسامح مع الأخطاء الإملائية عبر تقاطع الـ trigrams.
+إذا كانت SQLite مبنية بدون FTS5 يعود البحث إلى LIKE على الجداول الأصلية.
+"""
+
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_logger = logging.getLogger(__name__)
+
+# ===== تعريف الفهارس =====
+# كل فهرس: (الجدول الأصلي، جدول FTS، الأعمدة المفهرسة)
+SEARCH_INDEXES: Dict[str, Tuple[str, str, List[str]]] = {
+    'cars': ('transactions', 'cars_fts', ['brand', 'model', 'color', 'car_type']),
+    'customers': ('users', 'customers_fts', ['full_name', 'username', 'email', 'phone']),
+    'employees': ('employees', 'employees_fts', ['first_name', 'last_name', 'job_title', 'phone']),
+}
+
+# الترتيب بـ bm25 يحسب درجة كل صف مطابق، لذا يُرتَّب أحدث RANK_WINDOW صف فقط
+# ثم تكمل الصفحات التالية بالأحدث أولاً (كلمة شائعة مثل "bmw" تطابق عشرات الآلاف)
+RANK_WINDOW = 200
+# أقل نسبة من trigrams الاستعلام يجب أن توجد في النتيجة التقريبية (الأخطاء الإملائية)
+FUZZY_MIN_SIMILARITY = 0.4
+# عدد المرشحين الذين يُقيَّمون في مرحلة البحث التقريبي
+FUZZY_CANDIDATES = 200
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """هل نسخة SQLite مبنية مع FTS5 ومُجزِّئ trigram (3.34+)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def search_index_exists(conn: sqlite3.Connection, kind: str) -> bool:
+    fts_table = SEARCH_INDEXES[kind][1]
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (fts_table,)).fetchone() is not None
+
+
+def create_search_schema(conn: sqlite3.Connection) -> bool:
+    """إنشاء جداول FTS5 والـ Triggers التي تحافظ عليها (False إذا لم يكن FTS5 متاحاً)"""
+    if not fts5_available(conn):
+        _logger.warning("⚠️ SQLite was built without FTS5/trigram, global search falls back to LIKE")
+        return False
+
+    for base_table, fts_table, columns in SEARCH_INDEXES.values():
+        cols = ', '.join(columns)
+        new_values = ', '.join(f"new.{c}" for c in columns)
+        old_values = ', '.join(f"old.{c}" for c in columns)
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                     f"{cols}, content='{base_table}', content_rowid='id', tokenize='trigram')")
+
+        # External Content: الحذف يتم بأمر 'delete' مع القيم القديمة نفسها
+        delete_old = (f"INSERT INTO {fts_table} ({fts_table}, rowid, {cols}) "
+                      f"VALUES ('delete', old.id, {old_values});")
+        insert_new = f"INSERT INTO {fts_table} (rowid, {cols}) VALUES (new.id, {new_values});"
+        for suffix in ('ai', 'ad', 'au'):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{fts_table}_{suffix}")
+        conn.execute(f"CREATE TRIGGER trg_{fts_table}_ai AFTER INSERT ON {base_table} BEGIN {insert_new} END")
+        conn.execute(f"CREATE TRIGGER trg_{fts_table}_ad AFTER DELETE ON {base_table} BEGIN {delete_old} END")
+        conn.execute(f"CREATE TRIGGER trg_{fts_table}_au AFTER UPDATE OF {cols} ON {base_table} "
+                     f"BEGIN {delete_old} {insert_new} END")
+    return True
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> Dict[str, int]:
+    """إعادة بناء فهارس FTS من الجداول الأصلية (يُستدعى داخل معاملة كتابة)"""
+    counts = {}
+    for kind, (base_table, fts_table, _) in SEARCH_INDEXES.items():
+        if not search_index_exists(conn, kind):
+            continue
+        conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+        counts[kind] = conn.execute(f"SELECT COUNT(*) FROM {base_table}").fetchone()[0]
+    return counts
+
+
+def index_new_rows(conn: sqlite3.Connection, kind: str, first_id: int):
+    """فهرسة صفوف الجدول الأصلي ذات id >= first_id دفعة واحدة (بديل Trigger الإدخال عند الإدخال المجمّع)"""
+    if not search_index_exists(conn, kind):
+        return
+    base_table, fts_table, columns = SEARCH_INDEXES[kind]
+    cols = ', '.join(columns)
+    conn.execute(f"INSERT INTO {fts_table} (rowid, {cols}) SELECT id, {cols} FROM {base_table} WHERE id >= ?",
+                 (first_id,))
+
+
+# ===== بناء الاستعلامات =====
+
+def _quote(text: str) -> str:
+    """نص حرفي داخل استعلام FTS5 (عبارة بين علامتي تنصيص)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _trigrams(text: str) -> List[str]:
+    """trigrams النص كما يولدها مُجزِّئ trigram (بدون تمييز حالة الأحرف)"""
+    text = text.lower()
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+def _fuzzy_expression(query: str) -> Optional[str]:
+    """
+    نصفا الاستعلام كعبارتين (OR): خطأ إملائي واحد يترك أحد النصفين سليماً،
+    فيبقى المرشح الصحيح ضمن النتائج (Mercedez -> "merc" OR "cedez")
+    """
+    query = query.lower()
+    if len(query) < 6:
+        return None
+    middle = len(query) // 2
+    return f"{_quote(query[:middle])} OR {_quote(query[middle:])}"
+
+
+def match_expression(query: str, columns: Optional[Sequence[str]] = None) -> Optional[str]:
+    """تعبير MATCH للبحث الجزئي (مثل LIKE '%q%')؛ None إذا كان الاستعلام أقصر من 3 أحرف"""
+    query = query.strip()
+    if len(query) < 3:
+        return None
+    phrase = _quote(query)
+    if columns:
+        return '{' + ' '.join(columns) + '} : ' + phrase
+    return phrase
+
+
+def text_filter(kind: str, query: str, columns: Sequence[str], id_column: str = 'id',
+                indexed: bool = True) -> Tuple[str, list]:
+    """
+    شرط SQL يضاف إلى WHERE لتصفية الجدول الأصلي بنص جزئي في أعمدة محددة (بديل LIKE '%q%'):
+    عبر الفهرس إن وُجد، وإلا LIKE (استعلام أقصر من 3 أحرف أو indexed=False).
+    id_column باسم الجدول المستعار إن وُجد (مثل 't.id') ليُطبَّق الاسم نفسه على أعمدة LIKE.
+    Returns:
+        (" AND ...", params)
+    """
+    fts_table = SEARCH_INDEXES[kind][1]
+    expression = match_expression(query, columns)
+    if expression and indexed:
+        return f" AND {id_column} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)", [expression]
+    alias = id_column.rsplit('.', 1)[0] + '.' if '.' in id_column else ''
+    like = ' OR '.join(f"LOWER({alias}{c}) LIKE LOWER(?)" for c in columns)
+    return f" AND ({like})", [f"%{query.strip()}%"] * len(columns)
+
+
+def search_ids(conn: sqlite3.Connection, kind: str, query: str, limit: int = 10,
+               offset: int = 0, fuzzy: bool = True, indexed: bool = True) -> List[int]:
+    """
+    معرّفات صفوف الجدول الأصلي المطابقة مرتبة حسب الصلة:
+    1. تطابق جزئي كامل (substring) مرتب بـ bm25
+    2. ثم (إذا لم تكفِ النتائج) تطابق تقريبي: الصفوف التي تحتوي FUZZY_MIN_SIMILARITY على الأقل
+       من trigrams الاستعلام (يتحمل خطأ حرف أو حرفين)
+    الاستعلامات الأقصر من 3 أحرف (لا trigram لها) تُبحث كبادئة بـ LIKE، الأحدث أولاً.
+    """
+    base_table, fts_table, columns = SEARCH_INDEXES[kind]
+    query = query.strip()
+    if not query:
+        return []
+    wanted = offset + limit
+
+    expression = match_expression(query)
+    if expression is None or not indexed:
+        pattern = f"{query}%" if expression is None else f"%{query}%"
+        like = ' OR '.join(f"{c} LIKE ?" for c in columns)
+        rows = conn.execute(f"SELECT id FROM {base_table} WHERE {like} ORDER BY id DESC LIMIT ? OFFSET ?",
+                            [pattern] * len(columns) + [limit, offset]).fetchall()
+        return [r[0] for r in rows]
+
+    # FTS5 يقرأ المطابقات بترتيب rowid تنازلياً ويتوقف عند LIMIT، فالنافذة لا تمسح كل المطابقات
+    window = conn.execute(
+        f"SELECT rowid FROM (SELECT rowid, rank FROM {fts_table} WHERE {fts_table} MATCH ? "
+        f"ORDER BY rowid DESC LIMIT ?) ORDER BY rank, rowid DESC",
+        (expression, RANK_WINDOW)
+    ).fetchall()
+    ids = [r[0] for r in window]
+    if wanted > len(ids) == RANK_WINDOW:
+        ids += [r[0] for r in conn.execute(
+            f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ? AND rowid < ? ORDER BY rowid DESC LIMIT ?",
+            (expression, min(ids), wanted - len(ids))
+        ).fetchall()]
+
+    fuzzy_expression = _fuzzy_expression(query) if fuzzy else None
+    if fuzzy_expression and len(ids) < wanted:
+        seen = set(ids)
+        grams = set(_trigrams(query))
+        candidates = conn.execute(
+            f"SELECT rowid, {', '.join(columns)} FROM {fts_table} WHERE {fts_table} MATCH ? "
+            f"ORDER BY rowid DESC LIMIT ?",
+            (fuzzy_expression, FUZZY_CANDIDATES)
+        ).fetchall()
+        scored = []
+        for row in candidates:
+            if row[0] in seen:
+                continue
+            # أفضل عمود منفرد حتى لا تتجمع trigrams من أعمدة مختلفة
+            similarity = max((len(grams.intersection(_trigrams(str(v)))) / len(grams)
+                              for v in row[1:] if v), default=0)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((-similarity, -row[0]))
+        ids.extend(-rowid for _, rowid in sorted(scored))
+
+    return ids[offset:wanted]
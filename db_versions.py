@@ -0,0 +1,45 @@
+"""
+db_versions.py - عدادات إصدار البيانات (Data Version Counters)
+SmartCar AI-Dealer
+كل نطاق (scope) له رقم يزيد مع أي كتابة على جداوله عبر Triggers، فيعرف القارئ أن البيانات لم تتغير
+بقراءة صف واحد بدل إعادة الاستعلام: ETag في utils/api_server.py ومفتاح ذاكرة الاستجابات المؤقتة.
+"""
+
+import sqlite3
+from typing import Dict, Iterable
+
+# النطاق -> (الجدول، العمليات التي تغيّر ما يُعرض منه)
+# users: الإحصاءات تعرض العدد فقط، فتحديث آخر دخول مثلاً لا يغيّر الإصدار
+VERSIONED_TABLES: Dict[str, tuple] = {
+    'transactions': ('transactions', ('INSERT', 'UPDATE', 'DELETE')),
+    'users': ('users', ('INSERT', 'DELETE')),
+}
+
+
+def create_data_version_schema(conn: sqlite3.Connection):
+    conn.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID''')
+    for scope, (table, operations) in VERSIONED_TABLES.items():
+        conn.execute("INSERT OR IGNORE INTO data_versions (scope, version) VALUES (?, 0)", (scope,))
+        for operation in operations:
+            # FOR EACH ROW إلزامي في SQLite؛ تحديث جماعي يزيد الرقم عدة مرات وهذا لا يضر (المهم أنه تغيّر)
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{operation.lower()}
+                AFTER {operation} ON {table} BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE scope = '{scope}';
+                END''')
+
+
+def bump_data_version(conn: sqlite3.Connection, scope: str):
+    """زيادة رقم الإصدار يدوياً (عند تعطيل الـ Trigger مؤقتاً أثناء إدخال مجمّع)"""
+    conn.execute("UPDATE data_versions SET version = version + 1 WHERE scope = ?", (scope,))
+
+
+def get_data_versions(conn: sqlite3.Connection, scopes: Iterable[str]) -> Dict[str, int]:
+    """أرقام الإصدار الحالية للنطاقات المطلوبة (0 لنطاق غير معروف)"""
+    scopes = list(scopes)
+    placeholders = ', '.join('?' * len(scopes))
+    rows = conn.execute(f"SELECT scope, version FROM data_versions WHERE scope IN ({placeholders})", scopes)
+    versions = {scope: version for scope, version in rows}
+    return {scope: versions.get(scope, 0) for scope in scopes}
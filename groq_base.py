@@ -5,11 +5,42 @@ SmartCar AI-Dealer
 """
 
 import base64
+import contextvars
 import json
+import random
 import re
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, Callable, List, Tuple
+import groq
 from groq import Groq
 from config import Config
+from utils.cache_manager import get_ai_cache
+from utils.image_preprocessor import prepare_image
+from utils import metrics
+
+
+class GroqCallCancelled(Exception):
+    """طلب أُلغي قبل اكتماله (مثلاً عند فشل بوابة التحقق من الصورة)"""
+
+
+# مجمع خيوط مشترك لكل طلبات Groq في العملية: حجمه هو الحد الأقصى للطلبات المتزامنة
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# إشارة الإلغاء الخاصة بالطلب الجاري في الخيط الحالي (تضبطها submit)
+_call_context = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, Config.GROQ_MAX_CONCURRENCY),
+                                               thread_name_prefix="groq")
+    return _executor
+
 
 class GroqBaseClient:
     """الفئة الأساسية للتعامل مع Groq API - تدعم نماذج النصوص والرؤية"""
@@ -26,8 +57,9 @@ class GroqBaseClient:
                 self.logger.error("❌ Groq API Key is missing in .env file!")
             raise ValueError("Groq API Key not found.")
 
-        # إنشاء عميل Groq
-        self.client = Groq(api_key=self.api_key)
+        # إنشاء عميل Groq (المهلة لكل طلب؛ إعادة المحاولة تتم في _chat_completion)
+        self.client = Groq(api_key=self.api_key, base_url=Config.GROQ_BASE_URL or None,
+                           timeout=Config.GROQ_TIMEOUT_SECONDS, max_retries=0)
 
     def _encode_image(self, image_bytes: bytes) -> str:
         """تحويل بيانات الصورة من بايتات إلى نص Base64 للارسال عبر الـ API"""
@@ -38,6 +70,137 @@ class GroqBaseClient:
                 self.logger.error(f"❌ Error encoding image: {str(e)}")
             raise
 
+    def _image_data_url(self, image_bytes: bytes) -> str:
+        """
+        رابط data: للصورة بعد تجهيزها (تدوير EXIF، تصغير، حذف البيانات الوصفية، إعادة ترميز).
+        إذا تعذر فك الصورة تُرسل كما هي.
+        """
+        try:
+            prepared = prepare_image(image_bytes)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"⚠️ Image preprocessing failed, sending original: {e}")
+            return f"data:image/jpeg;base64,{self._encode_image(image_bytes)}"
+        if self.logger:
+            self.logger.info(f"[IMG] {prepared.original_size} {prepared.original_bytes // 1024}KB -> "
+                             f"{prepared.size} {len(prepared.data) // 1024}KB q{prepared.quality}")
+        return prepared.data_url()
+
+    # ===== طبقة الطلبات: إعادة المحاولة والتوازي والإلغاء =====
+
+    def _chat_completion(self, **kwargs):
+        """
+        chat.completions.create مع إعادة المحاولة عند 429 / 5xx / انقطاع الاتصال أو انتهاء المهلة.
+        التأخير أسي مع عشوائية كاملة (أو قيمة Retry-After إن أرسلها الخادم)،
+        ويتوقف فوراً إذا أُلغي الطلب عبر إشارة submit.
+        """
+        cancel_event = getattr(_call_context, 'cancel_event', None)
+        attempts = max(0, Config.GROQ_MAX_RETRIES) + 1
+        model = kwargs.get('model', self.model)
+        for attempt in range(attempts):
+            if cancel_event is not None and cancel_event.is_set():
+                raise GroqCallCancelled()
+            started = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+                metrics.observe('groq_request_seconds', time.perf_counter() - started, model=model, outcome='ok')
+                usage = getattr(response, 'usage', None)
+                if usage is not None:
+                    metrics.inc('groq_tokens_total', usage.prompt_tokens or 0, model=model, kind='prompt')
+                    metrics.inc('groq_tokens_total', usage.completion_tokens or 0, model=model, kind='completion')
+                return response
+            except Exception as e:
+                metrics.observe('groq_request_seconds', time.perf_counter() - started, model=model, outcome='error')
+                metrics.inc('groq_errors_total', model=model, error=e.__class__.__name__)
+                delay = self._retry_delay(e, attempt)
+                if delay is None or attempt == attempts - 1:
+                    raise
+                if self.logger:
+                    self.logger.warning(f"⚠️ Groq call failed ({e.__class__.__name__}), "
+                                        f"retry {attempt + 1}/{attempts - 1} in {delay:.2f}s")
+                if cancel_event is not None:
+                    if cancel_event.wait(delay):
+                        raise GroqCallCancelled()
+                else:
+                    time.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+        """مدة الانتظار قبل إعادة المحاولة، أو None إذا كان الخطأ غير قابل لإعادة المحاولة"""
+        if isinstance(error, (groq.APITimeoutError, groq.APIConnectionError)):
+            retry_after = None
+        elif isinstance(error, groq.APIStatusError) and (error.status_code == 429 or error.status_code >= 500):
+            retry_after = error.response.headers.get('retry-after')
+        else:
+            return None
+
+        backoff = min(Config.GROQ_RETRY_MAX_SECONDS, Config.GROQ_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+        try:
+            if retry_after is not None:
+                return min(Config.GROQ_RETRY_MAX_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        return random.uniform(0, backoff)
+
+    def submit(self, func: Callable[[], Any], cancel_event: Optional[threading.Event] = None) -> Future:
+        """تشغيل func على مجمع خيوط Groq المشترك؛ cancel_event يوقف إعادة المحاولات داخل func"""
+        def run():
+            if cancel_event is not None and cancel_event.is_set():
+                raise GroqCallCancelled()
+            _call_context.cancel_event = cancel_event
+            try:
+                return func()
+            finally:
+                _call_context.cancel_event = None
+        # خيوط المجمع لا ترث contextvars تلقائياً: نمرر سياق المستدعي حتى تحمل سجلاتها معرّف الترابط نفسه
+        context = contextvars.copy_context()
+        return _get_executor().submit(context.run, run)
+
+    def run_concurrently(self, calls: Dict[str, Callable[[], Any]],
+                         timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        تشغيل طلبات مستقلة بالتوازي وإرجاع {الاسم: النتيجة}.
+        إذا فشل أحدها أو انتهت المهلة الكلية تُلغى البقية ويُرفع الاستثناء (TimeoutError عند انتهاء المهلة).
+        """
+        cancel_event = threading.Event()
+        futures = {name: self.submit(func, cancel_event) for name, func in calls.items()}
+        try:
+            done, pending = wait(futures.values(), timeout=timeout, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    raise future.exception()
+            if pending:
+                raise TimeoutError(f"Groq calls timed out after {timeout}s: "
+                                   f"{[name for name, f in futures.items() if f in pending]}")
+            return {name: future.result() for name, future in futures.items()}
+        except BaseException:
+            cancel_event.set()
+            for future in futures.values():
+                future.cancel()
+            raise
+
+    def _cached_request(self, kind: str, prompt_version: Any, images: List[Tuple[str, bytes]],
+                        request: Callable[[], Dict[str, Any]], **params) -> Dict[str, Any]:
+        """
+        تنفيذ طلب Vision عبر الذاكرة المؤقتة الدائمة (utils/cache_manager.AIResponseCache).
+        المفتاح: SHA-256 للصور + إصدار البرومبت + النموذج؛ الردود التي تحتوي خطأ لا تُخزَّن.
+        """
+        if not Config.AI_CACHE_ENABLED:
+            return request()
+
+        cache = get_ai_cache()
+        key = cache.make_key(kind, self.model, prompt_version, images, **params)
+        cached = cache.get(key)
+        if cached is not None:
+            if self.logger:
+                self.logger.info(f"[CACHE] {kind} hit ({key[:12]})")
+            return cached
+
+        result = request()
+        if isinstance(result, dict) and 'error' not in result and result.get('success', True) is not False:
+            cache.set(key, result, kind=kind, model=self.model)
+        return result
+
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """
         استخراج ومعالجة نصوص JSON من ردود الذكاء الاصطناعي.
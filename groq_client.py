@@ -4,13 +4,21 @@ SmartCar AI-Dealer
 تحليل صور السيارات، اكتشاف الأضرار، واستخراج المواصفات الفنية
 """
 
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional, Tuple
 from groq_base import GroqBaseClient
 from config import Config
 
 class CarAIClient(GroqBaseClient):
     """العميل المتخصص في تحليل رؤية الحاسوب للسيارات"""
 
+    # إصدار كل برومبت: يُرفع عند تعديل نص البرومبت حتى لا تُعاد ردود قديمة من الذاكرة المؤقتة
+    PROMPT_VERSIONS = {
+        'analyze_car_image': 1,
+        'quick_validate_image': 1,
+        'analyze_car_from_multiple_angles': 2,
+    }
+
     def analyze_car_image(self, image_bytes: bytes, user_lang: str = "Deutsch") -> Dict[str, Any]:
         """
         إرسال صورة السيارة للذكاء الاصطناعي لاستخراج البيانات التقنية والحالة.
@@ -63,12 +71,12 @@ class CarAIClient(GroqBaseClient):
         - If the image is not a car, return {{"error": "Not a vehicle"}}
         """
 
-        try:
-            # تحويل الصورة إلى Base64
-            base64_image = self._encode_image(image_bytes)
+        def request():
+            # تجهيز الصورة (تصغير وإعادة ترميز) وتحويلها إلى Base64
+            image_url = self._image_data_url(image_bytes)
 
             # طلب التحليل من نموذج Vision
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {
@@ -78,7 +86,7 @@ class CarAIClient(GroqBaseClient):
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                    "url": image_url
                                 },
                             },
                         ],
@@ -91,7 +99,7 @@ class CarAIClient(GroqBaseClient):
             # معالجة الرد
             raw_content = response.choices[0].message.content
             analysis_result = self._parse_json_response(raw_content)
-            
+
             # 🔧 POST-PROCESSING: تصحيح الماركة بناءً على وصف الشعار
             analysis_result = self._validate_and_correct_brand(analysis_result)
 
@@ -100,6 +108,9 @@ class CarAIClient(GroqBaseClient):
 
             return analysis_result
 
+        try:
+            return self._cached_request('analyze_car_image', self.PROMPT_VERSIONS['analyze_car_image'],
+                                        [('main', image_bytes)], request, user_lang=user_lang)
         except Exception as e:
             if self.logger:
                 self.logger.error(f"[ERROR] AI Analysis Failed: {str(e)}")
@@ -142,18 +153,18 @@ class CarAIClient(GroqBaseClient):
         """
         تحقق سريع من أن الصورة تحتوي على سيارة قبل إجراء التحليل المكلف.
         """
-        try:
-            base64_image = self._encode_image(image_bytes)
-            prompt = "Is there a vehicle (car, truck, motorcycle) visible in this image? Ignore if it is on a screen or digital display. Answer JSON: {\"is_valid\": boolean, \"message\": \"short reason\"}"
-            
-            response = self.client.chat.completions.create(
+        prompt = "Is there a vehicle (car, truck, motorcycle) visible in this image? Ignore if it is on a screen or digital display. Answer JSON: {\"is_valid\": boolean, \"message\": \"short reason\"}"
+
+        def request():
+            image_url = self._image_data_url(image_bytes)
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {
                         "role": "user",
                         "content": [
                             {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
+                            {"type": "image_url", "image_url": {"url": image_url}},
                         ],
                     }
                 ],
@@ -161,6 +172,10 @@ class CarAIClient(GroqBaseClient):
                 max_tokens=50
             )
             return self._parse_json_response(response.choices[0].message.content)
+
+        try:
+            return self._cached_request('quick_validate_image', self.PROMPT_VERSIONS['quick_validate_image'],
+                                        [('main', image_bytes)], request)
         except Exception as e:
             # في حالة الفشل، نفترض أنها صالحة لنسمح بالتحليل الكامل
             if self.logger: self.logger.warning(f"Quick validation failed: {e}")
@@ -202,37 +217,77 @@ class CarAIClient(GroqBaseClient):
             21. estimated_price_range: {{"min": number, "max": number}} (In Euro, based on market value)
             22. confidence: (Float 0.0 to 1.0, how sure are you about the model?)
             23. success: true (Always true if analysis works)
+            24. is_vehicle: (false if no real vehicle is visible, e.g. only on a screen or digital display)
 
             Return ONLY valid JSON.
             """
             messages_content.append({"type": "text", "text": prompt})
 
-            # إضافة الصور المتاحة
-            for label, img_bytes in images_dict.items():
-                if img_bytes:
-                    base64_img = self._encode_image(img_bytes)
+            images = [(label, img_bytes) for label, img_bytes in images_dict.items() if img_bytes]
+
+            # 2. إرسال الطلب (أو إعادة الرد المخزن لنفس الصور دون ترميزها)
+            def request():
+                # إضافة الصور المتاحة
+                for label, img_bytes in images:
                     messages_content.append({
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_img}",
+                            "url": self._image_data_url(img_bytes),
                             "detail": "high"
                         }
                     })
 
-            # 2. إرسال الطلب
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": messages_content}],
-                temperature=0.3
-            )
+                response= self._chat_completion(
+                    model=self.model,
+                    messages=[{"role": "user", "content": messages_content}],
+                    temperature=0.3
+                )
 
-            # 3. معالجة النتيجة
-            return self._parse_json_response(response.choices[0].message.content)
+                # 3. معالجة النتيجة
+                return self._parse_json_response(response.choices[0].message.content)
+
+            return self._cached_request('analyze_car_from_multiple_angles',
+                                        self.PROMPT_VERSIONS['analyze_car_from_multiple_angles'], images, request)
 
         except Exception as e:
             if self.logger: self.logger.error(f"Multi-angle analysis failed: {e}")
             return {"success": False, "error": str(e)}
 
+    def validate_and_analyze(self, main_image_bytes: bytes, images_dict: Dict[str, bytes],
+                             validation: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        تشغيل التحقق السريع والتحليل الشامل بالتوازي بدل التسلسل.
+        إذا فشل التحقق يُرجع None بدل التحليل دون انتظاره: طلب التحليل يكون قد أُرسل غالباً
+        (GROQ_MAX_CONCURRENCY > 1) فتُهمل نتيجته ولا يُعاد بعد خطأ، ولا يُمنع إرساله إلا إذا كان ما زال في الطابور.
+        validation: حكم مسبق (بوابة الصور المحلية utils/image_gate.py) فلا يُرسل طلب التحقق السريع؛
+        عندها يتحقق التحليل نفسه من وجود مركبة عبر الحقل is_vehicle.
+        """
+        if validation is not None:
+            if not validation.get('is_valid'):
+                return validation, None
+            return self._vehicle_check(validation, self.analyze_car_from_multiple_angles(images_dict))
+
+        cancel_event = threading.Event()
+        validation_future = self.submit(lambda: self.quick_validate_image(main_image_bytes))
+        analysis_future = self.submit(lambda: self.analyze_car_from_multiple_angles(images_dict), cancel_event)
+
+        validation = validation_future.result()
+        if not validation.get('is_valid'):
+            cancel_event.set()
+            analysis_future.cancel()
+            if self.logger:
+                self.logger.info(f"[CAR] Validation gate failed, analysis cancelled: {validation.get('message')}")
+            return validation, None
+        return self._vehicle_check(validation, analysis_future.result())
+
+    def _vehicle_check(self, validation: Dict[str, Any],
+                       analysis: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        if analysis.get('is_vehicle') is False:
+            if self.logger:
+                self.logger.info("[CAR] Analysis found no vehicle in the images")
+            return {'is_valid': False, 'is_vehicle': False, 'message': "No vehicle detected in the image"}, None
+        return validation, analysis
+
     def identify_damage_areas(self, image_bytes: bytes) -> str:
         """وظيفة مخصصة لوصف الأضرار بشكل إنشائي مفصل (اختياري)"""
         # يمكن استخدامها في التقارير المطولة التي تسبق الفاتورة
@@ -6,8 +6,7 @@ Mitarbeiter-Selbstbedienung Anwesenheitsseite
 import streamlit as st
 from db_manager import DatabaseManager
 from datetime import datetime
-import json
-import os
+from utils.i18n import get_translator
 
 # إعداد الصفحة
 st.set_page_config(
@@ -57,27 +56,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# تحميل اللغة
-def load_language(lang_code):
-    try:
-        with open(f'locales/{lang_code}.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {}
-
-# اختيار اللغة
+# اختيار اللغة (مستقلة عن لغة الجلسة، من جداول الترجمة المشتركة في utils/i18n)
 lang = st.selectbox("🌐 Language", ["DE", "EN", "AR"], index=0, key="lang_select")
-translations = load_language(lang.lower())
-
-def t(key):
-    keys = key.split('.')
-    value = translations
-    for k in keys:
-        if isinstance(value, dict) and k in value:
-            value = value[k]
-        else:
-            return key
-    return value if isinstance(value, str) else key
+t = get_translator(lang.lower())
 
 # العنوان
 st.markdown(f"""
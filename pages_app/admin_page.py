@@ -18,8 +18,9 @@ from components.html_components import (
     get_admin_dashboard_html, get_section_header_html
 )
 from components.navigation import navigate_to
-from utils.cache_manager import CacheManager
+from utils.cache_manager import CacheManager, get_ai_cache
 from utils.invoice_generator import InvoiceGenerator
+from utils.image_store import load_variant
 
 
 # ======================
@@ -38,7 +39,7 @@ def admin_page():
     # القائمة الجانبية
     admin_menu = st.selectbox(
         t('admin.title'),
-        [t('admin.statistics'), '📊 مبيعات الموظفين', t('admin.users'), t('admin.employees'), t('admin.transactions'), t('admin.financial_settings'), f"📋 {t('admin.audit_log', 'Audit Log')}", f"📈 {t('admin.kpi', 'KPI Dashboard')}", f"📊 {t('admin.monthly_report', 'Monthly Report')}"]
+        [t('admin.statistics'), '📊 مبيعات الموظفين', t('admin.users'), t('admin.employees'), t('admin.transactions'), t('admin.financial_settings'), f"📋 {t('admin.audit_log', 'Audit Log')}", f"📈 {t('admin.kpi', 'KPI Dashboard')}", f"📊 {t('admin.monthly_report', 'Monthly Report')}", f"⏱️ {t('admin.performance', 'Performance')}", f"📧 {t('admin.newsletter', 'Newsletter')}"]
     )
     
     db = DatabaseManager()
@@ -149,12 +150,8 @@ def admin_page():
         # نسبة العمولة
         commission_rate = st.slider(t('charts.commission_rate', 'Commission Rate %'), min_value=1.0, max_value=10.0, value=3.0, step=0.5) / 100
         
-        # جلب البيانات مع caching
-        @st.cache_data(ttl=180)  # Cache لمدة 3 دقائق
-        def get_cached_sales_summary(month, year, rate):
-            return db.get_all_employees_sales_summary(month, year, rate)
-        
-        sales_summary = get_cached_sales_summary(month, year, commission_rate)
+        # استعلام واحد مجمّع لكل الموظفين - لا حاجة لـ cache (البيانات محدثة دائماً)
+        sales_summary = db.get_all_employees_sales_summary(month, year, commission_rate)
         
         if not sales_summary:
             st.warning(f"⚠️ {t('charts.no_employees', 'No employees in the system')}")
@@ -876,15 +873,11 @@ def admin_page():
             
             # جلب إحصائيات السنة المحددة
             # جلب إحصائيات السنة المحددة
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT COUNT(*), COALESCE(SUM(estimated_price), 0), COALESCE(AVG(estimated_price), 0)
-                    FROM transactions 
-                    WHERE strftime('%Y', created_at) = ?
-                ''', (selected_year,))
-                year_count, year_total, year_avg = cursor.fetchone()
+            # من التجميع الشهري (12 صفاً كحد أقصى بدل معاملات السنة كلها)
+            year_months = db.get_sales_rollup('monthly', f"{int(selected_year):04d}-01", f"{int(selected_year) + 1:04d}-01")
+            year_count = sum(m['sales_count'] for m in year_months)
+            year_total = sum(m['total_sales'] for m in year_months)
+            year_avg = year_total / year_count if year_count else 0
             
             # عرض بطاقات الملخص للسنة
             ac1, ac2, ac3 = st.columns(3)
@@ -895,8 +888,6 @@ def admin_page():
             with ac3:
                 st.metric(t('admin.average_value'), f"€{year_avg:,.2f}")
             
-            conn.close()
-            
             if st.button(f"❌ {t('admin.close_report')}"):
                 st.session_state['show_annual_report'] = False
                 st.rerun()
@@ -919,8 +910,9 @@ def admin_page():
                         st.write(f"**{t('admin.car_type')}:** {trans.get('car_type')}")
                         st.write(f"**{t('admin.brand')}:** {trans.get('brand')}")
                         img_path = trans.get('image_path')
-                        if img_path and img_path != 'stored_in_session' and os.path.exists(img_path):
-                            st.image(img_path, width=150)
+                        thumb = load_variant(img_path, 'thumb')
+                        if thumb:
+                            st.image(thumb, width=150)
                     
                     with col2:
                         st.write(f"**{t('admin.model')}:** {trans.get('model')} {trans.get('manufacture_year')}")
@@ -1081,18 +1073,15 @@ def admin_page():
             # نحتاج لجلب البيانات مجمعة حسب التاريخ
             
             # جلب المعاملات مع التاريخ والسعر باستخدام مدير قاعدة البيانات
+            # السلاسل الزمنية والعلامات التجارية من جداول التجميع؛ الأسعار والأنواع فقط من المعاملات
             with db.get_connection() as conn:
-                df_trans = pd.read_sql_query("SELECT created_at, estimated_price, brand, car_type FROM transactions", conn)
+                df_trans = pd.read_sql_query("SELECT estimated_price, brand, car_type FROM transactions", conn)
             
             if not df_trans.empty:
-                df_trans['created_at'] = pd.to_datetime(df_trans['created_at'])
-                df_trans['date'] = df_trans['created_at'].dt.date
-                
                 # تجميع حسب اليوم
-                daily_stats = df_trans.groupby('date').agg({
-                    'estimated_price': 'sum',
-                    'created_at': 'count'
-                }).reset_index()
+                daily_stats = pd.DataFrame([d for d in db.get_sales_rollup('daily') if d['day']])
+                daily_stats = daily_stats[['day', 'total_sales', 'sales_count']]
+                daily_stats['day'] = pd.to_datetime(daily_stats['day']).dt.date
                 daily_stats.columns = ['التاريخ', 'إجمالي القيمة', 'عدد المعاملات']
                 
                 st.subheader(f"📅 {t('admin.growth_analysis')}")
@@ -1118,7 +1107,8 @@ def admin_page():
                 
                 with pie_col1:
                     # العلامات التجارية الأكثر شعبية
-                    brand_counts = df_trans['brand'].value_counts().reset_index()
+                    brand_counts = pd.DataFrame([b for b in db.get_sales_rollup('brand') if b['brand']])
+                    brand_counts = brand_counts.groupby('brand')['sales_count'].sum().sort_values(ascending=False).reset_index()
                     brand_counts.columns = ['العلامة التجارية', 'العدد']
                     fig_pie = px.pie(brand_counts, values='العدد', names='العلامة التجارية', 
                                    title='توزيع العلامات التجارية', hole=0.4)
@@ -1137,11 +1127,8 @@ def admin_page():
                 # 3. Monthly Revenue Trend with Profit
                 st.subheader(f"💰 {t('admin.monthly_revenue', 'Monthly Revenue Trend')}")
                 
-                df_trans['month'] = df_trans['created_at'].dt.to_period('M').astype(str)
-                monthly_rev = df_trans.groupby('month').agg(
-                    revenue=('estimated_price', 'sum'),
-                    count=('estimated_price', 'count')
-                ).reset_index()
+                monthly_rollup = pd.DataFrame([m for m in db.get_sales_rollup('monthly') if m['month']])
+                monthly_rev = monthly_rollup[['month', 'total_sales', 'sales_count']].copy()
                 monthly_rev.columns = [t('admin.month', 'Month'), t('admin.revenue', 'Revenue (€)'), t('admin.count', 'Count')]
                 
                 rev_col1, rev_col2 = st.columns(2)
@@ -1239,7 +1226,9 @@ def admin_page():
                 # 📈 Demand Forecast
                 st.subheader(f"📈 {t('admin.demand_forecast', 'Demand Forecast')}")
                 try:
-                    df_monthly = df_trans.set_index('created_at').resample('M').size().reset_index(name='count')
+                    df_monthly = monthly_rollup[['month', 'sales_count']].copy()
+                    df_monthly['created_at'] = pd.to_datetime(df_monthly['month'] + '-01') + pd.offsets.MonthEnd(0)
+                    df_monthly = df_monthly.set_index('created_at')['sales_count'].asfreq('M', fill_value=0).reset_index(name='count')
                     if len(df_monthly) >= 3:
                         # Simple moving average forecast
                         df_monthly['forecast'] = df_monthly['count'].rolling(window=3, min_periods=1).mean()
@@ -1289,14 +1278,26 @@ def admin_page():
     elif admin_menu == t('admin.financial_settings'):
         st.subheader(f"⚙️ {t('admin.system_settings')}")
         
+        # Export options (Excel + DATEV): streamed to a file in chunks, optionally split by period and zipped
+        exp_c1, exp_c2, exp_c3, exp_c4 = st.columns(4)
+        with exp_c1:
+            export_from = st.date_input(t('admin.export_from', 'From'), value=None, key="export_from")
+        with exp_c2:
+            export_to = st.date_input(t('admin.export_to', 'To'), value=None, key="export_to")
+        with exp_c3:
+            export_partition = st.selectbox(t('admin.export_partition', 'Split by'), [None, 'month', 'quarter', 'year'],
+                format_func=lambda p: t('admin.export_no_split', 'No split') if p is None else p, key="export_partition")
+        with exp_c4:
+            export_zip = st.checkbox("ZIP", value=Config.EXPORT_COMPRESS, key="export_zip")
+
         # Excel Export
         if st.button(f"📊 {t('admin.export_excel', 'Export All Data (Excel)')}", use_container_width=True, type="primary"):
             try:
                 from utils.excel_export import ExcelExporter
-                data = ExcelExporter.export_all_data()
-                st.download_button("⬇️ Download Excel", data, 
-                    file_name=f"SmartCar_Export_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="dl_excel")
+                from utils.export_stream import render_download
+                path = ExcelExporter.export_to_file(export_from, export_to, export_partition, export_zip)
+                render_download(path, "⬇️ Download Excel",
+                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="dl_excel")
             except Exception as e:
                 st.error(f"❌ {e}")
         
@@ -1307,8 +1308,10 @@ def admin_page():
         with col1:
             if st.button(f"💾 {t('admin.create_backup')}", use_container_width=True):
                 try:
-                    backup_path = db.backup_database()
-                    st.success(f"✅ تم إنشاء النسخة الاحتياطية: {backup_path}")
+                    from utils.backup_manager import BackupManager
+                    report = BackupManager.backup(db.db_path)
+                    BackupManager.cleanup_old_backups()
+                    st.success(f"✅ تم إنشاء النسخة الاحتياطية: {report['path']} ({report['total_seconds']:.1f}s)")
                 except Exception as e:
                     st.error(f"❌ خطأ: {e}")
             
@@ -1336,11 +1339,23 @@ def admin_page():
         with col2:
             if st.button(f"🧹 {t('admin.clean_cache')}", use_container_width=True):
                 try:
-                    cache = CacheManager()
-                    count = cache.clear()
+                    CacheManager().clear()
+                    count = get_ai_cache().clear()
                     st.success(f"✅ {t('admin.clean_success')} ({count})")
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
+
+            # إحصائيات تخزين ردود تحليل الصور (AI Response Cache)
+            try:
+                ai_stats = get_ai_cache().stats()
+                st.caption(
+                    f"🧠 {t('admin.ai_cache', 'AI cache')}: "
+                    f"{ai_stats['hits']} hits / {ai_stats['misses']} misses ({ai_stats['hit_rate']:.0%}) · "
+                    f"{ai_stats['entries']} entries · {ai_stats['size_mb']:.2f} MB · "
+                    f"{ai_stats['evictions']} evicted · {ai_stats['expired']} expired"
+                )
+            except Exception as e:
+                st.caption(f"🧠 AI cache unavailable: {e}")
             
             st.markdown("<div style='height: 10px'></div>", unsafe_allow_html=True)
             
@@ -1348,21 +1363,29 @@ def admin_page():
             if st.button(f"🔔 {t('admin.send_reminders', 'Send Reminders')}", use_container_width=True, help="Send installment & TÜV reminders"):
                 with st.spinner(t('admin.sending_reminders', 'Sending reminders...')):
                     try:
-                        from utils.notifier import NotificationManager
-                        notifier = NotificationManager()
-                        results = notifier.run_all_reminders()
-                        
-                        st.success(f"""
-                        ✅ {t('admin.reminders_sent', 'Reminders processed!')}
-                        - 📋 {t('admin.installments_found', 'Installments due')}: {results['installments_found']}
-                        - 📧 {t('admin.reminders_emailed', 'Emails sent')}: {results['installments_sent']}
-                        - 🚗 {t('admin.tuv_found', 'TÜV checks')}: {results['tuv_found']}
-                        """)
-                        
-                        if results['errors']:
-                            st.warning(f"⚠️ {len(results['errors'])} errors occurred")
+                        # التذكيرات ترسل بريداً لكل قسط: تُنفذ في الطابور الخلفي (مفتاح واحد يمنع التشغيل المزدوج)
+                        from utils.job_queue import submit
+                        st.session_state.reminders_job = submit('reminders.run', {}, priority=-5,
+                                                                idempotency_key='reminders.run',
+                                                                user_id=st.session_state.user.get('id'))
                     except Exception as e:
                         st.error(f"❌ Error: {e}")
+            
+            if st.session_state.get('reminders_job'):
+                from components.job_status import job_panel
+                reminders_job = job_panel(st.session_state.reminders_job, key="reminders_job")
+                if reminders_job:
+                    results = reminders_job['result']
+                    del st.session_state['reminders_job']
+                    st.success(f"""
+                    ✅ {t('admin.reminders_sent', 'Reminders processed!')}
+                    - 📋 {t('admin.installments_found', 'Installments due')}: {results['installments_found']}
+                    - 📧 {t('admin.reminders_emailed', 'Emails sent')}: {results['installments_sent']}
+                    - 🚗 {t('admin.tuv_found', 'TÜV checks')}: {results['tuv_found']}
+                    """)
+                    
+                    if results['errors']:
+                        st.warning(f"⚠️ {len(results['errors'])} errors occurred")
         
 
         # DATEV Export Section
@@ -1375,20 +1398,18 @@ def admin_page():
             if st.button(f"📊 {t('admin.export_transactions', 'Export Transactions CSV')}", use_container_width=True):
                 try:
                     from utils.datev_export import DATEVExporter
-                    csv_data = DATEVExporter.export_transactions()
-                    st.download_button("⬇️ Download DATEV Transactions", csv_data, 
-                        file_name=f"DATEV_Transactions_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv", key="dl_datev_trans")
+                    from utils.export_stream import render_download
+                    path = DATEVExporter.export_to_file('transactions', export_from, export_to, export_partition, export_zip)
+                    render_download(path, "⬇️ Download DATEV Transactions", "text/csv", key="dl_datev_trans")
                 except Exception as e:
                     st.error(f"❌ {e}")
         with datev_c2:
             if st.button(f"🧾 {t('admin.export_invoices', 'Export Invoices CSV')}", use_container_width=True):
                 try:
                     from utils.datev_export import DATEVExporter
-                    csv_data = DATEVExporter.export_invoices()
-                    st.download_button("⬇️ Download DATEV Invoices", csv_data,
-                        file_name=f"DATEV_Invoices_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv", key="dl_datev_inv")
+                    from utils.export_stream import render_download
+                    path = DATEVExporter.export_to_file('invoices', export_from, export_to, export_partition, export_zip)
+                    render_download(path, "⬇️ Download DATEV Invoices", "text/csv", key="dl_datev_inv")
                 except Exception as e:
                     st.error(f"❌ {e}")
 
@@ -1523,11 +1544,11 @@ def admin_page():
         
         import pandas as pd
         # Get current month data
-        with db.get_connection() as conn:
-            current_month = pd.Timestamp.now().strftime('%Y-%m')
-            cur_sales = pd.read_sql_query(f"SELECT COUNT(*) as c FROM transactions WHERE created_at LIKE '{current_month}%'", conn).iloc[0]['c']
-            cur_revenue = pd.read_sql_query(f"SELECT COALESCE(SUM(estimated_price),0) as r FROM transactions WHERE created_at LIKE '{current_month}%'", conn).iloc[0]['r']
-            cur_users = pd.read_sql_query(f"SELECT COUNT(*) as c FROM users WHERE created_at LIKE '{current_month}%'", conn).iloc[0]['c']
+        current_month = pd.Timestamp.now().strftime('%Y-%m')
+        month_row = db.fetch_one("SELECT sales_count, total_sales FROM sales_rollup_monthly WHERE month = ?", (current_month,))
+        cur_sales = month_row['sales_count'] if month_row else 0
+        cur_revenue = month_row['total_sales'] if month_row else 0
+        cur_users = db.fetch_value("SELECT COUNT(*) FROM users WHERE created_at LIKE ?", (f"{current_month}%",), default=0)
         
         kpis = [
             ('🛒', t('admin.sales', 'Sales'), cur_sales, targets['monthly_sales']),
@@ -1579,6 +1600,103 @@ def admin_page():
             wa_link = WhatsAppSender.generate_link("", f"SmartCar Report {report_month}/{report_year}")
             st.markdown(f"[📱 Share via WhatsApp]({wa_link})")
 
+    elif admin_menu == f"⏱️ {t('admin.performance', 'Performance')}":
+        st.subheader(f"⏱️ {t('admin.performance', 'Performance')}")
+
+        import pandas as pd
+        from utils import metrics
+        from utils.logger import get_log_stats
+
+        # Metrics of this process plus the snapshots of the API / worker processes (utils/metrics.py)
+        st.caption(t('admin.performance_hint',
+            'Since process start; other processes are included once they write a snapshot '
+            f"(every {Config.METRICS_FLUSH_SECONDS:.0f}s). Percentiles are estimated from histogram buckets."))
+        if not Config.METRICS_ENABLED:
+            st.info(t('admin.metrics_disabled', 'Metrics are disabled (METRICS_ENABLED=False)'))
+
+        log_stats = get_log_stats()
+        tokens = {row['kind']: row['value'] for row in metrics.counter_totals('groq_tokens_total', ['kind'])}
+        groq_errors = sum(row['value'] for row in metrics.counter_totals('groq_errors_total', []))
+        pm1, pm2, pm3, pm4 = st.columns(4)
+        pm1.metric("Groq tokens (prompt)", f"{tokens.get('prompt', 0):,.0f}")
+        pm2.metric("Groq tokens (completion)", f"{tokens.get('completion', 0):,.0f}")
+        pm3.metric("Groq errors", f"{groq_errors:,.0f}")
+        pm4.metric("Log queue", f"{log_stats['queued']:,} / {log_stats['capacity']:,}",
+                   delta=f"-{log_stats['dropped']:,} dropped" if log_stats['dropped'] else None)
+
+        def show_table(rows, empty_label):
+            if rows:
+                st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            else:
+                st.info(empty_label)
+
+        perf_tabs = rtl_tabs(["📄 Pages", "🌐 API", "🐢 Queries", "🤖 Groq", "📑 PDF / 📧 Email"])
+        with perf_tabs[0]:
+            show_table(metrics.summarize('page_render_seconds', ['page']), t('admin.no_metrics', 'No data yet'))
+        with perf_tabs[1]:
+            show_table(metrics.summarize('api_request_seconds', ['endpoint', 'method']),
+                       t('admin.no_metrics', 'No data yet'))
+        with perf_tabs[2]:
+            sort_by = st.radio(t('admin.sort_by', 'Sort by'), ['max_ms', 'p95_ms', 'total_s', 'count'],
+                               horizontal=True, key="perf_query_sort")
+            queries = sorted(metrics.summarize('db_query_seconds', ['query'], rows_counter='db_query_rows_total'),
+                             key=lambda row: row[sort_by], reverse=True)[:50]
+            show_table(queries, t('admin.no_metrics', 'No data yet'))
+        with perf_tabs[3]:
+            show_table(metrics.summarize('groq_request_seconds', ['model', 'outcome']),
+                       t('admin.no_metrics', 'No data yet'))
+            show_table(metrics.counter_totals('groq_errors_total', ['model', 'error']),
+                       t('admin.no_groq_errors', 'No Groq errors'))
+        with perf_tabs[4]:
+            show_table(metrics.summarize('pdf_generation_seconds', ['kind', 'outcome']),
+                       t('admin.no_metrics', 'No data yet'))
+            show_table(metrics.summarize('email_send_seconds', ['outcome']), t('admin.no_metrics', 'No data yet'))
+
+    elif admin_menu == f"📧 {t('admin.newsletter', 'Newsletter')}":
+        st.subheader(f"📧 {t('admin.newsletter', 'Newsletter')}")
+
+        from utils.newsletter import Newsletter
+
+        nl_stats = Newsletter.get_stats()
+        nc1, nc2 = st.columns(2)
+        nc1.metric(t('admin.subscribers', 'Subscribers'), nl_stats['subscribers'])
+        nc2.metric(t('admin.campaigns', 'Campaigns'), nl_stats['campaigns'])
+
+        with st.form("newsletter_campaign_form", clear_on_submit=True):
+            nl_subject = st.text_input(t('admin.campaign_subject', 'Subject'))
+            nl_body = st.text_area(t('admin.campaign_body', 'Message'), height=200)
+            if st.form_submit_button(f"➕ {t('admin.create_campaign', 'Create Campaign')}", use_container_width=True):
+                if nl_subject.strip() and nl_body.strip():
+                    Newsletter.create_campaign(nl_subject.strip(), nl_body)
+                    st.rerun()
+                else:
+                    st.warning(t('admin.campaign_required', 'Subject and message are required'))
+
+        for campaign in Newsletter.get_campaigns():
+            cc1, cc2 = st.columns([3, 1])
+            with cc1:
+                st.markdown(f"**{campaign['subject']}**")
+                st.caption(f"{campaign['created_at']} · 📨 {campaign['sent_count']}")
+            with cc2:
+                if st.button(f"📤 {t('admin.send_campaign', 'Send')}", key=f"nl_send_{campaign['id']}",
+                             use_container_width=True, disabled=not nl_stats['subscribers']):
+                    # إرسال لكل المشتركين: في الطابور الخلفي بمحاولة واحدة (إعادة المحاولة تكرر البريد لمن استلمه)
+                    from utils.job_queue import submit
+                    st.session_state.newsletter_job = submit('newsletter.send', {'campaign_id': campaign['id']},
+                                                             priority=-5, max_attempts=1,
+                                                             idempotency_key=f"newsletter.send:{campaign['id']}",
+                                                             user_id=st.session_state.user.get('id'))
+
+        if st.session_state.get('newsletter_job'):
+            from components.job_status import job_panel
+            newsletter_job = job_panel(st.session_state.newsletter_job, key="newsletter_job")
+            if newsletter_job:
+                results = newsletter_job['result']
+                del st.session_state['newsletter_job']
+                st.success(f"✅ {t('admin.campaign_sent', 'Campaign sent')}: {results['sent']} · ❌ {results['failed']}")
+                if results['errors']:
+                    st.warning(f"⚠️ {len(results['errors'])} errors occurred")
+
 
 
 # ======================
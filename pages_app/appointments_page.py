@@ -3,40 +3,13 @@ pages_app/appointments_page.py - Appointment Booking System
 SmartCar AI-Dealer - نظام حجز المواعيد
 """
 import streamlit as st
-import sqlite3
 from datetime import datetime, timedelta
 from db_manager import DatabaseManager
 from utils.i18n import t
-from config import Config
-
-
-def _ensure_table():
-    """Create appointments table if not exists"""
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS appointments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            customer_name TEXT,
-            phone TEXT,
-            appointment_type TEXT NOT NULL,
-            preferred_date TEXT NOT NULL,
-            preferred_time TEXT NOT NULL,
-            car_brand TEXT,
-            car_model TEXT,
-            notes TEXT,
-            status TEXT DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    conn.commit()
-    conn.close()
 
 
 def appointments_page():
     """صفحة حجز المواعيد"""
-    _ensure_table()
     db = DatabaseManager()
     user = st.session_state.get('user', {})
     is_admin = user.get('role') == 'admin'
@@ -85,14 +58,11 @@ def _customer_view(user):
         
         if st.form_submit_button(f"✅ {t('appointments.submit', 'Book Appointment')}", use_container_width=True, type="primary"):
             try:
-                conn = sqlite3.connect(Config.DATABASE_PATH)
-                conn.execute("""
+                DatabaseManager().execute("""
                     INSERT INTO appointments (user_id, customer_name, phone, appointment_type, preferred_date, preferred_time, car_brand, notes)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (user['id'], user.get('full_name', ''), user.get('phone', ''),
                       apt_type, str(preferred_date), preferred_time, car_brand, notes))
-                conn.commit()
-                conn.close()
                 st.success(f"✅ {t('appointments.booked', 'Appointment booked successfully!')}")
                 st.balloons()
             except Exception as e:
@@ -102,10 +72,7 @@ def _customer_view(user):
     st.markdown("---")
     st.subheader(f"📋 {t('appointments.my_appointments', 'My Appointments')}")
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM appointments WHERE user_id=? ORDER BY preferred_date DESC", (user['id'],)).fetchall()
-        conn.close()
+        rows = DatabaseManager().fetch_all("SELECT * FROM appointments WHERE user_id=? ORDER BY preferred_date DESC", (user['id'],))
         
         for apt in rows:
             status_colors = {'pending': '#f39c12', 'confirmed': '#27ae60', 'cancelled': '#e74c3c'}
@@ -131,14 +98,14 @@ def _admin_view():
     status_filter = st.selectbox("Filter", ['all', 'pending', 'confirmed', 'cancelled'], key="apt_filter")
     
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
+        db = DatabaseManager()
         q = "SELECT * FROM appointments"
+        params = []
         if status_filter != 'all':
-            q += f" WHERE status='{status_filter}'"
+            q += " WHERE status=?"
+            params.append(status_filter)
         q += " ORDER BY preferred_date DESC"
-        rows = conn.execute(q).fetchall()
-        conn.close()
+        rows = db.fetch_all(q, params)
         
         for apt in rows:
             status_colors = {'pending': '#f39c12', 'confirmed': '#27ae60', 'cancelled': '#e74c3c'}
@@ -154,16 +121,12 @@ def _admin_view():
                 with c1:
                     if apt['status'] == 'pending':
                         if st.button(f"✅ Confirm", key=f"conf_{apt['id']}"):
-                            conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                            conn2.execute("UPDATE appointments SET status='confirmed' WHERE id=?", (apt['id'],))
-                            conn2.commit(); conn2.close()
+                            db.execute("UPDATE appointments SET status='confirmed' WHERE id=?", (apt['id'],))
                             st.rerun()
                 with c2:
                     if apt['status'] != 'cancelled':
                         if st.button(f"❌ Cancel", key=f"canc_{apt['id']}"):
-                            conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                            conn2.execute("UPDATE appointments SET status='cancelled' WHERE id=?", (apt['id'],))
-                            conn2.commit(); conn2.close()
+                            db.execute("UPDATE appointments SET status='cancelled' WHERE id=?", (apt['id'],))
                             st.rerun()
         
         if not rows:
@@ -5,7 +5,6 @@ SmartCar AI-Dealer
 
 import streamlit as st
 import streamlit.components.v1 as components
-import os
 import base64
 import json
 import time
@@ -18,6 +17,8 @@ from utils.payment_processor import PaymentProcessor
 from utils.invoice_generator import InvoiceGenerator
 from components.html_components import render_universal_header, get_section_header_html
 from components.navigation import navigate_to
+from components.job_status import job_panel, session_image_path
+from utils.job_queue import submit
 
 
 # ======================
@@ -156,8 +157,7 @@ def verify_identity_page():
                     if st.button(f"{t('admin.scan_verify_id')} 🔍", key="btn_verify_id"):
                         with st.spinner(t('admin.analyzing_id')):
                             scanner = DocumentScanner()
-                            front_res = scanner.scan_id_card(id_front_val)
-                            back_res = scanner.scan_id_card(id_back_val)
+                            front_res, back_res = scanner.scan_id_card_sides(id_front_val, id_back_val)
                             
                             # دمج البيانات
                             combined = {k: v for k, v in front_res.items() if v != 'غير واضح'}
@@ -323,8 +323,7 @@ def verify_identity_page():
                     if st.button(f"{t('admin.scan_verify_license')} 🔍", key="btn_verify_lic"):
                         with st.spinner(t('admin.analyzing_license')):
                             scanner = DocumentScanner()
-                            front_res = scanner.scan_driver_license(lic_front_val)
-                            back_res = scanner.scan_driver_license(lic_back_val)
+                            front_res, back_res = scanner.scan_driver_license_sides(lic_front_val, lic_back_val)
                             
                             # دمج البيانات
                             combined = {k: v for k, v in front_res.items() if v != 'غير واضح'}
@@ -550,40 +549,25 @@ def checkout_page():
             # استخدام مولد فواتير الأقساط للحصول على نفس النتيجة في جميع الصفحات
             contract_id = st.session_state.get('current_contract_id') or st.session_state.get('last_transaction_id')
             if contract_id:
+                # التوليد في الطابور الخلفي مرة واحدة لكل عقد بدل إعادة توليد PDF مع كل إعادة تشغيل للصفحة
+                job_key = f"installment_invoices_job_{contract_id}"
                 try:
-                    from utils import InstallmentInvoiceGenerator
-                    inv_gen = InstallmentInvoiceGenerator()
-                    all_inv_path = inv_gen.generate_all_invoices(contract_id)
-                    if os.path.exists(all_inv_path):
-                        with open(all_inv_path, "rb") as pdf_file:
-                            st.download_button(
-                                f"🧾 {t('checkout.download_invoice')}", 
-                                pdf_file.read(), 
-                                file_name=f"Invoices_{contract_id}.pdf", 
-                                mime="application/pdf",
-                                use_container_width=True
-                            )
-                    else:
-                        st.info(f"⏳ {t('messages.loading')}...")
+                    if job_key not in st.session_state:
+                        st.session_state[job_key] = submit(
+                            'invoices.installments', {'contract_id': contract_id, 'lang': get_current_lang()},
+                            priority=5, idempotency_key=f"installment-invoices:{contract_id}",
+                            user_id=st.session_state.user.get('id'))
+                    job_panel(st.session_state[job_key], f"🧾 {t('checkout.download_invoice')}",
+                              f"Invoices_{contract_id}.pdf", key=job_key)
                 except Exception as e:
                     st.warning(f"📄 {t('admin.no_invoices')}: {e}")
             else:
                 st.info(f"📄 {t('admin.no_invoices')}")
         with col2:
-             if 'last_contract_path' in st.session_state:
-                contract_path = st.session_state.last_contract_path
-                if os.path.exists(contract_path):
-                    with open(contract_path, "rb") as pdf_file:
-                        st.download_button(
-                            f"📄 {t('checkout.download_contract')}", 
-                            pdf_file, 
-                            file_name=f"Contract_{st.session_state.get('current_contract_id', 'new')}.pdf", 
-                            mime="application/pdf",
-                            use_container_width=True,
-                            type="primary"
-                        )
-                else:
-                    st.info(f"⏳ {t('messages.loading')}...")
+             if st.session_state.get('last_contract_job'):
+                job_panel(st.session_state.last_contract_job, f"📄 {t('checkout.download_contract')}",
+                          f"Contract_{st.session_state.get('current_contract_id', 'new')}.pdf",
+                          key="contract_job", primary=True)
              else:
                 st.info(f"📄 {t('admin.no_contract_available')}")
         with col3:
@@ -1139,15 +1123,9 @@ EUR{amount_to_pay:.2f}
                              _img_path = ''
                              if _tx_id:
                                  try:
-                                     import sqlite3
-                                     _conn = sqlite3.connect(str(_db_img.db_path))
-                                     _conn.row_factory = sqlite3.Row
-                                     _cur = _conn.cursor()
-                                     _cur.execute('SELECT image_path FROM transactions WHERE id = ?', (_tx_id,))
-                                     _row = _cur.fetchone()
+                                     _row = _db_img.fetch_one('SELECT image_path FROM transactions WHERE id = ?', (_tx_id,))
                                      if _row and _row['image_path'] and _row['image_path'] != 'stored_in_session':
                                          _img_path = _row['image_path']
-                                     _conn.close()
                                  except:
                                      pass
                              # Fallback: from car_data or session state
@@ -1347,8 +1325,6 @@ EUR{amount_to_pay:.2f}
                                 contract_id = new_contract_id
                                 
                                 # === توليد عقد PDF ===
-                                gen = InvoiceGenerator()
-                                
                                 # تجميع بيانات العقد الكاملة
                                 contract_pdf_data = {
                                     **car_data,  # بيانات السيارة من التنبؤ
@@ -1371,9 +1347,14 @@ EUR{amount_to_pay:.2f}
                                 else:
                                     user_full_data = st.session_state.user
                                 
-                                # توليد PDF
-                                contract_pdf_path = gen.generate_contract(contract_id, contract_pdf_data, user_full_data, st.session_state.get('language', 'de'))
-                                st.session_state.last_contract_path = contract_pdf_path
+                                # توليد PDF في الطابور الخلفي (يظهر زر التنزيل في شاشة النجاح عند جاهزيته)
+                                contract_pdf_data['image_path'] = session_image_path(contract_pdf_data)
+                                st.session_state.last_contract_job = submit(
+                                    'contract.pdf',
+                                    {'contract_id': contract_id, 'contract': contract_pdf_data, 'user': user_full_data,
+                                     'lang': st.session_state.get('language', 'de')},
+                                    priority=10, idempotency_key=f"contract-pdf:{contract_id}",
+                                    user_id=st.session_state.user.get('id'))
                                 
                             except Exception as e:
                                 st.error(f"{t('admin.contract_save_error')}: {e}")
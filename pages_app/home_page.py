@@ -1612,8 +1612,8 @@ def home_page():
                     key="payroll_year"
                 )
             
-            # جلب الموظفين النشطين
-            employees = db.get_active_employees_for_payroll()
+            # جلب الموظفين النشطين مع حالة فواتير الشهر (استعلام واحد)
+            employees = db.get_payroll_batch(selected_year, selected_month_idx)
             
             if not employees:
                 st.info(f"ℹ️ {t('admin.no_employees_payroll')}")
@@ -1635,39 +1635,40 @@ def home_page():
                     st.markdown("<br>", unsafe_allow_html=True)
                     if st.button(f"📄 {t('admin.generate_all_invoices')}", key="gen_all_salaries", type="primary", use_container_width=True):
                         gen = InvoiceGenerator()
-                        generated_count = 0
+                        new_invoices = []
                         
                         progress_bar = st.progress(0)
                         for idx, emp in enumerate(employees):
                             try:
-                                # التحقق من عدم وجود فاتورة مسبقة
-                                if not db.salary_invoice_exists(emp['id'], selected_year, selected_month_idx):
+                                # التحقق من عدم وجود فاتورة مسبقة (من دفعة الرواتب)
+                                if not emp.get('invoice_id'):
                                     pdf_path = gen.generate_salary_invoice(
                                         emp, selected_month_idx, selected_year,
                                         has_children=True, church_tax=False, tax_class=1, lang='de'
                                     )
                                     
-                                    # حفظ في قاعدة البيانات
                                     calc = getattr(gen, '_last_salary_calculation', {})
-                                    db.create_salary_invoice(
-                                        employee_id=emp['id'],
-                                        month=selected_month_idx,
-                                        year=selected_year,
-                                        gross_salary=calc.get('gross_salary', 0),
-                                        net_salary=calc.get('net_salary', 0),
-                                        feiertags_geld=calc.get('holiday_bonus', 0),
-                                        urlaubsgeld=calc.get('vacation_bonus', 0),
-                                        tax_amount=calc.get('total_taxes', 0),
-                                        insurance_amount=calc.get('total_sozialversicherung', 0),
-                                        deductions=calc.get('other_deductions', 0),
-                                        pdf_path=pdf_path
-                                    )
-                                    generated_count += 1
+                                    new_invoices.append({
+                                        'employee_id': emp['id'],
+                                        'month': selected_month_idx,
+                                        'year': selected_year,
+                                        'gross_salary': calc.get('gross_salary', 0),
+                                        'net_salary': calc.get('net_salary', 0),
+                                        'feiertags_geld': calc.get('holiday_bonus', 0),
+                                        'urlaubsgeld': calc.get('vacation_bonus', 0),
+                                        'tax_amount': calc.get('total_taxes', 0),
+                                        'insurance_amount': calc.get('total_sozialversicherung', 0),
+                                        'deductions': calc.get('other_deductions', 0),
+                                        'pdf_path': pdf_path
+                                    })
                             except Exception as e:
                                 st.error(f"❌ {emp.get('first_name')} {emp.get('last_name')}: {e}")
                             
                             progress_bar.progress((idx + 1) / len(employees))
                         
+                        # حفظ كل الفواتير في قاعدة البيانات دفعة واحدة
+                        generated_count = db.create_salary_invoices(new_invoices)
+                        
                         if generated_count > 0:
                             st.success(f"✅ {t('admin.salary_generated')} ({generated_count})")
                         st.rerun()
@@ -81,8 +81,9 @@ def inventory_page():
             params = []
             
             if brand_filter:
-                query += " AND LOWER(t.brand) LIKE LOWER(?)"
-                params.append(f"%{brand_filter}%")
+                brand_sql, brand_params = db.search_filter('cars', brand_filter, ['brand'], 't.id')
+                query += brand_sql
+                params.extend(brand_params)
             
             if price_min > 0:
                 query += " AND t.estimated_price >= ?"
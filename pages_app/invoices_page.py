@@ -95,8 +95,7 @@ def invoices_page():
                             with st.spinner(t('ocr.scanning')):
                                 from utils.ocr_scanner import DocumentScanner
                                 scanner = DocumentScanner()
-                                front_result = scanner.scan_id_card(id_front_bytes)
-                                back_result = scanner.scan_id_card(id_back_bytes)
+                                front_result, back_result = scanner.scan_id_card_sides(id_front_bytes, id_back_bytes)
                                 
                                 combined = {}
                                 unclear = t('ocr.unclear')
@@ -134,8 +133,7 @@ def invoices_page():
                             with st.spinner(t('ocr.scanning')):
                                 from utils.ocr_scanner import DocumentScanner
                                 scanner = DocumentScanner()
-                                front_result = scanner.scan_driver_license(lic_front_bytes)
-                                back_result = scanner.scan_driver_license(lic_back_bytes)
+                                front_result, back_result = scanner.scan_driver_license_sides(lic_front_bytes, lic_back_bytes)
                                 
                                 combined = {}
                                 unclear = t('ocr.unclear')
@@ -17,14 +17,16 @@ from utils.i18n import t, get_current_lang, is_rtl, rtl_tabs
 from config import Config
 from db_manager import DatabaseManager
 from groq_client import CarAIClient as GroqCarAnalyzer
+from utils.image_gate import get_image_gate, validate_vehicle_image
 from utils.predictor import PricePredictor
 from utils.notifier import NotificationManager
-from utils.invoice_generator import InvoiceGenerator
 from components.html_components import (
     render_universal_header, get_predict_subheader_html,
     get_results_page_html, get_analysis_results_html, get_section_header_html
 )
 from components.navigation import navigate_to
+from components.job_status import job_panel, session_image_path
+from utils.job_queue import submit
 
 
 # ======================
@@ -380,15 +382,20 @@ def predict_page():
         
         with col_check:
             st.warning(f"🔄 {t('admin.verifying_image')}")
-            # التحقق السريع (أقل تكلفة)
+            # البوابة المحلية (حدة، تعريض، أبعاد، pHash)؛ طلب Groq السريع فقط إذا كانت غير حاسمة
             analyzer = GroqCarAnalyzer()
-            validation = analyzer.quick_validate_image(main_image_bytes)
+            other_angles = {label: data for label, data in images_to_analyze.items() if label != 'front'}
+            validation = validate_vehicle_image(main_image_bytes, analyzer, other_angles)
+            gate_result = validation.get('gate')
             
             if validation['is_valid']:
                 st.success(f"✅ **{t('admin.valid_image')}**")
+                for warning in (gate_result.warnings if gate_result else []):
+                    st.caption(f"⚠️ {t(f'gate.{warning}')}")
                 valid_car = True
             else:
-                st.error(f"❌ **{t('admin.alert')}:** {validation['message']}")
+                message = validation['message'] if validation['source'] == 'llm' else t(f"gate.{validation['msg_key']}")
+                st.error(f"❌ **{t('admin.alert')}:** {message}")
                 st.warning(t('admin.upload_clear_image'))
                 valid_car = False
         
@@ -397,8 +404,18 @@ def predict_page():
                 if st.button(f"🤖 {t('admin.ai_full_analysis')}", type="primary"):
                     with st.spinner(t('admin.analyzing_images')):
                         try:
-                            # استخدام التحليل المتعدد
-                            analysis_result = analyzer.analyze_car_from_multiple_angles(images_to_analyze)
+                            # التحقق والتحليل المتعدد بالتوازي (التحقق غالباً من الذاكرة المؤقتة؛
+                            # يُلغى التحليل إذا فشل التحقق)
+                            validation, analysis_result = analyzer.validate_and_analyze(
+                                main_image_bytes, images_to_analyze, validation=validation)
+                            # حكم التحليل يُحفظ ببصمة الصورة لإعادة استخدامه مع النسخ شبه المطابقة
+                            if gate_result is not None and gate_result.source != 'memory':
+                                if analysis_result and analysis_result.get('success'):
+                                    get_image_gate().remember(gate_result, True, source='analysis')
+                                elif validation.get('is_vehicle') is False:
+                                    get_image_gate().remember(gate_result, False, source='analysis')
+                            if analysis_result is None:
+                                analysis_result = {'success': False, 'error': validation.get('message')}
                             
                             st.session_state.analysis_result = analysis_result
                             st.session_state.car_details['analysis'] = analysis_result
@@ -1109,49 +1126,35 @@ def results_page():
     with col3:
         if st.button(f"📧 {t('invoices.send_email')}", use_container_width=True):
             try:
-                # إنشاء الفاتورة أولاً إذا لم تكن موجودة
-                if not st.session_state.get('invoice_path'):
-                    generator = InvoiceGenerator()
-                    transaction_data = {
-                        'id': st.session_state.get('last_transaction_id', datetime.now().strftime('%Y%m%d%H%M%S')),
-                        'estimated_price': prediction_result['estimated_price'],
-                        **car_data
-                    }
-                    
-                    # استخدام بيانات العميل المختار إذا كان الآدمن هو من أنشأ العقد
-                    customer_for_invoice = st.session_state.get('selected_customer_for_invoice', st.session_state.user)
-                    
-                    invoice_path = generator.generate_car_invoice(
-                        transaction_data,
-                        customer_for_invoice  # استخدام بيانات العميل الصحيحة
-                    )
-                    st.session_state.invoice_path = invoice_path
-                
-                # إرسال البريد
-                notifier = NotificationManager()
-                
                 # استخدام بيانات العميل المختار إذا كان الآدمن هو من أنشأ العقد
                 customer_for_invoice = st.session_state.get('selected_customer_for_invoice', st.session_state.user)
                 
-                if not notifier.email_configured:
+                if not NotificationManager().email_configured:
                     st.warning(f"⚠️ {t('admin.email_incomplete')}")
                 else:
-                    result = notifier.send_invoice_email(
-                        recipient_email=customer_for_invoice['email'],  # بريد العميل الصحيح
-                        invoice_path=st.session_state.invoice_path,
-                        user_data=customer_for_invoice,  # بيانات العميل الصحيحة
-                        transaction_data={
-                            'estimated_price': prediction_result['estimated_price'],
-                            **car_data
-                        }
-                    )
+                    transaction_data = {
+                        'id': st.session_state.get('last_transaction_id', datetime.now().strftime('%Y%m%d%H%M%S')),
+                        'estimated_price': estimated_price,
+                        **car_data
+                    }
+                    transaction_data['image_path'] = session_image_path(transaction_data)
                     
-                    if result['success']:
-                        st.success(f"✅ {t('messages.success')}")
-                    else:
-                        st.error(f"❌ {result['message']}")
+                    # توليد الفاتورة (إن لم تكن موجودة) والإرسال في الطابور الخلفي مع إعادة المحاولة عند فشل SMTP
+                    st.session_state.invoice_email_job = submit(
+                        'invoice.email',
+                        {'transaction': transaction_data, 'user': customer_for_invoice,
+                         'invoice_path': st.session_state.get('invoice_path'), 'lang': get_current_lang()},
+                        priority=5, idempotency_key=f"invoice-email:{transaction_data['id']}:{customer_for_invoice.get('email')}",
+                        user_id=st.session_state.user.get('id'))
             except Exception as e:
                 st.error(f"❌ {t('messages.error')}: {e}")
+        
+        if st.session_state.get('invoice_email_job'):
+            email_job = job_panel(st.session_state.invoice_email_job, key="invoice_email_job")
+            if email_job:
+                st.session_state.invoice_path = email_job['result']['path']
+                del st.session_state['invoice_email_job']
+                st.success(f"✅ {t('messages.success')}")
     
     st.markdown("---")
     
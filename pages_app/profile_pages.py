@@ -8,10 +8,10 @@ import streamlit.components.v1 as components
 import os
 import json
 import base64
-from pathlib import Path
 from datetime import datetime
 from utils.i18n import t, get_current_lang, is_rtl, rtl_tabs
 from utils.invoice_generator import InvoiceGenerator
+from utils.image_store import load_variant
 from config import Config
 from db_manager import DatabaseManager
 from auth import AuthManager
@@ -157,8 +157,7 @@ def profile_page():
                         with st.spinner(t('messages.loading')):
                             from utils.ocr_scanner import DocumentScanner
                             scanner = DocumentScanner()
-                            front_result = scanner.scan_id_card(id_front_bytes)
-                            back_result = scanner.scan_id_card(id_back_bytes)
+                            front_result, back_result = scanner.scan_id_card_sides(id_front_bytes, id_back_bytes)
                             
                             combined = {}
                             for key in ['full_name', 'id_number', 'nationality', 'date_of_birth', 'gender', 'expiry_date', 'address']:
@@ -194,8 +193,7 @@ def profile_page():
                         with st.spinner(t('messages.loading')):
                             from utils.ocr_scanner import DocumentScanner
                             scanner = DocumentScanner()
-                            front_result = scanner.scan_driver_license(lic_front_bytes)
-                            back_result = scanner.scan_driver_license(lic_back_bytes)
+                            front_result, back_result = scanner.scan_driver_license_sides(lic_front_bytes, lic_back_bytes)
                             
                             combined = {}
                             for key in ['license_number', 'license_type', 'license_class', 'expiry_date', 'blood_type']:
@@ -459,9 +457,9 @@ def profile_page():
                     e_col1, e_col2 = st.columns([1, 2])
                     
                     with e_col1:
-                        img_path = tr.get('image_path')
-                        if img_path and Path(img_path).exists():
-                            st.image(img_path, width=150)
+                        thumb = load_variant(tr.get('image_path'), 'thumb')
+                        if thumb:
+                            st.image(thumb, width=150)
                         else:
                             st.info(t('profile.no_image'))
                             
@@ -552,10 +550,8 @@ def profile_page():
                 with st.spinner(t('messages.loading')):
                     scanner = DocumentScanner()
                     
-                    # مسح الوجه الأمامي
-                    front_result = scanner.scan_id_card(id_front_bytes)
-                    # مسح الوجه الخلفي
-                    back_result = scanner.scan_id_card(id_back_bytes)
+                    # مسح الوجهين الأمامي والخلفي بالتوازي
+                    front_result, back_result = scanner.scan_id_card_sides(id_front_bytes, id_back_bytes)
                     
                     # دمج النتائج
                     combined = {}
@@ -626,10 +622,8 @@ def profile_page():
                 with st.spinner(t('messages.loading')):
                     scanner = DocumentScanner()
                     
-                    # مسح الوجه الأمامي
-                    front_result = scanner.scan_driver_license(lic_front_bytes)
-                    # مسح الوجه الخلفي
-                    back_result = scanner.scan_driver_license(lic_back_bytes)
+                    # مسح الوجهين الأمامي والخلفي بالتوازي
+                    front_result, back_result = scanner.scan_driver_license_sides(lic_front_bytes, lic_back_bytes)
                     
                     # دمج النتائج
                     combined = {}
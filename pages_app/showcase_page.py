@@ -46,7 +46,8 @@ def showcase_page():
             params = []
             
             if brand_f:
-                query += " AND LOWER(t.brand) LIKE LOWER(?)"; params.append(f"%{brand_f}%")
+                brand_sql, brand_params = db.search_filter('cars', brand_f, ['brand'], 't.id')
+                query += brand_sql; params.extend(brand_params)
             if max_price < 200000:
                 query += " AND t.estimated_price <= ?"; params.append(max_price)
             
@@ -3,35 +3,13 @@ pages_app/tasks_page.py - Employee Task Management
 SmartCar AI-Dealer - إدارة المهام
 """
 import streamlit as st
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 from utils.i18n import t
 
 
-def _ensure_table():
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            assigned_to INTEGER,
-            assigned_name TEXT,
-            created_by INTEGER,
-            priority TEXT DEFAULT 'normal',
-            status TEXT DEFAULT 'pending',
-            due_date TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (assigned_to) REFERENCES users(id)
-        )
-    """)
-    conn.commit(); conn.close()
-
-
 def tasks_page():
     """Employee task management page"""
-    _ensure_table()
     user = st.session_state.get('user', {})
     is_admin = user.get('role') == 'admin'
     
@@ -42,17 +20,17 @@ def tasks_page():
     """, unsafe_allow_html=True)
     
     # Stats
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    db = DatabaseManager()
     
-    if is_admin:
-        pending = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE status='pending'").fetchone()['c']
-        progress = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE status='in_progress'").fetchone()['c']
-        done = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE status='completed'").fetchone()['c']
-    else:
-        pending = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE assigned_to=? AND status='pending'", (user['id'],)).fetchone()['c']
-        progress = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE assigned_to=? AND status='in_progress'", (user['id'],)).fetchone()['c']
-        done = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE assigned_to=? AND status='completed'", (user['id'],)).fetchone()['c']
+    with db.get_read_connection() as conn:
+        if is_admin:
+            pending = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE status='pending'").fetchone()['c']
+            progress = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE status='in_progress'").fetchone()['c']
+            done = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE status='completed'").fetchone()['c']
+        else:
+            pending = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE assigned_to=? AND status='pending'", (user['id'],)).fetchone()['c']
+            progress = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE assigned_to=? AND status='in_progress'", (user['id'],)).fetchone()['c']
+            done = conn.execute("SELECT COUNT(*) as c FROM tasks WHERE assigned_to=? AND status='completed'", (user['id'],)).fetchone()['c']
     
     s1, s2, s3 = st.columns(3)
     s1.metric(f"⏳ {t('tasks.pending', 'Pending')}", pending)
@@ -85,10 +63,8 @@ def tasks_page():
                 
                 if st.form_submit_button(f"✅ {t('tasks.create', 'Create')}", use_container_width=True, type="primary"):
                     if title:
-                        conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                        conn2.execute("INSERT INTO tasks (title, description, assigned_name, created_by, priority, due_date) VALUES (?,?,?,?,?,?)",
-                                     (title, description, assigned if assigned != 'Unassigned' else None, user['id'], priority, str(due_date)))
-                        conn2.commit(); conn2.close()
+                        db.execute("INSERT INTO tasks (title, description, assigned_name, created_by, priority, due_date) VALUES (?,?,?,?,?,?)",
+                                   (title, description, assigned if assigned != 'Unassigned' else None, user['id'], priority, str(due_date)))
                         st.success(f"✅ {t('tasks.created', 'Task created!')}")
                         st.rerun()
     
@@ -108,8 +84,7 @@ def tasks_page():
         params.append(status_filter)
     q += " ORDER BY CASE priority WHEN 'urgent' THEN 1 WHEN 'high' THEN 2 ELSE 3 END, created_at DESC"
     
-    tasks = conn.execute(q, params).fetchall()
-    conn.close()
+    tasks = db.fetch_all(q, params)
     
     priority_colors = {'normal': '#3498db', 'high': '#f39c12', 'urgent': '#e74c3c'}
     status_icons = {'pending': '⏳', 'in_progress': '🔄', 'completed': '✅'}
@@ -129,11 +104,9 @@ def tasks_page():
                 with bc1:
                     if task['status'] == 'pending':
                         if st.button(f"🔄 Start", key=f"start_{task['id']}"):
-                            conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                            conn2.execute("UPDATE tasks SET status='in_progress' WHERE id=?", (task['id'],))
-                            conn2.commit(); conn2.close(); st.rerun()
+                            db.execute("UPDATE tasks SET status='in_progress' WHERE id=?", (task['id'],))
+                            st.rerun()
                 with bc2:
                     if st.button(f"✅ Complete", key=f"done_{task['id']}"):
-                        conn2 = sqlite3.connect(Config.DATABASE_PATH)
-                        conn2.execute("UPDATE tasks SET status='completed' WHERE id=?", (task['id'],))
-                        conn2.commit(); conn2.close(); st.rerun()
+                        db.execute("UPDATE tasks SET status='completed' WHERE id=?", (task['id'],))
+                        st.rerun()
@@ -0,0 +1,48 @@
+"""
+سكربت أرشفة سجل التدقيق وجلسات الدخول - نقل الأشهر القديمة إلى ملفات شهرية مضغوطة وحذف الأرشيف المنتهي
+(العامل worker.py يقوم بذلك كل ساعة؛ السكربت لتشغيله من cron عند عدم وجود عامل)
+قم بتشغيله من مجلد المشروع: python scripts/archive_events.py [--hot-months N] [--keep-months N] [--rebuild-counts]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from db_manager import DatabaseManager  # noqa: E402
+from utils.event_writer import archive_old_events, list_archives, prune_archives, rebuild_event_counts  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old audit/login events into monthly gzip JSONL files")
+    parser.add_argument('--hot-months', type=int, default=Config.EVENT_HOT_MONTHS,
+                        help="months kept in the database, including the current one")
+    parser.add_argument('--keep-months', type=int, default=Config.EVENT_ARCHIVE_KEEP_MONTHS,
+                        help="delete archive files older than this (0 = keep forever)")
+    parser.add_argument('--rebuild-counts', action='store_true',
+                        help="recompute event_daily_counts from the tables (drops counts of archived months)")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    if args.rebuild_counts:
+        db.run_in_transaction(rebuild_event_counts)
+        print("✅ Daily event counters rebuilt")
+
+    archived = archive_old_events(hot_months=args.hot_months)
+    for table, rows in archived.items():
+        print(f"📦 {table}: {rows} row(s) archived")
+    if not archived:
+        print("✅ Nothing older than the hot window")
+
+    removed = prune_archives(keep_months=args.keep_months)
+    if removed:
+        print(f"🗑️ {removed} expired archive file(s) removed")
+
+    for archive in list_archives():
+        print(f"   {archive['table']} {archive['month']}  {archive['file']}  {archive['size_kb']} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,10 +21,10 @@ mkdir -p ${BACKUP_DIR}
 
 echo -e "${YELLOW}Creating backup: ${BACKUP_NAME}${NC}"
 
-# Backup database
+# Backup database (SQLite backup API: consistent with the -wal file, safe while the app is running)
 if [ -f "smartcar.db" ]; then
     echo -e "${YELLOW}Backing up database...${NC}"
-    cp smartcar.db ${BACKUP_DIR}/${BACKUP_NAME}.db
+    python scripts/backup_db.py create --name "${BACKUP_NAME}" --no-prune
     echo -e "${GREEN}✅ Database backed up${NC}"
 fi
 
@@ -42,13 +42,10 @@ if [ -d "uploads" ] && [ "$(ls -A uploads 2>/dev/null)" ]; then
     echo -e "${GREEN}✅ Uploads backed up${NC}"
 fi
 
-# Cleanup old backups (keep last 10)
+# Cleanup old backups: the database backup and its tarballs share one name and the same
+# last/daily/weekly retention policy (BACKUP_KEEP_* in config.py)
 echo -e "${YELLOW}Cleaning old backups...${NC}"
-cd ${BACKUP_DIR}
-ls -t *.db 2>/dev/null | tail -n +11 | xargs -r rm --
-ls -t *_invoices.tar.gz 2>/dev/null | tail -n +11 | xargs -r rm --
-ls -t *_uploads.tar.gz 2>/dev/null | tail -n +11 | xargs -r rm --
-cd ..
+python scripts/backup_db.py prune
 
 echo -e "${GREEN}=== Backup Complete ===${NC}"
 echo -e "${GREEN}Backup location: ${BACKUP_DIR}/${BACKUP_NAME}*${NC}"
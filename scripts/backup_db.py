@@ -0,0 +1,82 @@
+"""
+نسخ احتياطي واستعادة لقاعدة البيانات أثناء عمل التطبيق عبر SQLite Backup API (utils/backup_manager.py)
+create: نسخة متسقة تشمل ملف -wal مع فحص السلامة والضغط ثم تطبيق سياسة الاحتفاظ
+(--name يثبت اسم النسخة حتى تطابق أرشيفات الفواتير والملفات التي ينشئها backup.sh)
+restore: استعادة ذرية داخل معاملة SQLite واحدة (مع نسخة أمان من الحالة الحالية أولاً)
+قم بتشغيله من مجلد المشروع: python scripts/backup_db.py {create,list,verify,restore,prune} [...]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from utils.backup_manager import BackupError, BackupManager  # noqa: E402
+
+
+def resolve(name: str) -> str:
+    """اسم النسخة (بدون امتداد أو معه) أو مسارها الكامل"""
+    if os.path.exists(name):
+        return name
+    for ext in ('', '.db', '.db.gz'):
+        path = os.path.join(BackupManager.BACKUP_DIR, name + ext)
+        if os.path.exists(path):
+            return path
+    raise SystemExit(f"❌ Backup not found: {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online SQLite backups for SmartCar")
+    sub = parser.add_subparsers(dest='command', required=True)
+    create = sub.add_parser('create', help="create a verified backup of the live database")
+    create.add_argument('--no-compress', action='store_true')
+    create.add_argument('--no-prune', action='store_true', help="skip the retention policy")
+    create.add_argument('--name', help="backup name instead of a new timestamp (scripts/backup.sh uses it for its tarballs too)")
+    sub.add_parser('list', help="list backups, newest first")
+    verify = sub.add_parser('verify', help="full integrity check of a backup")
+    verify.add_argument('name')
+    restore = sub.add_parser('restore', help="restore a backup into the live database")
+    restore.add_argument('name')
+    restore.add_argument('--no-safety-backup', action='store_true')
+    prune = sub.add_parser('prune', help="apply the retention policy")
+    prune.add_argument('--keep-last', type=int)
+    prune.add_argument('--keep-daily', type=int)
+    prune.add_argument('--keep-weekly', type=int)
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'create':
+            report = BackupManager.backup(compress=False if args.no_compress else None, name=args.name)
+            print(f"✅ {report['path']}")
+            print(f"   size {report['size'] / 1024 / 1024:.2f} MB, pages {report.get('pages', 0)}, "
+                  f"integrity {report['integrity']}")
+            print(f"   total {report['total_seconds']:.2f}s (copy {report['duration_seconds']:.2f}s in "
+                  f"{report['steps']} steps, compress {report.get('compress_seconds', 0):.2f}s)")
+            print(f"   max step {report['max_step_ms']:.1f} ms, write stall {report['write_stall_max_ms']:.1f} ms "
+                  f"({report['journal_mode']}), restarts {report['restarts']}")
+            if not args.no_prune:
+                for name in BackupManager.apply_retention():
+                    print(f"🗑️  {name}")
+        elif args.command == 'list':
+            for b in BackupManager.list_backups():
+                print(f"{b['name']:<45} {b['size_mb']:>9.2f} MB  {b['created_at']:%Y-%m-%d %H:%M:%S}")
+        elif args.command == 'verify':
+            result = BackupManager.verify_backup(resolve(args.name))
+            print(f"{'✅' if result == 'ok' else '❌'} {result}")
+            sys.exit(0 if result == 'ok' else 1)
+        elif args.command == 'restore':
+            path = resolve(args.name)
+            BackupManager.restore_backup(path, safety_backup=not args.no_safety_backup)
+            print(f"✅ Restored {os.path.basename(path)} into {Config.DATABASE_PATH}")
+        elif args.command == 'prune':
+            for name in BackupManager.apply_retention(args.keep_last, args.keep_daily, args.keep_weekly):
+                print(f"🗑️  {name}")
+    except BackupError as e:
+        raise SystemExit(f"❌ {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+قياس استيراد CSV: الطريقة القديمة (قائمة كاملة + INSERT لكل صف مع Triggers الصف الواحد) مقابل
+CSVImporter.import_csv (قراءة على دفعات + تحقق لكل عمود + executemany في معاملة لكل دفعة).
+يتحقق أيضاً من اتساق جداول التجميع وفهرس البحث بعد الاستيراد المجمّع.
+قم بتشغيله من مجلد المشروع: python scripts/bench_csv_import.py [--rows 500000] [--legacy-rows 50000]
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from db_manager import DatabaseManager  # noqa: E402
+from db_rollups import check_rollups  # noqa: E402
+from utils.csv_importer import CSVImporter  # noqa: E402
+
+HEADER = ['brand', 'model', 'manufacture_year', 'mileage', 'estimated_price', 'fuel_type', 'condition',
+          'color', 'transmission', 'horsepower', 'engine_cc']
+
+
+def build_feed(path: Path, rows: int, seed: int = 42):
+    """ملف تاجر اصطناعي: ثلث الصفوف بدون سعر، 0.1% صفوف غير صالحة، و1% مكرر"""
+    rnd = random.Random(seed)
+    brands = list(Config.BRAND_FACTORS)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(HEADER)
+        for i in range(rows):
+            if i % 100 == 99:
+                rnd.seed(seed + i - 50)  # يعيد إنتاج صف سابق
+            writer.writerow([
+                rnd.choice(brands), f"Model {rnd.randint(1, 60)}",
+                'n/a' if i % 1000 == 0 else rnd.randint(1995, 2025), rnd.randint(0, 350000),
+                '' if i % 3 == 0 else f"{rnd.uniform(3000, 120000):.2f}".replace('.', ','),
+                rnd.choice(['Diesel', 'Benzin', 'Elektro', 'Hybrid']), 'gut', rnd.choice(['Schwarz', 'Weiß', 'Grau']),
+                rnd.choice(['Automatik', 'Schaltgetriebe']), rnd.randint(60, 600), rnd.choice(['', 1598, 1998, 2995]),
+            ])
+            rnd.seed(seed + i + 1)
+
+
+def fresh_database(path: Path) -> DatabaseManager:
+    # DatabaseManager كائن وحيد: نعيد تهيئته لكل قاعدة بيانات
+    DatabaseManager._instance = None
+    DatabaseManager._initialized = False
+    db = DatabaseManager(path)
+    db.execute("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'bench', 'bench@example.com', 'x')")
+    return db
+
+
+def legacy_import(db: DatabaseManager, content: bytes) -> int:
+    """import_to_db كما كان (دون العمود inventory_status غير الموجود في المخطط)"""
+    rows = list(csv.DictReader(io.StringIO(content.decode('utf-8-sig')), delimiter=';'))
+    imported = 0
+    with db.get_connection() as conn:
+        for row in rows:
+            try:
+                conn.execute("""
+                    INSERT INTO transactions (user_id, brand, model, manufacture_year, mileage, estimated_price,
+                        fuel_type, condition, color, transmission, horsepower, engine_cc, car_type, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (1, row['brand'], row['model'], int(row['manufacture_year'] or 0), float(row['mileage'] or 0),
+                      float((row['estimated_price'] or '0').replace(',', '.')), row['fuel_type'], row['condition'],
+                      row['color'], row['transmission'], row['horsepower'], row['engine_cc'], row['model'],
+                      datetime.now().isoformat()))
+                imported += 1
+            except ValueError:
+                pass
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming CSV import pipeline")
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--legacy-rows', type=int, default=50000, help="rows for the (slow) legacy path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        feed = Path(workdir) / 'feed.csv'
+        build_feed(feed, args.legacy_rows)
+        db = fresh_database(Path(workdir) / 'legacy.db')
+        t0 = time.perf_counter()
+        imported = legacy_import(db, feed.read_bytes())
+        legacy_seconds = time.perf_counter() - t0
+        print(f"legacy    {args.legacy_rows:>9,} rows  {legacy_seconds:7.2f}s  "
+              f"{args.legacy_rows / legacy_seconds:>9,.0f} rows/s  imported {imported:,}")
+
+        build_feed(feed, args.rows)
+        db = fresh_database(Path(workdir) / 'bulk.db')
+        report = CSVImporter.import_csv(feed, 1, price_missing=True)
+        print(f"streaming {args.rows:>9,} rows  {report['seconds']:7.2f}s  {args.rows / report['seconds']:>9,.0f} rows/s  "
+              f"imported {report['imported']:,}, duplicates {report['duplicates']:,}, priced {report['priced']:,}, "
+              f"invalid {report['error_count']:,}")
+
+        t0 = time.perf_counter()
+        again = CSVImporter.import_csv(feed, 1)
+        print(f"re-import (all duplicates) {time.perf_counter() - t0:.2f}s, imported {again['imported']:,}")
+
+        with db.get_connection() as conn:
+            mismatches = check_rollups(conn)
+            indexed = conn.execute("SELECT COUNT(*) FROM cars_fts").fetchone()[0] if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'cars_fts'").fetchone() else None
+            total = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        print(f"rollups consistent: {not mismatches}, search index rows: {indexed} / {total}")
+        db.close_connections()
+
+
+if __name__ == '__main__':
+    main()
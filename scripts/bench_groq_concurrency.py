@@ -0,0 +1,137 @@
+"""
+قياس وفحص طبقة طلبات Groq المتوازية مقابل خادم بديل محلي (scripts/groq_stub_server.py)
+- مسح وجهي الهوية: تسلسلي مقابل متوازٍ
+- الحد الأقصى للطلبات المتزامنة (GROQ_MAX_CONCURRENCY)
+- إعادة المحاولة عند 429 / 500
+- فشل بوابة التحقق: التحليل الجاري يُهمل دون إعادة محاولة، والتحليل المنتظر في الطابور لا يبدأ
+- سجلات خيوط المجمع تحمل معرّف الترابط الخاص بالجلسة المستدعية
+قم بتشغيله من مجلد المشروع: python scripts/bench_groq_concurrency.py [--latency 1.0]
+"""
+
+import argparse
+import io
+import logging
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import groq_base  # noqa: E402
+from config import Config  # noqa: E402
+from groq_client import CarAIClient  # noqa: E402
+from groq_stub_server import STUB_CONTENT, StubState, start_stub_server  # noqa: E402
+from utils.logger import get_correlation_id, set_correlation_id  # noqa: E402
+from utils.ocr_scanner import DocumentScanner  # noqa: E402
+
+
+def sample_image(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 500), color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def reset_executor(max_concurrency: int):
+    """إعادة إنشاء مجمع الخيوط المشترك بحد تزامن جديد"""
+    Config.GROQ_MAX_CONCURRENCY = max_concurrency
+    if groq_base._executor is not None:
+        groq_base._executor.shutdown(wait=True)
+    groq_base._executor = None
+
+
+class CorrelationProbe(logging.Handler):
+    """يسجل (اسم الخيط، معرّف الترابط) لكل سجل لحظة كتابته"""
+
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    def emit(self, record: logging.LogRecord):
+        self.seen.append((record.threadName, get_correlation_id()))
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent Groq calls against a local stub server")
+    parser.add_argument('--latency', type=float, default=1.0, help="stub response latency in seconds")
+    args = parser.parse_args()
+
+    state = StubState(latency=args.latency)
+    server = start_stub_server(state)
+    host, port = server.server_address
+    Config.GROQ_BASE_URL = f"http://{host}:{port}"
+    Config.GROQ_API_KEY = Config.GROQ_API_KEY or "stub"
+    Config.AI_CACHE_ENABLED = False
+    Config.GROQ_RETRY_BACKOFF_SECONDS = 0.05
+    reset_executor(4)
+
+    scanner = DocumentScanner()
+    front, back = sample_image((200, 200, 200)), sample_image((120, 120, 120))
+    ok = True
+
+    # 1. مسح وجهي الهوية
+    sequential = timed(lambda: (scanner.scan_id_card(front), scanner.scan_id_card(back)))
+    concurrent = timed(lambda: scanner.scan_id_card_sides(front, back))
+    print(f"ID front+back  sequential: {sequential:.2f}s  concurrent: {concurrent:.2f}s  "
+          f"speedup: {sequential / concurrent:.2f}x")
+    ok &= concurrent < sequential * 0.75
+
+    # 2. الحد الأقصى للتزامن
+    state.max_in_flight = 0
+    elapsed = timed(lambda: scanner.run_concurrently(
+        {str(i): (lambda: scanner.scan_id_card(front)) for i in range(8)}))
+    print(f"8 scans with GROQ_MAX_CONCURRENCY=4: {elapsed:.2f}s, max in flight at stub: {state.max_in_flight}")
+    ok &= state.max_in_flight == 4
+
+    # 3. إعادة المحاولة عند 429 ثم 500
+    for status in (429, 500):
+        state.requests, state.failures, state.fail_first, state.fail_status = 0, 0, 2, status
+        result = scanner.scan_id_card(front)
+        print(f"retry on {status}: requests={state.requests} result_ok={'error' not in result}")
+        ok &= state.requests == 3 and 'error' not in result
+    state.fail_first = 0
+
+    # 4. معرّف الترابط في خيوط المجمع (سجلات [IMG] تُكتب داخل الطلب على خيط groq_N)
+    probe = CorrelationProbe()
+    Config.logger.addHandler(probe)
+    set_correlation_id('bench-session')
+    scanner.scan_id_card_sides(front, back)
+    Config.logger.removeHandler(probe)
+    pooled = [cid for thread, cid in probe.seen if thread.startswith('groq')]
+    print(f"correlation id on pool threads: {sorted(set(pooled))} ({len(pooled)} record(s))")
+    ok &= bool(pooled) and set(pooled) == {'bench-session'}
+
+    # 5. فشل بوابة التحقق. بالتزامن الافتراضي يُرسل طلب التحليل مع التحقق، فلا يمكن منعه:
+    #    نتيجته تُهمل ولا يُعاد بعد خطأ، والدالة لا تنتظره. لا يُمنع إرساله إلا إذا كان ما زال في الطابور
+    #    (هنا بتزامن = 1 حيث ينتظر التحليل خلف التحقق)
+    STUB_CONTENT['is_valid'] = False
+    analyzer = CarAIClient()
+    for concurrency, expected in ((4, 2), (1, 1)):
+        reset_executor(concurrency)
+        state.requests = 0
+        start = time.perf_counter()
+        validation, analysis = analyzer.validate_and_analyze(front, {'front': front, 'side': back})
+        elapsed = time.perf_counter() - start
+        reset_executor(concurrency)  # ينتظر انتهاء التحليل الجاري قبل العد
+        requests = state.requests
+        outcome = "in flight: result discarded, no retries" if expected == 2 else "queued: never started"
+        print(f"validation gate failed (concurrency {concurrency}) -> analysis={analysis} "
+              f"requests={requests} ({outcome}), returned after {elapsed:.2f}s")
+        ok &= analysis is None and requests == expected and elapsed < args.latency * 1.8
+    STUB_CONTENT['is_valid'] = True
+
+    server.shutdown()
+    print("✅ all checks passed" if ok else "❌ some checks failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+قياس أداء الترجمة t(): البحث المتداخل السابق (split + قراءة session_state في كل استدعاء)
+مقابل الجداول المسطحة المترجمة مسبقاً في utils/i18n.py
+يعمل داخل تشغيل Streamlit حقيقي (AppTest) حتى يُقاس session_state الفعلي، ويتحقق من:
+- تطابق النتائج مع الطريقة السابقة لكل مفتاح في كل اللغات (مع التنسيق والمفاتيح المفقودة)
+- إعادة التحميل التلقائي عند تعديل ملف لغة
+قم بتشغيله من مجلد المشروع: python scripts/bench_i18n.py [--calls 200000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def bench_app(project_dir: str, calls: int):
+    """سكربت Streamlit الذي يشغله AppTest (يجب أن يكون مستقلاً: تُنسخ الدالة كمصدر)"""
+    import json
+    import os
+    import shutil
+    import sys
+    import tempfile
+    import time
+
+    import streamlit as st
+
+    sys.path.insert(0, project_dir)
+    from utils import i18n
+
+    def legacy_t(key, default=None, **kwargs):
+        """الطريقة السابقة: لغة الجلسة في كل استدعاء ثم مشي في القاموس المتداخل"""
+        lang = st.session_state.get('language', i18n.DEFAULT_LANGUAGE)
+        if lang not in i18n.SUPPORTED_LANGUAGES:
+            lang = i18n.DEFAULT_LANGUAGE
+        value = legacy_cache[lang]
+        for k in key.split('.'):
+            if isinstance(value, dict):
+                value = value.get(k)
+            else:
+                value = None
+                break
+        if value is None:
+            return default if default else key
+        if kwargs and isinstance(value, str):
+            try:
+                return value.format(**kwargs)
+            except Exception:
+                return value
+        return value
+
+    legacy_cache = {}
+    for lang in i18n.SUPPORTED_LANGUAGES:
+        with open(os.path.join(project_dir, 'locales', f"{lang}.json"), encoding='utf-8') as f:
+            legacy_cache[lang] = json.load(f)
+
+    # 1. التطابق: كل المفاتيح (أوراق وأقسام) + مفاتيح مفقودة + تنسيق
+    checked = 0
+    for lang in i18n.SUPPORTED_LANGUAGES:
+        st.session_state['language'] = lang
+        i18n._run_language.value = None
+        keys = list(i18n._get_catalog(lang).entries) + ['missing.key', 'nav', 'nav.home.deeper', '']
+        for key in keys:
+            for kwargs in ({}, {'name': 'Max', 'count': 3, 'n': 1}):
+                assert i18n.t(key, None, **kwargs) == legacy_t(key, None, **kwargs), (lang, key)
+                assert i18n.t(key, 'Fallback', **kwargs) == legacy_t(key, 'Fallback', **kwargs), (lang, key)
+                checked += 2
+
+    # 2. الإنتاجية: مزيج مفاتيح صفحة عادية (مع مفتاح مفقود له قيمة افتراضية)
+    st.session_state['language'] = 'ar'
+    i18n._run_language.value = None
+    leaves = [k for k, v in i18n._get_catalog('ar').entries.items() if isinstance(v, str)]
+    mix = leaves[::max(len(leaves) // 50, 1)][:50] + ['search.more']
+    results = {}
+    for name, func in (('legacy (split + session_state)', legacy_t),
+                       ('t() flat table', i18n.t),
+                       ('get_translator("ar")', i18n.get_translator('ar'))):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            for i in range(calls):
+                func(mix[i % len(mix)], 'Default')
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+
+    # 3. إعادة التحميل التلقائي: نسخة مؤقتة من locales/ ثم تعديل ملف
+    original_dir, original_interval = i18n.LOCALES_DIR, i18n.RELOAD_CHECK_SECONDS
+    tmp = tempfile.mkdtemp()
+    try:
+        shutil.copytree(original_dir, os.path.join(tmp, 'locales'))
+        i18n.LOCALES_DIR = i18n.Path(tmp) / 'locales'
+        i18n.RELOAD_CHECK_SECONDS = 0
+        i18n.clear_translations_cache()
+        translate = i18n.get_translator('en')
+        before = translate('nav.home')
+        path = i18n.LOCALES_DIR / 'en.json'
+        data = json.loads(path.read_text(encoding='utf-8'))
+        data['nav']['home'] = 'Reloaded Home'
+        data['bench'] = {'added': 'Hello {name}'}
+        time.sleep(0.01)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        reloaded = (translate('nav.home'), translate('bench.added', name='Max'))
+    finally:
+        i18n.LOCALES_DIR, i18n.RELOAD_CHECK_SECONDS = original_dir, original_interval
+        i18n.clear_translations_cache()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    st.session_state['bench'] = {
+        'checked': checked, 'results': results, 'calls': calls,
+        'reload': (before, reloaded), 'missing': i18n.missing_keys_report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark utils.i18n.t() throughput")
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+
+    app = AppTest.from_function(bench_app, args=(str(PROJECT_DIR), args.calls), default_timeout=600).run()
+    if app.exception:
+        print(f"❌ {app.exception[0].message}")
+        sys.exit(1)
+    bench = app.session_state['bench']
+
+    print(f"✅ t() identical to the previous lookup for {bench['checked']:,} key/language/argument combinations")
+    before, (home, added) = bench['reload']
+    print(f"✅ hot reload: nav.home '{before}' -> '{home}', new key -> '{added}'")
+    assert home == 'Reloaded Home' and added == 'Hello Max', "locale file change was not picked up"
+
+    calls = bench['calls']
+    baseline = bench['results']['legacy (split + session_state)']
+    print(f"\n{'lookup':<32} {'ns/call':>9} {'calls/s':>12} {'speedup':>8}")
+    for name, seconds in bench['results'].items():
+        print(f"{name:<32} {seconds / calls * 1e9:>9.0f} {calls / seconds:>12,.0f} {baseline / seconds:>7.1f}x")
+
+    print("\nkeys missing per locale (present in another locale):")
+    for lang, keys in bench['missing'].items():
+        print(f"  {lang}: {len(keys)}" + (f"  e.g. {', '.join(keys[:5])}" if keys else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+قياس تجهيز الصور قبل الرفع لـ Groq: حجم الحمولة وزمن الرفع قبل/بعد التصغير وإعادة الترميز
+بدون --dir تُولَّد صور بحجم صور الهاتف (4032x3024، JPEG q95، EXIF مع تدوير) من صور uploads/
+قم بتشغيله من مجلد المشروع: python scripts/bench_image_preprocessing.py [--dir صور] [--uplink-mbps 10]
+"""
+
+import argparse
+import base64
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.image_preprocessor import ImagePreprocessor  # noqa: E402
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PHONE_SIZE = (4032, 3024)
+EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def build_fixtures(target: Path, seed: int = 42) -> list:
+    """صور اصطناعية بحجم صور الهاتف: تكبير صور uploads/ مع ضوضاء حساس وEXIF (تدوير 90°)"""
+    rnd = np.random.default_rng(seed)
+    sources = sorted((PROJECT_DIR / 'uploads').glob('*.jpg'))
+    paths = []
+    for src in sources:
+        img = Image.open(src).convert('RGB').resize(PHONE_SIZE, Image.BICUBIC)
+        pixels = np.asarray(img, dtype=np.int16) + rnd.normal(0, 6, (PHONE_SIZE[1], PHONE_SIZE[0], 3)).astype(np.int16)
+        img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+        # الهواتف تحفظ الصورة أفقياً وتضع اتجاه العرض في EXIF
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'BenchPhone'
+        path = target / f"phone_{src.stem}.jpg"
+        img.save(path, format='JPEG', quality=95, exif=exif.tobytes())
+        paths.append(path)
+    return paths
+
+
+def upload_ms(payload_bytes: int, uplink_mbps: float) -> float:
+    """زمن الرفع التقديري لحمولة Base64 على رابط بسرعة uplink_mbps"""
+    return payload_bytes * 8 / (uplink_mbps * 1_000_000) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing before Groq upload")
+    parser.add_argument('--dir', type=Path, help="fixture directory (default: synthetic phone-sized photos)")
+    parser.add_argument('--uplink-mbps', type=float, default=10.0, help="uplink bandwidth used for the upload estimate")
+    parser.add_argument('--max-edge', type=int, help="override AI_IMAGE_MAX_EDGE")
+    parser.add_argument('--format', help="override AI_IMAGE_FORMAT (JPEG / WEBP)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dir:
+            paths = sorted(p for p in args.dir.iterdir() if p.suffix.lower() in EXTENSIONS)
+        else:
+            paths = build_fixtures(Path(tmp))
+        if not paths:
+            print("❌ No fixture images found")
+            sys.exit(1)
+
+        preprocessor = ImagePreprocessor(max_edge=args.max_edge, image_format=args.format, memo_size=0)
+        print(f"max_edge={preprocessor.max_edge} format={preprocessor.format} "
+              f"quality={preprocessor.min_quality}-{preprocessor.quality} target={preprocessor.target_bytes // 1024}KB "
+              f"uplink={args.uplink_mbps} Mbit/s")
+        header = (f"{'image':<24} {'before':>16} {'after':>16} {'KB before':>10} {'KB after':>9} "
+                  f"{'prep ms':>8} {'upload ms before':>17} {'upload ms after':>16}")
+        print(header)
+        print('-' * len(header))
+
+        totals = {'before': 0, 'after': 0, 'prep': 0.0, 'mp_before': 0.0, 'mp_after': 0.0}
+        for path in paths:
+            raw = path.read_bytes()
+            start = time.perf_counter()
+            prepared = preprocessor.prepare(raw)
+            payload = len(base64.b64encode(prepared.data))
+            prep_ms = (time.perf_counter() - start) * 1000
+            before_payload = len(base64.b64encode(raw))
+
+            # التحقق: الصورة الناتجة بالاتجاه الصحيح وبدون بيانات EXIF
+            decoded = Image.open(io.BytesIO(prepared.data))
+            assert max(decoded.size) <= preprocessor.max_edge, "image not downscaled"
+            assert not decoded.getexif(), "metadata not stripped"
+
+            ow, oh = prepared.original_size
+            nw, nh = prepared.size
+            print(f"{path.name[:24]:<24} {f'{ow}x{oh}':>16} {f'{nw}x{nh}':>16} {len(raw) / 1024:>10.0f} "
+                  f"{len(prepared.data) / 1024:>9.0f} {prep_ms:>8.1f} "
+                  f"{upload_ms(before_payload, args.uplink_mbps):>17.0f} {upload_ms(payload, args.uplink_mbps):>16.0f}")
+            totals['before'] += before_payload
+            totals['after'] += payload
+            totals['prep'] += prep_ms
+            totals['mp_before'] += ow * oh / 1e6
+            totals['mp_after'] += nw * nh / 1e6
+
+        count = len(paths)
+        before_ms = upload_ms(totals['before'], args.uplink_mbps)
+        after_ms = upload_ms(totals['after'], args.uplink_mbps) + totals['prep']
+        print()
+        print(f"images: {count}")
+        print(f"base64 payload: {totals['before'] / 1024 / 1024:.2f} MB -> {totals['after'] / 1024 / 1024:.2f} MB "
+              f"({totals['before'] / max(totals['after'], 1):.1f}x smaller)")
+        print(f"pixels sent (vision token cost scales with these): {totals['mp_before']:.1f} MP -> {totals['mp_after']:.1f} MP")
+        print(f"upload time incl. preprocessing: {before_ms:.0f} ms -> {after_ms:.0f} ms "
+              f"(preprocessing {totals['prep'] / count:.0f} ms/image)")
+
+
+if __name__ == '__main__':
+    main()
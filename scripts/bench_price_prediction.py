@@ -0,0 +1,92 @@
+"""
+قياس أداء التسعير: predict_price لكل سيارة مقابل predict_prices المجمّع (NumPy)
+يتحقق أيضاً من تطابق النتائج تماماً بين المسارين
+قم بتشغيله من مجلد المشروع: python scripts/bench_price_prediction.py [--rows 100000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from utils.predictor import PricePredictor  # noqa: E402
+
+
+def build_inventory(rows: int, seed: int = 42) -> list:
+    """مخزون اصطناعي بكل الأعمدة التي يستخدمها PricePredictor"""
+    rnd = random.Random(seed)
+
+    def choice(factors: dict) -> str:
+        return rnd.choice(list(factors) + [''])
+
+    inventory = []
+    for _ in range(rows):
+        inventory.append({
+            'car_type': rnd.choice(list(Config.TYPE_MAPPING)),
+            'brand': rnd.choice(list(Config.BRAND_FACTORS)),
+            'condition_score': rnd.choice([0.2, 0.4, 0.6, 0.8, 0.9, 1.0]),
+            'mileage': rnd.randint(0, 350000),
+            'manufacture_year': rnd.randint(2000, 2026),
+            'fuel_type': choice(Config.FUEL_FACTORS),
+            'owners': rnd.randint(1, 6),
+            'tuv_months': rnd.randint(0, 24),
+            'maintenance': rnd.random() < 0.5,
+            'transmission': choice(Config.TRANSMISSION_FACTORS),
+            'drivetrain': choice(Config.DRIVETRAIN_FACTORS),
+            'color': choice(Config.COLOR_FACTORS),
+            'emissions_class': choice(Config.EMISSIONS_FACTORS),
+            'engine_cc': rnd.choice([0, 999, 1200, 1498, 1598, 1968, 2494, 2998, 3996, 4395]),
+            'horsepower': rnd.randint(0, 600),
+            'accident_history': choice(Config.ACCIDENT_FACTORS),
+            'warranty': choice(Config.WARRANTY_FACTORS),
+            'service_book': choice(Config.SERVICE_BOOK_FACTORS),
+            'equipment': rnd.sample(list(Config.EQUIPMENT_BONUSES), rnd.randint(0, 5)),
+        })
+    return inventory
+
+
+def timed(func, repeat: int):
+    """أفضل زمن من عدة تكرارات (بالثواني) مع نتيجة آخر تشغيل"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs vectorized price prediction")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    predictor = PricePredictor()
+    inventory = build_inventory(args.rows)
+    frame = pd.DataFrame(inventory)
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+
+    scalar_s, scalar = timed(lambda: [predictor.predict_price(car) for car in inventory], args.repeat)
+    frame_s, batch_frame = timed(lambda: predictor.predict_prices(frame), args.repeat)
+    arrays_s, batch_arrays = timed(lambda: predictor.predict_prices(columns), args.repeat)
+
+    assert batch_frame.tolist() == scalar, "DataFrame batch differs from predict_price"
+    assert batch_arrays.tolist() == scalar, "array batch differs from predict_price"
+
+    print(f"rows: {args.rows:,} (best of {args.repeat})")
+    print(f"{'path':<32} {'time (ms)':>10} {'rows/s':>12} {'speedup':>8}")
+    for name, seconds in (("predict_price loop", scalar_s),
+                          ("predict_prices(DataFrame)", frame_s),
+                          ("predict_prices(NumPy columns)", arrays_s)):
+        print(f"{name:<32} {seconds * 1000:>10.1f} {args.rows / seconds:>12,.0f} {scalar_s / seconds:>7.1f}x")
+    print("✅ results identical to predict_price for every row")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+قياس أداء استعلامات التقارير: strftime() القديمة مقابل طرق DatabaseManager الحالية
+(نطاقات created_at نصف المفتوحة وجداول تجميع المبيعات)
+قم بتشغيله من مجلد المشروع: python scripts/bench_reporting_queries.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager  # noqa: E402
+from db_migrations import apply_migrations  # noqa: E402
+
+BRANDS = ['BMW', 'Mercedes', 'Audi', 'Volkswagen', 'Toyota', 'Ford', 'Tesla', 'Kia']
+YEARS = (2023, 2024, 2025)
+BENCH_YEAR = 2024
+EMPLOYEES = 50
+MARGIN = 0.20
+
+# الاستعلامات القديمة كما كانت قبل التحويل إلى نطاقات
+LEGACY_MONTH = """
+    SELECT COUNT(*), COALESCE(SUM(estimated_price), 0),
+           COALESCE(SUM(estimated_price * COALESCE(profit_margin, ?)), 0)
+    FROM transactions
+    WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
+"""
+LEGACY_QUARTER = """
+    SELECT COUNT(*), COALESCE(SUM(estimated_price), 0),
+           COALESCE(SUM(estimated_price * COALESCE(profit_margin, ?)), 0)
+    FROM transactions
+    WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) IN (?, ?, ?)
+"""
+LEGACY_YEAR = """
+    SELECT COUNT(*), COALESCE(SUM(estimated_price), 0),
+           COALESCE(SUM(estimated_price * COALESCE(profit_margin, ?)), 0)
+    FROM transactions
+    WHERE strftime('%Y', created_at) = ?
+"""
+LEGACY_EMPLOYEE = """
+    SELECT COUNT(*), COALESCE(SUM(estimated_price), 0)
+    FROM transactions
+    WHERE employee_id = ? AND strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
+"""
+
+
+def build_database(path: Path, rows: int, seed: int = 42):
+    """إنشاء قاعدة بيانات اصطناعية بعدد المعاملات المطلوب (صيغتا التاريخ مختلطتان)"""
+    rnd = random.Random(seed)
+    start = datetime(YEARS[0], 1, 1)
+    span = int((datetime(YEARS[-1] + 1, 1, 1) - start).total_seconds())
+
+    def generate():
+        for i in range(rows):
+            ts = start + timedelta(seconds=rnd.randrange(span))
+            # CURRENT_TIMESTAMP و isoformat() موجودتان في البيانات الحقيقية
+            created = ts.isoformat() if i % 2 else ts.strftime('%Y-%m-%d %H:%M:%S')
+            yield (
+                1, rnd.choice(BRANDS), 'Model', rnd.uniform(5000, 90000),
+                rnd.choice((None, 0.15, 0.20, 0.25)), rnd.randint(1, EMPLOYEES), created,
+            )
+
+    conn = sqlite3.connect(str(path))
+    apply_migrations(conn)
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('bench', 'bench@example.com', 'x')")
+    conn.executemany(
+        "INSERT INTO transactions (user_id, brand, model, estimated_price, profit_margin, employee_id, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", generate()
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def timed(func, repeat: int) -> float:
+    """أفضل زمن (بالمللي ثانية) من عدة تكرارات"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def legacy_monthly(conn):
+    return [conn.execute(LEGACY_MONTH, (MARGIN, str(BENCH_YEAR), f"{m:02d}")).fetchone() for m in range(1, 13)]
+
+
+def legacy_quarterly(conn):
+    return [
+        conn.execute(LEGACY_QUARTER, (MARGIN, str(BENCH_YEAR), *[f"{m:02d}" for m in range(q * 3 - 2, q * 3 + 1)])).fetchone()
+        for q in range(1, 5)
+    ]
+
+
+def legacy_yearly(conn):
+    return conn.execute(LEGACY_YEAR, (MARGIN, str(BENCH_YEAR))).fetchone()
+
+
+def legacy_employee(conn):
+    return [conn.execute(LEGACY_EMPLOYEE, (e, str(BENCH_YEAR), '06')).fetchone() for e in range(1, EMPLOYEES + 1)]
+
+
+def run_size(rows: int, repeat: int, workdir: Path):
+    path = workdir / f"bench_{rows}.db"
+    t0 = time.perf_counter()
+    build_database(path, rows)
+    print(f"\n=== {rows:,} transactions (built in {time.perf_counter() - t0:.1f}s) ===")
+
+    # DatabaseManager كائن وحيد: نعيد تهيئته لكل قاعدة بيانات
+    DatabaseManager._instance = None
+    DatabaseManager._initialized = False
+    db = DatabaseManager(path)
+    db.set_setting('company_profit_margin', MARGIN)
+
+    legacy = sqlite3.connect(str(path))
+    cases = [
+        ('monthly profits', lambda: legacy_monthly(legacy), lambda: db.get_monthly_profits(BENCH_YEAR)),
+        ('quarterly profits', lambda: legacy_quarterly(legacy), lambda: db.get_quarterly_profits(BENCH_YEAR)),
+        ('yearly profit', lambda: legacy_yearly(legacy), lambda: db.get_yearly_profit(BENCH_YEAR)),
+        ('employee sales x50', lambda: legacy_employee(legacy),
+         lambda: [db.get_employee_sales(e, month=6, year=BENCH_YEAR) for e in range(1, EMPLOYEES + 1)]),
+    ]
+
+    print(f"{'query':<22}{'strftime (ms)':>16}{'current (ms)':>14}{'speedup':>10}")
+    for name, old, new in cases:
+        old_ms, new_ms = timed(old, repeat), timed(new, repeat)
+        print(f"{name:<22}{old_ms:>16.2f}{new_ms:>14.2f}{old_ms / max(new_ms, 1e-6):>9.1f}x")
+
+    # التحقق من تطابق النتائج
+    monthly = db.get_monthly_profits(BENCH_YEAR)
+    assert [m['sales_count'] for m in monthly] == [r[0] for r in legacy_monthly(legacy)], "monthly mismatch"
+    quarterly = db.get_quarterly_profits(BENCH_YEAR)
+    assert [q['sales_count'] for q in quarterly] == [r[0] for r in legacy_quarterly(legacy)], "quarterly mismatch"
+
+    print("\nplans:")
+    for label, sql, params in [
+        ('legacy year', LEGACY_YEAR, (MARGIN, str(BENCH_YEAR))),
+        ('range year', "SELECT COUNT(*) FROM transactions WHERE created_at >= ? AND created_at < ?",
+         ('2024-01-01', '2025-01-01')),
+    ]:
+        detail = '; '.join(row[3] for row in legacy.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        print(f"  {label:<12} {detail}")
+
+    legacy.close()
+    db.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            run_size(rows, args.repeat, Path(tmp))
+
+
+if __name__ == '__main__':
+    main()
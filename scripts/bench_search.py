@@ -0,0 +1,156 @@
+"""
+قياس البحث الشامل: مسح LIKE '%q%' (الطريقة السابقة) مقابل فهرس FTS5 trigram (db_search.py)
+يبني قاعدة بيانات مؤقتة بعدد كبير من السيارات والعملاء والموظفين، ويتحقق أن الفهرس يعيد
+نفس صفوف LIKE تماماً (البحث الشامل وفلتر الماركة) قبل مقارنة الزمن لكل ضغطة مفتاح.
+قم بتشغيله من مجلد المشروع: python scripts/bench_search.py [--rows 300000]
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_search import (SEARCH_INDEXES, create_search_schema, rebuild_search_index,  # noqa: E402
+                       search_ids, text_filter)
+
+BRANDS = ['BMW', 'Mercedes-Benz', 'Volkswagen', 'Audi', 'Opel', 'Skoda', 'Toyota', 'Hyundai',
+          'Ford', 'Renault', 'Peugeot', 'Porsche', 'Tesla', 'Kia', 'Seat', 'Volvo']
+MODELS = ['Golf', 'Passat', 'X5', '320d', 'C200', 'A4', 'Astra', 'Octavia', 'Corolla', 'Tucson',
+          'Focus', 'Clio', '308', 'Cayenne', 'Model 3', 'Sportage', 'Leon', 'XC60']
+COLORS = ['Black', 'White', 'Silver', 'Grey', 'Blue', 'Red', 'Green', 'Schwarz', 'Weiß', 'أسود']
+TYPES = ['Sedan', 'SUV', 'Hatchback', 'Coupe', 'Kombi', 'Van']
+FIRST = ['Max', 'Anna', 'Lukas', 'Sophie', 'Mohammed', 'Fatima', 'Jonas', 'Lea', 'Omar', 'Mia']
+LAST = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Hoffmann', 'Yilmaz', 'Haddad']
+JOBS = ['Verkäufer', 'Verkaufsleiter', 'Mechaniker', 'Buchhalter', 'Manager']
+
+# (النوع، الاستعلام) كما يكتبها المستخدم في خانة البحث
+QUERIES = [('cars', 'bmw'), ('cars', 'Golf'), ('cars', 'cayenne'), ('cars', 'silver'),
+           ('customers', 'schmidt'), ('customers', '0176'), ('customers', 'mia.yilmaz1234'),
+           ('customers', '0176 55'), ('employees', 'verkauf'), ('employees', 'haddad')]
+TYPO_QUERIES = [('cars', 'Mercedez'), ('cars', 'Volkswagn'), ('customers', 'Schnieder')]
+
+
+def build_database(path: Path, rows: int, seed: int = 42) -> sqlite3.Connection:
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, full_name TEXT, email TEXT, phone TEXT)")
+    conn.execute("CREATE TABLE transactions (id INTEGER PRIMARY KEY, brand TEXT, model TEXT, color TEXT, "
+                 "car_type TEXT, estimated_price REAL)")
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, "
+                 "job_title TEXT, phone TEXT)")
+
+    def person():
+        first, last = rnd.choice(FIRST), rnd.choice(LAST)
+        return first, last, f"01{rnd.randint(50, 79)}{rnd.randint(1000000, 9999999)}"
+
+    users = []
+    for i in range(rows // 3):
+        first, last, phone = person()
+        users.append((f"{first.lower()}{i}", f"{first} {last}", f"{first}.{last}{i}@mail.de".lower(), phone))
+    conn.executemany("INSERT INTO users (username, full_name, email, phone) VALUES (?, ?, ?, ?)", users)
+    conn.executemany(
+        "INSERT INTO transactions (brand, model, color, car_type, estimated_price) VALUES (?, ?, ?, ?, ?)",
+        ((rnd.choice(BRANDS), rnd.choice(MODELS), rnd.choice(COLORS), rnd.choice(TYPES),
+          rnd.randint(0, 90000)) for _ in range(rows)))
+    conn.executemany(
+        "INSERT INTO employees (first_name, last_name, job_title, phone) VALUES (?, ?, ?, ?)",
+        ((*person()[:2], rnd.choice(JOBS), person()[2]) for _ in range(max(rows // 100, 10))))
+    conn.commit()
+    return conn
+
+
+def like_search(conn: sqlite3.Connection, kind: str, query: str, limit: int):
+    """البحث السابق في components/global_search.py"""
+    base_table, _, columns = SEARCH_INDEXES[kind]
+    like = ' OR '.join(f"{c} LIKE ?" for c in columns)
+    return conn.execute(f"SELECT id FROM {base_table} WHERE {like} LIMIT ?",
+                        [f"%{query}%"] * len(columns) + [limit]).fetchall()
+
+
+def timed(func, repeat: int) -> float:
+    """أفضل زمن من عدة تكرارات (بالمللي ثانية)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LIKE scans vs the FTS5 search index")
+    parser.add_argument('--rows', type=int, default=300_000, help="number of cars (customers = rows / 3)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=10, help="results per section (one page)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        conn = build_database(Path(tmp) / 'search.db', args.rows)
+        print(f"cars: {args.rows:,}  customers: {args.rows // 3:,}  built in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        if not create_search_schema(conn):
+            print("❌ SQLite was built without FTS5/trigram")
+            sys.exit(1)
+        rebuild_search_index(conn)
+        conn.commit()
+        print(f"FTS5 index built in {time.perf_counter() - start:.1f}s (sqlite {sqlite3.sqlite_version})")
+
+        # 1. نفس الصفوف: البحث الجزئي بدون حد وبدون المرحلة التقريبية، وفلتر الماركة
+        for kind, query in QUERIES:
+            base_table, _, columns = SEARCH_INDEXES[kind]
+            expected = {r[0] for r in like_search(conn, kind, query, -1)}
+            actual = set(search_ids(conn, kind, query, limit=len(expected) + 1, fuzzy=False))
+            assert actual == expected, f"{kind} '{query}': FTS {len(actual)} rows vs LIKE {len(expected)}"
+        for brand in ('bmw', 'Benz', 'wagen', 'o'):
+            like_sql, like_params = text_filter('cars', brand, ['brand'], 't.id', indexed=False)
+            fts_sql, fts_params = text_filter('cars', brand, ['brand'], 't.id')
+            select = "SELECT t.id FROM transactions t WHERE t.estimated_price > 0"
+            assert (conn.execute(select + like_sql, like_params).fetchall()
+                    == conn.execute(select + fts_sql, fts_params).fetchall()), f"brand filter '{brand}' differs"
+        print("✅ FTS results identical to LIKE for every query and brand filter")
+
+        # 2. زمن كل ضغطة مفتاح (صفحة واحدة لكل قسم)
+        print(f"\n{'kind':<10} {'query':<16} {'LIKE ms':>9} {'FTS ms':>9} {'speedup':>8}")
+        for kind, query in QUERIES:
+            like_ms = timed(lambda: like_search(conn, kind, query, args.limit), args.repeat)
+            fts_ms = timed(lambda: search_ids(conn, kind, query, args.limit), args.repeat)
+            print(f"{kind:<10} {query:<16} {like_ms:>9.2f} {fts_ms:>9.2f} {like_ms / fts_ms:>7.1f}x")
+
+        # عند عدم وجود صفحة كاملة يمسح LIKE الجدول كاملاً (وهي حالة كل استعلام فيه خطأ إملائي)
+        print(f"\n{'kind':<10} {'typo':<16} {'LIKE ms':>9} {'FTS ms':>9} {'LIKE hits':>10} {'FTS top hit'}")
+        for kind, query in TYPO_QUERIES:
+            base_table, _, columns = SEARCH_INDEXES[kind]
+            like_ms = timed(lambda: like_search(conn, kind, query, args.limit), args.repeat)
+            fts_ms = timed(lambda: search_ids(conn, kind, query, args.limit), args.repeat)
+            hits = like_search(conn, kind, query, args.limit)
+            ids = search_ids(conn, kind, query, args.limit)
+            top = conn.execute(f"SELECT {', '.join(columns)} FROM {base_table} WHERE id = ?",
+                               ids[:1]).fetchone() if ids else None
+            print(f"{kind:<10} {query:<16} {like_ms:>9.2f} {fts_ms:>9.2f} {len(hits):>10} {top}")
+
+        # 3. فلتر الماركة: inventory / showcase تجلب كل المطابقات، و /api/cars أول 50
+        conn.execute("INSERT INTO transactions (brand, model, estimated_price) VALUES ('Lamborghini', 'Urus', 240000)")
+        conn.commit()
+        print(f"\n{'brand filter':<26} {'LIKE ms':>9} {'FTS ms':>9} {'speedup':>8}")
+        select = "SELECT t.id, t.brand FROM transactions t WHERE t.estimated_price > 0"
+        for brand in ('porsche', 'wagen', 'lambo'):
+            like_sql, like_params = text_filter('cars', brand, ['brand'], 't.id', indexed=False)
+            fts_sql, fts_params = text_filter('cars', brand, ['brand'], 't.id')
+            for label, order in (('page', " ORDER BY t.id DESC"), ('api', " ORDER BY t.id DESC LIMIT 50")):
+                like_ms = timed(lambda: conn.execute(select + like_sql + order, like_params).fetchall(), args.repeat)
+                fts_ms = timed(lambda: conn.execute(select + fts_sql + order, fts_params).fetchall(), args.repeat)
+                print(f"{f'{brand} ({label})':<26} {like_ms:>9.2f} {fts_ms:>9.2f} {like_ms / fts_ms:>7.1f}x")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+قياس إرسال دفعة تذكيرات: الطريقة السابقة (اتصال + EHLO + إرسال + QUIT لكل رسالة) مقابل مجمع الجلسات
+(utils/smtp_pool.py: جلسة واحدة لكل SMTP_MAX_MESSAGES_PER_CONNECTION رسالة).
+يشغّل خادم SMTP محلياً للتجربة (بدون TLS أو تسجيل دخول) يعدّ الاتصالات والرسائل، ويرفض العناوين التي
+تحتوي reject لاختبار عزل فشل المستلمين؛ --latency يحاكي زمن المصافحة عند مزود حقيقي (TLS + AUTH).
+أو استخدم --host/--port لخادم تجربة خارجي (مثل: python -m aiosmtpd -n -l localhost:1025).
+قم بتشغيله من مجلد المشروع: python scripts/bench_smtp.py [--messages 200] [--latency 50]
+"""
+
+import argparse
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from utils.notifier import NotificationManager  # noqa: E402
+from utils.smtp_pool import SMTPPool  # noqa: E402
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency: float):
+        super().__init__(address, SinkHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = self.messages = self.refused = 0
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """خادم SMTP أدنى: يقبل الرسائل ويتجاهلها"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        time.sleep(server.latency)
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply("250-sink")
+                self.reply("250 8BITMIME")
+            elif verb == 'RCPT':
+                if 'reject' in command.lower():
+                    with server.lock:
+                        server.refused += 1
+                    self.reply("550 mailbox unavailable")
+                else:
+                    self.reply("250 ok")
+            elif verb == 'DATA':
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self.reply("250 queued")
+            elif verb == 'QUIT':
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RSET, NOOP
+                self.reply("250 ok")
+
+
+def reminder_messages(count: int, reject_every: int) -> list:
+    notifier = NotificationManager()
+    messages = []
+    for i in range(count):
+        email = f"reject{i}@example.com" if reject_every and i % reject_every == 0 else f"customer{i}@example.com"
+        messages.append(notifier._installment_reminder_message({
+            'email': email, 'full_name': f"Customer {i}", 'amount_due': 349.0, 'due_date': '2026-11-01',
+            'installment_number': i % 48 + 1, 'contract_id': 1000 + i}))
+    return messages
+
+
+def send_legacy(host: str, port: int, messages: list) -> int:
+    """السلوك السابق: اتصال جديد لكل رسالة"""
+    notifier, sent = NotificationManager(), 0
+    for m in messages:
+        try:
+            with smtplib.SMTP(host, port, timeout=30) as server:
+                server.send_message(notifier._build_message(m['to'], m['subject'], m['body'], True))
+            sent += 1
+        except smtplib.SMTPException:
+            pass
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled SMTP delivery against a local sink server")
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=50, help="simulated handshake latency per connection (ms)")
+    parser.add_argument('--reject-every', type=int, default=100, help="every Nth recipient is refused (0 = none)")
+    parser.add_argument('--host', help="use an external debugging SMTP server instead of the built-in sink")
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+
+    sink = None
+    if args.host:
+        host, port = args.host, args.port
+    else:
+        sink = SinkServer(('127.0.0.1', 0), args.latency / 1000)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        host, port = sink.server_address
+
+    Config.SENDER_EMAIL = Config.SENDER_EMAIL or 'noreply@smartcar.local'
+    messages = reminder_messages(args.messages, args.reject_every)
+
+    rows = []
+    for name in ('legacy (connection per mail)', 'pooled session'):
+        before = (sink.connections, sink.messages) if sink else (0, 0)
+        start = time.perf_counter()
+        if name.startswith('legacy'):
+            sent = send_legacy(host, port, messages)
+        else:
+            pool = SMTPPool(host, port, security='none', max_per_connection=Config.SMTP_MAX_MESSAGES_PER_CONNECTION)
+            results = pool.send_batch(NotificationManager()._build_message(m['to'], m['subject'], m['body'], True)
+                                      for m in messages)
+            pool.close()
+            sent = sum(1 for r in results if r['success'])
+        elapsed = time.perf_counter() - start
+        connections = sink.connections - before[0] if sink else None
+        rows.append((name, sent, connections, elapsed))
+
+    print(f"{'delivery':<30} {'sent':>6} {'connections':>12} {'seconds':>9} {'mails/s':>9}")
+    for name, sent, connections, elapsed in rows:
+        print(f"{name:<30} {sent:>6} {connections if connections is not None else '-':>12} "
+              f"{elapsed:>9.2f} {len(messages) / elapsed:>9.0f}")
+    print(f"\nspeedup: {rows[0][3] / rows[1][3]:.1f}x; refused recipients are reported per message "
+          f"and the rest of the batch continues on the same session")
+    if sink:
+        sink.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+قياس تكلفة حقن الأنماط في كل إعادة تشغيل: الطريقة السابقة (قراءة الشعار + base64 + استبدال داخل CSS
+غير مصغّر في كل إعادة) مقابل utils/static_assets.inject_css (كتلة مبنية مرة واحدة لكل عملية)
+يعمل داخل تشغيل Streamlit حقيقي (AppTest)، ويقيس:
+- حجم البايتات المرسلة للمتصفح في أول تحميل (كتلة CSS العامة + كتلة اللغة)
+- زمن الخادم لكل إعادة تشغيل (بناء الكتلة + st.markdown + بصمة الرسالة)
+- مع وبدون خدمة الملفات الثابتة (server.enableStaticServing)
+قم بتشغيله من مجلد المشروع: python scripts/bench_static_assets.py [--reruns 200]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def bench_app(project_dir: str, reruns: int):
+    """سكربت Streamlit الذي يشغله AppTest (يجب أن يكون مستقلاً: تُنسخ الدالة كمصدر)"""
+    import base64
+    import hashlib
+    import shutil
+    import sys
+    import tempfile
+    import time
+    from pathlib import Path
+
+    import streamlit as st
+
+    sys.path.insert(0, project_dir)
+    from config import Config
+    from utils import i18n, static_assets
+    from components import css_styles
+
+    # التقاط وسائط inject_css لإعادة بناء الطريقة السابقة من نفس نص CSS
+    calls = {}
+    original_inject = css_styles.inject_css
+    css_styles.inject_css = lambda name, css, assets=None, fonts=None: calls.setdefault(name, (css, assets, fonts))
+    css_styles.load_custom_css()
+    css_styles.inject_css = original_inject
+    css, assets, fonts = calls['custom']
+
+    placeholder = st.empty()
+
+    def legacy_block():
+        logo = ""
+        if Config.LOGO_PATH.exists():
+            logo = base64.b64encode(Config.LOGO_PATH.read_bytes()).decode()
+        html = "<style>" + css.replace("[LOGO_URL]", f"data:image/png;base64,{logo}") + "</style>"
+        placeholder.markdown(html, unsafe_allow_html=True)
+        return html
+
+    def current_block():
+        with placeholder:
+            static_assets.inject_css('custom', css, assets, fonts)
+        return static_assets._style_blocks['custom'][1]
+
+    def timed(render):
+        """أفضل زمن من 3 لكل إعادة تشغيل؛ البصمة md5 تمثل ما يحسبه Streamlit لكل رسالة"""
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(reruns):
+                hashlib.md5(render().encode()).hexdigest()
+            best = min(best, time.perf_counter() - start)
+        return best / reruns
+
+    tmp = tempfile.mkdtemp()
+    original_dir = static_assets.ASSETS_DIR
+    static_assets.ASSETS_DIR = Path(tmp) / 'assets'
+    results = {}
+    try:
+        legacy = legacy_block()
+        results['legacy (read + base64 per rerun)'] = (len(legacy.encode()), timed(legacy_block))
+        for serving in (False, True):
+            st._config.set_option('server.enableStaticServing', serving)
+            static_assets.clear_style_cache()
+            block = current_block()
+            label = 'inject_css, static files' if serving else 'inject_css, data URI'
+            results[label] = (len(block.encode()), timed(current_block))
+        published = sorted(p.name for p in static_assets.ASSETS_DIR.glob('*'))
+    finally:
+        static_assets.ASSETS_DIR = original_dir
+        static_assets.clear_style_cache()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # كتلة اللغة: التبديل بين الاتجاهين يغير هذه الكتلة الصغيرة فقط
+    language = {}
+    for lang in ('ar', 'en'):
+        st.session_state['language'] = lang
+        i18n._run_language.value = None
+        i18n.apply_language_css()
+        language[lang] = len(static_assets._style_blocks['rtl' if lang == 'ar' else 'ltr'][1].encode())
+
+    st.session_state['bench'] = {'results': results, 'published': published, 'language': language}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-rerun CSS/logo injection")
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    app = AppTest.from_function(bench_app, args=(str(PROJECT_DIR), args.reruns), default_timeout=600).run()
+    if app.exception:
+        print(f"❌ {app.exception[0].message}")
+        sys.exit(1)
+    bench = app.session_state['bench']
+
+    results = bench['results']
+    baseline_bytes, baseline_time = results['legacy (read + base64 per rerun)']
+    print(f"{'style block':<34} {'bytes':>10} {'µs/rerun':>10} {'speedup':>8}")
+    for name, (size, seconds) in results.items():
+        print(f"{name:<34} {size:>10,} {seconds * 1e6:>10.1f} {baseline_time / seconds:>7.1f}x")
+    print(f"\nbytes saved on first load: {baseline_bytes - results['inject_css, static files'][0]:,} "
+          f"(logo and fonts fetched once as cacheable files: {', '.join(bench['published']) or 'none'})")
+    print("language blocks: " + ", ".join(f"{lang} {size:,} bytes" for lang, size in bench['language'].items()))
+    print("identical blocks ≥ global.minCachedMessageSize are sent as a hash reference on later reruns")
+
+
+if __name__ == '__main__':
+    main()
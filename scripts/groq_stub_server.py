@@ -0,0 +1,119 @@
+"""
+خادم بديل محلي لواجهة Groq (OpenAI-compatible) لاختبار طبقة الطلبات بدون مفتاح أو تكلفة
+يرد على POST /openai/v1/chat/completions بعد تأخير ثابت، ويمكنه حقن أخطاء 429 / 500.
+التشغيل: python scripts/groq_stub_server.py --port 8099 --latency 1.0 --fail-first 2
+ثم: GROQ_BASE_URL=http://127.0.0.1:8099 GROQ_API_KEY=stub streamlit run app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_CONTENT = {
+    'is_valid': True, 'message': 'stub', 'success': True,
+    'brand': 'Skoda', 'model': 'Fabia', 'estimated_brand': 'Skoda', 'estimated_model': 'Fabia',
+    'full_name': 'Max Mustermann', 'id_number': 'L01X00T47', 'expiry_date': '2031-08-01',
+    'license_number': 'B072RRE2I55', 'license_type': 'B',
+}
+
+
+class StubState:
+    """إعدادات الخادم وعداداته (مشتركة بين خيوط الطلبات)"""
+
+    def __init__(self, latency: float = 1.0, fail_first: int = 0, fail_status: int = 429,
+                 retry_after: float = None):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict = None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not self.path.endswith('/chat/completions'):
+                self._send(404, {'error': {'message': 'not found'}})
+                return
+
+            with state.lock:
+                state.requests += 1
+                fail = state.failures < state.fail_first
+                if fail:
+                    state.failures += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                time.sleep(state.latency)
+                if fail:
+                    headers = {'retry-after': str(state.retry_after)} if state.retry_after is not None else {}
+                    self._send(state.fail_status, {'error': {'message': 'stub failure', 'type': 'stub'}}, headers)
+                    return
+                self._send(200, {
+                    'id': f"stub-{state.requests}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': 'stub',
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': json.dumps(STUB_CONTENT)},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                })
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+def start_stub_server(state: StubState, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """تشغيل الخادم في خيط خلفي؛ العنوان الفعلي في server.server_address"""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=1.0, help="seconds before each response")
+    parser.add_argument('--fail-first', type=int, default=0, help="fail the first N requests")
+    parser.add_argument('--fail-status', type=int, default=429)
+    parser.add_argument('--retry-after', type=float, help="Retry-After header sent with failures")
+    args = parser.parse_args()
+
+    state = StubState(args.latency, args.fail_first, args.fail_status, args.retry_after)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Groq stub listening on http://{args.host}:{args.port} (set GROQ_BASE_URL to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nrequests={state.requests} failures={state.failures} max_in_flight={state.max_in_flight}")
+
+
+if __name__ == '__main__':
+    main()
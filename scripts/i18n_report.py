@@ -0,0 +1,65 @@
+"""
+تقرير مفاتيح الترجمة المفقودة:
+- المفاتيح الموجودة في ملف لغة والمفقودة من لغة أخرى
+- المفاتيح المستخدمة في الكود t('...') وغير الموجودة في ملف اللغة (تظهر بالقيمة الافتراضية أو كاسم المفتاح)
+قم بتشغيله من مجلد المشروع: python scripts/i18n_report.py [--strict]
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from utils.i18n import SUPPORTED_LANGUAGES, _get_catalog, missing_keys_report  # noqa: E402
+
+# t('section.key' ...) / t("section.key" ...) بمفتاح نصي ثابت
+_CALL_PATTERN = re.compile(r"""\bt\(\s*(['"])([A-Za-z0-9_]+(?:\.[A-Za-z0-9_]+)+)\1""")
+_SKIP_DIRS = {'scripts', 'venv', '.venv', '__pycache__', '.git'}
+
+
+def used_keys() -> dict:
+    """المفاتيح المستخدمة في الكود: المفتاح -> أول موضع (ملف:سطر)"""
+    keys = {}
+    for path in sorted(PROJECT_DIR.rglob('*.py')):
+        if _SKIP_DIRS.intersection(path.relative_to(PROJECT_DIR).parts):
+            continue
+        for number, line in enumerate(path.read_text(encoding='utf-8', errors='ignore').splitlines(), 1):
+            for match in _CALL_PATTERN.finditer(line):
+                keys.setdefault(match.group(2), f"{path.relative_to(PROJECT_DIR)}:{number}")
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report translation keys missing from the locale files")
+    parser.add_argument('--strict', action='store_true', help="exit with status 1 if any key is missing")
+    parser.add_argument('--limit', type=int, default=20, help="keys listed per section")
+    args = parser.parse_args()
+
+    missing_total = 0
+    print("Keys present in another locale but missing here:")
+    for lang, keys in missing_keys_report().items():
+        missing_total += len(keys)
+        print(f"  {lang}: {len(keys)}")
+        for key in keys[:args.limit]:
+            print(f"     {key}")
+
+    code_keys = used_keys()
+    print(f"\nKeys used in code ({len(code_keys)}) but missing from the locale file:")
+    for lang in SUPPORTED_LANGUAGES:
+        entries = _get_catalog(lang).entries
+        missing = [key for key in sorted(code_keys) if key not in entries]
+        missing_total += len(missing)
+        print(f"  {lang}: {len(missing)}")
+        for key in missing[:args.limit]:
+            print(f"     {key:<40} {code_keys[key]}")
+
+    print("\n✅ No missing keys" if not missing_total else f"\n⚠️ {missing_total} missing key(s)")
+    if args.strict:
+        sys.exit(1 if missing_total else 0)
+
+
+if __name__ == '__main__':
+    main()
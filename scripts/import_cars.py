@@ -0,0 +1,58 @@
+"""
+استيراد ملف سيارات من تاجر (CSV مفصول بفاصلة منقوطة) إلى جدول transactions عبر utils/csv_importer.py:
+قراءة على دفعات، تحقق وتحويل للأنواع لكل عمود، تخطي المكرر (الماركة + الموديل + السنة + الممشى)،
+تسعير اختياري للصفوف بدون سعر، وإدخال executemany داخل معاملة واحدة لكل دفعة مع عرض التقدم.
+قم بتشغيله من مجلد المشروع: python scripts/import_cars.py feed.csv --user-id 1 [--price-missing] [--keep-duplicates]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.csv_importer import CSVImporter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import a dealer CSV feed into the inventory")
+    parser.add_argument('csv_file', type=Path)
+    parser.add_argument('--user-id', type=int, required=True, help="owner of the imported rows")
+    parser.add_argument('--price-missing', action='store_true', help="price rows without estimated_price")
+    parser.add_argument('--keep-duplicates', action='store_true', help="do not skip rows already in the inventory")
+    parser.add_argument('--chunk-rows', type=int)
+    parser.add_argument('--dry-run', action='store_true', help="only parse and validate the header")
+    args = parser.parse_args()
+
+    if not args.csv_file.is_file():
+        raise SystemExit(f"❌ File not found: {args.csv_file}")
+
+    parsed = CSVImporter.parse_csv(args.csv_file)
+    if not parsed['success']:
+        raise SystemExit(f"❌ {parsed['error']}")
+    print(f"📄 {parsed['row_count']:,} rows, columns: {', '.join(parsed['columns'])}")
+    if parsed['unknown_columns']:
+        print(f"⚠️ ignored columns: {', '.join(parsed['unknown_columns'])}")
+    if args.dry_run:
+        return
+
+    def progress(report: dict):
+        print(f"\r   {report['total']:,}/{parsed['row_count']:,} rows  imported {report['imported']:,}  "
+              f"duplicates {report['duplicates']:,}  errors {report['error_count']:,}  ({report['seconds']:.1f}s)",
+              end='', flush=True)
+
+    report = CSVImporter.import_csv(args.csv_file, args.user_id, price_missing=args.price_missing,
+                                    skip_duplicates=not args.keep_duplicates, progress=progress,
+                                    chunk_rows=args.chunk_rows)
+    print()
+    rate = report['total'] / report['seconds'] if report['seconds'] else 0
+    print(f"✅ {report['imported']:,} imported, {report['duplicates']:,} duplicates skipped, "
+          f"{report['priced']:,} priced, {report['error_count']:,} invalid rows ({rate:,.0f} rows/s)")
+    for error in report['errors'][:20]:
+        print(f"   {error}")
+    if report['error_count'] > 20:
+        print(f"   ... {report['error_count'] - 20:,} more")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+نقل صور المعاملات القديمة (data/images/<brand>_<model>_<timestamp>.jpg) إلى مخزن الصور حسب بصمة المحتوى
+وتحديث image_path في كل المعاملات التي تشير إليها؛ الصور المتكررة تصبح ملفاً واحداً مع نسخ WebP المشتقة.
+قم بتشغيله من مجلد المشروع: python scripts/import_images.py [--delete-originals]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager  # noqa: E402
+from utils.image_store import hash_from_path, put_image  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move legacy transaction images into the content-addressed image store")
+    parser.add_argument('--delete-originals', action='store_true', help="delete the legacy files after they were imported")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    with db.get_read_connection() as conn:
+        paths = [row[0] for row in conn.execute(
+            "SELECT DISTINCT image_path FROM transactions WHERE image_path IS NOT NULL AND image_path != ''")]
+    legacy = [p for p in paths if p != 'stored_in_session' and hash_from_path(p) is None]
+
+    imported, missing, rows, legacy_bytes = [], [], 0, 0
+    stored = set()
+    for old_path in legacy:
+        source = Path(old_path)
+        if not source.is_file():
+            missing.append(old_path)
+            continue
+        data = source.read_bytes()
+        with db.get_connection() as conn:
+            new_path = put_image(conn, data)
+            rows += conn.execute("UPDATE transactions SET image_path = ? WHERE image_path = ?",
+                                 (new_path, old_path)).rowcount
+        imported.append(source)
+        legacy_bytes += len(data)
+        stored.add(new_path)
+
+    print(f"✅ {len(imported)} file(s) imported into {len(stored)} unique image(s), {rows} transaction(s) updated")
+    if imported:
+        unique_bytes = sum(Path(p).stat().st_size for p in stored)
+        print(f"   originals: {legacy_bytes / 1024 / 1024:.1f} MB -> {unique_bytes / 1024 / 1024:.1f} MB after deduplication")
+    if missing:
+        print(f"⚠️ {len(missing)} referenced file(s) not found (left unchanged):")
+        for path in missing[:10]:
+            print(f"   {path}")
+
+    if args.delete_originals:
+        for source in imported:
+            source.unlink(missing_ok=True)
+        print(f"🗑️ {len(imported)} legacy file(s) deleted")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+اختبار حمل لواجهة REST للقراءة (utils/api_server.py): طلبات متزامنة على كل نقطة نهاية وقياس
+الطلبات/ثانية وزمن الاستجابة p50/p95 وحجم البيانات المنقولة، مع طلبات If-None-Match (304) وgzip.
+بدون --url يُنشئ قاعدة بيانات اصطناعية مؤقتة (--seed) ويشغّل الواجهة داخل العملية بخادم werkzeug متعدد الخيوط؛
+مع --url يختبر خادماً قائماً (مثل: gunicorn -w 4 -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app).
+قم بتشغيله من مجلد المشروع: python scripts/load_test_api.py [--seed 50000] [--requests 2000] [--concurrency 16]
+"""
+
+import argparse
+import json
+import logging
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager  # noqa: E402
+from db_migrations import apply_migrations  # noqa: E402
+
+BRANDS = ['BMW', 'Mercedes', 'Audi', 'Volkswagen', 'Toyota', 'Ford', 'Tesla', 'Kia']
+MODELS = ['A4', 'C200', 'Golf', 'Corolla', 'Focus', 'Model 3', 'Sportage', 'X5']
+
+
+def build_database(path: Path, rows: int, seed: int = 42):
+    """قاعدة بيانات اصطناعية بعدد السيارات المطلوب"""
+    rnd = random.Random(seed)
+    start = datetime(2023, 1, 1)
+
+    def generate():
+        for _ in range(rows):
+            created = start + timedelta(seconds=rnd.randrange(3 * 365 * 86400))
+            yield (1, rnd.choice(BRANDS), rnd.choice(MODELS), rnd.randint(2010, 2025), rnd.uniform(5000, 90000),
+                   rnd.randint(0, 250000), rnd.choice(('Petrol', 'Diesel', 'Electric', 'Hybrid')),
+                   created.strftime('%Y-%m-%d %H:%M:%S'))
+
+    conn = sqlite3.connect(str(path))
+    apply_migrations(conn)
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('bench', 'bench@example.com', 'x')")
+    conn.executemany(
+        "INSERT INTO transactions (user_id, brand, model, manufacture_year, estimated_price, mileage, fuel_type, "
+        "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", generate()
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def start_local_server(path: Path) -> tuple:
+    """تشغيل الواجهة داخل العملية على منفذ عشوائي"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # سطر لكل طلب يشوّه القياس
+    # DatabaseManager كائن وحيد: نهيئه على قاعدة البيانات المؤقتة قبل أول طلب
+    DatabaseManager._instance = None
+    DatabaseManager._initialized = False
+    DatabaseManager(path)
+    from utils.api_server import create_app
+
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def fetch(url: str, headers: dict = None) -> tuple:
+    """(الحالة، البايتات المنقولة، الترويسات)"""
+    req = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, len(resp.read()), resp.headers
+    except urllib.error.HTTPError as e:
+        return e.code, len(e.read()), e.headers
+
+
+def run_scenario(name: str, make_request, total: int, concurrency: int) -> dict:
+    latencies, statuses, transferred = [], {}, 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal transferred
+        t0 = time.perf_counter()
+        status, size = make_request(i)
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            transferred += size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'name': name, 'rps': total / wall, 'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1], 'kb_per_req': transferred / total / 1024,
+        'statuses': ' '.join(f"{code}x{count}" for code, count in sorted(statuses.items())),
+    }
+
+
+def walk_cursor(base: str, limit: int) -> tuple:
+    """المرور على كل الصفحات عبر ترويسة X-Next-Cursor: (عدد الصفحات، الثواني)"""
+    url, pages, start = f"{base}/api/cars?limit={limit}", 0, time.perf_counter()
+    while True:
+        status, _, headers = fetch(url, {'Accept-Encoding': 'gzip'})
+        if status != 200:
+            raise RuntimeError(f"{url} -> {status}")
+        pages += 1
+        cursor = headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages, time.perf_counter() - start
+        url = f"{base}/api/cars?limit={limit}&cursor={cursor}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the SmartCar read API")
+    parser.add_argument('--url', help="base URL of a running API (default: in-process server on a synthetic DB)")
+    parser.add_argument('--seed', type=int, default=50000, help="synthetic cars for the in-process server")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    server = tmp = None
+    if args.url:
+        base = args.url.rstrip('/')
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        path = Path(tmp.name) / 'load_test.db'
+        t0 = time.perf_counter()
+        build_database(path, args.seed)
+        print(f"synthetic database: {args.seed:,} cars (built in {time.perf_counter() - t0:.1f}s)")
+        server, base = start_local_server(path)
+
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    list_etag = fetch(f"{base}/api/cars", gzip_headers)[2].get('ETag', '')
+    with urllib.request.urlopen(f"{base}/api/cars?fields=id&limit=200", timeout=30) as resp:
+        car_ids = [row['id'] for row in json.loads(resp.read())] or [1]
+
+    scenarios = [
+        ('GET /api/cars (gzip)', lambda i: fetch(f"{base}/api/cars", gzip_headers)[:2]),
+        ('GET /api/cars (identity)', lambda i: fetch(f"{base}/api/cars")[:2]),
+        ('GET /api/cars If-None-Match', lambda i: fetch(f"{base}/api/cars",
+                                                         {**gzip_headers, 'If-None-Match': list_etag})[:2]),
+        ('GET /api/cars?brand=BMW', lambda i: fetch(f"{base}/api/cars?brand=BMW", gzip_headers)[:2]),
+        ('GET /api/cars/<id>', lambda i: fetch(f"{base}/api/cars/{car_ids[i % len(car_ids)]}", gzip_headers)[:2]),
+        ('GET /api/stats', lambda i: fetch(f"{base}/api/stats", gzip_headers)[:2]),
+        ('GET /api/brands', lambda i: fetch(f"{base}/api/brands", gzip_headers)[:2]),
+    ]
+
+    print(f"\n{args.requests} requests per scenario, concurrency {args.concurrency}, target {base}")
+    print(f"{'scenario':<32} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'KB/req':>8}  statuses")
+    for name, make_request in scenarios:
+        r = run_scenario(name, make_request, args.requests, args.concurrency)
+        print(f"{r['name']:<32} {r['rps']:>8.0f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['kb_per_req']:>8.2f}  "
+              f"{r['statuses']}")
+
+    pages, seconds = walk_cursor(base, 200)
+    print(f"\nfull cursor walk: {pages} pages of 200 in {seconds:.2f}s "
+          f"({seconds / pages * 1000:.1f} ms/page; constant per page, unlike OFFSET)")
+
+    if server:
+        server.shutdown()
+        DatabaseManager().close_connections()
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
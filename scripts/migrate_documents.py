@@ -0,0 +1,50 @@
+"""
+نقل ملفات أرشيف المستندات من عمود documents.file_data (BLOB داخل smartcar.db) إلى مخزن الملفات
+(Config.DOCUMENT_STORE: مجلد محلي أو S3)، ثم اختيارياً التحقق من البصمات وتقليص ملف قاعدة البيانات (VACUUM).
+آمن لإعادة التشغيل: كل مستند يُنقل ويُثبَّت على حدة.
+قم بتشغيله من مجلد المشروع: python scripts/migrate_documents.py [--verify] [--vacuum]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from db_manager import DatabaseManager  # noqa: E402
+from utils.document_archive import DocumentArchive  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move document BLOBs out of SQLite into the document blob store")
+    parser.add_argument('--verify', action='store_true', help="re-read every stored document and check its SHA-256")
+    parser.add_argument('--vacuum', action='store_true', help="run VACUUM afterwards to return the freed pages to the OS")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db_size = Config.DATABASE_PATH.stat().st_size
+
+    start = time.perf_counter()
+    report = DocumentArchive.migrate_blobs()
+    print(f"✅ {report['moved']} document(s) moved to the '{Config.DOCUMENT_STORE}' store "
+          f"({report['bytes'] / 1024 / 1024:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    if args.verify:
+        ids = [row['id'] for row in db.fetch_all("SELECT id FROM documents WHERE storage_key IS NOT NULL")]
+        failed = [doc_id for doc_id in ids if not DocumentArchive.verify(doc_id)]
+        print(f"{'✅' if not failed else '❌'} {len(ids) - len(failed)}/{len(ids)} document(s) match their checksum")
+        if failed:
+            print(f"   failed ids: {failed[:20]}")
+
+    if args.vacuum:
+        with db.get_connection() as conn:
+            conn.execute("VACUUM")
+            # في وضع WAL يتقلص الملف الرئيسي فقط بعد نقل السجل إليه
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"🧹 VACUUM: {db_size / 1024 / 1024:.1f} MB -> {Config.DATABASE_PATH.stat().st_size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
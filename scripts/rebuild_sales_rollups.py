@@ -0,0 +1,42 @@
+"""
+سكربت جداول تجميع المبيعات - فحص الاتساق أو إعادة البناء من جدول transactions
+قم بتشغيله من مجلد المشروع: python scripts/rebuild_sales_rollups.py [--check]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_manager import DatabaseManager  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the materialized sales rollup tables")
+    parser.add_argument('--check', action='store_true', help="only compare rollups with transactions, do not rebuild")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    mismatches = db.check_sales_rollups()
+
+    if not mismatches:
+        print("✅ Sales rollups are consistent with transactions")
+    else:
+        for name, problems in mismatches.items():
+            print(f"❌ {name}: {len(problems)} mismatched bucket(s)")
+            for problem in problems[:10]:
+                print(f"   {problem['key']}: expected={problem['expected']} actual={problem['actual']}")
+
+    if args.check:
+        sys.exit(1 if mismatches else 0)
+
+    print("🔄 Rebuilding sales rollups...")
+    counts = db.rebuild_sales_rollups()
+    for name, buckets in counts.items():
+        print(f"   {name}: {buckets} bucket(s)")
+    print("✅ Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,7 +17,7 @@ BACKUP_DIR="./backups"
 # Check if backup name provided
 if [ -z "$1" ]; then
     echo -e "${YELLOW}Available backups:${NC}"
-    ls -lh ${BACKUP_DIR}/*.db 2>/dev/null || echo "No database backups found"
+    ls -lh ${BACKUP_DIR}/*.db ${BACKUP_DIR}/*.db.gz 2>/dev/null || echo "No database backups found"
     echo ""
     echo -e "${YELLOW}Usage: ./restore.sh <backup_name>${NC}"
     echo -e "Example: ./restore.sh smartcar_backup_20240115_120000"
@@ -27,8 +27,8 @@ fi
 BACKUP_NAME=$1
 
 # Check if backup exists
-if [ ! -f "${BACKUP_DIR}/${BACKUP_NAME}.db" ]; then
-    echo -e "${RED}❌ Backup not found: ${BACKUP_DIR}/${BACKUP_NAME}.db${NC}"
+if [ ! -f "${BACKUP_DIR}/${BACKUP_NAME}.db" ] && [ ! -f "${BACKUP_DIR}/${BACKUP_NAME}.db.gz" ]; then
+    echo -e "${RED}❌ Backup not found: ${BACKUP_DIR}/${BACKUP_NAME}.db(.gz)${NC}"
     exit 1
 fi
 
@@ -42,9 +42,9 @@ echo -e "${YELLOW}Creating backup of current state...${NC}"
 echo -e "${YELLOW}Stopping application...${NC}"
 docker-compose down 2>/dev/null || true
 
-# Restore database
+# Restore database (verified, applied in one SQLite transaction; backup.sh above saved the current state)
 echo -e "${YELLOW}Restoring database...${NC}"
-cp ${BACKUP_DIR}/${BACKUP_NAME}.db smartcar.db
+python scripts/backup_db.py restore "${BACKUP_NAME}" --no-safety-backup
 echo -e "${GREEN}✅ Database restored${NC}"
 
 # Restore invoices if exists
@@ -0,0 +1,239 @@
+"""
+فحص S3BlobStore (utils/blob_store.py) مقابل بديل S3 داخل العملية: رفع مستند صغير (put_object) وآخر كبير
+(Multipart Upload) عبر DocumentArchive، التنزيل على أجزاء مع التحقق من SHA-256، كشف المحتوى التالف،
+إلغاء الرفع عند خطأ في منتصفه، ثم الحذف.
+البديل يطبق قواعد S3 التي يعتمد عليها المخزن (حد 5MB للأجزاء عدا الأخير، ترتيب الأجزاء و ETag، 404 من head_object).
+أو استخدم --endpoint-url/--bucket لخادم حقيقي متوافق مع S3 (مثل MinIO محلي؛ يتطلب boto3).
+قم بتشغيله من مجلد المشروع: python scripts/verify_s3_blob_store.py [--endpoint-url URL --bucket NAME]
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+from utils import blob_store  # noqa: E402
+from utils.blob_store import BlobStore, S3BlobStore  # noqa: E402
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class FakeClientError(Exception):
+    """نفس شكل botocore.exceptions.ClientError: e.response['Error']['Code']"""
+
+    def __init__(self, code: str, operation: str):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation")
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeBody:
+    """مثل botocore StreamingBody: iter_chunks و close"""
+
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+        self.closed = False
+
+    def iter_chunks(self, chunk_size: int):
+        while True:
+            chunk = self._stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeS3Client:
+    """عميل S3 في الذاكرة بالدوال التي يستدعيها S3BlobStore فقط"""
+
+    def __init__(self, bucket: str):
+        self.buckets = {bucket: {}}
+        self.uploads = {}
+        self.calls = []
+        self.bodies = []
+
+    def _objects(self, bucket: str, operation: str) -> dict:
+        self.calls.append(operation)
+        if bucket not in self.buckets:
+            raise FakeClientError('NoSuchBucket', operation)
+        return self.buckets[bucket]
+
+    def put_object(self, Bucket, Key, Body):
+        self._objects(Bucket, 'PutObject')[Key] = bytes(Body)
+        return {'ETag': f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def create_multipart_upload(self, Bucket, Key):
+        self._objects(Bucket, 'CreateMultipartUpload')
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {'bucket': Bucket, 'key': Key, 'parts': {}}
+        return {'UploadId': upload_id}
+
+    def _upload(self, UploadId, Bucket, Key, operation):
+        upload = self.uploads.get(UploadId)
+        if upload is None or (upload['bucket'], upload['key']) != (Bucket, Key):
+            raise FakeClientError('NoSuchUpload', operation)
+        return upload
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._objects(Bucket, 'UploadPart')
+        if not 1 <= PartNumber <= 10000:
+            raise FakeClientError('InvalidArgument', 'UploadPart')
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self._upload(UploadId, Bucket, Key, 'UploadPart')['parts'][PartNumber] = (etag, bytes(Body))
+        return {'ETag': etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        objects = self._objects(Bucket, 'CompleteMultipartUpload')
+        upload = self._upload(UploadId, Bucket, Key, 'CompleteMultipartUpload')
+        parts = MultipartUpload['Parts']
+        numbers = [part['PartNumber'] for part in parts]
+        if not parts or numbers != sorted(set(numbers)):
+            raise FakeClientError('InvalidPartOrder', 'CompleteMultipartUpload')
+        data = []
+        for index, part in enumerate(parts):
+            etag, body = upload['parts'].get(part['PartNumber'], (None, b''))
+            if etag != part['ETag']:
+                raise FakeClientError('InvalidPart', 'CompleteMultipartUpload')
+            if index < len(parts) - 1 and len(body) < MIN_PART_SIZE:
+                raise FakeClientError('EntityTooSmall', 'CompleteMultipartUpload')
+            data.append(body)
+        objects[Key] = b''.join(data)
+        del self.uploads[UploadId]
+        return {'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._objects(Bucket, 'AbortMultipartUpload')
+        self._upload(UploadId, Bucket, Key, 'AbortMultipartUpload')
+        del self.uploads[UploadId]
+
+    def get_object(self, Bucket, Key):
+        objects = self._objects(Bucket, 'GetObject')
+        if Key not in objects:
+            raise FakeClientError('NoSuchKey', 'GetObject')
+        body = FakeBody(objects[Key])
+        self.bodies.append(body)
+        return {'Body': body, 'ContentLength': len(objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self._objects(Bucket, 'HeadObject'):
+            raise FakeClientError('404', 'HeadObject')
+        return {'ContentLength': len(self.buckets[Bucket][Key])}
+
+    def delete_object(self, Bucket, Key):
+        self._objects(Bucket, 'DeleteObject').pop(Key, None)
+
+
+def failing_source(data: bytes, fail_after: int):
+    """أجزاء ثم خطأ (انقطاع الرفع من المتصفح مثلاً)"""
+    for start in range(0, fail_after, Config.BLOB_CHUNK_SIZE):
+        yield data[start:start + Config.BLOB_CHUNK_SIZE]
+    raise IOError("client disconnected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify S3BlobStore against an in-process S3 stand-in or a real endpoint")
+    parser.add_argument('--endpoint-url', help="S3-compatible endpoint (e.g. http://localhost:9000 for MinIO)")
+    parser.add_argument('--bucket', default='smartcar-verify')
+    args = parser.parse_args()
+
+    fake = None if args.endpoint_url else FakeS3Client(args.bucket)
+    prefix = f"verify/{uuid.uuid4().hex[:8]}/"
+    store = S3BlobStore(args.bucket, prefix, client=fake, endpoint_url=args.endpoint_url)
+    blob_store._store = store  # DocumentArchive يستخدم هذا المخزن
+
+    workdir = tempfile.mkdtemp(prefix='smartcar_s3_')
+    from db_manager import DatabaseManager
+    DatabaseManager(Path(workdir) / 'verify.db')
+    from utils.document_archive import DocumentArchive
+
+    ok = True
+
+    def check(label: str, passed: bool, detail: str = ''):
+        nonlocal ok
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {label}{f'  ({detail})' if detail else ''}")
+
+    # 0. مخزن ناقص يفشل عند إنشائه
+    class IncompleteStore(BlobStore):
+        def put(self, key, chunks):
+            return 0, ''
+    try:
+        IncompleteStore()
+        check("incomplete BlobStore subclass rejected at construction", False)
+    except TypeError as e:
+        check("incomplete BlobStore subclass rejected at construction", True, str(e).split(' with')[0])
+
+    # 1. مستند صغير: طلب put_object واحد
+    small = os.urandom(300 * 1024)
+    calls_before = len(fake.calls) if fake else 0
+    small_id = DocumentArchive.upload(1, 'TÜV', 'small.pdf', small)
+    _, content = DocumentArchive.download(small_id)
+    detail = ''
+    if fake:
+        used = fake.calls[calls_before:]
+        detail = f"calls: {', '.join(dict.fromkeys(used))}"
+        ok &= 'CreateMultipartUpload' not in used
+    check("small document round-trips through put_object", content == small, detail)
+
+    # 2. مستند كبير من كائن ملف: Multipart Upload بأجزاء PART_SIZE، والتنزيل على أجزاء
+    large = os.urandom(2 * S3BlobStore.PART_SIZE + 1024 * 1024 + 17)
+    large_id = DocumentArchive.upload(1, 'Gutachten', 'large.pdf', io.BytesIO(large))
+    key = DatabaseManager().fetch_value("SELECT storage_key FROM documents WHERE id=?", (large_id,))
+    checksum = DatabaseManager().fetch_value("SELECT checksum FROM documents WHERE id=?", (large_id,))
+    _, chunks = DocumentArchive.stream(large_id)
+    digest, sizes = hashlib.sha256(), []
+    for chunk in chunks:
+        digest.update(chunk)
+        sizes.append(len(chunk))
+    detail = f"{len(sizes)} chunks of <= {max(sizes) // 1024} KB"
+    if fake:
+        parts = fake.calls.count('UploadPart')
+        detail += f", {parts} parts uploaded, body closed: {all(b.closed for b in fake.bodies)}"
+        ok &= parts == 3 and all(b.closed for b in fake.bodies)
+    check("large document uploads in parts and streams back with a matching SHA-256",
+          digest.hexdigest() == checksum == hashlib.sha256(large).hexdigest()
+          and max(sizes) <= Config.BLOB_CHUNK_SIZE, detail)
+
+    # 3. محتوى تالف في المخزن يُكشف عند آخر جزء
+    if fake:
+        stored = fake.buckets[args.bucket][prefix + key]
+        fake.buckets[args.bucket][prefix + key] = stored[:-1] + bytes([stored[-1] ^ 1])
+        try:
+            b''.join(DocumentArchive.stream(large_id)[1])
+            check("corrupted object is rejected by checksum verification", False)
+        except IOError as e:
+            check("corrupted object is rejected by checksum verification", True, str(e))
+
+    # 4. خطأ في منتصف الرفع: يُلغى الرفع ولا يبقى كائن أو رفع معلق
+    broken_key = uuid.uuid4().hex
+    try:
+        store.put(broken_key, failing_source(large, S3BlobStore.PART_SIZE + 1024 * 1024))
+        check("upload aborted when the source fails mid-way", False)
+    except IOError:
+        detail = f"pending uploads: {len(fake.uploads)}, abort called" if fake else ''
+        passed = not store.exists(broken_key) and (not fake or (not fake.uploads
+                                                                and 'AbortMultipartUpload' in fake.calls))
+        check("upload aborted when the source fails mid-way", passed, detail)
+
+    # 5. الحذف
+    DocumentArchive.delete(small_id)
+    DocumentArchive.delete(large_id)
+    check("documents deleted from the store", not store.exists(key) and DocumentArchive.download(small_id) == (None, None))
+
+    DatabaseManager().close_connections()
+    shutil.rmtree(workdir, ignore_errors=True)
+    print("✅ all checks passed" if ok else "❌ some checks failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
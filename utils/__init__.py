@@ -9,11 +9,15 @@ def __getattr__(name):
     _imports = {
         'ImageValidator': ('.validation', 'ImageValidator'),
         'validate_car_image': ('.validation', 'validate_car_image'),
+        'ImagePreprocessor': ('.image_preprocessor', 'ImagePreprocessor'),
+        'prepare_image': ('.image_preprocessor', 'prepare_image'),
         'PDFBaseGenerator': ('.pdf_generator', 'PDFGenerator'),
         'InvoiceGenerator': ('.invoice_generator', 'InvoiceGenerator'),
         'InstallmentInvoiceGenerator': ('.installment_invoice', 'InstallmentInvoiceGenerator'),
         'NotificationManager': ('.notifier', 'NotificationManager'),
         'CacheManager': ('.cache_manager', 'CacheManager'),
+        'AIResponseCache': ('.cache_manager', 'AIResponseCache'),
+        'get_ai_cache': ('.cache_manager', 'get_ai_cache'),
         'DocumentScanner': ('.ocr_scanner', 'DocumentScanner'),
         'PaymentProcessor': ('.payment_processor', 'PaymentProcessor'),
         'ImageCleanupManager': ('.cleanup', 'ImageCleanupManager'),
@@ -34,11 +38,15 @@ def __getattr__(name):
 __all__ = [
     'ImageValidator',
     'validate_car_image',
+    'ImagePreprocessor',
+    'prepare_image',
     'PDFBaseGenerator',
     'InvoiceGenerator',
     'InstallmentInvoiceGenerator',
     'NotificationManager',
     'CacheManager',
+    'AIResponseCache',
+    'get_ai_cache',
     'DocumentScanner',
     'PaymentProcessor',
     'ImageCleanupManager',
@@ -1,71 +1,344 @@
 """
 utils/api_server.py - REST API for SmartCar
 SmartCar AI-Dealer
-To run: python utils/api_server.py
+Read-only JSON API over the pooled read-only SQLite connections (DatabaseManager.get_read_connection):
+- /api/cars uses keyset (cursor) pagination; the next page is announced in the Link / X-Next-Cursor headers
+- ?fields= projects a subset of the public car columns
+- ETag / If-None-Match from the data version counters (db_versions.py): unchanged data -> 304 without a query
+- /api/stats and /api/brands are cached in-process per data version; JSON responses are gzip-compressed
+- /api/exports/<token> streams an export file (utils/export_stream.py) in chunks for a signed, expiring link
+- /metrics exposes the performance metrics of all processes (utils/metrics.py) in Prometheus text format
+To run (development): python utils/api_server.py [--port 5000]
+Production (multi-worker): gunicorn -w 4 -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app
 """
-from flask import Flask, jsonify, request
-import sqlite3
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+if __name__ == '__main__':
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask import Flask, Response, g, jsonify, request, send_file
+
 from config import Config
+from db_manager import DatabaseManager
+from db_versions import get_data_versions
+from utils.export_stream import download_name, resolve_download
+from utils import metrics
+from utils.logger import set_correlation_id
 
 app = Flask(__name__)
 
+# Public car columns (internal fields such as user_id, image/invoice paths and margins are never exposed)
+CAR_FIELDS = ('id', 'brand', 'model', 'car_type', 'manufacture_year', 'estimated_price', 'mileage', 'fuel_type',
+              'color', 'transmission', 'drivetrain', 'horsepower', 'engine_cc', 'emissions_class', 'condition',
+              'accident_history', 'warranty', 'service_book', 'equipment', 'created_at')
+# Default projection of /api/cars (the columns the list endpoint always returned)
+LIST_FIELDS = ('id', 'brand', 'model', 'manufacture_year', 'estimated_price', 'mileage', 'fuel_type', 'color',
+               'transmission', 'horsepower')
+
+
+class InvalidQuery(ValueError):
+    """Malformed query parameter -> 400"""
+
+
+def get_db() -> DatabaseManager:
+    return DatabaseManager()
+
+
+# ===== Versioning & caching =====
+
+def data_version(*scopes: str) -> str:
+    with get_db().get_read_connection() as conn:
+        versions = get_data_versions(conn, scopes)
+    return '.'.join(str(versions[scope]) for scope in scopes)
+
+
+def request_etag(version: str) -> str:
+    """Strong ETag for this URL at this data version"""
+    key = f"{request.path}?{request.query_string.decode()}|{version}"
+    return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    # contains_weak: proxies that compress the body downgrade the ETag to W/"..."
+    if request.if_none_match and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = _cache_control()
+        return response
+    return None
+
+
+def _cache_control() -> str:
+    # max-age 0: clients revalidate every time, which costs one version lookup and a 304
+    if Config.API_CACHE_MAX_AGE > 0:
+        return f"public, max-age={Config.API_CACHE_MAX_AGE}"
+    return "no-cache"
+
+
+class ResponseCache:
+    """Small LRU of serialized responses; an entry is valid only for the data version it was built from"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[str, bytes, Optional[bytes]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_build(self, key: str, version: str, build: Callable[[], object]) -> Tuple[bytes, Optional[bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        body = _dumps(build())
+        compressed = gzip.compress(body, 6) if len(body) >= Config.API_GZIP_MIN_BYTES else None
+        with self._lock:
+            self._entries[key] = (version, body, compressed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, compressed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _dumps(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _accepts_gzip() -> bool:
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def json_response(body: bytes, etag: str, compressed: Optional[bytes] = None) -> Response:
+    if compressed is not None and _accepts_gzip():
+        response = Response(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = _cache_control()
+    response.vary.add('Accept-Encoding')
+    return response
 
-def get_db():
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
+@app.before_request
+def bind_request_id():
+    """Correlation id for every log line of this request (client X-Request-ID when it is sane, else a new one)"""
+    incoming = request.headers.get('X-Request-ID', '')
+    request_id = incoming if 0 < len(incoming) <= 64 and incoming.replace('-', '').isalnum() else None
+    g.request_id = set_correlation_id(request_id)
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Latency per route template (registered first, so it runs after compression)"""
+    if 'request_started' in g:
+        metrics.observe('api_request_seconds', time.perf_counter() - g.request_started,
+                        endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+                        method=request.method, status=response.status_code)
+    return response
+
+
+@app.after_request
+def echo_request_id(response: Response) -> Response:
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """gzip for JSON bodies that were not compressed by the view (cached views ship pre-compressed bytes)"""
+    if (response.status_code == 200 and response.mimetype == 'application/json' and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers and _accepts_gzip()):
+        data = response.get_data()
+        if len(data) >= Config.API_GZIP_MIN_BYTES:
+            response.set_data(gzip.compress(data, 6))
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.errorhandler(InvalidQuery)
+def invalid_query(error: InvalidQuery):
+    return jsonify({'error': str(error)}), 400
+
+
+# ===== Request parsing =====
+
+def parse_fields(default: Sequence[str]) -> List[str]:
+    raw = request.args.get('fields', '')
+    if not raw:
+        return list(default)
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in CAR_FIELDS]
+    if unknown:
+        raise InvalidQuery(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def encode_cursor(created_at, car_id: int) -> str:
+    raw = json.dumps([created_at, car_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value: str) -> Tuple[str, int]:
+    try:
+        created_at, car_id = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        if not isinstance(created_at, str) or not isinstance(car_id, int):
+            raise ValueError
+        return created_at, car_id
+    except (ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor") from None
+
+
+# ===== Endpoints =====
 
 @app.route('/api/cars', methods=['GET'])
 def get_cars():
-    """Get available cars"""
-    conn = get_db()
+    """Get available cars, newest first (?brand=, ?fields=, ?limit=, ?cursor=)"""
+    fields = parse_fields(LIST_FIELDS)
+    limit = max(1, min(request.args.get('limit', Config.API_PAGE_SIZE, type=int), Config.API_MAX_PAGE_SIZE))
     brand = request.args.get('brand', '')
-    limit = request.args.get('limit', 50, type=int)
-    
-    q = "SELECT id, brand, model, manufacture_year, estimated_price, mileage, fuel_type, color, transmission, horsepower FROM transactions WHERE estimated_price > 0"
-    params = []
+    cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+
+    etag = request_etag(data_version('transactions'))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    # id and created_at are always read: they form the keyset of the next page
+    columns = ', '.join(dict.fromkeys(fields + ['id', 'created_at']))
+    q = f"SELECT {columns} FROM transactions WHERE estimated_price > 0"
+    params: list = []
     if brand:
-        q += " AND LOWER(brand) LIKE LOWER(?)"
-        params.append(f"%{brand}%")
-    q += " ORDER BY created_at DESC LIMIT ?"
-    params.append(limit)
-    
-    rows = conn.execute(q, params).fetchall()
-    conn.close()
-    return jsonify([dict(r) for r in rows])
+        brand_sql, brand_params = get_db().search_filter('cars', brand, ['brand'])
+        q += brand_sql
+        params.extend(brand_params)
+    if cursor:
+        # Row-value comparison walks idx_transactions_created (created_at, rowid) from the cursor position
+        q += " AND (created_at, id) < (?, ?)"
+        params.extend(cursor)
+    q += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = get_db().fetch_all(q, params)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{field: row[field] for field in fields} for row in rows]
+
+    response = json_response(_dumps(items), etag)
+    if has_more:
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=str(limit))
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @app.route('/api/cars/<int:car_id>', methods=['GET'])
 def get_car(car_id):
-    """Get single car details"""
-    conn = get_db()
-    row = conn.execute("SELECT * FROM transactions WHERE id=?", (car_id,)).fetchone()
-    conn.close()
+    """Get single car details (?fields=)"""
+    fields = parse_fields(CAR_FIELDS)
+    etag = request_etag(data_version('transactions'))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    row = get_db().fetch_one(f"SELECT {', '.join(fields)} FROM transactions WHERE id=?", (car_id,))
     if row:
-        return jsonify(dict(row))
+        return json_response(_dumps(row), etag)
     return jsonify({'error': 'Not found'}), 404
 
 
+def _compute_stats() -> dict:
+    with get_db().get_read_connection() as conn:
+        total_cars, priced, total_price = conn.execute(
+            "SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(priced_count), 0), COALESCE(SUM(total_sales), 0) "
+            "FROM sales_rollup_monthly"
+        ).fetchone()
+        total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        avg_price = total_price / priced if priced else 0
+    return {'total_cars': total_cars, 'total_users': total_users, 'avg_price': round(avg_price, 2)}
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get system statistics"""
-    conn = get_db()
-    total_cars = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
-    total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-    avg_price = conn.execute("SELECT AVG(estimated_price) FROM transactions WHERE estimated_price > 0").fetchone()[0] or 0
-    conn.close()
-    return jsonify({'total_cars': total_cars, 'total_users': total_users, 'avg_price': round(avg_price, 2)})
+    version = data_version('transactions', 'users')
+    etag = request_etag(version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    body, compressed = response_cache.get_or_build('stats', version, _compute_stats)
+    return json_response(body, etag, compressed)
 
 
 @app.route('/api/brands', methods=['GET'])
 def get_brands():
     """Get brand statistics"""
-    conn = get_db()
-    rows = conn.execute("SELECT brand, COUNT(*) as count FROM transactions GROUP BY brand ORDER BY count DESC").fetchall()
-    conn.close()
-    return jsonify([dict(r) for r in rows])
+    version = data_version('transactions')
+    etag = request_etag(version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    body, compressed = response_cache.get_or_build('brands', version, lambda: get_db().fetch_all(
+        "SELECT NULLIF(brand, '') as brand, SUM(sales_count) as count FROM sales_rollup_brand GROUP BY brand ORDER BY count DESC"
+    ))
+    return json_response(body, etag, compressed)
+
+
+@app.route('/api/exports/<token>', methods=['GET'])
+def get_export(token):
+    """Excel / DATEV export created in the admin panel; the file is read and sent in chunks, never loaded whole"""
+    path = resolve_download(token)
+    if path is None:
+        return jsonify({'error': 'Link invalid or expired'}), 404
+    response = send_file(path, as_attachment=True, download_name=download_name(path), conditional=True)
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of this process merged with the snapshots of the app and worker processes"""
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {Config.METRICS_TOKEN}":
+        return jsonify({'error': 'Unauthorized'}), 401
+    response = Response(metrics.render_prometheus(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def create_app() -> Flask:
+    """WSGI application (see wsgi.py); each worker process opens its own connection pools on first request"""
+    app.debug = Config.API_DEBUG
+    return app
 
 
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
+    parser = argparse.ArgumentParser(description="SmartCar read API (development server)")
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+    create_app().run(port=args.port, debug=Config.API_DEBUG, threaded=True)
@@ -1,10 +1,13 @@
 """
 utils/audit_logger.py - Audit Log System
 SmartCar AI-Dealer
+الأحداث تُكتب على دفعات عبر utils/event_writer.py، والإحصائيات تُقرأ من العدادات اليومية
 """
-import sqlite3, json
+import json
 from datetime import datetime
 from config import Config
+from db_manager import DatabaseManager
+from utils.event_writer import flush_events, get_event_writer
 
 
 class AuditLogger:
@@ -21,35 +24,31 @@ class AuditLogger:
             pass
         details_json = json.dumps(details, ensure_ascii=False) if details else None
         try:
-            conn = sqlite3.connect(Config.DATABASE_PATH)
-            conn.execute(
-                "INSERT INTO audit_log (user_id,username,action,entity_type,entity_id,details,created_at) VALUES (?,?,?,?,?,?,?)",
-                (user_id, username, action, entity_type, str(entity_id) if entity_id else None, details_json, datetime.now().isoformat()))
-            conn.commit()
-            conn.close()
+            get_event_writer().add('audit_log', (user_id, username, action, entity_type,
+                                                 str(entity_id) if entity_id else None, details_json, datetime.now().isoformat()))
         except Exception as e:
             if Config.logger: Config.logger.error(f"Audit: {e}")
 
     @staticmethod
     def get_logs(limit=100, action_filter=None, user_filter=None):
         try:
-            conn = sqlite3.connect(Config.DATABASE_PATH)
+            flush_events()
             q, p = "SELECT * FROM audit_log WHERE 1=1", []
             if action_filter: q += " AND action=?"; p.append(action_filter)
             if user_filter: q += " AND username LIKE ?"; p.append(f"%{user_filter}%")
             q += " ORDER BY created_at DESC LIMIT ?"; p.append(limit)
-            c = conn.cursor(); c.execute(q, p)
-            cols = [d[0] for d in c.description]
-            rows = [dict(zip(cols, r)) for r in c.fetchall()]
-            conn.close(); return rows
+            return DatabaseManager().fetch_all(q, p)
         except Exception: return []
 
     @staticmethod
     def get_stats():
+        # من event_daily_counts (صف لكل يوم وإجراء) بدل المرور على audit_log كاملاً؛ يشمل الأشهر المؤرشفة
         try:
-            conn = sqlite3.connect(Config.DATABASE_PATH); c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM audit_log"); total = c.fetchone()[0]
-            c.execute("SELECT COUNT(*) FROM audit_log WHERE created_at >= date('now','-1 day')"); today = c.fetchone()[0]
-            c.execute("SELECT action,COUNT(*) as cnt FROM audit_log GROUP BY action ORDER BY cnt DESC LIMIT 5"); top = c.fetchall()
-            conn.close(); return {'total': total, 'today': today, 'top_actions': top}
+            flush_events()
+            with DatabaseManager().get_read_connection() as conn:
+                c = conn.cursor()
+                c.execute("SELECT COALESCE(SUM(events),0) FROM event_daily_counts WHERE source='audit_log'"); total = c.fetchone()[0]
+                c.execute("SELECT COALESCE(SUM(events),0) FROM event_daily_counts WHERE source='audit_log' AND day >= date('now','-1 day')"); today = c.fetchone()[0]
+                c.execute("SELECT action,SUM(events) as cnt FROM event_daily_counts WHERE source='audit_log' GROUP BY action ORDER BY cnt DESC LIMIT 5"); top = [tuple(r) for r in c.fetchall()]
+            return {'total': total, 'today': today, 'top_actions': top}
         except Exception: return {'total': 0, 'today': 0, 'top_actions': []}
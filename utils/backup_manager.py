@@ -1,11 +1,105 @@
 """
 utils/backup_manager.py - Automated Backup System
 SmartCar AI-Dealer
+Online backups through the SQLite backup API: pages are copied in steps from one read snapshot,
+so the copy is consistent (WAL content included) and writers keep committing while it runs.
+Backups are verified, optionally gzip-compressed, and pruned by a last/daily/weekly retention policy.
+scripts/backup.sh stores the invoices/uploads tarballs under the same name; retention treats them as one set.
 """
-import shutil, os, glob
+import shutil, os, glob, gzip, sqlite3, time
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
 from config import Config
 
+BACKUP_PREFIX = 'smartcar_backup_'
+PARTIAL_SUFFIX = '.partial'
+# files written next to a database backup by scripts/backup.sh (<name>_invoices.tar.gz, ...)
+COMPANION_SUFFIXES = ('_invoices.tar.gz', '_uploads.tar.gz')
+BACKUP_SUFFIXES = ('.db.gz', '.db') + COMPANION_SUFFIXES
+
+
+class BackupError(Exception):
+    """Backup or restore could not be completed (the live database is left untouched)"""
+
+
+def _connect(path, timeout: Optional[float] = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=timeout or Config.DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}")
+    return conn
+
+
+def verify_database(path, mode: Optional[str] = None) -> str:
+    """'ok' or the first integrity problem; mode quick (quick_check), full (integrity_check) or none"""
+    mode = (mode or Config.BACKUP_VERIFY).lower()
+    if mode == 'none':
+        return 'skipped'
+    pragma = 'integrity_check' if mode == 'full' else 'quick_check'
+    conn = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        return conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+
+
+def online_copy(source_path, dest_path, pages: Optional[int] = None, sleep_ms: Optional[float] = None,
+                checkpoint: Optional[str] = None) -> Dict:
+    """Copy a live database into dest_path with sqlite3.Connection.backup and report the timings.
+
+    In WAL mode the source connection holds one read transaction for the whole copy: every step reads the
+    same snapshot (no restart when another connection commits) and writers are never blocked by it.
+    In rollback-journal mode a writer can only commit between steps, so the stall is bounded by one step.
+    """
+    pages = pages or Config.BACKUP_PAGES_PER_STEP
+    sleep_ms = Config.BACKUP_STEP_SLEEP_MS if sleep_ms is None else sleep_ms
+    checkpoint = (checkpoint or Config.BACKUP_CHECKPOINT).lower()
+    report = {'checkpoint': checkpoint, 'steps': 0, 'restarts': 0, 'max_step_ms': 0.0}
+
+    src = _connect(source_path)
+    dst = sqlite3.connect(str(dest_path))
+    try:
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+        report['journal_mode'] = 'wal' if wal else 'rollback'
+        if wal and checkpoint in ('passive', 'truncate'):
+            # passive never waits for writers; truncate waits for readers but leaves an empty -wal file
+            t0 = time.perf_counter()
+            busy, log_frames, checkpointed = src.execute(f"PRAGMA wal_checkpoint({checkpoint.upper()})").fetchone()
+            report['checkpoint_ms'] = (time.perf_counter() - t0) * 1000
+            report['wal_frames'] = log_frames
+            report['wal_frames_checkpointed'] = checkpointed
+
+        started = time.perf_counter()
+        if wal:
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()  # pins the read snapshot
+        step_started = [time.perf_counter()]
+        last_remaining = [None]
+
+        def progress(status, remaining, total):
+            now = time.perf_counter()
+            report['max_step_ms'] = max(report['max_step_ms'], (now - step_started[0]) * 1000 - sleep_ms)
+            report['steps'] += 1
+            report['pages'] = total
+            if last_remaining[0] is not None and remaining > last_remaining[0]:
+                report['restarts'] += 1
+            last_remaining[0] = remaining
+            step_started[0] = now
+
+        src.backup(dst, pages=pages, progress=progress, sleep=sleep_ms / 1000)
+        if wal:
+            src.execute("COMMIT")
+        # the copy inherits WAL mode from page 1; a standalone file should not need -wal/-shm companions
+        dst.execute("PRAGMA journal_mode = DELETE")
+        report['duration_seconds'] = time.perf_counter() - started
+        report['max_step_ms'] = max(report['max_step_ms'], 0.0)
+        report['write_stall_max_ms'] = 0.0 if wal else report['max_step_ms']
+        return report
+    finally:
+        dst.close()
+        src.close()
+
 
 class BackupManager:
     """Automated database backup with scheduling"""
@@ -13,31 +107,180 @@ class BackupManager:
     BACKUP_DIR = os.path.join(os.path.dirname(Config.DATABASE_PATH), 'backups')
 
     @staticmethod
-    def create_backup() -> str:
-        os.makedirs(BackupManager.BACKUP_DIR, exist_ok=True)
+    def _new_backup_path(compress: bool, name: Optional[str] = None) -> str:
+        ext = '.db.gz' if compress else '.db'
+        if name:
+            # a caller-chosen name ties this backup to its companion files, so it is never altered
+            name = BackupManager._set_name(os.path.basename(name))
+            path = os.path.join(BackupManager.BACKUP_DIR, name + ext)
+            if any(os.path.exists(os.path.join(BackupManager.BACKUP_DIR, name + e)) for e in ('.db', '.db.gz')):
+                raise BackupError(f"Backup {name} already exists")
+            return path
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = os.path.join(BackupManager.BACKUP_DIR, f'smartcar_backup_{timestamp}.db')
-        shutil.copy2(Config.DATABASE_PATH, backup_path)
-        return backup_path
+        path = os.path.join(BackupManager.BACKUP_DIR, f'{BACKUP_PREFIX}{timestamp}{ext}')
+        counter = 1
+        while os.path.exists(path):
+            path = os.path.join(BackupManager.BACKUP_DIR, f'{BACKUP_PREFIX}{timestamp}_{counter}{ext}')
+            counter += 1
+        return path
+
+    @staticmethod
+    def backup(db_path=None, compress: Optional[bool] = None, verify: Optional[str] = None,
+               name: Optional[str] = None) -> Dict:
+        """Create a verified backup and return its report (path, size, duration, step and stall timings).
+        name (e.g. smartcar_backup_20240115_120000) fixes the file name instead of a fresh timestamp."""
+        os.makedirs(BackupManager.BACKUP_DIR, exist_ok=True)
+        db_path = db_path or Config.DATABASE_PATH
+        compress = Config.BACKUP_COMPRESS if compress is None else compress
+        final_path = BackupManager._new_backup_path(compress, name)
+        # the copy is written next to the target and renamed only once it is complete and verified
+        raw_path = final_path[:-3] if compress else final_path
+        raw_partial = raw_path + PARTIAL_SUFFIX
+        started = time.perf_counter()
+        try:
+            report = online_copy(db_path, raw_partial)
+            report['integrity'] = verify_database(raw_partial, verify)
+            if report['integrity'] not in ('ok', 'skipped'):
+                raise BackupError(f"Backup failed verification: {report['integrity']}")
+            if compress:
+                t0 = time.perf_counter()
+                with open(raw_partial, 'rb') as src, gzip.open(final_path + PARTIAL_SUFFIX, 'wb', compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, Config.BLOB_CHUNK_SIZE)
+                report['compress_seconds'] = time.perf_counter() - t0
+                report['raw_size'] = os.path.getsize(raw_partial)
+                os.remove(raw_partial)
+                os.replace(final_path + PARTIAL_SUFFIX, final_path)
+            else:
+                os.replace(raw_partial, final_path)
+        finally:
+            for leftover in (raw_partial, final_path + PARTIAL_SUFFIX):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        report.update(path=final_path, name=os.path.basename(final_path), size=os.path.getsize(final_path),
+                      compressed=compress, total_seconds=time.perf_counter() - started)
+        if Config.logger:
+            Config.logger.info(
+                f"💾 Backup {report['name']}: {report['size'] / 1024 / 1024:.1f} MB in {report['total_seconds']:.2f}s "
+                f"(copy {report['duration_seconds']:.2f}s, {report['steps']} steps, "
+                f"max step {report['max_step_ms']:.1f} ms, write stall {report['write_stall_max_ms']:.1f} ms)")
+        return report
+
+    @staticmethod
+    def create_backup(db_path=None) -> str:
+        return BackupManager.backup(db_path)['path']
 
     @staticmethod
     def list_backups() -> list:
         os.makedirs(BackupManager.BACKUP_DIR, exist_ok=True)
         backups = glob.glob(os.path.join(BackupManager.BACKUP_DIR, '*.db'))
+        backups += glob.glob(os.path.join(BackupManager.BACKUP_DIR, '*.db.gz'))
         result = []
-        for b in sorted(backups, reverse=True):
+        for b in sorted(backups, key=lambda p: (BackupManager._backup_time(p), p), reverse=True):
             size = os.path.getsize(b)
             name = os.path.basename(b)
-            result.append({'path': b, 'name': name, 'size': size, 'size_mb': size / 1024 / 1024})
+            result.append({'path': b, 'name': name, 'size': size, 'size_mb': size / 1024 / 1024,
+                           'compressed': name.endswith('.gz'), 'created_at': BackupManager._backup_time(b)})
         return result
 
     @staticmethod
-    def restore_backup(backup_path: str) -> bool:
+    def _set_name(file_name: str) -> str:
+        """Backup set a file belongs to: smartcar_backup_X.db.gz and smartcar_backup_X_uploads.tar.gz -> smartcar_backup_X"""
+        for suffix in BACKUP_SUFFIXES:
+            if file_name.endswith(suffix):
+                return file_name[:-len(suffix)]
+        return file_name
+
+    @staticmethod
+    def _backup_sets() -> List[Dict]:
+        """Database backups and their companion tarballs grouped by name, newest first"""
+        os.makedirs(BackupManager.BACKUP_DIR, exist_ok=True)
+        sets: Dict[str, List[str]] = {}
+        for suffix in BACKUP_SUFFIXES:
+            for path in glob.glob(os.path.join(BackupManager.BACKUP_DIR, '*' + suffix)):
+                sets.setdefault(BackupManager._set_name(os.path.basename(path)), []).append(path)
+        result = [{'name': name, 'paths': sorted(paths), 'created_at': min(map(BackupManager._backup_time, paths))}
+                  for name, paths in sets.items()]
+        return sorted(result, key=lambda s: (s['created_at'], s['name']), reverse=True)
+
+    @staticmethod
+    def _backup_time(path: str) -> datetime:
+        """Timestamp from the file name (smartcar_backup_YYYYmmdd_HHMMSS), else the modification time"""
+        stem = os.path.basename(path)
+        if stem.startswith(BACKUP_PREFIX):
+            try:
+                return datetime.strptime(stem[len(BACKUP_PREFIX):len(BACKUP_PREFIX) + 15], '%Y%m%d_%H%M%S')
+            except ValueError:
+                pass
+        return datetime.fromtimestamp(os.path.getmtime(path))
+
+    @staticmethod
+    def verify_backup(backup_path: str, mode: Optional[str] = None) -> str:
+        """Integrity check of a backup file (compressed backups are expanded to a temporary file)"""
+        try:
+            staged = BackupManager._stage(backup_path)
+        except BackupError as e:
+            return str(e)
+        try:
+            return verify_database(staged, mode or 'full')
+        finally:
+            if staged != backup_path and os.path.exists(staged):
+                os.remove(staged)
+
+    @staticmethod
+    def _stage(backup_path: str) -> str:
+        if not backup_path.endswith('.gz'):
+            return backup_path
+        os.makedirs(BackupManager.BACKUP_DIR, exist_ok=True)
+        staged = os.path.join(BackupManager.BACKUP_DIR, f".restore_{os.getpid()}.db{PARTIAL_SUFFIX}")
+        try:
+            with gzip.open(backup_path, 'rb') as src, open(staged, 'wb') as dst:
+                shutil.copyfileobj(src, dst, Config.BLOB_CHUNK_SIZE)
+        except (OSError, EOFError) as e:
+            if os.path.exists(staged):
+                os.remove(staged)
+            raise BackupError(f"Backup {os.path.basename(backup_path)} is damaged: {e}") from e
+        return staged
+
+    @staticmethod
+    def restore_backup(backup_path: str, db_path=None, safety_backup: bool = True) -> bool:
+        """Replace the live database with a backup in one SQLite transaction.
+
+        The file is never copied over the live database (stale -wal/-shm files and open connections would
+        corrupt it); the backup API writes into it under an exclusive lock instead, so other connections
+        and processes see either the old or the restored data. Older backups are migrated afterwards.
+        """
         if not os.path.exists(backup_path):
             return False
-        # Create safety backup first
-        safety = BackupManager.create_backup()
-        shutil.copy2(backup_path, Config.DATABASE_PATH)
+        db_path = db_path or Config.DATABASE_PATH
+        staged = BackupManager._stage(backup_path)
+        try:
+            integrity = verify_database(staged, 'quick')
+            if integrity != 'ok':
+                raise BackupError(f"Backup {os.path.basename(backup_path)} is damaged: {integrity}")
+            # Create safety backup first
+            if safety_backup:
+                BackupManager.backup(db_path)
+
+            started = time.perf_counter()
+            src = sqlite3.connect(f"{Path(staged).absolute().as_uri()}?mode=ro", uri=True)
+            dst = _connect(db_path)
+            try:
+                src.backup(dst)  # pages=-1: a single step, i.e. a single write transaction on the live database
+                from db_migrations import apply_migrations
+                apply_migrations(dst)
+            finally:
+                dst.close()
+                src.close()
+        finally:
+            if staged != backup_path and os.path.exists(staged):
+                os.remove(staged)
+
+        from db_manager import DatabaseManager
+        if DatabaseManager._initialized:
+            DatabaseManager().close_connections()  # pooled connections reopen on the restored schema
+        if Config.logger:
+            Config.logger.info(f"♻️ Restored {os.path.basename(backup_path)} in {time.perf_counter() - started:.2f}s")
         return True
 
     @staticmethod
@@ -46,11 +289,38 @@ class BackupManager:
             os.remove(backup_path)
 
     @staticmethod
-    def cleanup_old_backups(keep_count: int = 10):
-        backups = BackupManager.list_backups()
-        if len(backups) > keep_count:
-            for old in backups[keep_count:]:
-                BackupManager.delete_backup(old['path'])
+    def apply_retention(keep_last: Optional[int] = None, keep_daily: Optional[int] = None,
+                        keep_weekly: Optional[int] = None) -> List[str]:
+        """Keep the newest keep_last backups plus the newest backup of each of the last keep_daily days
+        and keep_weekly ISO weeks; delete the rest and return their file names.
+        A backup and its invoices/uploads tarballs are kept or deleted together."""
+        keep_last = Config.BACKUP_KEEP_LAST if keep_last is None else keep_last
+        keep_daily = Config.BACKUP_KEEP_DAILY if keep_daily is None else keep_daily
+        keep_weekly = Config.BACKUP_KEEP_WEEKLY if keep_weekly is None else keep_weekly
+        backups = BackupManager._backup_sets()  # newest first
+        keep = {b['name'] for b in backups[:keep_last]}
+        for count, bucket in ((keep_daily, lambda d: d.date()), (keep_weekly, lambda d: d.isocalendar()[:2])):
+            seen = []
+            for b in backups:
+                key = bucket(b['created_at'])
+                if key not in seen:
+                    if len(seen) >= count:
+                        break
+                    seen.append(key)
+                    keep.add(b['name'])
+        deleted = []
+        for b in backups:
+            if b['name'] not in keep:
+                for path in b['paths']:
+                    BackupManager.delete_backup(path)
+                    deleted.append(os.path.basename(path))
+        return deleted
+
+    @staticmethod
+    def cleanup_old_backups(keep_count: Optional[int] = None):
+        if keep_count is None:
+            return BackupManager.apply_retention()
+        return BackupManager.apply_retention(keep_last=keep_count, keep_daily=0, keep_weekly=0)
 
     @staticmethod
     def get_db_size() -> float:
@@ -69,9 +339,9 @@ class BackupManager:
         b1, b2 = st.columns(2)
         with b1:
             if st.button(f"💾 {t('backup.create', 'Create Backup')}", type="primary", use_container_width=True):
-                path = BackupManager.create_backup()
+                report = BackupManager.backup()
                 BackupManager.cleanup_old_backups()
-                st.success(f"✅ Backup created: {os.path.basename(path)}")
+                st.success(f"✅ Backup created: {report['name']} ({report['total_seconds']:.1f}s)")
         with b2:
             if st.button(f"🗑️ {t('backup.cleanup', 'Cleanup Old')}", use_container_width=True):
                 BackupManager.cleanup_old_backups(5)
@@ -0,0 +1,192 @@
+"""
+utils/blob_store.py - مخزن الملفات الكبيرة (المستندات) خارج قاعدة البيانات
+SmartCar AI-Dealer
+الرفع والتنزيل على شكل أجزاء (chunks) فلا يُحمَّل الملف كاملاً في الذاكرة، ويُحسب SHA-256 أثناء الرفع.
+LocalBlobStore يحفظ في مجلد محلي؛ S3BlobStore يعمل مع أي خادم متوافق مع S3 (AWS أو MinIO محلي)
+أو أي كائن client يوفر نفس الدوال (put_object / upload_part / get_object ...).
+"""
+
+import abc
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple, Union
+
+from config import Config
+
+BinarySource = Union[bytes, bytearray, memoryview, BinaryIO, Iterable[bytes]]
+
+
+class BlobStore(abc.ABC):
+    """الواجهة المشتركة للمخازن: المفتاح نص بدون '/' والمحتوى يُكتب ويُقرأ كأجزاء bytes.
+    مخزن ينقصه أحد هذه الدوال يفشل عند إنشائه (TypeError) لا في منتصف رفع ملف."""
+
+    @abc.abstractmethod
+    def put(self, key: str, chunks: Iterable[bytes]) -> Tuple[int, str]:
+        """كتابة المحتوى وإرجاع (الحجم بالبايت، SHA-256)"""
+
+    @abc.abstractmethod
+    def iter_chunks(self, key: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """قراءة المحتوى كأجزاء bytes"""
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """حذف المحتوى (لا خطأ إذا لم يكن موجوداً)"""
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        """هل المفتاح موجود"""
+
+
+def iter_source(source: BinarySource, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """bytes أو كائن ملف ثنائي (مثل UploadedFile في Streamlit) أو مولّد أجزاء -> أجزاء bytes"""
+    chunk_size = chunk_size or Config.BLOB_CHUNK_SIZE
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+class LocalBlobStore(BlobStore):
+    """تخزين كل ملف في <root>/<أول حرفين من المفتاح>/<المفتاح> مع كتابة ذرية (ملف مؤقت ثم rename)"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def put(self, key: str, chunks: Iterable[bytes]) -> Tuple[int, str]:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return size, digest.hexdigest()
+
+    def iter_chunks(self, key: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._path(key), 'rb') as f:
+            yield from iter_source(f, chunk_size)
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+
+class S3BlobStore(BlobStore):
+    """
+    مخزن متوافق مع S3. الملفات الأصغر من PART_SIZE تُرفع بطلب put_object واحد،
+    والأكبر عبر Multipart Upload جزءاً جزءاً (يُلغى الرفع عند أي خطأ).
+    """
+
+    # الحد الأدنى لحجم الجزء في S3 هو 5MB (عدا الجزء الأخير)
+    PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, bucket: str, prefix: str = '', client=None, endpoint_url: Optional[str] = None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("DOCUMENT_STORE=s3 requires boto3 (pip install boto3)") from e
+            client = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put(self, key: str, chunks: Iterable[bytes]) -> Tuple[int, str]:
+        digest, size = hashlib.sha256(), 0
+        buffer = bytearray()
+        upload_id, parts = None, []
+        try:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                buffer += chunk
+                if len(buffer) >= self.PART_SIZE:
+                    if upload_id is None:
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=self._key(key))['UploadId']
+                    parts.append(self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                    buffer.clear()
+
+            if upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=bytes(buffer))
+            else:
+                if buffer:
+                    parts.append(self._upload_part(key, upload_id, len(parts) + 1, bytes(buffer)))
+                self.client.complete_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                                                      MultipartUpload={'Parts': parts})
+        except BaseException:
+            if upload_id is not None:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id)
+            raise
+        return size, digest.hexdigest()
+
+    def _upload_part(self, key: str, upload_id: str, number: int, body: bytes) -> dict:
+        response = self.client.upload_part(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                                           PartNumber=number, Body=body)
+        return {'PartNumber': number, 'ETag': response['ETag']}
+
+    def iter_chunks(self, key: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        try:
+            yield from body.iter_chunks(chunk_size or Config.BLOB_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            code = str(getattr(e, 'response', {}).get('Error', {}).get('Code', ''))
+            if code in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """مخزن المستندات حسب Config.DOCUMENT_STORE (مثيل مشترك على مستوى العملية)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if Config.DOCUMENT_STORE == 's3':
+                    _store = S3BlobStore(Config.DOCUMENT_S3_BUCKET, Config.DOCUMENT_S3_PREFIX,
+                                         endpoint_url=Config.DOCUMENT_S3_ENDPOINT_URL)
+                else:
+                    _store = LocalBlobStore(Config.DOCUMENTS_DIR)
+    return _store
@@ -2,6 +2,16 @@
 utils/cache_manager.py - Simple Cache Management
 SmartCar AI-Dealer
 """
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import Config
+
 
 class CacheManager:
     """
@@ -17,4 +27,134 @@ class CacheManager:
         self._cache[key] = value
 
     def clear(self):
-        self._cache.clear()
\ No newline at end of file
+        self._cache.clear()
+
+
+class AIResponseCache:
+    """
+    Persistent cache for AI vision responses (SQLite file under Config.CACHE_DIR).
+    Entries expire after a TTL; when the total size exceeds the limit, the least
+    recently used entries are evicted. Hit/miss counters are stored in the same file
+    so they are shared between Streamlit sessions and survive restarts.
+    """
+
+    _COUNTERS = ('hits', 'misses', 'expired', 'evictions')
+
+    def __init__(self, path: Optional[Path] = None, ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.path = Path(path or Config.CACHE_DIR / "ai_responses.db")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.AI_CACHE_TTL_HOURS * 3600
+        self.max_bytes = max_bytes if max_bytes is not None else int(Config.AI_CACHE_MAX_MB * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                                   [(name,) for name in self._COUNTERS])
+
+    @staticmethod
+    def make_key(kind: str, model: str, prompt_version: Any,
+                 images: Iterable[Tuple[str, bytes]], **params) -> str:
+        """SHA-256 over the request kind, prompt version, model, image bytes and extra params"""
+        digest = hashlib.sha256(f"{kind}|{prompt_version}|{model}".encode())
+        for label, image_bytes in images:
+            digest.update(f"|{label}:".encode())
+            digest.update(hashlib.sha256(image_bytes or b"").digest())
+        if params:
+            digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _bump(self, name: str, amount: int = 1):
+        self._conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached response, or None on a miss / expired entry"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bump('expired')
+                row = None
+            if row is None:
+                self._bump('misses')
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._bump('hits')
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict, kind: str = None, model: str = None):
+        """Store a response and evict expired / least recently used entries over the size limit"""
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses (key, kind, model, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, kind, model, payload, len(payload.encode()), now, now))
+            expired = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+            if expired:
+                self._bump('expired', expired)
+            self._evict_over_limit()
+
+    def _evict_over_limit(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._bump('evictions', len(evicted))
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current entry count and size (for the admin page)"""
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        return {
+            **counters,
+            'entries': entries,
+            'size_mb': size / (1024 * 1024),
+            'hit_rate': counters.get('hits', 0) / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> int:
+        """Delete all cached responses and reset the counters; returns the number of entries removed"""
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM responses").rowcount
+            self._conn.execute("UPDATE counters SET value = 0")
+        return removed
+
+
+_ai_cache: Optional[AIResponseCache] = None
+_ai_cache_lock = threading.Lock()
+
+
+def get_ai_cache() -> AIResponseCache:
+    """Process-wide AIResponseCache instance"""
+    global _ai_cache
+    if _ai_cache is None:
+        with _ai_cache_lock:
+            if _ai_cache is None:
+                _ai_cache = AIResponseCache()
+    return _ai_cache
@@ -2,9 +2,8 @@
 utils/car_pipeline.py - Car Status Pipeline
 SmartCar AI-Dealer - مراحل حالة السيارة
 """
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 
 
 class CarPipeline:
@@ -19,48 +18,21 @@ class CarPipeline:
         'sold': {'icon': '✅', 'color': '#27ae60', 'label': 'Verkauft'},
     }
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS car_pipeline (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id INTEGER NOT NULL,
-                stage TEXT DEFAULT 'received',
-                updated_by INTEGER,
-                notes TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (transaction_id) REFERENCES transactions(id)
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def set_stage(transaction_id: int, stage: str, user_id: int = None, notes: str = None):
-        CarPipeline._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("INSERT INTO car_pipeline (transaction_id, stage, updated_by, notes) VALUES (?,?,?,?)",
-                     (transaction_id, stage, user_id, notes))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("INSERT INTO car_pipeline (transaction_id, stage, updated_by, notes) VALUES (?,?,?,?)",
+                                  (transaction_id, stage, user_id, notes))
 
     @staticmethod
     def get_current_stage(transaction_id: int) -> str:
-        CarPipeline._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        row = conn.execute("SELECT stage FROM car_pipeline WHERE transaction_id=? ORDER BY updated_at DESC LIMIT 1",
-                          (transaction_id,)).fetchone()
-        conn.close()
-        return row[0] if row else 'received'
+        return DatabaseManager().fetch_value(
+            "SELECT stage FROM car_pipeline WHERE transaction_id=? ORDER BY updated_at DESC LIMIT 1",
+            (transaction_id,), default='received')
 
     @staticmethod
     def get_history(transaction_id: int) -> list:
-        CarPipeline._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM car_pipeline WHERE transaction_id=? ORDER BY updated_at ASC",
-                           (transaction_id,)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return DatabaseManager().fetch_all("SELECT * FROM car_pipeline WHERE transaction_id=? ORDER BY updated_at ASC",
+                                           (transaction_id,))
 
     @staticmethod
     def render_pipeline_html(current_stage: str) -> str:
@@ -1,10 +1,72 @@
 """
 utils/csv_importer.py - CSV Import for Car Data
 SmartCar AI-Dealer
+Streaming pipeline for dealer feeds: pandas parses the file in chunks (IMPORT_CHUNK_ROWS), every chunk is
+validated and coerced column-wise, deduplicated against the inventory (brand + model + year + mileage),
+optionally priced with PricePredictor.predict_prices, then inserted with executemany in one transaction per chunk
+(DatabaseManager.bulk_insert_transactions applies rollups, search index and data version once per chunk).
 """
-import csv, io, sqlite3
+import codecs
+import io
+import time
 from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
 from config import Config
+from db_manager import DatabaseManager
+
+CsvSource = Union[bytes, str, Path, BinaryIO]
+DedupKey = Tuple[str, str, Optional[int], int]
+
+INSERT_SQL = """
+    INSERT INTO transactions (user_id, brand, model, manufacture_year, mileage,
+        estimated_price, fuel_type, condition, color, transmission, horsepower,
+        engine_cc, car_type, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _open(source: CsvSource) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, Path)):
+        return open(source, 'rb')
+    return source
+
+
+def _detect_encoding(stream: BinaryIO) -> str:
+    """utf-8-sig unless the first 64 KB are not valid UTF-8 (then latin-1, as before)"""
+    head = stream.read(65536)
+    stream.seek(0)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _text(chunk: pd.DataFrame, name: str) -> pd.Series:
+    if name not in chunk.columns:
+        return pd.Series('', index=chunk.index, dtype=object)
+    return chunk[name].str.strip()
+
+
+def _number(chunk: pd.DataFrame, name: str) -> Tuple[pd.Series, pd.Series]:
+    """(values with NaN for empty cells, mask of cells that are not numbers); a decimal comma is accepted"""
+    raw = _text(chunk, name).str.replace(' ', '', regex=False).str.replace(',', '.', regex=False)
+    values = pd.to_numeric(raw, errors='coerce')
+    return values, values.isna() & (raw != '')
+
+
+def _nullable(values: pd.Series, integer: bool = True) -> list:
+    """Python ints / floats with None for missing values (what sqlite3 binds)"""
+    if integer:
+        values = values.round().astype('Int64')
+    return values.astype(object).where(values.notna(), None).tolist()
 
 
 class CSVImporter:
@@ -12,60 +74,166 @@ class CSVImporter:
 
     EXPECTED_COLUMNS = ['brand', 'model', 'manufacture_year', 'mileage', 'estimated_price',
                         'fuel_type', 'condition', 'color', 'transmission', 'horsepower', 'engine_cc']
+    REQUIRED_COLUMNS = ['brand', 'model']
 
     @staticmethod
-    def parse_csv(file_content: bytes) -> dict:
-        """Parse CSV and return preview + validation"""
+    def iter_chunks(source: CsvSource, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Semicolon-separated CSV as DataFrames of raw strings, chunk_rows rows at a time"""
+        stream = _open(source)
         try:
-            text = file_content.decode('utf-8-sig')
-        except:
-            text = file_content.decode('latin-1')
-        
-        reader = csv.DictReader(io.StringIO(text), delimiter=';')
-        rows = list(reader)
-        
-        if not rows:
+            reader = pd.read_csv(stream, sep=';', dtype=str, keep_default_na=False,
+                                 chunksize=chunk_rows or Config.IMPORT_CHUNK_ROWS,
+                                 encoding=_detect_encoding(stream), encoding_errors='replace')
+            with reader:
+                for chunk in reader:
+                    chunk.columns = [str(column).strip().lower() for column in chunk.columns]
+                    yield chunk
+        except pd.errors.EmptyDataError:
+            return
+        finally:
+            if stream is not source:
+                stream.close()
+
+    @staticmethod
+    def parse_csv(file_content: CsvSource) -> dict:
+        """Parse CSV and return preview + validation (the rows themselves are not kept)"""
+        columns, preview, row_count = [], [], 0
+        for chunk in CSVImporter.iter_chunks(file_content):
+            if not columns:
+                columns = list(chunk.columns)
+                preview = chunk.head(5).to_dict('records')
+            row_count += len(chunk)
+
+        if not row_count:
             return {'success': False, 'error': 'Empty CSV file', 'rows': []}
-        
-        columns = list(rows[0].keys())
-        
+        missing = [column for column in CSVImporter.REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            return {'success': False, 'error': f"Missing columns: {', '.join(missing)}", 'rows': []}
+
         return {
             'success': True,
             'columns': columns,
-            'row_count': len(rows),
-            'rows': rows,
-            'preview': rows[:5]
+            'row_count': row_count,
+            'unknown_columns': [c for c in columns if c not in CSVImporter.EXPECTED_COLUMNS + ['car_type']],
+            'preview': preview
         }
 
+    @staticmethod
+    def import_csv(source: CsvSource, user_id: int, price_missing: bool = False, skip_duplicates: bool = True,
+                   progress: Optional[Callable[[dict], None]] = None, chunk_rows: Optional[int] = None) -> dict:
+        """
+        Stream a CSV file into the transactions table.
+        price_missing: rows without estimated_price are priced by PricePredictor (one vectorized call per chunk)
+        skip_duplicates: rows matching the inventory or an earlier row on brand + model + year + mileage are skipped
+        progress: called after every committed chunk with the running report
+        """
+        return CSVImporter.import_frames(CSVImporter.iter_chunks(source, chunk_rows), user_id,
+                                         price_missing, skip_duplicates, progress)
+
     @staticmethod
     def import_to_db(rows: list, user_id: int) -> dict:
-        """Import parsed rows into transactions table"""
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        imported = 0
-        errors = []
-        
-        for i, row in enumerate(rows):
-            try:
-                conn.execute("""
-                    INSERT INTO transactions (user_id, brand, model, manufacture_year, mileage, 
-                        estimated_price, fuel_type, condition, color, transmission, horsepower, 
-                        engine_cc, car_type, inventory_status, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'available', ?)
-                """, (
-                    user_id,
-                    row.get('brand', ''), row.get('model', ''),
-                    int(row.get('manufacture_year', 0) or 0),
-                    float(row.get('mileage', 0) or 0),
-                    float(row.get('estimated_price', 0) or 0),
-                    row.get('fuel_type', ''), row.get('condition', ''),
-                    row.get('color', ''), row.get('transmission', ''),
-                    row.get('horsepower', ''), row.get('engine_cc', ''),
-                    row.get('car_type', row.get('model', '')),
-                    datetime.now().isoformat()
-                ))
-                imported += 1
-            except Exception as e:
-                errors.append(f"Row {i+1}: {e}")
-        
-        conn.commit(); conn.close()
-        return {'imported': imported, 'errors': errors, 'total': len(rows)}
+        """Import already parsed rows (list of dicts) into transactions table"""
+        frame = pd.DataFrame(rows, dtype=str).fillna('')
+        frame.columns = [str(column).strip().lower() for column in frame.columns]
+        return CSVImporter.import_frames([frame], user_id, skip_duplicates=False)
+
+    @staticmethod
+    def import_frames(chunks, user_id: int, price_missing: bool = False, skip_duplicates: bool = True,
+                      progress: Optional[Callable[[dict], None]] = None) -> dict:
+        db = DatabaseManager()
+        started = time.perf_counter()
+        seen = CSVImporter._inventory_keys(db) if skip_duplicates else None
+        predictor = None
+        if price_missing:
+            from utils.predictor import PricePredictor
+            predictor = PricePredictor()
+        report = {'total': 0, 'imported': 0, 'duplicates': 0, 'priced': 0, 'error_count': 0, 'errors': []}
+
+        for chunk in chunks:
+            chunk = chunk.reset_index(drop=True)
+            offset = report['total']
+            report['total'] += len(chunk)
+            rows, errors = CSVImporter._prepare(chunk, user_id, offset, seen, predictor, report)
+            report['error_count'] += len(errors)
+            report['errors'].extend(errors[:max(0, Config.IMPORT_MAX_ERRORS - len(report['errors']))])
+            if rows:
+                report['imported'] += db.bulk_insert_transactions(INSERT_SQL, rows)
+            report['seconds'] = round(time.perf_counter() - started, 2)
+            if progress:
+                progress(report)
+
+        report['seconds'] = round(time.perf_counter() - started, 2)
+        return report
+
+    @staticmethod
+    def _inventory_keys(db: DatabaseManager) -> Set[DedupKey]:
+        return {
+            ((brand or '').strip().lower(), (model or '').strip().lower(), year, mileage or 0)
+            for brand, model, year, mileage in db.iter_rows(
+                "SELECT brand, model, CAST(manufacture_year AS INTEGER), CAST(mileage AS INTEGER) FROM transactions")
+        }
+
+    @staticmethod
+    def _prepare(chunk: pd.DataFrame, user_id: int, offset: int, seen: Optional[Set[DedupKey]],
+                 predictor, report: dict) -> Tuple[List[tuple], List[str]]:
+        """Validate and coerce one chunk column by column; returns (insert parameters, error messages)"""
+        brand, model = _text(chunk, 'brand'), _text(chunk, 'model')
+        year, bad_year = _number(chunk, 'manufacture_year')
+        mileage, bad_mileage = _number(chunk, 'mileage')
+        price, bad_price = _number(chunk, 'estimated_price')
+        horsepower, bad_hp = _number(chunk, 'horsepower')
+        engine_cc, bad_cc = _number(chunk, 'engine_cc')
+
+        checks = (
+            (brand == '', "missing brand"),
+            (model == '', "missing model"),
+            (bad_year | ~(year.between(1900, datetime.now().year + 1) | year.isna()), "invalid manufacture_year"),
+            (bad_mileage | (mileage < 0), "invalid mileage"),
+            (bad_price | (price < 0), "invalid estimated_price"),
+            (bad_hp | (horsepower < 0), "invalid horsepower"),
+            (bad_cc | (engine_cc < 0), "invalid engine_cc"),
+        )
+        invalid = np.zeros(len(chunk), dtype=bool)
+        messages: Dict[int, List[str]] = {}
+        for mask, message in checks:
+            mask = mask.to_numpy(dtype=bool)
+            invalid |= mask
+            for i in np.flatnonzero(mask):
+                messages.setdefault(int(i), []).append(message)
+        errors = [f"Row {offset + i + 1}: {', '.join(found)}" for i, found in sorted(messages.items())]
+
+        mileage = mileage.fillna(0)
+        years, mileages = _nullable(year), _nullable(mileage)
+        car_type = _text(chunk, 'car_type').where(lambda s: s != '', model)
+        keep = ~invalid
+        if seen is not None:
+            keys = list(zip(brand.str.lower().tolist(), model.str.lower().tolist(), years, mileages))
+            for i in np.flatnonzero(keep):
+                if keys[i] in seen:
+                    keep[i] = False
+                    report['duplicates'] += 1
+                else:
+                    seen.add(keys[i])
+
+        if predictor is not None:
+            unpriced = keep & (price.isna() | (price == 0)).to_numpy()
+            if unpriced.any():
+                batch = pd.DataFrame({
+                    'car_type': car_type, 'brand': brand, 'mileage': mileage, 'manufacture_year': year,
+                    'fuel_type': _text(chunk, 'fuel_type'), 'transmission': _text(chunk, 'transmission'),
+                    'color': _text(chunk, 'color'), 'horsepower': horsepower, 'engine_cc': engine_cc,
+                })[unpriced]
+                price = price.copy()
+                price[unpriced] = predictor.predict_prices(batch)
+                report['priced'] += int(unpriced.sum())
+
+        columns = [
+            [user_id] * len(chunk), brand.tolist(), model.tolist(), years, mileages,
+            _nullable(price.fillna(0), integer=False),
+            _text(chunk, 'fuel_type').tolist(), _text(chunk, 'condition').tolist(),
+            _text(chunk, 'color').tolist(), _text(chunk, 'transmission').tolist(),
+            _nullable(horsepower), _nullable(engine_cc), car_type.tolist(),
+            [datetime.now().isoformat()] * len(chunk),
+        ]
+        rows = list(zip(*columns))
+        return [rows[i] for i in np.flatnonzero(keep)], errors
@@ -2,70 +2,37 @@
 utils/customer_messages.py - Customer-Company Messaging
 SmartCar AI-Dealer - رسائل العملاء
 """
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 
 
 class CustomerMessages:
     """Internal messaging between customers and company"""
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id INTEGER NOT NULL,
-                sender_name TEXT,
-                receiver_id INTEGER,
-                subject TEXT,
-                body TEXT NOT NULL,
-                is_read INTEGER DEFAULT 0,
-                reply_to INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def send(sender_id: int, sender_name: str, body: str, subject: str = None, receiver_id: int = None, reply_to: int = None):
-        CustomerMessages._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("INSERT INTO messages (sender_id, sender_name, receiver_id, subject, body, reply_to) VALUES (?,?,?,?,?,?)",
-                     (sender_id, sender_name, receiver_id, subject, body, reply_to))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("INSERT INTO messages (sender_id, sender_name, receiver_id, subject, body, reply_to) VALUES (?,?,?,?,?,?)",
+                                  (sender_id, sender_name, receiver_id, subject, body, reply_to))
 
     @staticmethod
     def get_inbox(user_id: int, is_admin: bool = False) -> list:
-        CustomerMessages._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
+        db = DatabaseManager()
         if is_admin:
-            rows = conn.execute("SELECT * FROM messages ORDER BY created_at DESC LIMIT 50").fetchall()
-        else:
-            rows = conn.execute("SELECT * FROM messages WHERE sender_id=? OR receiver_id=? ORDER BY created_at DESC LIMIT 50",
-                               (user_id, user_id)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+            return db.fetch_all("SELECT * FROM messages ORDER BY created_at DESC LIMIT 50")
+        return db.fetch_all("SELECT * FROM messages WHERE sender_id=? OR receiver_id=? ORDER BY created_at DESC LIMIT 50",
+                            (user_id, user_id))
 
     @staticmethod
     def mark_read(message_id: int):
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("UPDATE messages SET is_read=1 WHERE id=?", (message_id,))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("UPDATE messages SET is_read=1 WHERE id=?", (message_id,))
 
     @staticmethod
     def get_unread_count(user_id: int, is_admin: bool = False) -> int:
-        CustomerMessages._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
+        db = DatabaseManager()
         if is_admin:
-            row = conn.execute("SELECT COUNT(*) FROM messages WHERE is_read=0").fetchone()
-        else:
-            row = conn.execute("SELECT COUNT(*) FROM messages WHERE (receiver_id=? OR (receiver_id IS NULL AND sender_id!=?)) AND is_read=0",
-                               (user_id, user_id)).fetchone()
-        conn.close()
-        return row[0] if row else 0
+            return db.fetch_value("SELECT COUNT(*) FROM messages WHERE is_read=0", default=0)
+        return db.fetch_value("SELECT COUNT(*) FROM messages WHERE (receiver_id=? OR (receiver_id IS NULL AND sender_id!=?)) AND is_read=0",
+                              (user_id, user_id), default=0)
 
     @staticmethod
     def render_messaging_ui():
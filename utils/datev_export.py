@@ -1,21 +1,42 @@
 """
 utils/datev_export.py - DATEV CSV Export
 SmartCar AI-Dealer - German accounting standard export
+Rows are generated from a chunked cursor (DatabaseManager.iter_rows) and written as CSV chunks, so the export
+never holds the full result or the full CSV in memory (utils/export_stream.py).
 """
-import csv, io, sqlite3
-from datetime import datetime
-from config import Config
+import csv
+from typing import Iterator, Optional
+
+from db_manager import DatabaseManager
+from utils.export_stream import date_filter, date_partitions, iter_csv, parse_date, write_export
+
+CSV_FORMAT = {'delimiter': ';', 'quoting': csv.QUOTE_ALL}
+
+TRANSACTIONS_HEADER = [
+    'Umsatz (ohne Soll/Haben-Kz)', 'Soll/Haben-Kennzeichen',
+    'WKZ Umsatz', 'Kurs', 'Basis-Umsatz', 'WKZ Basis-Umsatz',
+    'Konto', 'Gegenkonto (ohne BU-Schlüssel)', 'BU-Schlüssel',
+    'Belegdatum', 'Belegfeld 1', 'Belegfeld 2',
+    'Skonto', 'Buchungstext'
+]
+INVOICES_HEADER = [
+    'Umsatz', 'Soll/Haben', 'WKZ', 'Konto', 'Gegenkonto',
+    'Belegdatum', 'Belegfeld 1', 'Status', 'Buchungstext'
+]
+
+
+def _datev_date(value) -> str:
+    """DATEV format: DDMM"""
+    date_str = (value or '')[:10].replace('-', '')
+    return date_str[6:8] + date_str[4:6] if len(date_str) == 8 else ''
 
 
 class DATEVExporter:
     """Export transactions in DATEV-compatible CSV format"""
 
     @staticmethod
-    def export_transactions(start_date=None, end_date=None) -> str:
-        """Generate DATEV CSV content for transactions"""
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        
+    def iter_transactions(start_date=None, end_date=None) -> Iterator[str]:
+        """DATEV CSV for transactions, yielded in chunks"""
         query = """
             SELECT t.id, t.brand, t.model, t.estimated_price, t.created_at,
                    t.fuel_type, t.mileage, t.manufacture_year,
@@ -24,59 +45,30 @@ class DATEVExporter:
             JOIN users u ON t.user_id = u.id
             WHERE 1=1
         """
-        params = []
-        if start_date:
-            query += " AND t.created_at >= ?"; params.append(start_date)
-        if end_date:
-            query += " AND t.created_at <= ?"; params.append(end_date)
-        query += " ORDER BY t.created_at DESC"
-        
-        rows = conn.execute(query, params).fetchall()
-        conn.close()
+        where, params = date_filter('t.created_at', start_date, end_date)
+        rows = DatabaseManager().iter_rows(query + where + " ORDER BY t.created_at DESC", params)
+        return iter_csv(TRANSACTIONS_HEADER, (DATEVExporter._transaction_row(row) for row in rows), **CSV_FORMAT)
 
-        output = io.StringIO()
-        writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_ALL)
-        
-        # DATEV header
-        writer.writerow([
-            'Umsatz (ohne Soll/Haben-Kz)', 'Soll/Haben-Kennzeichen',
-            'WKZ Umsatz', 'Kurs', 'Basis-Umsatz', 'WKZ Basis-Umsatz',
-            'Konto', 'Gegenkonto (ohne BU-Schlüssel)', 'BU-Schlüssel',
-            'Belegdatum', 'Belegfeld 1', 'Belegfeld 2',
-            'Skonto', 'Buchungstext'
-        ])
-        
-        for row in rows:
-            price = row['estimated_price'] or 0
-            date_str = row['created_at'][:10].replace('-', '') if row['created_at'] else ''
-            # DATEV format: DDMM
-            if len(date_str) == 8:
-                datev_date = date_str[6:8] + date_str[4:6]
-            else:
-                datev_date = ''
-            
-            writer.writerow([
-                f"{price:.2f}".replace('.', ','),  # German decimal
-                'S',  # Soll (debit)
-                'EUR', '', '', '',
-                '8400',  # Revenue account
-                '10000',  # Customer account
-                '',
-                datev_date,
-                f"RE-{row['id']}",  # Invoice reference
-                f"{row['brand']} {row['model']}",
-                '', 
-                f"Fahrzeugbewertung {row['brand']} {row['model']} - {row['full_name']}"
-            ])
-        
-        return output.getvalue()
+    @staticmethod
+    def _transaction_row(row) -> list:
+        price = row['estimated_price'] or 0
+        return [
+            f"{price:.2f}".replace('.', ','),  # German decimal
+            'S',  # Soll (debit)
+            'EUR', '', '', '',
+            '8400',  # Revenue account
+            '10000',  # Customer account
+            '',
+            _datev_date(row['created_at']),
+            f"RE-{row['id']}",  # Invoice reference
+            f"{row['brand']} {row['model']}",
+            '',
+            f"Fahrzeugbewertung {row['brand']} {row['model']} - {row['full_name']}"
+        ]
 
     @staticmethod
-    def export_invoices(start_date=None, end_date=None) -> str:
-        """Export invoices in DATEV format"""
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        
+    def iter_invoices(start_date=None, end_date=None) -> Iterator[str]:
+        """DATEV CSV for invoices, yielded in chunks"""
         query = """
             SELECT i.id, i.amount_due, i.due_date, i.status, i.installment_number,
                    c.id as contract_id, c.total_amount
@@ -84,39 +76,60 @@ class DATEVExporter:
             JOIN contracts c ON i.contract_id = c.id
             WHERE 1=1
         """
-        params = []
-        if start_date:
-            query += " AND i.due_date >= ?"; params.append(start_date)
-        if end_date:
-            query += " AND i.due_date <= ?"; params.append(end_date)
-        query += " ORDER BY i.due_date DESC"
-        
+        where, params = date_filter('i.due_date', start_date, end_date)
+        rows = DatabaseManager().iter_rows(query + where + " ORDER BY i.due_date DESC", params)
+        return iter_csv(INVOICES_HEADER, (DATEVExporter._invoice_row(row) for row in rows), **CSV_FORMAT)
+
+    @staticmethod
+    def _invoice_row(row) -> list:
+        amount = row['amount_due'] or 0
+        return [
+            f"{amount:.2f}".replace('.', ','),
+            'S', 'EUR', '1400', '8400',
+            _datev_date(row['due_date']),
+            f"INV-{row['contract_id']}-{row['installment_number']}",
+            row['status'],
+            f"Rate {row['installment_number']} Vertrag #{row['contract_id']}"
+        ]
+
+    @staticmethod
+    def export_transactions(start_date=None, end_date=None) -> str:
+        """Generate DATEV CSV content for transactions"""
+        return ''.join(DATEVExporter.iter_transactions(start_date, end_date))
+
+    @staticmethod
+    def export_invoices(start_date=None, end_date=None) -> str:
+        """Export invoices in DATEV format"""
         try:
-            rows = conn.execute(query, params).fetchall()
+            return ''.join(DATEVExporter.iter_invoices(start_date, end_date))
         except Exception:
-            rows = []
-        conn.close()
+            return ''.join(iter_csv(INVOICES_HEADER, [], **CSV_FORMAT))
+
+    @staticmethod
+    def export_to_file(kind: str, start_date=None, end_date=None, partition: Optional[str] = None,
+                       compress: bool = False):
+        """
+        Write a DATEV export ('transactions' or 'invoices') under Config.EXPORTS_DIR and return its path.
+        partition='month'/'quarter'/'year' writes one CSV per period into a zip.
+        """
+        if kind == 'transactions':
+            generate, table, column = DATEVExporter.iter_transactions, 'transactions', 'created_at'
+        elif kind == 'invoices':
+            generate, table, column = DATEVExporter.iter_invoices, 'invoices', 'due_date'
+        else:
+            raise ValueError(f"Unknown DATEV export: {kind}")
+        name = f"DATEV_{kind.capitalize()}"
 
-        output = io.StringIO()
-        writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_ALL)
-        
-        writer.writerow([
-            'Umsatz', 'Soll/Haben', 'WKZ', 'Konto', 'Gegenkonto',
-            'Belegdatum', 'Belegfeld 1', 'Status', 'Buchungstext'
-        ])
-        
-        for row in rows:
-            amount = row['amount_due'] or 0
-            date_str = (row['due_date'] or '')[:10].replace('-', '')
-            datev_date = date_str[6:8] + date_str[4:6] if len(date_str) == 8 else ''
-            
-            writer.writerow([
-                f"{amount:.2f}".replace('.', ','),
-                'S', 'EUR', '1400', '8400',
-                datev_date,
-                f"INV-{row['contract_id']}-{row['installment_number']}",
-                row['status'],
-                f"Rate {row['installment_number']} Vertrag #{row['contract_id']}"
-            ])
-        
-        return output.getvalue()
+        start, end = parse_date(start_date), parse_date(end_date)
+        if partition and (start is None or end is None):
+            row = DatabaseManager().fetch_one(f"SELECT MIN({column}) AS first, MAX({column}) AS last FROM {table}")
+            start = start or parse_date(row and row['first'])
+            end = end or parse_date(row and row['last'])
+        if partition and start and end:
+            members = [(f"{name}_{label}.csv", generate(first, last))
+                       for label, first, last in date_partitions(start, end, partition)]
+        else:
+            members = [(f"{name}.csv", generate(start_date, end_date))]
+        if compress or len(members) > 1:
+            return write_export(f"{name}.zip", members, compress=True)
+        return write_export(f"{name}.csv", members, compress=False)
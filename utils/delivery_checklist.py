@@ -2,9 +2,8 @@
 utils/delivery_checklist.py - Car Delivery Checklist
 SmartCar AI-Dealer - قائمة فحص التسليم
 """
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 
 
 class DeliveryChecklist:
@@ -23,56 +22,32 @@ class DeliveryChecklist:
         ('handover', '🤝 Customer Briefing', 'Features explained to customer'),
     ]
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS delivery_checklist (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id INTEGER NOT NULL,
-                item_key TEXT NOT NULL,
-                checked INTEGER DEFAULT 0,
-                checked_by TEXT,
-                checked_at TIMESTAMP,
-                notes TEXT
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def init_checklist(transaction_id: int):
-        DeliveryChecklist._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        existing = conn.execute("SELECT COUNT(*) FROM delivery_checklist WHERE transaction_id=?", (transaction_id,)).fetchone()[0]
-        if existing == 0:
-            for key, label, desc in DeliveryChecklist.DEFAULT_ITEMS:
-                conn.execute("INSERT INTO delivery_checklist (transaction_id, item_key) VALUES (?,?)", (transaction_id, key))
-            conn.commit()
-        conn.close()
+        with DatabaseManager().get_connection() as conn:
+            existing = conn.execute("SELECT COUNT(*) FROM delivery_checklist WHERE transaction_id=?", (transaction_id,)).fetchone()[0]
+            if existing == 0:
+                conn.executemany("INSERT INTO delivery_checklist (transaction_id, item_key) VALUES (?,?)",
+                                 [(transaction_id, key) for key, label, desc in DeliveryChecklist.DEFAULT_ITEMS])
 
     @staticmethod
     def toggle_item(transaction_id: int, item_key: str, checked_by: str = None):
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        current = conn.execute("SELECT checked FROM delivery_checklist WHERE transaction_id=? AND item_key=?", 
-                              (transaction_id, item_key)).fetchone()
-        new_val = 0 if current and current[0] else 1
-        conn.execute("UPDATE delivery_checklist SET checked=?, checked_by=?, checked_at=? WHERE transaction_id=? AND item_key=?",
-                     (new_val, checked_by, datetime.now().isoformat() if new_val else None, transaction_id, item_key))
-        conn.commit(); conn.close()
+        with DatabaseManager().get_connection() as conn:
+            current = conn.execute("SELECT checked FROM delivery_checklist WHERE transaction_id=? AND item_key=?", 
+                                  (transaction_id, item_key)).fetchone()
+            new_val = 0 if current and current[0] else 1
+            conn.execute("UPDATE delivery_checklist SET checked=?, checked_by=?, checked_at=? WHERE transaction_id=? AND item_key=?",
+                         (new_val, checked_by, datetime.now().isoformat() if new_val else None, transaction_id, item_key))
 
     @staticmethod
     def get_status(transaction_id: int) -> dict:
-        DeliveryChecklist._ensure_table()
         DeliveryChecklist.init_checklist(transaction_id)
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        items = conn.execute("SELECT * FROM delivery_checklist WHERE transaction_id=?", (transaction_id,)).fetchall()
-        conn.close()
+        items = DatabaseManager().fetch_all("SELECT * FROM delivery_checklist WHERE transaction_id=?", (transaction_id,))
         
         total = len(items)
         checked = sum(1 for i in items if i['checked'])
         return {
-            'items': [dict(i) for i in items],
+            'items': items,
             'total': total,
             'checked': checked,
             'progress': (checked / max(total, 1)) * 100
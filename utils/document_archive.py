@@ -1,10 +1,13 @@
 """
 utils/document_archive.py - Document Archive System
 SmartCar AI-Dealer - أرشيف المستندات
+الملفات في مخزن الملفات (utils/blob_store.py) وقاعدة البيانات تحفظ البيانات الوصفية فقط
 """
-import sqlite3, os, base64
-from datetime import datetime
-from config import Config
+import hashlib
+import uuid
+from typing import Iterator, Optional, Tuple
+from db_manager import DatabaseManager
+from utils.blob_store import BinarySource, get_blob_store, iter_source
 
 
 class DocumentArchive:
@@ -13,71 +16,117 @@ class DocumentArchive:
     DOC_TYPES = ['TÜV', 'Fahrzeugschein', 'Fahrzeugbrief', 'Versicherung', 'Gutachten', 'Kaufvertrag', 'Sonstige']
 
     @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id INTEGER,
-                doc_type TEXT NOT NULL,
-                filename TEXT NOT NULL,
-                file_data BLOB,
-                file_size INTEGER,
-                uploaded_by INTEGER,
-                notes TEXT,
-                expiry_date TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit(); conn.close()
+    def upload(transaction_id: int, doc_type: str, filename: str, file_data: BinarySource,
+               uploaded_by: int = None, notes: str = None, expiry_date: str = None) -> int:
+        """Stream file_data (bytes or a binary file object) to the blob store, then record its metadata"""
+        store = get_blob_store()
+        key = uuid.uuid4().hex
+        size, checksum = store.put(key, iter_source(file_data))
+        try:
+            return DatabaseManager().execute("""
+                INSERT INTO documents (transaction_id, doc_type, filename, storage_key, checksum, file_size, uploaded_by, notes, expiry_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (transaction_id, doc_type, filename, key, checksum, size, uploaded_by, notes, expiry_date)).lastrowid
+        except Exception:
+            store.delete(key)
+            raise
 
     @staticmethod
-    def upload(transaction_id: int, doc_type: str, filename: str, file_data: bytes,
-               uploaded_by: int = None, notes: str = None, expiry_date: str = None):
-        DocumentArchive._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            INSERT INTO documents (transaction_id, doc_type, filename, file_data, file_size, uploaded_by, notes, expiry_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (transaction_id, doc_type, filename, file_data, len(file_data), uploaded_by, notes, expiry_date))
-        conn.commit(); conn.close()
+    def get_documents(transaction_id: int) -> list:
+        return DatabaseManager().fetch_all("SELECT id, transaction_id, doc_type, filename, file_size, notes, expiry_date, created_at FROM documents WHERE transaction_id=? ORDER BY created_at DESC",
+                                           (transaction_id,))
 
     @staticmethod
-    def get_documents(transaction_id: int) -> list:
-        DocumentArchive._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT id, transaction_id, doc_type, filename, file_size, notes, expiry_date, created_at FROM documents WHERE transaction_id=? ORDER BY created_at DESC",
-                           (transaction_id,)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+    def stream(doc_id: int) -> Tuple[Optional[str], Optional[Iterator[bytes]]]:
+        """(filename, chunk iterator); the checksum is verified as the last chunk is read"""
+        db = DatabaseManager()
+        row = db.fetch_one("SELECT filename, storage_key, checksum FROM documents WHERE id=?", (doc_id,))
+        if not row:
+            return None, None
+        if not row['storage_key']:
+            # Row not migrated yet (scripts/migrate_documents.py): content is still in file_data
+            data = db.fetch_value("SELECT file_data FROM documents WHERE id=?", (doc_id,)) or b''
+            return row['filename'], iter_source(data)
+        return row['filename'], DocumentArchive._verified(row['storage_key'], row['checksum'])
+
+    @staticmethod
+    def _verified(key: str, checksum: Optional[str]) -> Iterator[bytes]:
+        digest = hashlib.sha256()
+        for chunk in get_blob_store().iter_chunks(key):
+            digest.update(chunk)
+            yield chunk
+        if checksum and digest.hexdigest() != checksum:
+            raise IOError(f"Document {key} failed checksum verification")
 
     @staticmethod
     def download(doc_id: int) -> tuple:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        row = conn.execute("SELECT filename, file_data FROM documents WHERE id=?", (doc_id,)).fetchone()
-        conn.close()
-        return (row[0], row[1]) if row else (None, None)
+        filename, chunks = DocumentArchive.stream(doc_id)
+        return (filename, b''.join(chunks)) if filename is not None else (None, None)
 
     @staticmethod
     def delete(doc_id: int):
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("DELETE FROM documents WHERE id=?", (doc_id,))
-        conn.commit(); conn.close()
+        db = DatabaseManager()
+        key = db.fetch_value("SELECT storage_key FROM documents WHERE id=?", (doc_id,))
+        db.execute("DELETE FROM documents WHERE id=?", (doc_id,))
+        if key:
+            get_blob_store().delete(key)
+
+    @staticmethod
+    def migrate_blobs(batch_size: int = 20) -> dict:
+        """
+        One-shot move of legacy file_data BLOBs into the blob store (resumable: each row is committed on its own).
+        BLOBs are read incrementally through sqlite3 blobopen where available, so large scans never sit fully in memory.
+        """
+        db = DatabaseManager()
+        store = get_blob_store()
+        report = {'moved': 0, 'bytes': 0}
+        while True:
+            ids = [row['id'] for row in db.fetch_all(
+                "SELECT id FROM documents WHERE storage_key IS NULL AND file_data IS NOT NULL ORDER BY id LIMIT ?",
+                (batch_size,))]
+            if not ids:
+                return report
+            for doc_id in ids:
+                key = uuid.uuid4().hex
+                with db.get_read_connection() as conn:
+                    if hasattr(conn, 'blobopen'):
+                        with conn.blobopen('documents', 'file_data', doc_id, readonly=True) as blob:
+                            size, checksum = store.put(key, iter_source(blob))
+                    else:
+                        data = conn.execute("SELECT file_data FROM documents WHERE id=?", (doc_id,)).fetchone()[0]
+                        size, checksum = store.put(key, iter_source(data))
+                updated = db.execute("""
+                    UPDATE documents SET storage_key=?, checksum=?, file_size=?, file_data=NULL
+                    WHERE id=? AND storage_key IS NULL
+                """, (key, checksum, size, doc_id)).rowcount
+                if updated:
+                    report['moved'] += 1
+                    report['bytes'] += size
+                else:
+                    store.delete(key)
+
+    @staticmethod
+    def verify(doc_id: int) -> bool:
+        """Re-read a stored document and compare it with its recorded checksum"""
+        try:
+            _, chunks = DocumentArchive.stream(doc_id)
+            if chunks is None:
+                return False
+            for _ in chunks:
+                pass
+            return True
+        except OSError:
+            return False
 
     @staticmethod
     def get_expiring_docs(days: int = 30) -> list:
-        DocumentArchive._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("""
-            SELECT d.*, t.brand, t.model FROM documents d
+        return DatabaseManager().fetch_all("""
+            SELECT d.id, d.transaction_id, d.doc_type, d.filename, d.file_size, d.notes, d.expiry_date, d.created_at,
+                   t.brand, t.model FROM documents d
             LEFT JOIN transactions t ON d.transaction_id = t.id
             WHERE d.expiry_date IS NOT NULL AND d.expiry_date <= date('now', ?)
             ORDER BY d.expiry_date ASC
-        """, (f'+{days} days',)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        """, (f'+{days} days',))
 
     @staticmethod
     def render_archive_ui(transaction_id: int):
@@ -101,7 +150,7 @@ class DocumentArchive:
                 
                 if st.form_submit_button(f"📤 {t('docs.upload', 'Upload')}", use_container_width=True):
                     if uploaded:
-                        DocumentArchive.upload(transaction_id, doc_type, uploaded.name, uploaded.read(),
+                        DocumentArchive.upload(transaction_id, doc_type, uploaded.name, uploaded,
                             user.get('id'), notes, str(expiry) if expiry else None)
                         st.success("✅ Uploaded!")
                         st.rerun()
@@ -0,0 +1,384 @@
+"""
+utils/event_writer.py - كاتب أحداث التدقيق وجلسات الدخول على دفعات
+SmartCar AI-Dealer
+AuditLogger.log و LoginTracker.log_login/log_logout لا يفتحان معاملة لكل حدث: الحدث يُضاف إلى ذاكرة مؤقتة،
+وخيط خلفي يكتب الدفعة في معاملة واحدة (executemany) عند بلوغ EVENT_BATCH_SIZE أو كل EVENT_FLUSH_SECONDS،
+ويحدّث في نفس المعاملة العدادات اليومية لكل إجراء (event_daily_counts) التي تقرأ منها شاشة التدقيق.
+عند إغلاق العملية تُفرَّغ الذاكرة، وما تعذرت كتابته يُحفظ في EVENT_SPOOL_DIR ويُعاد عند التشغيل التالي
+مرة واحدة فقط (اسم الملف يُسجَّل في event_spool_replays داخل معاملة كتابة أحداثه).
+الأشهر الأقدم من EVENT_HOT_MONTHS تُنقل من الجداول إلى ملف JSONL مضغوط لكل شهر (archive_old_events).
+"""
+
+import atexit
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+# أعمدة كل جدول أحداث بترتيب الإدخال (created_at دائماً آخر عمود)
+EVENT_TABLES: Dict[str, Tuple[str, ...]] = {
+    'audit_log': ('user_id', 'username', 'action', 'entity_type', 'entity_id', 'details', 'created_at'),
+    'login_sessions': ('user_id', 'username', 'action', 'success', 'ip_address', 'user_agent', 'created_at'),
+}
+
+_COUNT_SQL = """
+    INSERT INTO event_daily_counts (source, day, action, events) VALUES (?, ?, ?, ?)
+    ON CONFLICT(source, day, action) DO UPDATE SET events = events + excluded.events
+"""
+
+Event = Tuple[str, tuple]
+
+
+def _db():
+    # استيراد متأخر: db_migrations يستورد هذه الوحدة لإنشاء المخطط قبل اكتمال تحميل db_manager
+    from db_manager import DatabaseManager
+    return DatabaseManager()
+
+
+def create_event_schema(conn: sqlite3.Connection):
+    # عدد الأحداث لكل (جدول، يوم، إجراء)؛ يشمل الأشهر المؤرشفة أيضاً
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_daily_counts (
+        source TEXT NOT NULL,
+        day TEXT NOT NULL,
+        action TEXT NOT NULL,
+        events INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (source, day, action)
+    ) WITHOUT ROWID''')
+
+
+def create_spool_replay_schema(conn: sqlite3.Connection):
+    # ملفات spool التي كُتبت أحداثها: انهيار بعد المعاملة وقبل حذف الملف لا يكرر الأحداث
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_spool_replays (
+        name TEXT PRIMARY KEY,
+        events INTEGER NOT NULL,
+        replayed_at TEXT NOT NULL
+    )''')
+
+
+def rebuild_event_counts(conn: sqlite3.Connection):
+    """إعادة حساب العدادات من الجداول (مرة واحدة في الترحيل؛ بعدها يحدّثها الكاتب)"""
+    conn.execute("DELETE FROM event_daily_counts")
+    conn.execute("""
+        INSERT INTO event_daily_counts (source, day, action, events)
+        SELECT 'audit_log', substr(created_at, 1, 10), action, COUNT(*)
+        FROM audit_log WHERE created_at IS NOT NULL GROUP BY 2, 3
+    """)
+    conn.execute("""
+        INSERT INTO event_daily_counts (source, day, action, events)
+        SELECT 'login_sessions', substr(created_at, 1, 10),
+               CASE WHEN action = 'login' AND success = 0 THEN 'login_failed' ELSE action END, COUNT(*)
+        FROM login_sessions WHERE created_at IS NOT NULL GROUP BY 2, 3
+    """)
+
+
+def _count_action(table: str, row: tuple) -> str:
+    if table == 'login_sessions' and row[2] == 'login' and not row[3]:
+        return 'login_failed'
+    return row[2]
+
+
+def _write_batch(conn: sqlite3.Connection, batch: List[Event]):
+    """كل الدفعة في معاملة واحدة: executemany لكل جدول + تحديث العدادات اليومية"""
+    by_table: Dict[str, List[tuple]] = {}
+    counts: Counter = Counter()
+    for table, row in batch:
+        by_table.setdefault(table, []).append(row)
+        counts[(table, (row[-1] or '')[:10], _count_action(table, row))] += 1
+    for table, rows in by_table.items():
+        columns = EVENT_TABLES[table]
+        conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+    conn.executemany(_COUNT_SQL, [(table, day, action, n) for (table, day, action), n in counts.items()])
+
+
+class EventWriter:
+    """ذاكرة مؤقتة للأحداث + خيط كتابة؛ الترتيب محفوظ، ولا يُسقط أي حدث عند فشل الكتابة"""
+
+    def __init__(self, batch_size: Optional[int] = None, flush_seconds: Optional[float] = None,
+                 max_pending: Optional[int] = None):
+        self.batch_size = batch_size or Config.EVENT_BATCH_SIZE
+        self.flush_seconds = flush_seconds or Config.EVENT_FLUSH_SECONDS
+        self.max_pending = max_pending or Config.EVENT_MAX_PENDING
+        self._pending: List[Event] = []
+        self._lock = threading.Lock()          # يحمي _pending
+        self._write_lock = threading.Lock()    # دفعة واحدة في كل مرة (يحفظ الترتيب)
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {'written': 0, 'batches': 0, 'failures': 0, 'spilled': 0, 'replayed': 0}
+
+    def add(self, table: str, row: tuple):
+        if table not in EVENT_TABLES:
+            raise ValueError(f"Unknown event table: {table}")
+        with self._lock:
+            self._pending.append((table, row))
+            pending = len(self._pending)
+        if self._thread is None and not self._closed:
+            self._start()
+        if self._closed or pending >= self.max_pending:
+            self.flush()  # بعد الإغلاق أو عند تراكم الأحداث يكتب المستدعي بنفسه
+        elif pending >= self.batch_size:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """كتابة كل ما في الذاكرة الآن؛ يعيد عدد الأحداث المكتوبة (0 عند الفشل، والأحداث تبقى للمحاولة التالية)"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                _db().run_in_transaction(lambda conn: _write_batch(conn, batch))
+            except Exception as e:
+                with self._lock:
+                    self._pending[:0] = batch
+                    overflow = len(self._pending) >= self.max_pending
+                self.stats['failures'] += 1
+                if Config.logger:
+                    Config.logger.warning(f"Event writer: batch of {len(batch)} not written ({e})")
+                if overflow:
+                    self._spill()
+                return 0
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            return len(batch)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='event-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self.replay_spool()
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:  # الخيط لا يتوقف أبداً
+                if Config.logger:
+                    Config.logger.error(f"Event writer: {e}")
+
+    def close(self):
+        """عند الخروج: إيقاف الخيط، كتابة الباقي، وحفظ ما تعذرت كتابته في ملف spool"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(5.0, self.flush_seconds * 2))
+        self.flush()
+        self._spill()
+
+    # ===== ملفات spool: أحداث لم تصل لقاعدة البيانات =====
+
+    def _spill(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        Config.EVENT_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+        path = Config.EVENT_SPOOL_DIR / f"events-{os.getpid()}-{time.time_ns()}.jsonl"
+        with open(path, 'w', encoding='utf-8') as f:
+            for table, row in batch:
+                f.write(json.dumps({'table': table, 'row': list(row)}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['spilled'] += len(batch)
+        if Config.logger:
+            Config.logger.warning(f"Event writer: {len(batch)} event(s) saved to {path.name} for replay")
+
+    def replay_spool(self) -> int:
+        """
+        إعادة كتابة ملفات spool من تشغيل سابق. كل ملف يحجزه عامل واحد بإعادة تسميته إلى .replaying-<pid>،
+        والحجوزات التي ماتت عمليتها تُعاد أولاً. اسم الملف يُسجَّل في معاملة كتابة أحداثه نفسها،
+        فالملف الذي كُتب ثم لم يُحذف (انهيار بينهما) يُحذف في المرة التالية دون تكرار أحداثه.
+        """
+        if not Config.EVENT_SPOOL_DIR.exists():
+            return 0
+        _release_dead_claims()
+        replayed = 0
+        for path in sorted(Config.EVENT_SPOOL_DIR.glob('events-*.jsonl')):
+            claimed = path.with_suffix(f'.replaying-{os.getpid()}')
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # عملية أخرى أخذته
+            try:
+                with open(claimed, encoding='utf-8') as f:
+                    batch = [(item['table'], tuple(item['row'])) for item in map(json.loads, f) if item]
+                written = _db().run_in_transaction(lambda conn: _replay_batch(conn, path.stem, batch))
+            except Exception as e:
+                os.rename(claimed, path)
+                if Config.logger:
+                    Config.logger.warning(f"Event writer: replay of {path.name} failed ({e})")
+                continue
+            claimed.unlink()
+            replayed += written
+        self.stats['replayed'] += replayed
+        return replayed
+
+
+def _replay_batch(conn: sqlite3.Connection, name: str, batch: List[Event]) -> int:
+    if conn.execute("SELECT 1 FROM event_spool_replays WHERE name = ?", (name,)).fetchone():
+        return 0  # كُتب في تشغيل سابق انهار قبل حذف الملف
+    _write_batch(conn, batch)
+    conn.execute("INSERT INTO event_spool_replays (name, events, replayed_at) VALUES (?, ?, ?)",
+                 (name, len(batch), datetime.now().isoformat()))
+    return len(batch)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # عملية حية لمستخدم آخر
+    return True
+
+
+def _release_dead_claims():
+    """إعادة ملفات .replaying-<pid> لعملية لم تعد موجودة إلى اسمها الأصلي حتى تُعاد كتابتها"""
+    for claimed in Config.EVENT_SPOOL_DIR.glob('events-*.replaying-*'):
+        pid = claimed.suffix.rpartition('-')[2]
+        if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+            continue
+        try:
+            os.rename(claimed, claimed.with_suffix('.jsonl'))
+        except OSError:
+            continue  # عملية أخرى أعادته أولاً
+
+
+_writer: Optional[EventWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_event_writer() -> EventWriter:
+    """الكاتب المشترك في العملية؛ يُفرَّغ عند الخروج"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = EventWriter()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def flush_events() -> int:
+    """قبل القراءة: ما كُتب للتو يظهر فوراً في شاشات التدقيق"""
+    return _writer.flush() if _writer is not None else 0
+
+
+# ===== الاحتفاظ والأرشفة الشهرية =====
+
+def _month_start(value: str) -> str:
+    return f"{value[:7]}-01"
+
+
+def _next_month(month: str) -> str:
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}-01"
+
+
+def _shift_months(month: str, months: int) -> str:
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 - months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+
+
+def archive_old_events(hot_months: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    نقل الأشهر الأقدم من hot_months (الشهر الحالي + السابقة) إلى EVENT_ARCHIVE_DIR/<table>/<table>_YYYY-MM_<ids>.jsonl.gz.
+    الملف يُكتب ويُزامَن قبل حذف الصفوف، والحذف على دفعات بنطاق المعرفات نفسه؛ انقطاع في المنتصف
+    ينتج عند التشغيل التالي ملفاً ثانياً للشهر نفسه دون فقد أو تكرار. العدادات اليومية لا تتغير.
+    """
+    hot_months = Config.EVENT_HOT_MONTHS if hot_months is None else hot_months
+    cutoff = _shift_months(_month_start((now or datetime.now()).isoformat()), max(1, hot_months) - 1)
+    db = _db()
+    archived: Dict[str, int] = {}
+    for table in EVENT_TABLES:
+        while True:
+            first = db.fetch_value(f"SELECT MIN(created_at) FROM {table} WHERE created_at < ?", (cutoff,))
+            if not first:
+                break
+            start = _month_start(first)
+            end = min(_next_month(start), cutoff)
+            bounds = db.fetch_one(f"SELECT MIN(id) AS low, MAX(id) AS high, COUNT(*) AS n FROM {table} "
+                                  "WHERE created_at >= ? AND created_at < ?", (start, end))
+            if not bounds['n']:  # created_at أقدم من start بصيغة غير قياسية: لا يمكن أرشفته تلقائياً
+                break
+            _write_archive(db, table, start, end, bounds['low'], bounds['high'])
+            deleted = _delete_archived(db, table, start, end, bounds['high'])
+            archived[table] = archived.get(table, 0) + deleted
+            if Config.logger:
+                Config.logger.info(f"Archived {deleted} {table} row(s) of {start[:7]}")
+    return archived
+
+
+def _write_archive(db, table: str, start: str, end: str, low: int, high: int) -> Path:
+    folder = Config.EVENT_ARCHIVE_DIR / table
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{table}_{start[:7]}_{low}-{high}.jsonl.gz"
+    tmp = path.with_name(path.name + '.tmp')
+    rows = db.iter_rows(f"SELECT * FROM {table} WHERE created_at >= ? AND created_at < ? AND id <= ? ORDER BY id",
+                        (start, end, high))
+    with open(tmp, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as archive:
+            for row in rows:
+                archive.write((json.dumps(dict(row), ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def _delete_archived(db, table: str, start: str, end: str, high: int, chunk: int = 5000) -> int:
+    """حذف على دفعات صغيرة حتى لا يُحجز قفل الكتابة طويلاً"""
+    deleted = 0
+    while True:
+        count = db.execute(f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM {table} WHERE created_at >= ? AND created_at < ? AND id <= ? LIMIT ?)
+        """, (start, end, high, chunk)).rowcount
+        deleted += count
+        if count < chunk:
+            return deleted
+
+
+def prune_archives(keep_months: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """حذف ملفات الأرشيف الأقدم من keep_months شهراً (0 = الاحتفاظ للأبد)"""
+    keep_months = Config.EVENT_ARCHIVE_KEEP_MONTHS if keep_months is None else keep_months
+    if keep_months <= 0 or not Config.EVENT_ARCHIVE_DIR.exists():
+        return 0
+    oldest = _shift_months(_month_start((now or datetime.now()).isoformat()), keep_months)[:7]
+    removed = 0
+    for path in Config.EVENT_ARCHIVE_DIR.glob('*/*.jsonl.gz'):
+        month = path.name[:-len('.jsonl.gz')].rsplit('_', 2)[-2]
+        if month < oldest:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def list_archives() -> List[Dict]:
+    """ملفات الأرشيف الموجودة (الجدول، الشهر، الحجم)"""
+    if not Config.EVENT_ARCHIVE_DIR.exists():
+        return []
+    archives = []
+    for path in sorted(Config.EVENT_ARCHIVE_DIR.glob('*/*.jsonl.gz')):
+        month = path.name[:-len('.jsonl.gz')].rsplit('_', 2)[-2]
+        archives.append({'table': path.parent.name, 'month': month, 'file': path.name,
+                         'size_kb': round(path.stat().st_size / 1024, 1)})
+    return archives
@@ -1,56 +1,103 @@
 """
 utils/excel_export.py - Excel Data Export
 SmartCar AI-Dealer
+Each table is read through DatabaseManager.iter_rows (fetchmany chunks) into an openpyxl write-only workbook,
+which spools every sheet to a temp file; memory stays flat regardless of row count (utils/export_stream.py).
 """
-import io, sqlite3
-from config import Config
+import io
+import sqlite3
+from itertools import chain
+from typing import BinaryIO, Dict, Optional
+
+from db_manager import DatabaseManager
+from utils.export_stream import date_filter, date_partitions, parse_date, write_export
+
+# (sheet, query with a {where} slot for the date filter, date column or None for reference tables, order by)
+SHEETS = (
+    ('Transactions', "SELECT * FROM transactions WHERE 1=1{where}", 'created_at', "created_at DESC"),
+    ('Users', "SELECT id, username, full_name, email, phone, role, created_at FROM users WHERE 1=1", None, "id"),
+    ('Contracts', "SELECT * FROM contracts WHERE 1=1{where}", 'created_at', "created_at DESC"),
+    ('Employees', "SELECT * FROM employees WHERE 1=1", None, "id"),
+    ('Appointments', "SELECT * FROM appointments WHERE 1=1{where}", 'preferred_date', "preferred_date DESC"),
+    ('Audit Log', "SELECT * FROM audit_log WHERE 1=1{where}", 'created_at', "created_at DESC LIMIT 1000"),
+)
 
 
 class ExcelExporter:
     """Export all data as Excel files"""
 
+    @staticmethod
+    def write_workbook(target: BinaryIO, start_date=None, end_date=None) -> Dict[str, int]:
+        """Stream every sheet into target (path or binary file object); returns the row count per sheet"""
+        from openpyxl import Workbook
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+        db = DatabaseManager()
+        workbook = Workbook(write_only=True)
+        counts = {}
+        for sheet, query, date_column, order in SHEETS:
+            where, params = date_filter(date_column, start_date, end_date) if date_column else ('', [])
+            sql = f"{query.format(where=where)} ORDER BY {order}"
+            rows = db.iter_rows(sql, params)
+            try:
+                first = next(rows, None)
+            except sqlite3.Error:
+                continue  # table missing in this installation
+            worksheet = workbook.create_sheet(sheet)
+            if first is None:
+                with db.get_read_connection() as conn:
+                    worksheet.append([column[0] for column in conn.execute(sql, params).description])
+                counts[sheet] = 0
+                continue
+            worksheet.append(list(first.keys()))
+            count = 0
+            for row in chain([first], rows):
+                worksheet.append([ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value
+                                  for value in row])
+                count += 1
+            counts[sheet] = count
+        if not counts:
+            workbook.create_sheet('Empty')
+        workbook.save(target)
+        return counts
+
+    @staticmethod
+    def export_to_file(start_date=None, end_date=None, partition: Optional[str] = None,
+                       compress: bool = False):
+        """
+        Write the export under Config.EXPORTS_DIR and return its path.
+        partition='month'/'quarter'/'year' writes one workbook per period into a zip.
+        """
+        if partition:
+            start, end = ExcelExporter._bounds(start_date, end_date)
+            if start is None:
+                partition = None
+        if partition:
+            members = [(f"SmartCar_Export_{label}.xlsx",
+                        lambda out, first=first, last=last: ExcelExporter.write_workbook(out, first, last))
+                       for label, first, last in date_partitions(start, end, partition)]
+            return write_export("SmartCar_Export.zip", members, compress=True)
+        content = lambda out: ExcelExporter.write_workbook(out, start_date, end_date)  # noqa: E731
+        if compress:
+            return write_export("SmartCar_Export.zip", [("SmartCar_Export.xlsx", content)], compress=True)
+        return write_export("SmartCar_Export.xlsx", [("SmartCar_Export.xlsx", content)], compress=False)
+
+    @staticmethod
+    def _bounds(start_date, end_date):
+        """Requested range, with open ends filled from the oldest / newest transaction"""
+        start, end = parse_date(start_date), parse_date(end_date)
+        if start is None or end is None:
+            row = DatabaseManager().fetch_one("SELECT MIN(created_at) AS first, MAX(created_at) AS last FROM transactions")
+            if not row or not row['first']:
+                return None, None
+            start = start or parse_date(row['first'])
+            end = end or parse_date(row['last'])
+        return start, end
+
     @staticmethod
     def export_all_data() -> bytes:
-        import pandas as pd
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        
+        """Whole workbook as bytes (small installations / callers that need the content in memory)"""
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Transactions
-            try:
-                df = pd.read_sql_query("SELECT * FROM transactions ORDER BY created_at DESC", conn)
-                df.to_excel(writer, sheet_name='Transactions', index=False)
-            except: pass
-            
-            # Users
-            try:
-                df = pd.read_sql_query("SELECT id, username, full_name, email, phone, role, created_at FROM users", conn)
-                df.to_excel(writer, sheet_name='Users', index=False)
-            except: pass
-            
-            # Contracts
-            try:
-                df = pd.read_sql_query("SELECT * FROM contracts ORDER BY created_at DESC", conn)
-                df.to_excel(writer, sheet_name='Contracts', index=False)
-            except: pass
-            
-            # Employees
-            try:
-                df = pd.read_sql_query("SELECT * FROM employees", conn)
-                df.to_excel(writer, sheet_name='Employees', index=False)
-            except: pass
-            
-            # Appointments
-            try:
-                df = pd.read_sql_query("SELECT * FROM appointments ORDER BY preferred_date DESC", conn)
-                df.to_excel(writer, sheet_name='Appointments', index=False)
-            except: pass
-            
-            # Audit Log
-            try:
-                df = pd.read_sql_query("SELECT * FROM audit_log ORDER BY created_at DESC LIMIT 1000", conn)
-                df.to_excel(writer, sheet_name='Audit Log', index=False)
-            except: pass
-        
-        conn.close()
+        ExcelExporter.write_workbook(output)
         return output.getvalue()
+
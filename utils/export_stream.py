@@ -0,0 +1,196 @@
+"""
+utils/export_stream.py - Streaming export helpers
+SmartCar AI-Dealer
+Shared by ExcelExporter and DATEVExporter: rows come from DatabaseManager.iter_rows in chunks and are written
+straight to a file under Config.EXPORTS_DIR (never assembled in memory), optionally split by date range into
+one zip. The file is served by st.download_button, or by the REST API as a chunked download via a signed link.
+"""
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import time
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from config import Config
+
+# A member's content: text/bytes chunks, or a callable that writes into a binary file object (openpyxl)
+Content = Union[Iterable[Union[str, bytes]], Callable[[BinaryIO], None]]
+PERIODS = ('month', 'quarter', 'year')
+
+
+# ===== Date ranges =====
+
+def parse_date(value) -> Optional[date]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def date_filter(column: str, start_date=None, end_date=None) -> Tuple[str, list]:
+    """' AND column >= ? AND column < ?' for the inclusive day range [start_date, end_date]"""
+    sql, params = '', []
+    start, end = parse_date(start_date), parse_date(end_date)
+    if start:
+        sql += f" AND {column} >= ?"; params.append(start.isoformat())
+    if end:
+        # < next day, so timestamps during end_date itself are included ('2025-01-31 10:00' > '2025-01-31')
+        sql += f" AND {column} < ?"; params.append((end + timedelta(days=1)).isoformat())
+    return sql, params
+
+
+def date_partitions(start_date, end_date, period: str) -> List[Tuple[str, date, date]]:
+    """(label, first day, last day) for each month / quarter / year overlapping [start_date, end_date]"""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    start, end = parse_date(start_date), parse_date(end_date)
+    parts = []
+    current = start
+    while current <= end:
+        if period == 'month':
+            first = current.replace(day=1)
+            following = (first + timedelta(days=32)).replace(day=1)
+            label = f"{first:%Y-%m}"
+        elif period == 'quarter':
+            quarter = (current.month - 1) // 3
+            first = date(current.year, 3 * quarter + 1, 1)
+            following = date(current.year + 1, 1, 1) if quarter == 3 else date(current.year, 3 * quarter + 4, 1)
+            label = f"{current.year}-Q{quarter + 1}"
+        else:
+            first = date(current.year, 1, 1)
+            following = date(current.year + 1, 1, 1)
+            label = str(current.year)
+        parts.append((label, max(first, start), min(following - timedelta(days=1), end)))
+        current = following
+    return parts
+
+
+# ===== Writing =====
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence], chunk_rows: Optional[int] = None,
+             **fmtparams) -> Iterator[str]:
+    """CSV text in chunks of chunk_rows lines; the writer's buffer is drained after every chunk"""
+    chunk_rows = chunk_rows or Config.EXPORT_CHUNK_ROWS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, **fmtparams)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _write_content(out: BinaryIO, content: Content):
+    if callable(content):
+        content(out)
+        return
+    for chunk in content:
+        out.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+
+
+def write_export(filename: str, members: Iterable[Tuple[str, Content]], compress: bool) -> Path:
+    """
+    Write (name, content) members to a new file in EXPORTS_DIR: a zip with one entry per member when compress,
+    otherwise the single member as-is. Each member is produced and written incrementally.
+    """
+    members = list(members)
+    if not compress and len(members) != 1:
+        raise ValueError("Several export parts need compress=True")
+    prune_exports()
+    Config.EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = Config.EXPORTS_DIR / f"{uuid.uuid4().hex[:12]}_{filename}"
+    try:
+        if compress:
+            with zipfile.ZipFile(path, 'w') as archive:
+                for name, content in members:
+                    info = zipfile.ZipInfo(name, time.localtime()[:6])
+                    # .xlsx is already deflated; compressing it again only costs CPU
+                    info.compress_type = zipfile.ZIP_STORED if name.endswith('.xlsx') else zipfile.ZIP_DEFLATED
+                    with archive.open(info, 'w', force_zip64=True) as out:
+                        _write_content(out, content)
+        else:
+            with open(path, 'wb') as out:
+                _write_content(out, members[0][1])
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def download_name(path: Path) -> str:
+    """File name without the unique prefix added by write_export"""
+    return path.name.split('_', 1)[1]
+
+
+def prune_exports(max_age_hours: Optional[int] = None) -> int:
+    """Delete export files older than EXPORT_TTL_HOURS"""
+    if not Config.EXPORTS_DIR.exists():
+        return 0
+    cutoff = time.time() - 3600 * (Config.EXPORT_TTL_HOURS if max_age_hours is None else max_age_hours)
+    removed = 0
+    for path in Config.EXPORTS_DIR.iterdir():
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+# ===== Signed download links (utils/api_server.py: /api/exports/<token>) =====
+
+def _signature(payload: str) -> str:
+    return hmac.new(Config.APP_SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def sign_download(path: Path, ttl_minutes: Optional[int] = None) -> str:
+    expires = int(time.time()) + 60 * (ttl_minutes or Config.EXPORT_LINK_TTL_MINUTES)
+    payload = f"{path.name}|{expires}"
+    return base64.urlsafe_b64encode(f"{payload}|{_signature(payload)}".encode()).decode().rstrip('=')
+
+
+def resolve_download(token: str) -> Optional[Path]:
+    """Export file for a valid, unexpired token (None otherwise)"""
+    try:
+        decoded = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        name, expires, signature = decoded.split('|')
+        expired = int(expires) < time.time()
+    except ValueError:
+        return None
+    if expired or not hmac.compare_digest(signature, _signature(f"{name}|{expires}")):
+        return None
+    path = Config.EXPORTS_DIR / name
+    if path.parent != Config.EXPORTS_DIR or not path.is_file():
+        return None
+    return path
+
+
+def download_url(path: Path) -> Optional[str]:
+    """Chunked download link through the REST API (None when API_PUBLIC_URL is not configured)"""
+    if not Config.API_PUBLIC_URL:
+        return None
+    return f"{Config.API_PUBLIC_URL}/api/exports/{sign_download(path)}"
+
+
+def render_download(path: Path, label: str, mime: str, key: str):
+    """Download widget for an export file; prefers the API link, which streams the file instead of loading it"""
+    import streamlit as st
+
+    size_mb = path.stat().st_size / 1024 / 1024
+    url = download_url(path)
+    if url:
+        st.link_button(f"{label} ({size_mb:.1f} MB)", url)
+        return
+    mime = 'application/zip' if path.suffix == '.zip' else mime
+    with open(path, 'rb') as f:
+        st.download_button(f"{label} ({size_mb:.1f} MB)", f, file_name=download_name(path), mime=mime, key=key)
@@ -1,13 +1,19 @@
 """
 utils/i18n.py - نظام التوطين البسيط
 SmartCar AI-Dealer
+ملفات locales/*.json تُترجم عند التحميل إلى جداول مسطحة مشتركة بين الجلسات وتُعاد قراءتها عند تعديلها.
 """
 
 import json
+import threading
+import time
 import streamlit as st
 import streamlit.components.v1 as components
 from pathlib import Path
-from typing import Optional
+from string import Formatter
+from typing import Any, Callable, Dict, List, Optional, Set
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.static_assets import inject_css
 
 LOCALES_DIR = Path(__file__).parent.parent / "locales"
 
@@ -18,31 +24,109 @@ SUPPORTED_LANGUAGES = {
 }
 
 DEFAULT_LANGUAGE = 'de'
-_translations_cache = {}
+# أقل فترة (بالثواني) بين فحصين لتاريخ تعديل ملف اللغة؛ التعديل يُحمَّل تلقائياً بدون إعادة تشغيل
+RELOAD_CHECK_SECONDS = 2.0
+# حد المفاتيح المفقودة المسجلة لكل لغة (تقرير المفاتيح المفقودة)
+MAX_MISSING_KEYS = 1000
+_FORMATTER = Formatter()
 
 
-def load_translations(lang: str, force_reload: bool = False) -> dict:
-    global _translations_cache
-    if lang in _translations_cache and not force_reload:
-        return _translations_cache[lang]
-    
+class _Catalog:
+    """جدول ترجمة مسطح للغة واحدة ('a.b.c' -> القيمة) مشترك بين كل الجلسات"""
+    __slots__ = ('path', 'mtime', 'data', 'entries', 'templates', 'checked_at')
+
+    def __init__(self, path: Path, mtime: Optional[int], data: dict):
+        self.path = path
+        self.mtime = mtime
+        self.data = data
+        self.entries: Dict[str, Any] = {}
+        _flatten(data, '', self.entries)
+        # قوالب التنسيق محللة مسبقاً: النصوص بدون حقول {} لا تمر على str.format أبداً
+        self.templates: Dict[str, Callable[..., str]] = {
+            key: value.format for key, value in self.entries.items()
+            if isinstance(value, str) and _is_template(value)
+        }
+        self.checked_at = time.monotonic()
+
+
+_catalogs: Dict[str, _Catalog] = {}
+_catalogs_lock = threading.Lock()
+_missing_keys: Dict[str, Set[str]] = {}
+# لغة تشغيل السكربت الحالي لكل خيط، حتى لا يُقرأ session_state في كل استدعاء لـ t()
+_run_language = threading.local()
+
+
+def _flatten(data: dict, prefix: str, entries: Dict[str, Any]):
+    for k, v in data.items():
+        entries[prefix + k] = v
+        if isinstance(v, dict):
+            _flatten(v, f"{prefix}{k}.", entries)
+
+
+def _is_template(value: str) -> bool:
+    """هل يغيّر str.format النص (حقول أو أقواس مزدوجة) ويمكن تحليله بدون خطأ"""
+    if '{' not in value and '}' not in value:
+        return False
+    try:
+        list(_FORMATTER.parse(value))
+        return True
+    except ValueError:
+        return False
+
+
+def _locale_path(lang: str) -> Path:
     file_path = LOCALES_DIR / f"{lang}.json"
     if not file_path.exists():
         file_path = LOCALES_DIR / f"{DEFAULT_LANGUAGE}.json"
-    
+    return file_path
+
+
+def _mtime(path: Path) -> Optional[int]:
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            translations = json.load(f)
-            _translations_cache[lang] = translations
-            return translations
-    except:
-        return {}
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _compile(lang: str) -> _Catalog:
+    path = _locale_path(lang)
+    mtime = _mtime(path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return _Catalog(path, mtime, data if isinstance(data, dict) else {})
+
+
+def _get_catalog(lang: str) -> _Catalog:
+    """الجدول المترجم للغة مع إعادة التحميل عند تغير تاريخ تعديل الملف (فحص كل RELOAD_CHECK_SECONDS)"""
+    catalog = _catalogs.get(lang)
+    now = time.monotonic()
+    if catalog is not None and now - catalog.checked_at < RELOAD_CHECK_SECONDS:
+        return catalog
+    with _catalogs_lock:
+        catalog = _catalogs.get(lang)
+        if catalog is None or _locale_path(lang) != catalog.path or _mtime(catalog.path) != catalog.mtime:
+            catalog = _compile(lang)
+            _catalogs[lang] = catalog
+            _missing_keys.pop(lang, None)
+        catalog.checked_at = now
+    return catalog
+
+
+def load_translations(lang: str, force_reload: bool = False) -> dict:
+    if force_reload:
+        with _catalogs_lock:
+            _catalogs.pop(lang, None)
+    return _get_catalog(lang).data
 
 
 def clear_translations_cache():
-    """Clear the translations cache to force reload"""
-    global _translations_cache
-    _translations_cache = {}
+    """Clear the translations cache (not needed after editing locale files: they reload on mtime change)"""
+    with _catalogs_lock:
+        _catalogs.clear()
+        _missing_keys.clear()
 
 
 def get_current_lang() -> str:
@@ -53,45 +137,82 @@ def get_current_lang() -> str:
     return DEFAULT_LANGUAGE
 
 
+def _active_lang() -> str:
+    """اللغة الحالية مقروءة مرة واحدة لكل تشغيل للسكربت (ctx.cursors يُنشأ من جديد مع كل تشغيل)"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    run = getattr(ctx, 'cursors', None)
+    if run is None:
+        return get_current_lang()
+    cached = getattr(_run_language, 'value', None)
+    if cached is not None and cached[0] is run:
+        return cached[1]
+    lang = get_current_lang()
+    _run_language.value = (run, lang)
+    return lang
+
+
 def set_language(lang: str):
     """تعيين اللغة في session_state"""
     if lang in SUPPORTED_LANGUAGES:
         st.session_state['language'] = lang
+        _run_language.value = None
 
 
 def get_direction() -> str:
-    return SUPPORTED_LANGUAGES.get(get_current_lang(), {}).get('dir', 'ltr')
+    return SUPPORTED_LANGUAGES.get(_active_lang(), {}).get('dir', 'ltr')
 
 
 def is_rtl() -> bool:
     return get_direction() == 'rtl'
 
 
-def t(key: str, default: Optional[str] = None, **kwargs) -> str:
-    """ترجمة نص بناءً على مفتاح"""
-    lang = get_current_lang()
-    translations = load_translations(lang)
-    
-    keys = key.split('.')
-    value = translations
-    for k in keys:
-        if isinstance(value, dict):
-            value = value.get(k)
-        else:
-            value = None
-            break
-    
+def _translate(lang: str, key: str, default: Optional[str], kwargs: dict):
+    catalog = _get_catalog(lang)
+    value = catalog.entries.get(key)
+
     if value is None:
+        missing = _missing_keys.setdefault(lang, set())
+        if len(missing) < MAX_MISSING_KEYS:
+            missing.add(key)
         return default if default else key
-    
-    if kwargs and isinstance(value, str):
-        try:
-            return value.format(**kwargs)
-        except:
-            return value
+
+    if kwargs:
+        template = catalog.templates.get(key)
+        if template is not None:
+            try:
+                return template(**kwargs)
+            except (KeyError, IndexError, AttributeError, TypeError, ValueError):
+                return value
     return value
 
 
+def t(key: str, default: Optional[str] = None, **kwargs) -> str:
+    """ترجمة نص بناءً على مفتاح (بحث واحد في الجدول المسطح للغة الحالية)"""
+    return _translate(_active_lang(), key, default, kwargs)
+
+
+def get_translator(lang: str) -> Callable[..., str]:
+    """دالة ترجمة مثبتة على لغة محددة (صفحات مستقلة عن لغة الجلسة مثل تسجيل حضور الموظفين)"""
+    lang = lang if lang in SUPPORTED_LANGUAGES else DEFAULT_LANGUAGE
+
+    def translate(key: str, default: Optional[str] = None, **kwargs) -> str:
+        return _translate(lang, key, default, kwargs)
+    return translate
+
+
+def get_missing_keys() -> Dict[str, List[str]]:
+    """المفاتيح التي طُلبت أثناء التشغيل ولم توجد في ملف اللغة (منذ آخر تحميل له)"""
+    return {lang: sorted(keys) for lang, keys in _missing_keys.items() if keys}
+
+
+def missing_keys_report() -> Dict[str, List[str]]:
+    """المفاتيح النصية الموجودة في ملف لغة واحد على الأقل والمفقودة من كل لغة مدعومة"""
+    leaves = {lang: {k for k, v in _get_catalog(lang).entries.items() if not isinstance(v, dict)}
+              for lang in SUPPORTED_LANGUAGES}
+    every_key = set().union(*leaves.values())
+    return {lang: sorted(every_key - keys) for lang, keys in leaves.items()}
+
+
 def get_language_display_name(code: str) -> str:
     info = SUPPORTED_LANGUAGES.get(code, {})
     return f"{info.get('flag', '')} {info.get('name', code)}"
@@ -133,9 +254,9 @@ def rtl_checkbox(label: str, key: str = None, value: bool = False, help: str = N
         return st.checkbox(label, key=key, value=value, help=help)
 
 def apply_language_css():
-    """تطبيق CSS للغة الحالية"""
+    """تطبيق CSS للغة الحالية (كتلة مبنية مرة واحدة لكل اتجاه؛ تغيير اللغة يبدّل هذه الكتلة فقط)"""
     if is_rtl():
-        st.markdown("""<style>
+        inject_css('rtl', """
         /* Import Arabic Font */
         @import url('https://fonts.googleapis.com/css2?family=Cairo:wght@300;400;500;600;700&display=swap');
         
@@ -899,9 +1020,9 @@ def apply_language_css():
             font-weight: 600 !important;
         }
         
-        </style>""", unsafe_allow_html=True)
+        """)
     else:
-        st.markdown("""<style>
+        inject_css('ltr', """
         /* ═══════════════════════════════════════════════════════════════════════
            LTR MASTER STYLES - German/English Language Support
            Colors handled by config.toml
@@ -1103,7 +1224,7 @@ def apply_language_css():
             font-weight: 600 !important;
         }
         
-        </style>""", unsafe_allow_html=True)
+        """)
 
 
 def clear_language_on_logout():
@@ -0,0 +1,239 @@
+"""
+utils/image_gate.py - بوابة فحص الصور المحلية قبل Groq
+SmartCar AI-Dealer
+فحص على المعالج فقط فوق الصورة المفكوكة مرة واحدة (utils/image_preprocessor.py): الأبعاد، الحدة
+(تباين Laplacian)، التعريض (المتوسط ونسبة البكسلات المشبعة)، والبصمة الإدراكية pHash للتكرار.
+النتيجة pass / reject / inconclusive؛ سؤال "هل في الصورة مركبة؟" يُرسل لـ quick_validate_image فقط
+عندما تكون البوابة غير حاسمة، وإلا يتحقق منه التحليل الشامل نفسه (الحقل is_vehicle).
+أحكام النموذج تُحفظ ببصمة pHash في جدول image_fingerprints فتُقبل النسخ المعاد ضغطها أو تصويرها دون طلب جديد.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+from utils.image_preprocessor import PreparedImage, prepare_image
+
+_ANALYSIS_EDGE = 512   # الحدة والتعريض تُقاس على هذا الحجم حتى تبقى العتبات ثابتة مهما كانت دقة الصورة
+_HASH_SIZE = 32        # pHash: DCT لصورة 32x32 بتدرج الرمادي، ثم أول 8x8 معامل (64 بت)
+
+_n = np.arange(_HASH_SIZE)
+_DCT = np.sqrt(2 / _HASH_SIZE) * np.cos(np.pi * (2 * _n[None, :] + 1) * _n[:, None] / (2 * _HASH_SIZE))
+_DCT[0] /= np.sqrt(2)
+
+
+def create_image_gate_schema(conn: sqlite3.Connection):
+    # phash عدد صحيح بإشارة (64 بت في SQLite)؛ is_vehicle حكم النموذج على الصورة
+    conn.execute('''CREATE TABLE IF NOT EXISTS image_fingerprints (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        phash INTEGER NOT NULL,
+        sha256 TEXT NOT NULL UNIQUE,
+        is_vehicle INTEGER NOT NULL,
+        source TEXT,
+        created_at TEXT NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_image_fingerprints_created ON image_fingerprints(created_at)")
+
+
+# ===== المقاييس =====
+
+def perceptual_hash(image: Image.Image) -> int:
+    """pHash بطول 64 بت: بت لكل معامل DCT منخفض التردد أعلى من الوسيط"""
+    gray = np.asarray(image.convert('L').resize((_HASH_SIZE, _HASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ gray @ _DCT.T)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # معامل DC (متوسط الإضاءة) لا يدخل في الوسيط
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+def _signed(phash: int) -> int:
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+
+def image_metrics(prepared: PreparedImage) -> Dict[str, float]:
+    """مقاييس الجودة من الصورة المجهزة (بدون فك جديد)"""
+    gray_image = prepared.image.convert('L')
+    if max(gray_image.size) > _ANALYSIS_EDGE:
+        gray_image.thumbnail((_ANALYSIS_EDGE, _ANALYSIS_EDGE), Image.BILINEAR)
+    gray = np.asarray(gray_image, dtype=np.float32)
+    # Laplacian بنواة 3x3 (4 جيران) عبر الإزاحة بدل الالتفاف؛ تباين منخفض = صورة ضبابية
+    laplacian = gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1] - 4 * gray[1:-1, 1:-1]
+    width, height = prepared.original_size
+    return {
+        'width': width,
+        'height': height,
+        'sharpness': float(laplacian.var()),
+        'brightness': float(gray.mean()),
+        'contrast': float(gray.std()),
+        'dark_fraction': float((gray < 16).mean()),
+        'bright_fraction': float((gray > 239).mean()),
+    }
+
+
+class GateResult:
+    """نتيجة البوابة المحلية لصورة واحدة"""
+
+    def __init__(self, verdict: str, msg_key: str, metrics: Dict[str, float], phash: int, sha256: str,
+                 warnings: Optional[List[str]] = None, source: str = 'local'):
+        self.verdict = verdict        # pass / reject / inconclusive
+        self.msg_key = msg_key
+        self.metrics = metrics
+        self.phash = phash
+        self.sha256 = sha256
+        self.warnings = warnings or []
+        self.source = source          # local / memory
+
+    @property
+    def is_valid(self) -> bool:
+        return self.verdict != 'reject'
+
+    def as_dict(self) -> Dict:
+        return {'verdict': self.verdict, 'msg_key': self.msg_key, 'warnings': self.warnings,
+                'source': self.source, 'phash': f"{self.phash:016x}", 'metrics': self.metrics}
+
+
+class ImageGate:
+    """البوابة المحلية + ذاكرة أحكام النموذج حسب pHash"""
+
+    def __init__(self, db=None):
+        self._db = db
+        self._memo: 'OrderedDict[bytes, GateResult]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        if self._db is None:
+            from db_manager import DatabaseManager
+            self._db = DatabaseManager()
+        return self._db
+
+    def assess(self, image_bytes: bytes) -> GateResult:
+        """فحص الجودة فقط (بدون ذاكرة الأحكام)؛ يرفع استثناء إذا تعذر فك الصورة"""
+        digest = hashlib.sha256(image_bytes).digest()
+        with self._lock:
+            if digest in self._memo:
+                self._memo.move_to_end(digest)
+                return self._memo[digest]
+
+        prepared = prepare_image(image_bytes)
+        metrics = image_metrics(prepared)
+        result = self._classify(metrics, perceptual_hash(prepared.image), digest.hex())
+
+        with self._lock:
+            self._memo[digest] = result
+            while len(self._memo) > 32:
+                self._memo.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _classify(m: Dict[str, float], phash: int, sha256: str) -> GateResult:
+        clipped = m['dark_fraction'] + m['bright_fraction']
+        if min(m['width'], m['height']) < Config.IMAGE_MIN_EDGE:
+            return GateResult('reject', 'err_low_resolution', m, phash, sha256)
+        if m['contrast'] < Config.IMAGE_MIN_CONTRAST:
+            return GateResult('reject', 'err_blank', m, phash, sha256)
+        if m['sharpness'] < Config.IMAGE_BLUR_REJECT:
+            return GateResult('reject', 'err_blurry', m, phash, sha256)
+        if clipped > Config.IMAGE_CLIPPED_REJECT:
+            return GateResult('reject', 'err_exposure', m, phash, sha256)
+
+        warnings = []
+        if m['brightness'] < 40:
+            warnings.append('warn_too_dark')
+        elif m['brightness'] > 230:
+            warnings.append('warn_too_bright')
+        if m['sharpness'] < Config.IMAGE_BLUR_PASS:
+            warnings.append('warn_blurry')
+        # خلفية بيضاء أو سوداء واسعة تميز الشعارات ولقطات الشاشة والمستندات أكثر من صور السيارات
+        if warnings or clipped > Config.IMAGE_CLIPPED_PASS:
+            return GateResult('inconclusive', warnings[0] if warnings else 'warn_check_content', m, phash, sha256,
+                              warnings)
+        return GateResult('pass', 'success', m, phash, sha256)
+
+    def check(self, image_bytes: bytes, others: Optional[Dict[str, bytes]] = None) -> GateResult:
+        """الفحص المحلي + أحكام النموذج السابقة لصور شبه مطابقة + تكرار الصورة بين الزوايا"""
+        local = self.assess(image_bytes)
+        verdict, msg_key, source = local.verdict, local.msg_key, 'local'
+        if verdict != 'reject':
+            known = self.known_verdict(local.phash)
+            if known is not None:
+                verdict, source = ('pass', 'memory') if known else ('reject', 'memory')
+                msg_key = 'success' if known else 'err_not_vehicle'
+        warnings = list(local.warnings)  # نتيجة assess محفوظة في الذاكرة ولا تُعدَّل
+        for data in (others or {}).values():
+            if not data or data is image_bytes:
+                continue
+            try:
+                other = self.assess(data)
+            except Exception:
+                continue
+            if other.sha256 == local.sha256 or hamming(other.phash, local.phash) <= Config.IMAGE_PHASH_DISTANCE:
+                warnings.append('warn_duplicate_angle')
+                break
+        return GateResult(verdict, msg_key, local.metrics, local.phash, local.sha256, warnings, source)
+
+    def known_verdict(self, phash: int) -> Optional[bool]:
+        """حكم أقرب صورة محفوظة ضمن مسافة Hamming المسموحة (None إذا لا يوجد)"""
+        rows = self.db.fetch_all(
+            "SELECT phash, is_vehicle FROM image_fingerprints ORDER BY id DESC LIMIT ?", (Config.IMAGE_PHASH_MEMORY,))
+        if not rows:
+            return None
+        hashes = np.array([row['phash'] for row in rows], dtype=np.int64).view(np.uint64)
+        distances = np.unpackbits((hashes ^ np.uint64(phash)).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        best = int(distances.argmin())
+        if distances[best] > Config.IMAGE_PHASH_DISTANCE:
+            return None
+        return bool(rows[best]['is_vehicle'])
+
+    def remember(self, result: GateResult, is_vehicle: bool, source: str = 'llm'):
+        """حفظ حكم النموذج على الصورة لإعادة استخدامه مع الصور شبه المطابقة"""
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO image_fingerprints (phash, sha256, is_vehicle, source, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET is_vehicle = excluded.is_vehicle, source = excluded.source
+            ''', (_signed(result.phash), result.sha256, int(bool(is_vehicle)), source, datetime.now().isoformat()))
+
+
+_gate: Optional[ImageGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_image_gate() -> ImageGate:
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = ImageGate()
+    return _gate
+
+
+def validate_vehicle_image(image_bytes: bytes, analyzer=None, others: Optional[Dict[str, bytes]] = None) -> Dict:
+    """
+    بديل quick_validate_image في صفحة التقييم: البوابة المحلية أولاً، والنموذج فقط عند عدم الحسم.
+    :return: {'is_valid', 'message', 'msg_key', 'source': local/memory/llm, 'gate': GateResult}
+    """
+    gate = get_image_gate()
+    try:
+        result = gate.check(image_bytes, others)
+    except Exception as e:
+        return {'is_valid': False, 'msg_key': 'err_corrupted', 'message': str(e), 'source': 'local', 'gate': None}
+
+    validation = {'is_valid': result.is_valid, 'msg_key': result.msg_key, 'message': result.msg_key,
+                  'source': result.source, 'gate': result}
+    if result.verdict == 'inconclusive' and analyzer is not None and Config.IMAGE_GATE_LLM_FALLBACK:
+        llm = analyzer.quick_validate_image(image_bytes)
+        validation.update(is_valid=bool(llm.get('is_valid')), message=llm.get('message', ''), source='llm',
+                          msg_key='success' if llm.get('is_valid') else 'err_not_vehicle')
+        if llm.get('message') != 'Skipped validation':  # فشل الطلب لا يُحفظ كحكم
+            gate.remember(result, bool(llm.get('is_valid')))
+    return validation
@@ -0,0 +1,139 @@
+"""
+utils/image_preprocessor.py - تجهيز الصور قبل رفعها لنموذج Vision
+SmartCar AI-Dealer
+فك الترميز مرة واحدة: تصحيح اتجاه EXIF، تصغير إلى حد أقصى للحافة، حذف البيانات الوصفية،
+وإعادة الترميز بجودة متكيفة. نفس الصورة المفكوكة تُستخدم للتحقق وقياس الإضاءة والإرسال.
+"""
+
+import base64
+import hashlib
+import io
+import math
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from config import Config
+
+
+class PreparedImage:
+    """نتيجة تجهيز صورة واحدة (الصورة المصغرة + البيانات المشتقة منها)"""
+
+    def __init__(self, image: Image.Image, data: bytes, mime_type: str, original_size: Tuple[int, int],
+                 original_bytes: int, quality: int):
+        self.image = image                  # الصورة بعد التدوير والتصغير (RGB)
+        self.data = data                    # البايتات المعاد ترميزها (بدون EXIF)
+        self.mime_type = mime_type
+        self.original_size = original_size  # الأبعاد بعد تصحيح الاتجاه وقبل التصغير
+        self.original_bytes = original_bytes
+        self.quality = quality
+        self._brightness = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def brightness(self) -> float:
+        """متوسط الإضاءة (0-255) محسوباً على الصورة المصغرة"""
+        if self._brightness is None:
+            self._brightness = float(np.mean(np.asarray(self.image.convert('L'))))
+        return self._brightness
+
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+class ImagePreprocessor:
+    """تصغير وإعادة ترميز الصور مع ذاكرة صغيرة للصور المجهزة حسب SHA-256 للبايتات الأصلية"""
+
+    _MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+
+    def __init__(self, max_edge: Optional[int] = None, image_format: Optional[str] = None,
+                 quality: Optional[int] = None, min_quality: Optional[int] = None,
+                 target_kb: Optional[int] = None, memo_size: int = 16):
+        self.max_edge = max_edge or Config.AI_IMAGE_MAX_EDGE
+        self.format = (image_format or Config.AI_IMAGE_FORMAT).upper()
+        self.quality = quality or Config.AI_IMAGE_QUALITY
+        self.min_quality = min_quality or Config.AI_IMAGE_MIN_QUALITY
+        self.target_bytes = (target_kb or Config.AI_IMAGE_TARGET_KB) * 1024
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def prepare(self, image_bytes: bytes) -> PreparedImage:
+        """تجهيز الصورة (أو إعادتها من الذاكرة إذا جُهزت نفس البايتات مؤخراً)"""
+        key = hashlib.sha256(image_bytes).digest()
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        prepared = self._prepare(image_bytes)
+
+        with self._lock:
+            self._memo[key] = prepared
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return prepared
+
+    def _prepare(self, image_bytes: bytes) -> PreparedImage:
+        img = Image.open(io.BytesIO(image_bytes))
+        stored_width, stored_height = img.size
+        scale = self.max_edge / max(stored_width, stored_height)
+
+        # الأبعاد الحقيقية قبل draft (مع مراعاة التدوير 90/270 في EXIF)
+        width, height = stored_width, stored_height
+        if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # فك JPEG مباشرة بمقياس مصغر (1/2، 1/4، 1/8) يبقى أكبر من الأبعاد المطلوبة
+        if img.format == 'JPEG' and scale < 1:
+            img.draft('RGB', (math.ceil(stored_width * scale), math.ceil(stored_height * scale)))
+        img = ImageOps.exif_transpose(img)
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        if max(img.size) > self.max_edge:
+            img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS, reducing_gap=3.0)
+
+        data, quality = self._encode(img)
+        return PreparedImage(img, data, self._MIME_TYPES.get(self.format, 'image/jpeg'),
+                             (width, height), len(image_bytes), quality)
+
+    def _encode(self, img: Image.Image) -> Tuple[bytes, int]:
+        """ترميز بالجودة الافتراضية ثم خفضها تدريجياً حتى الحجم المستهدف (بدون أي بيانات وصفية)"""
+        quality = self.quality
+        while True:
+            buffer = io.BytesIO()
+            if self.format == 'PNG':
+                img.save(buffer, format='PNG', optimize=True)
+            else:
+                img.save(buffer, format=self.format, quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if self.format == 'PNG' or len(data) <= self.target_bytes or quality <= self.min_quality:
+                return data, quality
+            quality = max(self.min_quality, quality - 10)
+
+
+_preprocessor: Optional[ImagePreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def prepare_image(image_bytes: bytes) -> PreparedImage:
+    """تجهيز صورة بالإعدادات الافتراضية (مثيل مشترك على مستوى العملية)"""
+    global _preprocessor
+    if _preprocessor is None:
+        with _preprocessor_lock:
+            if _preprocessor is None:
+                _preprocessor = ImagePreprocessor()
+    return _preprocessor.prepare(image_bytes)
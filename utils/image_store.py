@@ -0,0 +1,254 @@
+"""
+utils/image_store.py - مخزن صور السيارات حسب بصمة المحتوى
+SmartCar AI-Dealer
+كل صورة تُحفظ مرة واحدة باسم SHA-256 لبايتاتها في مجلدات مجزأة (ab/cd/<hash>.<ext>) مهما تكرر رفعها،
+ومعها نسخ WebP مشتقة (thumb / medium / full) تعرضها الصفحات بدل قراءة الأصل وترميزه base64؛
+النسخ تُرمَّز خارج معاملة الحفظ (مهمة images.variants في العامل، أو عند أول عرض).
+جدول image_store هو فهرس المخزن؛ الصورة مستخدمة طالما يشير إليها image_path في أي معاملة
+(الفهرس idx_transactions_image_path)، والتنظيف يحذف غير المستخدم منها بعد مدة الاحتفاظ.
+"""
+
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from PIL import Image, ImageOps
+
+from config import Config
+
+# النسخ المشتقة: الاسم -> أقصى طول للحافة (None = الأبعاد الأصلية)، من الأكبر للأصغر
+VARIANTS: Dict[str, Optional[int]] = {
+    'full': None,
+    'medium': Config.IMAGE_MEDIUM_EDGE,
+    'thumb': Config.IMAGE_THUMB_EDGE,
+}
+
+_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif', 'BMP': 'bmp'}
+_HASH_NAME = re.compile(r'^([0-9a-f]{64})\.\w+$')
+
+
+def create_image_store_schema(conn: sqlite3.Connection):
+    conn.execute('''CREATE TABLE IF NOT EXISTS image_store (
+        hash TEXT PRIMARY KEY,
+        ext TEXT NOT NULL,
+        width INTEGER,
+        height INTEGER,
+        size_bytes INTEGER,
+        created_at TEXT NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_image_store_created ON image_store(created_at)")
+    # فهرس المراجع: التنظيف يقرأ مسارات الصور المستخدمة من الفهرس دون مسح جدول المعاملات
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_image_path ON transactions(image_path)")
+
+
+# ===== المسارات =====
+
+def _shard(digest: str) -> Path:
+    return Config.IMAGE_STORE_DIR / digest[:2] / digest[2:4]
+
+
+def original_path(digest: str, ext: str) -> Path:
+    return _shard(digest) / f"{digest}.{ext}"
+
+
+def _variant_file(digest: str, variant: str) -> Path:
+    return _shard(digest) / f"{digest}.{variant}.webp"
+
+
+def hash_from_path(image_path: Optional[str]) -> Optional[str]:
+    """بصمة الصورة إذا كان المسار لأصل داخل المخزن (بغض النظر عن مكان المجلد)، وإلا None"""
+    if not image_path:
+        return None
+    match = _HASH_NAME.match(Path(image_path).name)
+    return match.group(1) if match else None
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# ===== النسخ المشتقة =====
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def _write_variants(digest: str, img: Image.Image, variants: Iterable[str]):
+    """ترميز النسخ المطلوبة؛ كل نسخة تُصغَّر من السابقة الأكبر منها بدل الأصل"""
+    wanted = set(variants)
+    current = _to_rgb(img)
+    for variant, edge in VARIANTS.items():
+        if edge and max(current.size) > edge:
+            current = current.copy()
+            current.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+        if variant in wanted:
+            buffer = io.BytesIO()
+            current.save(buffer, format='WEBP', quality=Config.IMAGE_WEBP_QUALITY, method=4)
+            _write_atomic(_variant_file(digest, variant), buffer.getvalue())
+
+
+def store_original(data: bytes) -> Dict:
+    """
+    كتابة الأصل في المخزن (مرة واحدة لكل محتوى) دون ترميز أي نسخة؛ تُستدعى قبل فتح المعاملة.
+    Image.open يقرأ الترويسة فقط (الصيغة والأبعاد). البايتات غير القابلة للفك تُحفظ كما هي.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            ext = _EXTENSIONS.get(img.format, 'jpg')
+            width, height = img.size
+    except Exception:
+        ext, width, height = 'jpg', None, None
+
+    path = original_path(digest, ext)
+    if not path.exists():
+        _write_atomic(path, data)
+    return {'hash': digest, 'ext': ext, 'width': width, 'height': height, 'size_bytes': len(data), 'path': str(path)}
+
+
+def register_image(conn: sqlite3.Connection, image: Dict, data: bytes) -> str:
+    """تسجيل أصل محفوظ (store_original) في فهرس المخزن داخل معاملة المستدعي وإرجاع مساره لـ image_path"""
+    # إعادة رفع صورة موجودة تجدد created_at حتى لا يحذفها تنظيف جارٍ قبل ربطها بالمعاملة
+    conn.execute('''
+        INSERT INTO image_store (hash, ext, width, height, size_bytes, created_at) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(hash) DO UPDATE SET created_at = excluded.created_at
+    ''', (image['hash'], image['ext'], image['width'], image['height'], image['size_bytes'],
+          datetime.now().isoformat()))
+    # store_original لا يعيد كتابة ملف موجود؛ إذا حذفه تنظيف (collect_garbage) قبل هذا INSERT
+    # فقد انتظر INSERT انتهاء معاملة التنظيف (التي تحذف الملفات قبل commit)، فالفحص هنا نهائي
+    path = Path(image['path'])
+    if not path.exists():
+        _write_atomic(path, data)
+    return image['path']
+
+
+def put_image(conn: sqlite3.Connection, data: bytes) -> str:
+    """store_original + register_image؛ النسخ المشتقة تُنشأ لاحقاً (schedule_variants أو عند أول عرض)"""
+    return register_image(conn, store_original(data), data)
+
+
+def ensure_variants(image_path: Optional[str]) -> List[str]:
+    """ترميز النسخ المشتقة الناقصة لصورة في المخزن وإرجاع أسمائها"""
+    digest = hash_from_path(image_path)
+    if digest is None:
+        return []
+    missing = [v for v in VARIANTS if not _variant_file(digest, v).exists()]
+    source = Path(image_path)
+    if not missing or not source.exists():
+        return []
+    try:
+        with Image.open(source) as img:
+            _write_variants(digest, img, missing)
+    except Exception:
+        return []  # ليست صورة قابلة للفك: تُعرض كما هي
+    return missing
+
+
+def schedule_variants(image_path: Optional[str]):
+    """
+    ترميز النسخ مسبقاً في العامل الخلفي (worker.py) بعد حفظ المعاملة. بدون عامل حي لا تُضاف مهمة:
+    variant_path تنشئ كل نسخة عند أول عرض لها بدل ترميزها في طلب الحفظ.
+    """
+    digest = hash_from_path(image_path)
+    if digest is None or all(_variant_file(digest, v).exists() for v in VARIANTS):
+        return
+    from utils.job_queue import enqueue, workers_alive
+    if workers_alive():
+        enqueue('images.variants', {'image_path': image_path}, priority=-1,
+                idempotency_key=f"images.variants:{digest}")
+
+
+def variant_path(image_path: Optional[str], variant: str = 'medium') -> Optional[Path]:
+    """
+    مسار النسخة المطلوبة لصورة معاملة. تُنشأ النسخة عند أول طلب إذا لم تكن موجودة،
+    والصور القديمة خارج المخزن تُعاد كما هي.
+    """
+    if not image_path or image_path == 'stored_in_session':
+        return None
+    source = Path(image_path)
+    digest = hash_from_path(image_path)
+    if digest is None or variant not in VARIANTS:
+        return source if source.exists() else None
+
+    target = _variant_file(digest, variant)
+    if target.exists():
+        return target
+    if not source.exists():
+        # المسار المخزن قد يشير إلى موقع سابق لمجلد المشروع
+        source = original_path(digest, source.suffix.lstrip('.').lower())
+    try:
+        with Image.open(source) as img:
+            _write_variants(digest, img, [variant])
+        return target
+    except Exception:
+        return source if source.exists() else None
+
+
+@lru_cache(maxsize=128)
+def _read_cached(path: str, mtime_ns: int) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_variant(image_path: Optional[str], variant: str = 'thumb') -> Optional[bytes]:
+    """بايتات النسخة المطلوبة محفوظة في الذاكرة (لـ st.image بدون قراءة الملف في كل إعادة تشغيل)"""
+    path = variant_path(image_path, variant)
+    if path is None:
+        return None
+    try:
+        return _read_cached(str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return None
+
+
+# ===== التنظيف =====
+
+def referenced_hashes(conn: sqlite3.Connection) -> Set[str]:
+    """بصمات الصور المستخدمة في المعاملات (من الفهرس idx_transactions_image_path)"""
+    rows = conn.execute("SELECT DISTINCT image_path FROM transactions WHERE image_path IS NOT NULL")
+    return {digest for digest in (hash_from_path(row[0]) for row in rows) if digest}
+
+
+def collect_garbage(conn: sqlite3.Connection, retention_hours: int = 24) -> Dict[str, float]:
+    """حذف صور المخزن غير المستخدمة الأقدم من مدة الاحتفاظ (الأصل وكل النسخ المشتقة)"""
+    cutoff = (datetime.now() - timedelta(hours=retention_hours)).isoformat()
+    used = referenced_hashes(conn)
+    candidates = conn.execute("SELECT hash, ext FROM image_store WHERE created_at < ?", (cutoff,)).fetchall()
+    report = {'scanned_files': len(candidates), 'deleted_files': 0, 'freed_bytes': 0}
+
+    for digest, ext in candidates:
+        if digest in used:
+            continue
+        # الشرط يُعاد داخل DELETE: صورة أُعيد رفعها للتو (created_at جديد) لا تُحذف
+        deleted = conn.execute("DELETE FROM image_store WHERE hash = ? AND created_at < ?", (digest, cutoff)).rowcount
+        if not deleted:
+            continue
+        for path in [original_path(digest, ext)] + [_variant_file(digest, v) for v in VARIANTS]:
+            try:
+                report['freed_bytes'] += path.stat().st_size
+                path.unlink()
+            except OSError:
+                pass
+        report['deleted_files'] += 1
+    return report
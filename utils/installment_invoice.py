@@ -14,6 +14,7 @@ from io import BytesIO
 from fpdf import FPDF
 from config import Config
 from db_manager import DatabaseManager
+from utils.metrics import timed
 
 # Arabic RTL fix
 import arabic_reshaper
@@ -49,6 +50,7 @@ class InstallmentInvoiceGenerator:
             else:
                 self.font_path = None
 
+    @timed('pdf_generation_seconds', kind='installment')
     def generate_invoice_pdf(self, invoice_id: int, contract_data: dict, user_data: dict) -> str:
         """توليد فاتورة PDF لقسط واحد"""
         # جلب بيانات الفاتورة
@@ -166,6 +168,7 @@ class InstallmentInvoiceGenerator:
         pdf.output(str(file_path))
         return str(file_path)
 
+    @timed('pdf_generation_seconds', kind='installment_all')
     def generate_all_invoices(self, contract_id: int) -> str:
         """توليد جميع فواتير العقد في ملف PDF واحد - 3 فواتير في كل صفحة A4"""
         # جلب بيانات العقد والمستخدم مع حقول العنوان
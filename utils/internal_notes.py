@@ -2,54 +2,26 @@
 utils/internal_notes.py - Internal Notes System
 SmartCar AI-Dealer - ملاحظات داخلية للموظفين
 """
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 
 
 class InternalNotes:
     """Internal notes visible only to employees"""
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS internal_notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                entity_type TEXT NOT NULL,
-                entity_id INTEGER NOT NULL,
-                user_id INTEGER,
-                username TEXT,
-                note TEXT NOT NULL,
-                priority TEXT DEFAULT 'normal',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def add_note(entity_type: str, entity_id: int, note: str, user_id: int = None, username: str = None, priority: str = 'normal'):
-        InternalNotes._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("INSERT INTO internal_notes (entity_type, entity_id, user_id, username, note, priority) VALUES (?,?,?,?,?,?)",
-                     (entity_type, entity_id, user_id, username, note, priority))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("INSERT INTO internal_notes (entity_type, entity_id, user_id, username, note, priority) VALUES (?,?,?,?,?,?)",
+                                  (entity_type, entity_id, user_id, username, note, priority))
 
     @staticmethod
     def get_notes(entity_type: str, entity_id: int) -> list:
-        InternalNotes._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM internal_notes WHERE entity_type=? AND entity_id=? ORDER BY created_at DESC",
-                           (entity_type, entity_id)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return DatabaseManager().fetch_all("SELECT * FROM internal_notes WHERE entity_type=? AND entity_id=? ORDER BY created_at DESC",
+                                           (entity_type, entity_id))
 
     @staticmethod
     def delete_note(note_id: int):
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("DELETE FROM internal_notes WHERE id=?", (note_id,))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("DELETE FROM internal_notes WHERE id=?", (note_id,))
 
     @staticmethod
     def render_notes_section(entity_type: str, entity_id: int):
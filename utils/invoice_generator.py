@@ -13,6 +13,7 @@ from config import Config
 from .general_utils import GeneralUtils
 import streamlit as st
 from .i18n import t, get_direction
+from .metrics import timed
 
 # Arabic RTL text fix
 import arabic_reshaper
@@ -152,6 +153,7 @@ class InvoiceGenerator:
             else:
                 self.font_path = None # Will rely on standard font and sanitization
 
+    @timed('pdf_generation_seconds', kind='car_invoice')
     def generate_car_invoice(self, transaction_data: dict, user_data: dict, lang='Deutsch') -> str:
         """
         إنشاء فاتورة تقييم سيارة
@@ -315,6 +317,7 @@ class InvoiceGenerator:
         pdf.output(str(file_path))
         return str(file_path)
 
+    @timed('pdf_generation_seconds', kind='contract')
     def generate_contract(self, contract_id, contract_data: dict, user_data: dict, lang: str = 'en') -> str:
         """
         إنشاء عقد PDF شامل يتضمن:
@@ -944,6 +947,7 @@ class InvoiceGenerator:
         pdf.output(str(file_path))
         return str(file_path)
 
+    @timed('pdf_generation_seconds', kind='receipt')
     def generate_receipt(self, receipt_id: str, payment_data: dict, summary: dict, user_data: dict) -> str:
         """إنشاء إيصال دفع PDF"""
         filename = f"Receipt-{receipt_id}-{datetime.now().strftime('%Y%m%d%H%M')}.pdf"
@@ -991,6 +995,7 @@ class InvoiceGenerator:
         pdf.output(str(file_path))
         return str(file_path)
 
+    @timed('pdf_generation_seconds', kind='salary')
     def generate_salary_invoice(self, employee_data: dict, month: int, year: int, 
                                  other_deductions: float = 0, has_children: bool = True,
                                  church_tax: bool = False, tax_class: int = 1, lang: str = 'de') -> str:
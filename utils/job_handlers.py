@@ -0,0 +1,114 @@
+"""
+utils/job_handlers.py - الدوال المنفذة لمهام الطابور الخلفي
+SmartCar AI-Dealer
+كل دالة تستقبل JobContext وتعيد قاموساً يُحفظ في jobs.result؛ الملفات الناتجة تُعاد بالمفتاح path
+لتعرضها components/job_status.py كزر تنزيل. الأخطاء العابرة (SMTP، قفل قاعدة البيانات) تُرفع كما هي
+فيعيد الطابور المحاولة، والأخطاء الدائمة ترفع PermanentJobError.
+"""
+
+from utils.i18n import set_language
+from utils.job_queue import JobContext, PermanentJobError, job_handler
+
+
+def _use_language(ctx: JobContext):
+    """المولدات تقرأ اللغة من session_state؛ في العامل تُضبط من لغة الصفحة التي أضافت المهمة"""
+    if ctx.payload.get('lang'):
+        set_language(ctx.payload['lang'])
+
+
+@job_handler('images.variants')
+def render_image_variants(ctx: JobContext) -> dict:
+    """نسخ WebP لصورة معاملة محفوظة (utils/image_store.py)؛ تُضاف بعد حفظ المعاملة بأولوية منخفضة"""
+    from utils.image_store import ensure_variants
+
+    return {'variants': ensure_variants(ctx.payload['image_path'])}
+
+
+@job_handler('invoice.car')
+def generate_car_invoice(ctx: JobContext) -> dict:
+    from utils.invoice_generator import InvoiceGenerator
+
+    _use_language(ctx)
+    ctx.progress(0.1, 'invoice')
+    path = InvoiceGenerator().generate_car_invoice(ctx.payload['transaction'], ctx.payload['user'],
+                                                    ctx.payload.get('invoice_lang', 'Deutsch'))
+    return {'path': path, 'label': 'invoice'}
+
+
+@job_handler('invoice.email')
+def email_car_invoice(ctx: JobContext) -> dict:
+    """توليد فاتورة التقييم (إن لم تُمرر) ثم إرسالها للعميل بالبريد"""
+    from pathlib import Path
+
+    from utils.invoice_generator import InvoiceGenerator
+    from utils.notifier import NotificationManager
+
+    notifier = NotificationManager()
+    if not notifier.email_configured:
+        raise PermanentJobError('Email not configured')
+    user = ctx.payload['user']
+    if not user.get('email'):
+        raise PermanentJobError('Customer has no email address')
+
+    _use_language(ctx)
+    path = ctx.payload.get('invoice_path')
+    if not path or not Path(path).exists():
+        ctx.progress(0.2, 'invoice')
+        path = InvoiceGenerator().generate_car_invoice(ctx.payload['transaction'], user)
+
+    ctx.progress(0.6, 'email')
+    result = notifier.send_invoice_email(recipient_email=user['email'], invoice_path=path, user_data=user,
+                                         transaction_data=ctx.payload['transaction'])
+    if not result['success']:
+        # فشل الاتصال بخادم البريد عابر غالباً: يُعاد المحاولة بتأخير أسي
+        raise RuntimeError(result['message'])
+    return {'path': path, 'label': 'invoice', 'email': user['email']}
+
+
+@job_handler('contract.pdf')
+def generate_contract(ctx: JobContext) -> dict:
+    from utils.invoice_generator import InvoiceGenerator
+
+    _use_language(ctx)
+    ctx.progress(0.1, 'contract')
+    path = InvoiceGenerator().generate_contract(ctx.payload['contract_id'], ctx.payload['contract'],
+                                                ctx.payload['user'], ctx.payload.get('lang', 'de'))
+    return {'path': path, 'label': 'contract'}
+
+
+@job_handler('invoices.installments')
+def generate_installment_invoices(ctx: JobContext) -> dict:
+    from utils.installment_invoice import InstallmentInvoiceGenerator
+
+    _use_language(ctx)
+    ctx.progress(0.1, 'invoices')
+    try:
+        path = InstallmentInvoiceGenerator().generate_all_invoices(ctx.payload['contract_id'])
+    except ValueError as e:
+        # العقد غير موجود: لا فائدة من إعادة المحاولة
+        raise PermanentJobError(str(e)) from e
+    return {'path': path, 'label': 'invoices'}
+
+
+@job_handler('reminders.run')
+def run_reminders(ctx: JobContext) -> dict:
+    from utils.notifier import NotificationManager
+
+    ctx.progress(0.1, 'reminders')
+    return NotificationManager().run_all_reminders()
+
+
+@job_handler('newsletter.send')
+def send_newsletter(ctx: JobContext) -> dict:
+    """إرسال حملة النشرة لكل المشتركين (جلسات SMTP مجمعة)؛ الإخفاقات لكل مستلم تُعاد في النتيجة دون إعادة المحاولة"""
+    from utils.newsletter import Newsletter
+    from utils.notifier import NotificationManager
+
+    if not NotificationManager().email_configured:
+        raise PermanentJobError('Email not configured')
+    ctx.progress(0.1, 'newsletter')
+    try:
+        return Newsletter.send_campaign(ctx.payload['campaign_id'])
+    except ValueError as e:
+        # الحملة محذوفة: لا فائدة من إعادة المحاولة
+        raise PermanentJobError(str(e)) from e
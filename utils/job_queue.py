@@ -0,0 +1,312 @@
+"""
+utils/job_queue.py - طابور المهام الخلفية الدائم (جدول jobs في SQLite)
+SmartCar AI-Dealer
+الصفحات تضيف المهمة (PDF، بريد، تذكيرات) وتعود فوراً، وعملية worker.py المنفصلة تسحب المهام حسب الأولوية
+وتنفذها مع إعادة المحاولة بتأخير أسي، ومفتاح idempotency يمنع تكرار نفس العمل عند إعادة الضغط أو إعادة التشغيل.
+الواجهة تستطلع الحالة والتقدم (components/job_status.py) وتعرض الملف الناتج عند جاهزيته.
+"""
+
+import json
+import os
+import random
+import re
+import socket
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from db_manager import DatabaseManager
+
+# الحالات: queued -> running -> done | failed، أو cancelled في أي وقت قبل الانتهاء
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('done', 'failed', 'cancelled')
+
+# حقول لا تُحفظ في payload (بيانات المستخدم تُمرر كاملة من session_state وفيها كلمة المرور المشفرة)
+_SECRET_FIELD = re.compile(r'password|secret|token|totp', re.IGNORECASE)
+
+# نوع المهمة -> الدالة المنفذة (تُسجَّل في utils/job_handlers.py عبر @job_handler)
+JOB_HANDLERS: Dict[str, Callable[['JobContext'], Any]] = {}
+
+
+class PermanentJobError(Exception):
+    """خطأ لا تفيد معه إعادة المحاولة (بيانات ناقصة، بريد غير مُعد ...) فتفشل المهمة فوراً"""
+
+
+def job_handler(kind: str):
+    """تسجيل دالة منفذة لنوع مهمة"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _now() -> datetime:
+    return datetime.now()
+
+
+def _ts(moment: datetime) -> str:
+    return moment.isoformat(timespec='milliseconds')
+
+
+def _without_secrets(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_secrets(v) for k, v in value.items() if not _SECRET_FIELD.search(str(k))}
+    if isinstance(value, (list, tuple)):
+        return [_without_secrets(v) for v in value]
+    return value
+
+
+def _decode(row) -> Optional[Dict]:
+    if row is None:
+        return None
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'] or '{}')
+    job['result'] = json.loads(job['result']) if job.get('result') else None
+    return job
+
+
+class JobContext:
+    """ما تراه الدالة المنفذة: بيانات المهمة وتحديث التقدم (يجدد heartbeat حتى لا تُعتبر عالقة)"""
+
+    def __init__(self, job: Dict):
+        self.job = job
+        self.job_id = job['id']
+        self.payload = job['payload']
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        DatabaseManager().execute(
+            "UPDATE jobs SET progress = ?, message = COALESCE(?, message), heartbeat_at = ? WHERE id = ? AND status = 'running'",
+            (max(0.0, min(1.0, float(fraction))), message, _ts(_now()), self.job_id))
+
+
+# ===== الإضافة والاستعلام =====
+
+def enqueue(kind: str, payload: Optional[Dict] = None, *, priority: int = 0, idempotency_key: Optional[str] = None,
+            user_id: Optional[int] = None, max_attempts: Optional[int] = None, delay_seconds: float = 0) -> int:
+    """
+    إضافة مهمة وإرجاع رقمها. إذا كان للمفتاح مهمة نشطة أو منتهية بنجاح خلال JOB_IDEMPOTENCY_TTL_SECONDS
+    يُعاد رقمها بدل إضافة مهمة جديدة؛ وإلا (فشلت، أُلغيت، أو نتيجتها قديمة) يُعاد إدراج نفس الصف في الطابور.
+    """
+    now = _now()
+    values = (kind, json.dumps(_without_secrets(payload or {}), default=str, ensure_ascii=False), priority,
+              max_attempts or Config.JOB_MAX_ATTEMPTS, user_id, _ts(now + timedelta(seconds=delay_seconds)), _ts(now))
+    with DatabaseManager().get_connection() as conn:
+        row = conn.execute('''
+            INSERT INTO jobs (kind, payload, priority, max_attempts, user_id, run_after, created_at, idempotency_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(idempotency_key) DO NOTHING RETURNING id
+        ''', values + (idempotency_key,)).fetchone()
+        if row:
+            return row[0]
+
+        existing = conn.execute("SELECT id, status, finished_at FROM jobs WHERE idempotency_key = ?",
+                                (idempotency_key,)).fetchone()
+        fresh_after = _ts(now - timedelta(seconds=Config.JOB_IDEMPOTENCY_TTL_SECONDS))
+        if existing['status'] in ACTIVE_STATUSES or (existing['status'] == 'done' and existing['finished_at'] >= fresh_after):
+            return existing['id']
+        conn.execute('''
+            UPDATE jobs SET kind = ?, payload = ?, priority = ?, max_attempts = ?, user_id = ?, run_after = ?, created_at = ?,
+                status = 'queued', attempts = 0, progress = 0, message = NULL, result = NULL, error = NULL,
+                locked_by = NULL, heartbeat_at = NULL, finished_at = NULL
+            WHERE id = ? AND status = ?
+        ''', values + (existing['id'], existing['status']))
+        return existing['id']
+
+
+def get_job(job_id: int) -> Optional[Dict]:
+    """المهمة مع payload و result مفكوكين من JSON"""
+    return _decode(DatabaseManager().fetch_one("SELECT * FROM jobs WHERE id = ?", (job_id,)))
+
+
+def cancel(job_id: int) -> bool:
+    """إلغاء مهمة لم تنتهِ بعد (المهمة الجارية تكمل لكن نتيجتها لا تُعتمد)"""
+    return DatabaseManager().execute(
+        "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+        (_ts(_now()), job_id)).rowcount > 0
+
+
+def retry(job_id: int) -> bool:
+    """إعادة مهمة فاشلة أو ملغاة إلى الطابور بعدد محاولات جديد"""
+    return DatabaseManager().execute('''
+        UPDATE jobs SET status = 'queued', attempts = 0, progress = 0, message = NULL, error = NULL, result = NULL,
+            run_after = ?, locked_by = NULL, heartbeat_at = NULL, finished_at = NULL
+        WHERE id = ? AND status IN ('failed', 'cancelled')
+    ''', (_ts(_now()), job_id)).rowcount > 0
+
+
+def queue_stats() -> Dict[str, int]:
+    """عدد المهام لكل حالة (للوحة المشرف)"""
+    rows = DatabaseManager().fetch_all("SELECT status, COUNT(*) AS cnt FROM jobs GROUP BY status")
+    return {row['status']: row['cnt'] for row in rows}
+
+
+# ===== التنفيذ =====
+
+def claim_next(worker_id: str, job_id: Optional[int] = None) -> Optional[Dict]:
+    """
+    حجز المهمة التالية الجاهزة (الأعلى أولوية ثم الأقدم) في جملة UPDATE واحدة،
+    فلا يسحب عاملان نفس المهمة. job_id يحجز مهمة محددة (التنفيذ داخل الجلسة).
+    """
+    now = _ts(_now())
+    if job_id is None:
+        target = "(SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY priority DESC, id LIMIT 1)"
+        params = (now,)
+    else:
+        target, params = "?", (job_id,)
+    with DatabaseManager().get_connection() as conn:
+        row = conn.execute(f'''
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = ?, heartbeat_at = ?
+            WHERE id = {target} AND status = 'queued'
+            RETURNING *
+        ''', (worker_id, now) + params).fetchone()
+    return _decode(row)
+
+
+def _retry_delay(attempt: int) -> float:
+    """تأخير أسي مع عشوائية ±20% حتى لا تعود المهام الفاشلة معاً"""
+    return Config.JOB_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+
+
+def run_job(job: Dict, notify: bool = False) -> Optional[Dict]:
+    """تنفيذ مهمة محجوزة وتسجيل النتيجة أو إعادة جدولتها؛ notify يرسل إشعاراً للمستخدم عند الانتهاء"""
+    from utils import job_handlers  # noqa: F401  (تسجيل الدوال المنفذة)
+
+    db = DatabaseManager()
+    logger = Config.logger
+    handler = JOB_HANDLERS.get(job['kind'])
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler registered for job kind '{job['kind']}'")
+        result = handler(JobContext(job))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if not isinstance(e, PermanentJobError) and job['attempts'] < job['max_attempts']:
+            delay = _retry_delay(job['attempts'])
+            db.execute('''
+                UPDATE jobs SET status = 'queued', run_after = ?, error = ?, locked_by = NULL, heartbeat_at = NULL
+                WHERE id = ? AND status = 'running'
+            ''', (_ts(_now() + timedelta(seconds=delay)), error, job['id']))
+            if logger:
+                logger.warning(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed, retry in {delay:.0f}s: {error}")
+        else:
+            db.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                       (error, _ts(_now()), job['id']))
+            if logger:
+                logger.error(f"Job {job['id']} ({job['kind']}) failed: {error}")
+    else:
+        db.execute('''
+            UPDATE jobs SET status = 'done', progress = 1, result = ?, error = NULL, finished_at = ?
+            WHERE id = ? AND status = 'running'
+        ''', (json.dumps(result, default=str, ensure_ascii=False) if result is not None else None, _ts(_now()), job['id']))
+
+    finished = get_job(job['id'])
+    if notify and finished and finished['user_id'] and finished['status'] in ('done', 'failed'):
+        _notify_user(finished)
+    return finished
+
+
+def _notify_user(job: Dict):
+    """إشعار داخل التطبيق (components/notifications_bell.py) لمن غادر الصفحة قبل انتهاء المهمة"""
+    from utils.i18n import t
+
+    if job['status'] == 'done':
+        title, kind = t('jobs.ready_title', 'Your document is ready'), 'success'
+    else:
+        title, kind = t('jobs.failed_title', 'A background job failed'), 'error'
+    message = (job['result'] or {}).get('label') if isinstance(job['result'], dict) else None
+    try:
+        DatabaseManager().execute("INSERT INTO notifications (user_id, title, message, type) VALUES (?, ?, ?, ?)",
+                                  (job['user_id'], title, message or job['kind'], kind))
+    except sqlite3.Error as e:
+        if Config.logger:
+            Config.logger.warning(f"Job {job['id']} notification failed: {e}")
+
+
+def run_inline(job_id: int) -> Optional[Dict]:
+    """تنفيذ مهمة منتظرة داخل العملية الحالية (عند عدم وجود عامل يعمل)"""
+    job = claim_next(f"inline:{os.getpid()}", job_id=job_id)
+    return run_job(job) if job else get_job(job_id)
+
+
+def poll_job(job_id: int) -> Optional[Dict]:
+    """
+    حالة المهمة للواجهة. مهمة منتظرة حان وقتها بلا عامل حي تُنفَّذ هنا
+    (تشمل إعادة المحاولة بعد فشل تنفيذ سابق داخل الجلسة).
+    """
+    job = get_job(job_id)
+    if (job and job['status'] == 'queued' and job['run_after'] <= _ts(_now())
+            and Config.JOB_INLINE_FALLBACK and not workers_alive()):
+        job = run_inline(job_id)
+    return job
+
+
+def submit(kind: str, payload: Optional[Dict] = None, **options) -> int:
+    """
+    enqueue للصفحات: إذا لم يكن هناك عامل حي و JOB_INLINE_FALLBACK مفعّل تُنفَّذ المهمة فوراً داخل الجلسة
+    (السلوك قبل الطابور) بدل بقائها منتظرة بلا نهاية.
+    """
+    job_id = enqueue(kind, payload, **options)
+    if Config.JOB_INLINE_FALLBACK and not workers_alive():
+        run_inline(job_id)
+    return job_id
+
+
+# ===== العمال والصيانة =====
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def heartbeat(worker_id: str, current_job: Optional[int] = None):
+    now = _ts(_now())
+    with DatabaseManager().get_connection() as conn:
+        conn.execute('''
+            INSERT INTO job_workers (worker_id, pid, started_at, heartbeat_at, current_job) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, current_job = excluded.current_job
+        ''', (worker_id, os.getpid(), now, now, current_job))
+        if current_job is not None:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (now, current_job))
+
+
+def unregister_worker(worker_id: str):
+    DatabaseManager().execute("DELETE FROM job_workers WHERE worker_id = ?", (worker_id,))
+
+
+def workers_alive() -> int:
+    """عدد العمال الذين أرسلوا heartbeat خلال JOB_WORKER_TIMEOUT_SECONDS"""
+    cutoff = _ts(_now() - timedelta(seconds=Config.JOB_WORKER_TIMEOUT_SECONDS))
+    return DatabaseManager().fetch_value("SELECT COUNT(*) FROM job_workers WHERE heartbeat_at >= ?", (cutoff,), default=0)
+
+
+def requeue_stale() -> int:
+    """إعادة المهام الجارية التي توقف تحديثها (عامل انهار أو أُوقف) إلى الطابور أو إفشالها إذا استنفدت المحاولات"""
+    cutoff = _ts(_now() - timedelta(seconds=Config.JOB_STALE_SECONDS))
+    now = _ts(_now())
+    with DatabaseManager().get_connection() as conn:
+        requeued = conn.execute('''
+            UPDATE jobs SET status = 'queued', run_after = ?, locked_by = NULL, heartbeat_at = NULL, error = 'worker lost'
+            WHERE status = 'running' AND heartbeat_at < ? AND attempts < max_attempts
+        ''', (now, cutoff)).rowcount
+        failed = conn.execute('''
+            UPDATE jobs SET status = 'failed', finished_at = ?, error = 'worker lost'
+            WHERE status = 'running' AND heartbeat_at < ?
+        ''', (now, cutoff)).rowcount
+        conn.execute("DELETE FROM job_workers WHERE heartbeat_at < ?", (cutoff,))
+    return requeued + failed
+
+
+def purge_finished(retention_days: Optional[int] = None) -> int:
+    """حذف سجلات المهام المنتهية الأقدم من مدة الاحتفاظ (الملفات الناتجة تبقى)"""
+    cutoff = _ts(_now() - timedelta(days=retention_days or Config.JOB_RETENTION_DAYS))
+    return DatabaseManager().execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?", (cutoff,)).rowcount
+
+
+def list_jobs(status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """آخر المهام (اختيارياً حسب الحالة) للعرض"""
+    if status:
+        rows = DatabaseManager().fetch_all("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit))
+    else:
+        rows = DatabaseManager().fetch_all("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+    return [_decode(row) for row in rows]
@@ -2,67 +2,246 @@
 utils/logger.py - نظام السجلات الذكي
 SmartCar AI-Dealer
 إدارة تتبع الأخطاء، مراقبة العمليات، وتوثيق نشاط المستخدمين
+السجلات لا تُكتب في خيط الصفحة أو الطلب: QueueHandler يضعها في طابور محدود دون انتظار،
+وQueueListener يكتبها في خيط مستقل (JSON في app.log + نص في الـ Terminal).
 """
 
+import atexit
+import contextvars
+import itertools
+import json
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
-from pathlib import Path
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
 from config import Config
 
+# معرّف الترابط (Correlation ID): جلسة Streamlit أو طلب API أو مهمة في العامل
+_correlation_id: contextvars.ContextVar[str] = contextvars.ContextVar('correlation_id', default='-')
+
+# حقول LogRecord القياسية؛ ما عداها (extra=...) يُضاف إلى سجل JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'correlation_id',
+                                                                                'sampled'}
+
+_listener: Optional[QueueListener] = None
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def set_correlation_id(value: Optional[str] = None) -> str:
+    """ربط السجلات التالية في هذا الخيط/السياق بمعرّف (يُنشأ معرّف جديد إذا لم يُمرر)"""
+    value = value or new_correlation_id()
+    _correlation_id.set(value)
+    return value
+
+
+def get_correlation_id() -> str:
+    return _correlation_id.get()
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return f"{text[:limit]}… [+{len(text) - limit} chars]"
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    تسجيل سجل واحد من كل N للأحداث الكثيرة (حسب بادئة الرسالة أو extra={'event': ...}).
+    التحذيرات والأخطاء لا تخضع للعينات.
+    """
+
+    def __init__(self, rules: Dict[str, int]):
+        super().__init__()
+        self.rules = {key: every for key, every in rules.items() if every > 1}
+        self._counters = {key: itertools.count() for key in self.rules}
+
+    @staticmethod
+    def parse(spec: str) -> Dict[str, int]:
+        """"[CACHE]=20,[IMG]=10" -> {'[CACHE]': 20, '[IMG]': 10}"""
+        rules = {}
+        for part in spec.split(','):
+            key, _, every = part.strip().rpartition('=')
+            if key and every.strip().isdigit():
+                rules[key.strip()] = int(every)
+        return rules
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rules or record.levelno >= logging.WARNING:
+            return True
+        event = getattr(record, 'event', None)
+        key = event if event in self.rules else next(
+            (prefix for prefix in self.rules if str(record.msg).startswith(prefix)), None)
+        if key is None:
+            return True
+        # itertools.count آمن بين الخيوط في CPython (next ذري)
+        if next(self._counters[key]) % self.rules[key]:
+            return False
+        record.sampled = f"1/{self.rules[key]}"
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    يجهز السجل في خيط المستدعي (دمج المعاملات، الاقتطاع، معرّف الترابط) ثم put_nowait:
+    إذا امتلأ الطابور يُسقط السجل ويُعد بدل أن تنتظر الصفحة خيط الكتابة.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = _truncate(record.getMessage(), self.max_chars)
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.message = message, None, message
+        record.exc_info, record.exc_text = None, _truncate(exc_text, self.max_chars * 4) if exc_text else None
+        record.correlation_id = _correlation_id.get()
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and isinstance(value, str):
+                setattr(record, key, _truncate(value, self.max_chars))
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _SafeQueueListener(QueueListener):
+    """إيقاف آمن عند الخروج حتى لو كان الطابور ممتلئاً (ينتظر قليلاً لتفريغه)"""
+
+    def enqueue_sentinel(self):
+        try:
+            self.queue.put(self._sentinel, timeout=5)
+        except queue.Full:
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    """سطر JSON لكل سجل: الوقت، المستوى، المصدر، الرسالة، معرّف الترابط وحقول extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'correlation_id': getattr(record, 'correlation_id', '-'),
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'sampled', None):
+            entry['sampled'] = record.sampled
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
 def setup_logger(name: str = "SmartCarAI") -> logging.Logger:
     """
     إعداد وتهيئة المسجل (Logger) مع دعم تدوير الملفات (Rotating Files)
-    لمنع امتلاء مساحة التخزين.
+    لمنع امتلاء مساحة التخزين. الكتابة الفعلية تتم في خيط QueueListener.
     """
+    global _listener
+
     # 1. التأكد من وجود مجلد السجلات
     log_dir = Config.LOGS_DIR
     log_dir.mkdir(parents=True, exist_ok=True)
-    
+
     log_file = log_dir / "app.log"
-    
+
     # 2. إنشاء المسجل
     logger = logging.getLogger(name)
-    
+
     # منع تكرار السجلات إذا تم استدعاء الدالة أكثر من مرة
     if logger.hasHandlers():
         return logger
-        
+
     logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
 
     # 3. تنسيق السجلات (Formatter)
-    # [الوقت] [المستوى] [اسم الملف:السطر] الرسالة
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s [%(name)s:%(lineno)d] %(message)s',
+    # [الوقت] [المستوى] [cid] [اسم الملف:السطر] الرسالة
+    text_formatter = logging.Formatter(
+        '[%(asctime)s] %(levelname)s [%(correlation_id)s] [%(name)s:%(lineno)d] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
     # 4. معالج الملفات (File Handler) - تدوير الملف كل 5 ميجابايت والاحتفاظ بـ 5 نسخ
     file_handler = RotatingFileHandler(
-        log_file, 
-        maxBytes=5*1024*1024, 
-        backupCount=5, 
+        log_file,
+        maxBytes=5*1024*1024,
+        backupCount=5,
         encoding='utf-8'
     )
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(JsonFormatter() if Config.LOG_FORMAT == 'json' else text_formatter)
 
     # 5. معالج المنصة (Console Handler) - للعرض في الـ Terminal أثناء التطوير
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(text_formatter)
+
+    # 6. الطابور: المسجل يضع السجلات فقط، والخيط المستقل يكتبها في المعالجين أعلاه
+    log_queue: queue.Queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue, Config.LOG_MAX_FIELD_CHARS)
+    queue_handler.addFilter(SamplingFilter(SamplingFilter.parse(Config.LOG_SAMPLE_EVERY)))
+    logger.addHandler(queue_handler)
+
+    _listener = _SafeQueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    _listener._thread.name = 'log-writer'
+    atexit.register(_stop_listener)
 
     return logger
 
+
+def _stop_listener():
+    """تفريغ الطابور وإغلاق الملفات عند خروج العملية"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def get_log_stats() -> dict:
+    """حالة الطابور: عدد السجلات المنتظرة والسعة وعدد السجلات المُسقطة منذ بدء العملية"""
+    handler = next((h for h in logging.getLogger("SmartCarAI").handlers
+                    if isinstance(h, NonBlockingQueueHandler)), None)
+    if handler is None:
+        return {'queued': 0, 'capacity': 0, 'dropped': 0, 'writer_alive': False}
+    return {
+        'queued': handler.queue.qsize(),
+        'capacity': handler.queue.maxsize,
+        'dropped': handler.dropped,
+        'writer_alive': bool(_listener and _listener._thread and _listener._thread.is_alive()),
+    }
+
 def log_api_failure(provider: str, error_msg: str):
     """وظيفة مخصصة لتسجيل فشل الاتصال بالذكاء الاصطناعي"""
     logger = logging.getLogger("SmartCarAI.API")
-    logger.error(f"⚠️ API Failure | Provider: {provider} | Error: {error_msg}")
+    logger.error(f"⚠️ API Failure | Provider: {provider} | Error: {error_msg}",
+                 extra={'event': 'api_failure', 'provider': provider})
 
 def log_transaction(user_id: int, action: str, details: str):
     """وظيفة مخصصة لتسجيل العمليات المالية المهمة"""
     logger = logging.getLogger("SmartCarAI.Audit")
-    logger.info(f"💰 Transaction | User: {user_id} | Action: {action} | Details: {details}")
+    logger.info(f"💰 Transaction | User: {user_id} | Action: {action} | Details: {details}",
+                extra={'event': 'transaction', 'user_id': user_id, 'action': action})
 
 # تعيين المسجل في Config ليكون متاحاً لجميع الملفات
-Config.logger = setup_logger()
\ No newline at end of file
+Config.logger = setup_logger()
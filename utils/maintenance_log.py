@@ -2,61 +2,29 @@
 utils/maintenance_log.py - Car Maintenance History
 SmartCar AI-Dealer - سجل الصيانة
 """
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 
 
 class MaintenanceLog:
     """Track car maintenance and service history"""
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS maintenance_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id INTEGER NOT NULL,
-                service_type TEXT NOT NULL,
-                description TEXT,
-                cost REAL DEFAULT 0,
-                service_date TEXT,
-                next_service_date TEXT,
-                mechanic TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (transaction_id) REFERENCES transactions(id)
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def add_entry(transaction_id: int, service_type: str, description: str = None,
                   cost: float = 0, service_date: str = None, next_service: str = None, mechanic: str = None):
-        MaintenanceLog._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
+        DatabaseManager().execute("""
             INSERT INTO maintenance_log (transaction_id, service_type, description, cost, service_date, next_service_date, mechanic)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (transaction_id, service_type, description, cost, service_date, next_service, mechanic))
-        conn.commit(); conn.close()
 
     @staticmethod
     def get_history(transaction_id: int) -> list:
-        MaintenanceLog._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM maintenance_log WHERE transaction_id=? ORDER BY service_date DESC",
-                           (transaction_id,)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return DatabaseManager().fetch_all("SELECT * FROM maintenance_log WHERE transaction_id=? ORDER BY service_date DESC",
+                                           (transaction_id,))
 
     @staticmethod
     def get_total_cost(transaction_id: int) -> float:
-        MaintenanceLog._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        row = conn.execute("SELECT COALESCE(SUM(cost),0) FROM maintenance_log WHERE transaction_id=?",
-                          (transaction_id,)).fetchone()
-        conn.close()
-        return row[0] if row else 0
+        return DatabaseManager().fetch_value("SELECT COALESCE(SUM(cost),0) FROM maintenance_log WHERE transaction_id=?",
+                                             (transaction_id,), default=0)
 
     SERVICE_TYPES = ['Ölwechsel', 'Bremsen', 'Reifen', 'Inspektion', 'TÜV/AU',
                      'Karosserie', 'Elektronik', 'Getriebe', 'Motor', 'Klimaanlage', 'Sonstiges']
@@ -2,8 +2,7 @@
 utils/market_compare.py - Market Price Comparison
 SmartCar AI-Dealer - مقارنة أسعار السوق
 """
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 
 
 class MarketComparator:
@@ -13,22 +12,17 @@ class MarketComparator:
     def get_comparison(brand: str, model: str, year: int, mileage: float, estimated_price: float) -> dict:
         """Compare price against similar cars in our database"""
         try:
-            conn = sqlite3.connect(Config.DATABASE_PATH)
-            cursor = conn.cursor()
-            
             # Find similar cars (same brand, ±2 years, ±30k km)
-            cursor.execute("""
-                SELECT estimated_price, mileage, manufacture_year
-                FROM transactions
-                WHERE LOWER(brand) = LOWER(?)
-                AND ABS(manufacture_year - ?) <= 2
-                AND ABS(mileage - ?) <= 30000
-                AND estimated_price > 0
-                AND id NOT IN (SELECT id FROM transactions WHERE estimated_price = ?)
-            """, (brand, year, mileage, estimated_price))
-            
-            similar = cursor.fetchall()
-            conn.close()
+            with DatabaseManager().get_read_connection() as conn:
+                similar = conn.execute("""
+                    SELECT estimated_price, mileage, manufacture_year
+                    FROM transactions
+                    WHERE LOWER(brand) = LOWER(?)
+                    AND ABS(manufacture_year - ?) <= 2
+                    AND ABS(mileage - ?) <= 30000
+                    AND estimated_price > 0
+                    AND id NOT IN (SELECT id FROM transactions WHERE estimated_price = ?)
+                """, (brand, year, mileage, estimated_price)).fetchall()
             
             if not similar:
                 return {
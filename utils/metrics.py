@@ -0,0 +1,395 @@
+"""
+utils/metrics.py - قياس الأداء داخل العملية
+SmartCar AI-Dealer
+عدادات (Counters) ومدرجات تكرارية (Histograms) بحدود ثابتة تُجمع في الذاكرة تحت قفل واحد:
+زمن عرض الصفحات، زمن الاستعلامات وعدد صفوفها، طلبات Groq (الزمن، الرموز، الأخطاء)، إنشاء PDF، إرسال البريد
+وطلبات واجهة API. كل عملية (Streamlit، API، العامل) تكتب لقطة JSON في METRICS_DIR كل METRICS_FLUSH_SECONDS
+من خيط خلفي، وواجهة API تدمج اللقطات وتعرضها في /metrics بصيغة Prometheus النصية.
+"""
+
+import atexit
+import functools
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import Config
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# حدود المدرجات بالثواني (le) - من 1ms حتى دقيقة
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# النوع والوصف لكل مقياس (يظهران في # TYPE و # HELP)
+METRICS = {
+    'page_render_seconds': ('histogram', "Streamlit page render time"),
+    'db_query_seconds': ('histogram', "SQLite statement latency"),
+    'db_query_rows_total': ('counter', "Rows fetched (SELECT) or changed (DML) per statement"),
+    'groq_request_seconds': ('histogram', "Groq chat completion latency per attempt"),
+    'groq_tokens_total': ('counter', "Groq tokens used"),
+    'groq_errors_total': ('counter', "Failed Groq attempts by error type"),
+    'pdf_generation_seconds': ('histogram', "PDF generation time"),
+    'email_send_seconds': ('histogram', "SMTP send time per message"),
+    'api_request_seconds': ('histogram', "Read API request latency"),
+}
+PREFIX = 'smartcar_'
+
+# نص الاستعلام وسم مفيد في لوحة الإدارة لكنه كثير السلاسل لـ Prometheus: يُصدَّر مجمعاً حسب العملية والجدول
+# (أوامر المخطط مثل CREATE / ALTER / PRAGMA تُجمع حسب العملية فقط)
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+([\w.]+)", re.IGNORECASE)
+_DATA_OPS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH'}
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count', 'min', 'max')
+
+    def __init__(self, counts: Optional[List[int]] = None, total: float = 0.0, count: int = 0,
+                 low: float = float('inf'), peak: float = 0.0):
+        self.counts = counts or [0] * (len(LATENCY_BUCKETS) + 1)  # العنصر الأخير = +Inf
+        self.sum, self.count, self.min, self.max = total, count, low, peak
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: '_Histogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> '_Histogram':
+        return _Histogram(list(self.counts), self.sum, self.count, self.min, self.max)
+
+    def quantile(self, q: float) -> float:
+        """تقدير مثل histogram_quantile: استيفاء خطي داخل الشريحة، محصور بين أصغر وأكبر قيمة مرصودة"""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(LATENCY_BUCKETS):
+                    return self.max
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index]
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(self.max, max(self.min, estimate))
+            seen += bucket_count
+        return self.max
+
+
+class _Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+
+    @staticmethod
+    def _overflow(series: dict, labels: LabelKey) -> LabelKey:
+        """حد أقصى للسلاسل لكل مقياس؛ ما بعده يُجمع تحت القيمة 'other'"""
+        if len(series) < Config.METRICS_MAX_SERIES:
+            return labels
+        return tuple((key, 'other') for key, _ in labels)
+
+    def observe(self, name: str, value: float, labels: LabelKey):
+        with self.lock:
+            series = self.histograms.get(name)
+            if series is None:
+                series = self.histograms[name] = {}
+            histogram = series.get(labels)
+            if histogram is None:
+                labels = self._overflow(series, labels)
+                histogram = series.get(labels) or series.setdefault(labels, _Histogram())
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float, labels: LabelKey):
+        with self.lock:
+            series = self.counters.get(name)
+            if series is None:
+                series = self.counters[name] = {}
+            if labels not in series:
+                labels = self._overflow(series, labels)
+            series[labels] = series.get(labels, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'histograms': {name: [[dict(labels), h.counts, h.sum, h.count, h.min, h.max]
+                                      for labels, h in series.items()]
+                               for name, series in self.histograms.items()},
+                'counters': {name: [[dict(labels), value] for labels, value in series.items()]
+                             for name, series in self.counters.items()},
+            }
+
+
+_registry = _Registry()
+_flusher: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+
+
+def _labels(labels: Dict[str, object]) -> LabelKey:
+    if len(labels) == 1:  # المسار الشائع (query=...) دون فرز
+        (key, value), = labels.items()
+        return ((key, value if type(value) is str else str(value)),)
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels):
+    """تسجيل قيمة (بالثواني) في مدرج تكراري"""
+    if Config.METRICS_ENABLED:
+        if _flusher is None:
+            _ensure_flusher()
+        _registry.observe(name, seconds, _labels(labels))
+
+
+def inc(name: str, amount: float = 1, **labels):
+    """زيادة عداد"""
+    if Config.METRICS_ENABLED and amount:
+        if _flusher is None:
+            _ensure_flusher()
+        _registry.inc(name, amount, _labels(labels))
+
+
+@contextmanager
+def timer(name: str, **labels) -> Iterator[None]:
+    """قياس زمن كتلة كود؛ يضيف الوسم outcome = ok / error (استثناءات Exception فقط، لا إشارات Streamlit)"""
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        observe(name, time.perf_counter() - started, outcome=outcome, **labels)
+
+
+def timed(name: str, **labels):
+    """نسخة الـ decorator من timer"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@functools.lru_cache(maxsize=2048)
+def query_label(sql: str) -> str:
+    """شكل الاستعلام كوسم: مسافات موحدة، قوائم ? مختصرة، والقيم الحرفية مستبدلة"""
+    text = ' '.join(sql.split())
+    text = re.sub(r"\?(\s*,\s*\?)+", "?, ...", text)
+    text = re.sub(r"'(?:[^']|'')*'", "'?'", text)
+    text = re.sub(r"(?<![\w.])-?\d+(\.\d+)?\b", "N", text)
+    return text[:200]
+
+
+# ===== اللقطات بين العمليات =====
+
+def _snapshot_path(pid: Optional[int] = None):
+    return Config.METRICS_DIR / f"{pid or os.getpid()}.json"
+
+
+def flush():
+    """كتابة لقطة هذه العملية (ملف مؤقت ثم os.replace حتى لا يقرأ أحد ملفاً نصف مكتوب)"""
+    data = _registry.snapshot()
+    if not data['histograms'] and not data['counters']:
+        return
+    data['pid'], data['written'] = os.getpid(), time.time()
+    path = _snapshot_path()
+    try:
+        Config.METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data), encoding='utf-8')
+        os.replace(tmp, path)
+    except OSError as e:
+        if Config.logger:
+            Config.logger.warning(f"Metrics snapshot failed: {e}")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(Config.METRICS_FLUSH_SECONDS)
+        flush()
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is None:
+        with _flusher_lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+                _flusher.start()
+                atexit.register(flush)
+
+
+def _reset_after_fork():
+    """عملية gunicorn الفرعية تبدأ بمقاييس فارغة وخيط كتابة خاص بها"""
+    global _registry, _flusher, _flusher_lock
+    _registry, _flusher, _flusher_lock = _Registry(), None, threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def collect() -> Tuple[Dict[str, Dict[LabelKey, _Histogram]], Dict[str, Dict[LabelKey, float]]]:
+    """مقاييس هذه العملية (من الذاكرة) مدموجة مع لقطات العمليات الأخرى الحية"""
+    histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+    counters: Dict[str, Dict[LabelKey, float]] = {}
+    snapshots = [_registry.snapshot()]
+    now = time.time()
+    if Config.METRICS_DIR.exists():
+        for path in Config.METRICS_DIR.glob('*.json'):
+            if path == _snapshot_path():
+                continue
+            try:
+                if now - path.stat().st_mtime > Config.METRICS_STALE_SECONDS:
+                    path.unlink(missing_ok=True)  # عملية متوقفة
+                    continue
+                snapshots.append(json.loads(path.read_text(encoding='utf-8')))
+            except (OSError, ValueError):
+                continue
+
+    for data in snapshots:
+        for name, series in data.get('histograms', {}).items():
+            merged = histograms.setdefault(name, {})
+            for labels, counts, total, count, low, peak in series:
+                key = _labels(labels)
+                histogram = _Histogram(list(counts), total, count, low, peak)
+                if key in merged:
+                    merged[key].merge(histogram)
+                else:
+                    merged[key] = histogram
+        for name, series in data.get('counters', {}).items():
+            merged = counters.setdefault(name, {})
+            for labels, value in series:
+                key = _labels(labels)
+                merged[key] = merged.get(key, 0) + value
+    return histograms, counters
+
+
+# ===== التصدير =====
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _query_shape(labels: LabelKey) -> LabelKey:
+    """الوسم query="SELECT ... FROM users ..." يصبح op="SELECT" و table="users" """
+    result = []
+    for key, value in labels:
+        if key == 'query':
+            op = value.split(' ', 1)[0].upper()
+            match = _TABLE_RE.search(value) if op in _DATA_OPS else None
+            result += [('op', op), ('table', match.group(1) if match else '')]
+        else:
+            result.append((key, value))
+    return tuple(sorted(result))
+
+
+def _group_queries(series: dict, merge) -> dict:
+    grouped = {}
+    for labels, value in series.items():
+        key = _query_shape(labels)
+        grouped[key] = merge(grouped[key], value) if key in grouped else value
+    return grouped
+
+
+def render_prometheus() -> str:
+    """كل المقاييس المدموجة بصيغة Prometheus النصية (version 0.0.4)"""
+    histograms, counters = collect()
+
+    def merge_histograms(first: _Histogram, second: _Histogram) -> _Histogram:
+        first.merge(second)
+        return first
+
+    histograms = {name: _group_queries(series, merge_histograms) for name, series in histograms.items()}
+    counters = {name: _group_queries(series, lambda a, b: a + b) for name, series in counters.items()}
+    lines = []
+    for name in sorted(set(histograms) | set(counters)):
+        kind, description = METRICS.get(name, ('histogram' if name in histograms else 'counter', name))
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {description}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in sorted(counters.get(name, {}).items()):
+            lines.append(f"{full}{_format_labels(labels)} {_format_number(value)}")
+        for labels, histogram in sorted(histograms.get(name, {}).items()):
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_number(bound)
+                lines.append(f"{full}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{full}_sum{_format_labels(labels)} {_format_number(histogram.sum)}")
+            lines.append(f"{full}_count{_format_labels(labels)} {histogram.count}")
+    return '\n'.join(lines) + '\n'
+
+
+def summarize(name: str, by: Sequence[str], rows_counter: Optional[str] = None) -> List[dict]:
+    """
+    جدول للوحة الأداء: السلاسل مجمعة حسب الوسوم by مع العدد والمتوسط وp50/p95/p99 والأقصى (بالمللي ثانية)،
+    مرتبة حسب الزمن الكلي. rows_counter يضيف متوسط الصفوف لكل تنفيذ (مثل db_query_rows_total).
+    """
+    histograms, counters = collect()
+    groups: Dict[LabelKey, _Histogram] = {}
+    for labels, histogram in histograms.get(name, {}).items():
+        key = tuple(item for item in labels if item[0] in by)
+        if key in groups:
+            groups[key].merge(histogram)
+        else:
+            groups[key] = histogram.copy()
+
+    rows: Dict[LabelKey, float] = {}
+    for labels, value in counters.get(rows_counter, {}).items():
+        key = tuple(item for item in labels if item[0] in by)
+        rows[key] = rows.get(key, 0) + value
+
+    table = []
+    for key, histogram in groups.items():
+        entry = dict(key)
+        entry.update({
+            'count': histogram.count,
+            'total_s': round(histogram.sum, 3),
+            'avg_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else 0.0,
+            'p50_ms': round(histogram.quantile(0.50) * 1000, 2),
+            'p95_ms': round(histogram.quantile(0.95) * 1000, 2),
+            'p99_ms': round(histogram.quantile(0.99) * 1000, 2),
+            'max_ms': round(histogram.max * 1000, 2),
+        })
+        if rows_counter:
+            entry['avg_rows'] = round(rows.get(key, 0) / histogram.count, 1) if histogram.count else 0.0
+        table.append(entry)
+    return sorted(table, key=lambda entry: entry['total_s'], reverse=True)
+
+
+def counter_totals(name: str, by: Sequence[str]) -> List[dict]:
+    """قيم عداد مجمعة حسب الوسوم by"""
+    _, counters = collect()
+    totals: Dict[LabelKey, float] = {}
+    for labels, value in counters.get(name, {}).items():
+        key = tuple(item for item in labels if item[0] in by)
+        totals[key] = totals.get(key, 0) + value
+    return sorted(({**dict(key), 'value': value} for key, value in totals.items()),
+                  key=lambda entry: entry['value'], reverse=True)
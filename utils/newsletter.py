@@ -2,86 +2,56 @@
 utils/newsletter.py - Newsletter System
 SmartCar AI-Dealer
 """
-import sqlite3
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 from utils.email_templates import EmailTemplates
 
 
 class Newsletter:
     """Manage newsletter subscribers and campaigns"""
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS newsletter (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                name TEXT,
-                subscribed INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS campaigns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                subject TEXT NOT NULL,
-                body TEXT NOT NULL,
-                sent_count INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def subscribe(email: str, name: str = None):
-        Newsletter._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        try:
-            conn.execute("INSERT OR REPLACE INTO newsletter (email, name, subscribed) VALUES (?, ?, 1)", (email, name))
-            conn.commit()
-        finally:
-            conn.close()
+        DatabaseManager().execute("INSERT OR REPLACE INTO newsletter (email, name, subscribed) VALUES (?, ?, 1)", (email, name))
 
     @staticmethod
     def unsubscribe(email: str):
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("UPDATE newsletter SET subscribed=0 WHERE email=?", (email,))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("UPDATE newsletter SET subscribed=0 WHERE email=?", (email,))
 
     @staticmethod
     def get_subscribers() -> list:
-        Newsletter._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM newsletter WHERE subscribed=1 ORDER BY created_at DESC").fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return DatabaseManager().fetch_all("SELECT * FROM newsletter WHERE subscribed=1 ORDER BY created_at DESC")
 
     @staticmethod
     def create_campaign(subject: str, body: str) -> int:
-        Newsletter._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.execute("INSERT INTO campaigns (subject, body) VALUES (?, ?)", (subject, body))
-        campaign_id = cursor.lastrowid
-        conn.commit(); conn.close()
-        return campaign_id
+        cursor = DatabaseManager().execute("INSERT INTO campaigns (subject, body) VALUES (?, ?)", (subject, body))
+        return cursor.lastrowid
+
+    @staticmethod
+    def send_campaign(campaign_id: int) -> dict:
+        """Send a campaign to all subscribers over pooled SMTP sessions (one login per batch, not per mail)"""
+        from utils.notifier import NotificationManager
+
+        db = DatabaseManager()
+        campaign = db.fetch_one("SELECT subject, body FROM campaigns WHERE id=?", (campaign_id,))
+        if not campaign:
+            raise ValueError(f"Campaign {campaign_id} not found")
+        body = EmailTemplates.wrap(campaign['body'])
+        messages = [{'to': sub['email'], 'subject': campaign['subject'], 'body': body, 'is_html': True}
+                    for sub in db.fetch_all("SELECT email FROM newsletter WHERE subscribed=1")]
+        results = NotificationManager().send_bulk(messages)
+        sent = sum(1 for r in results if r['success'])
+        db.execute("UPDATE campaigns SET sent_count = sent_count + ? WHERE id=?", (sent, campaign_id))
+        return {'sent': sent, 'failed': len(results) - sent,
+                'errors': [f"{r['recipient']}: {r['error']}" for r in results if not r['success']]}
 
     @staticmethod
     def get_campaigns() -> list:
-        Newsletter._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM campaigns ORDER BY created_at DESC LIMIT 20").fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return DatabaseManager().fetch_all("SELECT * FROM campaigns ORDER BY created_at DESC LIMIT 20")
 
     @staticmethod
     def get_stats() -> dict:
-        Newsletter._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        total = conn.execute("SELECT COUNT(*) FROM newsletter WHERE subscribed=1").fetchone()[0]
-        campaigns = conn.execute("SELECT COUNT(*) FROM campaigns").fetchone()[0]
-        conn.close()
+        db = DatabaseManager()
+        total = db.fetch_value("SELECT COUNT(*) FROM newsletter WHERE subscribed=1", default=0)
+        campaigns = db.fetch_value("SELECT COUNT(*) FROM campaigns", default=0)
         return {'subscribers': total, 'campaigns': campaigns}
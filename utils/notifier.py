@@ -4,12 +4,13 @@ SmartCar AI-Dealer
 إدارة تنبيهات النظام، رسائل البريد الإلكتروني، وإشعارات واجهة المستخدم
 """
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from typing import Dict, List, Optional
 import streamlit as st
 from config import Config
+from utils.smtp_pool import get_smtp_pool
 
 class NotificationManager:
     """مسؤول عن إرسال الإشعارات عبر قنوات مختلفة (Email, UI, System)"""
@@ -24,8 +25,32 @@ class NotificationManager:
 
     @property
     def email_configured(self) -> bool:
-        """التحقق من صحة إعدادات البريد الإلكتروني"""
-        return bool(self.sender_email and self.sender_password and self.smtp_server)
+        """التحقق من صحة إعدادات البريد الإلكتروني (خادم محلي بدون تشفير لا يحتاج كلمة مرور)"""
+        return bool(self.sender_email and self.smtp_server
+                    and (self.sender_password or Config.SMTP_SECURITY == 'none'))
+
+    def _build_message(self, recipient_email: str, subject: str, body: str, is_html: bool = False) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = f"{Config.SENDER_NAME} <{self.sender_email}>"
+        msg['To'] = recipient_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
+        return msg
+
+    def send_bulk(self, messages: List[Dict]) -> List[Dict]:
+        """
+        إرسال دفعة رسائل [{'to', 'subject', 'body', 'is_html'}] عبر جلسة SMTP واحدة من المجمع.
+        تعيد نتيجة لكل رسالة بنفس الترتيب: {'recipient', 'success', 'error'}؛ فشل مستلم لا يوقف الباقي.
+        """
+        if not self.email_configured:
+            if self.logger: self.logger.warning("⚠️ إعدادات SMTP غير مكتملة. لم يتم إرسال البريد.")
+            return [{'recipient': m['to'], 'success': False, 'error': 'Email not configured'} for m in messages]
+        results = get_smtp_pool().send_batch(
+            self._build_message(m['to'], m['subject'], m['body'], m.get('is_html', False)) for m in messages)
+        if self.logger:
+            sent = sum(1 for r in results if r['success'])
+            self.logger.info(f"📧 دفعة بريد: {sent}/{len(results)} رسالة أُرسلت")
+        return results
 
     def send_invoice_email(self, recipient_email: str, invoice_path: str, user_data: dict, transaction_data: dict) -> dict:
         """إرسال الفاتورة مع المرفق"""
@@ -46,11 +71,7 @@ class NotificationManager:
             <p>{self.app_name}</p>
             """
             
-            msg = MIMEMultipart()
-            msg['From'] = f"{Config.SENDER_NAME} <{self.sender_email}>"
-            msg['To'] = recipient_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'html'))
+            msg = self._build_message(recipient_email, subject, body, is_html=True)
 
             # إرفاق ملف الفاتورة
             path = Path(invoice_path)
@@ -62,11 +83,9 @@ class NotificationManager:
             else:
                 return {'success': False, 'message': 'Invoice file not found'}
 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-
+            result = get_smtp_pool().send(msg)
+            if not result['success']:
+                return {'success': False, 'message': result['error']}
             return {'success': True, 'message': 'Email sent successfully'}
 
         except Exception as e:
@@ -75,23 +94,16 @@ class NotificationManager:
 
     def send_email(self, recipient_email: str, subject: str, body: str, is_html: bool = False) -> bool:
         """إرسال رسالة بريد إلكتروني رسمية"""
-        if not self.sender_email or not self.sender_password:
+        if not self.email_configured:
             if self.logger: self.logger.warning("⚠️ إعدادات SMTP غير مكتملة. لم يتم إرسال البريد.")
             return False
 
         try:
-            msg = MIMEMultipart()
-            msg['From'] = f"{Config.SENDER_NAME} <{self.sender_email}>"
-            msg['To'] = recipient_email
-            msg['Subject'] = subject
-
-            content_type = 'html' if is_html else 'plain'
-            msg.attach(MIMEText(body, content_type))
-
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # تأمين الاتصال
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
+            # جلسة مسجلة الدخول من المجمع بدل اتصال + STARTTLS + login لكل رسالة
+            result = get_smtp_pool().send(self._build_message(recipient_email, subject, body, is_html))
+            if not result['success']:
+                if self.logger: self.logger.error(f"❌ فشل إرسال البريد الإلكتروني: {result['error']}")
+                return False
             
             if self.logger: self.logger.info(f"📧 تم إرسال بريد بنجاح إلى: {recipient_email}")
             return True
@@ -161,9 +173,16 @@ class NotificationManager:
 
     def send_installment_reminder(self, installment_data: dict) -> bool:
         """إرسال تذكير بالقسط عبر البريد الإلكتروني"""
+        message = self._installment_reminder_message(installment_data)
+        if message is None:
+            return False
+        return self.send_email(message['to'], message['subject'], message['body'], is_html=True)
+
+    def _installment_reminder_message(self, installment_data: dict) -> Optional[Dict]:
+        """رسالة تذكير القسط (لـ send_bulk) أو None إذا لم يكن للعميل بريد"""
         email = installment_data.get('email', '')
         if not email:
-            return False
+            return None
         
         name = installment_data.get('full_name') or f"{installment_data.get('first_name', '')} {installment_data.get('last_name', '')}".strip()
         amount = installment_data.get('amount_due', 0)
@@ -192,7 +211,7 @@ class NotificationManager:
             </div>
         </div>
         """
-        return self.send_email(email, subject, body, is_html=True)
+        return {'to': email, 'subject': subject, 'body': body, 'is_html': True}
 
     def check_tuv_expiry(self, days_ahead: int = 30) -> list:
         """فحص السيارات التي ينتهي فحصها TÜV خلال عدد أيام محدد"""
@@ -259,10 +278,15 @@ class NotificationManager:
         # Installment reminders
         upcoming = self.check_upcoming_installments(days_ahead=7)
         results['installments_found'] = len(upcoming)
-        for inst in upcoming:
+        # كل التذكيرات في دفعة واحدة على جلسة SMTP واحدة بدل اتصال وتسجيل دخول لكل رسالة
+        messages = [m for m in (self._installment_reminder_message(inst) for inst in upcoming) if m]
+        if messages:
             try:
-                if self.send_installment_reminder(inst):
-                    results['installments_sent'] += 1
+                for sent in self.send_bulk(messages):
+                    if sent['success']:
+                        results['installments_sent'] += 1
+                    else:
+                        results['errors'].append(f"{sent['recipient']}: {sent['error']}")
             except Exception as e:
                 results['errors'].append(str(e))
         
@@ -4,6 +4,7 @@ SmartCar AI-Dealer
 استخراج البيانات من الهويات ورخص القيادة باستخدام رؤية الحاسوب
 """
 
+from typing import Tuple
 from groq_base import GroqBaseClient
 
 class DocumentScanner(GroqBaseClient):
@@ -30,7 +31,7 @@ class DocumentScanner(GroqBaseClient):
 
         try:
             # استخدام العميل الأساسي لإرسال الصورة
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {
@@ -40,7 +41,7 @@ class DocumentScanner(GroqBaseClient):
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{self._encode_image(image_bytes)}"
+                                    "url": self._image_data_url(image_bytes)
                                 },
                             },
                         ],
@@ -84,13 +85,13 @@ class DocumentScanner(GroqBaseClient):
         Return ONLY the JSON object.
         """
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[{
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{self._encode_image(image_bytes)}"}}
+                        {"type": "image_url", "image_url": {"url": self._image_data_url(image_bytes)}}
                     ]
                 }]
             )
@@ -98,6 +99,14 @@ class DocumentScanner(GroqBaseClient):
         except Exception as e:
             return {"error": str(e)}
 
+    def scan_id_card_sides(self, front_bytes: bytes, back_bytes: bytes) -> Tuple[dict, dict]:
+        """مسح وجهي بطاقة الهوية بالتوازي: (نتيجة الأمام، نتيجة الخلف)"""
+        results = self.run_concurrently({
+            'front': lambda: self.scan_id_card(front_bytes),
+            'back': lambda: self.scan_id_card(back_bytes),
+        })
+        return results['front'], results['back']
+
     def scan_driver_license(self, image_bytes: bytes) -> dict:
         """مسح رخصة القيادة واستخراج البيانات"""
         prompt = """
@@ -116,16 +125,24 @@ class DocumentScanner(GroqBaseClient):
         Return ONLY the JSON object.
         """
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[{
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{self._encode_image(image_bytes)}"}}
+                        {"type": "image_url", "image_url": {"url": self._image_data_url(image_bytes)}}
                     ]
                 }]
             )
             return self._parse_json_response(response.choices[0].message.content)
         except Exception as e:
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    def scan_driver_license_sides(self, front_bytes: bytes, back_bytes: bytes) -> Tuple[dict, dict]:
+        """مسح وجهي رخصة القيادة بالتوازي: (نتيجة الأمام، نتيجة الخلف)"""
+        results = self.run_concurrently({
+            'front': lambda: self.scan_driver_license(front_bytes),
+            'back': lambda: self.scan_driver_license(back_bytes),
+        })
+        return results['front'], results['back']
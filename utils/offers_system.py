@@ -2,34 +2,14 @@
 utils/offers_system.py - Special Offers & Discount Codes
 SmartCar AI-Dealer - نظام العروض والخصومات
 """
-import sqlite3, string, random
+import string, random
 from datetime import datetime
-from config import Config
+from db_manager import DatabaseManager
 
 
 class OffersSystem:
     """Manage special offers and discount codes"""
 
-    @staticmethod
-    def _ensure_table():
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS offers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                code TEXT UNIQUE NOT NULL,
-                description TEXT,
-                discount_type TEXT DEFAULT 'percentage',
-                discount_value REAL NOT NULL,
-                max_uses INTEGER DEFAULT 1,
-                current_uses INTEGER DEFAULT 0,
-                valid_from TEXT,
-                valid_until TEXT,
-                active INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit(); conn.close()
-
     @staticmethod
     def generate_code(length=8) -> str:
         chars = string.ascii_uppercase + string.digits
@@ -38,24 +18,17 @@ class OffersSystem:
     @staticmethod
     def create_offer(description: str, discount_type: str, discount_value: float,
                      max_uses: int = 1, valid_until: str = None, code: str = None) -> str:
-        OffersSystem._ensure_table()
         if not code:
             code = OffersSystem.generate_code()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("""
+        DatabaseManager().execute("""
             INSERT INTO offers (code, description, discount_type, discount_value, max_uses, valid_until)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (code, description, discount_type, discount_value, max_uses, valid_until))
-        conn.commit(); conn.close()
         return code
 
     @staticmethod
     def validate_code(code: str) -> dict:
-        OffersSystem._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        offer = conn.execute("SELECT * FROM offers WHERE code=? AND active=1", (code,)).fetchone()
-        conn.close()
+        offer = DatabaseManager().fetch_one("SELECT * FROM offers WHERE code=? AND active=1", (code,))
         
         if not offer:
             return {'valid': False, 'error': 'Invalid code'}
@@ -85,9 +58,7 @@ class OffersSystem:
         final_price = max(0, original_price - discount)
         
         # Increment usage
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("UPDATE offers SET current_uses = current_uses + 1 WHERE code=?", (code,))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("UPDATE offers SET current_uses = current_uses + 1 WHERE code=?", (code,))
         
         return {
             'valid': True,
@@ -99,9 +70,4 @@ class OffersSystem:
 
     @staticmethod
     def get_all_offers() -> list:
-        OffersSystem._ensure_table()
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM offers ORDER BY created_at DESC").fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return DatabaseManager().fetch_all("SELECT * FROM offers ORDER BY created_at DESC")
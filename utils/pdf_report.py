@@ -5,11 +5,14 @@ SmartCar AI-Dealer
 import io
 from datetime import datetime
 
+from utils.metrics import timed
+
 
 class PDFReportGenerator:
     """Generate professional PDF reports with charts data"""
 
     @staticmethod
+    @timed('pdf_generation_seconds', kind='summary_report')
     def generate_summary_report() -> bytes:
         from reportlab.lib.pagesizes import A4
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -5,8 +5,42 @@ SmartCar AI-Dealer
 يدعم السيارات الجديدة والمستعملة - متوافق مع معايير السوق الألماني (DAT/Schwacke)
 """
 
+from typing import Callable, Dict, Mapping, Union
+
+import numpy as np
+import pandas as pd
+
 from config import Config
 
+# ترتيب ضرب المعاملات في المعادلة النهائية (نفس الترتيب في المسارين الفردي والمجمّع لتطابق النتائج)
+FACTOR_ORDER = (
+    'base_price', 'weighted_core', 'brand_factor', 'fuel_factor', 'transmission_factor',
+    'drivetrain_factor', 'color_factor', 'emissions_factor', 'engine_size_factor', 'hp_factor',
+    'owner_penalty', 'maintenance_bonus', 'tuv_factor', 'warranty_factor', 'accident_factor',
+    'service_book_factor', 'equipment_bonus',
+)
+
+# المعاملات الفئوية: (العمود، القيمة الافتراضية عند غيابه، دالة المعامل لقيمة واحدة)
+# الدالة هي نفسها المستخدمة في المسار الفردي، وتُستدعى مرة واحدة لكل قيمة مميزة في الدفعة
+CATEGORICAL_FACTORS = {
+    'base_price': ('car_type', 'sedan', lambda v: Config.get_base_price(v)),
+    'brand_factor': ('brand', 'other', lambda v: Config.get_brand_factor(v)),
+    'fuel_factor': ('fuel_type', '', lambda v: Config.get_factor(Config.FUEL_FACTORS, v) if v else 1.0),
+    'transmission_factor': ('transmission', '', lambda v: Config.get_transmission_factor(v) if v else 1.0),
+    'drivetrain_factor': ('drivetrain', '', lambda v: Config.get_drivetrain_factor(v) if v else 1.0),
+    'color_factor': ('color', '', lambda v: Config.get_color_factor(v) if v else 1.0),
+    'emissions_factor': ('emissions_class', '', lambda v: Config.get_emissions_factor(v) if v else 1.0),
+    'engine_size_factor': ('engine_cc', 0, lambda v: Config.get_engine_size_factor(int(v)) if int(v) > 0 else 1.0),
+    'hp_factor': ('horsepower', 0, lambda v: Config.get_horsepower_factor(int(v)) if int(v) > 0 else 1.0),
+    'maintenance_bonus': ('maintenance', False, lambda v: 1.05 if v else 1.0),
+    'warranty_factor': ('warranty', '', lambda v: Config.get_warranty_factor(v) if v else 1.0),
+    'accident_factor': ('accident_history', '', lambda v: Config.get_accident_factor(v) if v else 1.0),
+    'service_book_factor': ('service_book', '', lambda v: Config.get_service_book_factor(v) if v else 1.0),
+}
+
+Batch = Union[pd.DataFrame, Mapping[str, object]]
+
+
 class PricePredictor:
     """محرك التسعير المتقدم - يدمج جميع العوامل المؤثرة في قيمة السيارة"""
 
@@ -29,12 +63,22 @@ class PricePredictor:
         
         العوامل غير المتوفرة تأخذ القيمة الافتراضية 1.0 (لا تأثير)
         """
-        # ======= المرحلة 1: البيانات الأساسية =======
-        car_type = analysis_data.get('car_type', 'sedan')
-        brand = analysis_data.get('brand', 'other')
+        factors = self._price_factors(analysis_data)
+
+        # ======= المرحلة 5: المعادلة النهائية =======
+        final_price = factors['base_price']
+        for name in FACTOR_ORDER[1:]:
+            final_price = final_price * factors[name]
 
-        base_price = Config.get_base_price(car_type)
-        brand_factor = Config.get_brand_factor(brand)
+        return round(final_price, 2)
+
+    def _price_factors(self, analysis_data: dict) -> Dict[str, float]:
+        """حساب كل معاملات المعادلة لسيارة واحدة (بأسماء FACTOR_ORDER)"""
+        # ======= المرحلة 1: البيانات الأساسية =======
+        factors = {
+            name: func(analysis_data.get(column, default))
+            for name, (column, default, func) in CATEGORICAL_FACTORS.items()
+        }
 
         # ======= المرحلة 2: النواة المرجحة (Condition + Mileage + Age) =======
         
@@ -71,94 +115,164 @@ class PricePredictor:
             a = max(0.10, 0.20 - ((age - 10) * 0.02))
 
         # النواة المرجحة
-        weighted_core = (self.w_condition * c) + (self.w_mileage * m) + (self.w_age * a)
+        factors['weighted_core'] = (self.w_condition * c) + (self.w_mileage * m) + (self.w_age * a)
 
         # ======= المرحلة 3: المعاملات الإضافية (Additional Factors) =======
+        # الصيانة (+5%)، الوقود، ناقل الحركة، الدفع، اللون، الانبعاثات، حجم وقوة المحرك، الحوادث،
+        # الضمان، دفتر الصيانة والتجهيزات: من CATEGORICAL_FACTORS أعلاه
 
         # 3A. معامل الملاك (Owners Factor) — خصم 2% لكل مالك إضافي
         owners = int(analysis_data.get('owners', 1))
-        owner_penalty = max(0.7, 1.0 - (max(0, owners - 1) * 0.02))
-
-        # 3B. معامل الصيانة (Maintenance Factor) — +5% للصيانة المنتظمة
-        has_maintenance = analysis_data.get('maintenance', False)
-        maintenance_bonus = 1.05 if has_maintenance else 1.0
+        factors['owner_penalty'] = max(0.7, 1.0 - (max(0, owners - 1) * 0.02))
 
-        # 3C. معامل التوف (TÜV Factor)
+        # 3B. معامل التوف (TÜV Factor)
         tuv_months = int(analysis_data.get('tuv_months', 12))
         tuv_factor = 1.0
         if tuv_months > 12:
             tuv_factor = 1.02
         elif tuv_months < 3:
             tuv_factor = 0.97
+        factors['tuv_factor'] = tuv_factor
 
-        # 3D. معامل نوع الوقود (Fuel Factor)
-        fuel_type = analysis_data.get('fuel_type', '')
-        fuel_factor = Config.get_factor(Config.FUEL_FACTORS, fuel_type) if fuel_type else 1.0
-
-        # ======= المرحلة 4: المعاملات الجديدة المتقدمة =======
-
-        # 4A. ناقل الحركة (Transmission)
-        transmission = analysis_data.get('transmission', '')
-        transmission_factor = Config.get_transmission_factor(transmission) if transmission else 1.0
-
-        # 4B. نظام الدفع (Drivetrain)
-        drivetrain = analysis_data.get('drivetrain', '')
-        drivetrain_factor = Config.get_drivetrain_factor(drivetrain) if drivetrain else 1.0
+        # 3C. التجهيزات الإضافية (Equipment Bonuses)
+        equipment = analysis_data.get('equipment', [])
+        factors['equipment_bonus'] = Config.calculate_equipment_bonus(equipment) if equipment else 1.0
 
-        # 4C. اللون (Color)
-        color = analysis_data.get('color', '')
-        color_factor = Config.get_color_factor(color) if color else 1.0
+        return factors
 
-        # 4D. فئة الانبعاثات (Emissions Class)
-        emissions = analysis_data.get('emissions_class', '')
-        emissions_factor = Config.get_emissions_factor(emissions) if emissions else 1.0
+    # ===== التسعير المجمّع (Vectorized Batch Pricing) =====
 
-        # 4E. حجم المحرك (Engine Size CC)
-        engine_cc = int(analysis_data.get('engine_cc', 0))
-        engine_size_factor = Config.get_engine_size_factor(engine_cc) if engine_cc > 0 else 1.0
+    def predict_prices(self, batch: Batch) -> np.ndarray:
+        """
+        تسعير دفعة سيارات دفعة واحدة (إعادة تسعير المخزون، استيراد CSV).
+        batch: DataFrame أو قاموس أعمدة (مصفوفات NumPy / قوائم) بنفس مفاتيح predict_price؛
+        العمود الغائب أو القيمة الفارغة (None / NaN) تأخذ القيمة الافتراضية للمسار الفردي.
+        النتيجة مطابقة تماماً لـ predict_price لكل صف (نفس العمليات بنفس الترتيب).
+        """
+        size = self._batch_size(batch)
 
-        # 4F. قوة المحرك (Horsepower)
-        horsepower = int(analysis_data.get('horsepower', 0))
-        hp_factor = Config.get_horsepower_factor(horsepower) if horsepower > 0 else 1.0
+        # المعاملات الفئوية: ترميز كل قيمة مميزة مرة واحدة ثم فهرسة جدول البحث
+        factors = {
+            name: self._lookup(self._column(batch, column), func, default, size)
+            for name, (column, default, func) in CATEGORICAL_FACTORS.items()
+        }
 
-        # 4G. تاريخ الحوادث (Accident History)
-        accident = analysis_data.get('accident_history', '')
-        accident_factor = Config.get_accident_factor(accident) if accident else 1.0
+        c = self._numeric(batch, 'condition_score', 0.8, size)
+        mileage = self._integer(batch, 'mileage', 50000, size)
+        year = self._integer(batch, 'manufacture_year', self.current_year, size)
+        owners = self._integer(batch, 'owners', 1, size)
+        tuv_months = self._integer(batch, 'tuv_months', 12, size)
+
+        # منحنى الممشى (نفس شرائح predict_price)
+        m = np.select(
+            [mileage < 30000, mileage < 60000, mileage < 120000, mileage < 200000],
+            [
+                0.95,
+                np.maximum(0.65, 1.0 - ((mileage - 30000) / 300000)),
+                np.maximum(0.40, 0.65 - ((mileage - 60000) * 0.000012)),
+                np.maximum(0.20, 0.40 - ((mileage - 120000) * 0.000020)),
+            ],
+            0.15,
+        )
 
-        # 4H. الضمان المتبقي (Remaining Warranty)
-        warranty = analysis_data.get('warranty', '')
-        warranty_factor = Config.get_warranty_factor(warranty) if warranty else 1.0
+        # منحنى العمر
+        age = np.maximum(0, self.current_year - year)
+        a = np.select(
+            [age == 0, age == 1, age <= 3, age <= 5, age <= 10],
+            [
+                1.0,
+                0.75,
+                np.maximum(0.50, 0.75 - ((age - 1) * 0.125)),
+                np.maximum(0.35, 0.50 - ((age - 3) * 0.075)),
+                np.maximum(0.20, 0.35 - ((age - 5) * 0.03)),
+            ],
+            np.maximum(0.10, 0.20 - ((age - 10) * 0.02)),
+        )
 
-        # 4I. دفتر الصيانة (Service Book)
-        service_book = analysis_data.get('service_book', '')
-        service_book_factor = Config.get_service_book_factor(service_book) if service_book else 1.0
+        factors['weighted_core'] = (self.w_condition * c) + (self.w_mileage * m) + (self.w_age * a)
+        factors['owner_penalty'] = np.maximum(0.7, 1.0 - (np.maximum(0, owners - 1) * 0.02))
+        factors['tuv_factor'] = np.where(tuv_months > 12, 1.02, np.where(tuv_months < 3, 0.97, 1.0))
+        factors['equipment_bonus'] = self._equipment_bonus(self._column(batch, 'equipment'), size)
 
-        # 4J. التجهيزات الإضافية (Equipment Bonuses)
-        equipment = analysis_data.get('equipment', [])
-        equipment_bonus = Config.calculate_equipment_bonus(equipment) if equipment else 1.0
+        final_price = factors['base_price'].astype(np.float64)
+        for name in FACTOR_ORDER[1:]:
+            final_price = final_price * factors[name]
 
-        # ======= المرحلة 5: المعادلة النهائية =======
-        final_price = (
-            base_price
-            * weighted_core
-            * brand_factor
-            * fuel_factor
-            * transmission_factor
-            * drivetrain_factor
-            * color_factor
-            * emissions_factor
-            * engine_size_factor
-            * hp_factor
-            * owner_penalty
-            * maintenance_bonus
-            * tuv_factor
-            * warranty_factor
-            * accident_factor
-            * service_book_factor
-            * equipment_bonus
-        )
+        return self._round_prices(final_price)
 
-        return round(final_price, 2)
+    @staticmethod
+    def _round_prices(prices: np.ndarray) -> np.ndarray:
+        """
+        round(x, 2) لكل عنصر: rint(x*100)/100 يطابقها تماماً إلا قرب منتصف السنت
+        (خطأ ضرب x*100)، وهذه الحالات النادرة تُحسب بـ round() نفسها
+        """
+        scaled = prices * 100
+        rounded = np.rint(scaled) / 100
+        near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= np.abs(scaled) * 1e-12 + 1e-9
+        for i in np.flatnonzero(near_tie):
+            rounded[i] = round(float(prices[i]), 2)
+        return rounded
+
+    @staticmethod
+    def _batch_size(batch: Batch) -> int:
+        if isinstance(batch, pd.DataFrame):
+            return len(batch)
+        sizes = {len(values) for values in batch.values()}
+        if len(sizes) > 1:
+            raise ValueError(f"All batch columns must have the same length, got {sorted(sizes)}")
+        return sizes.pop() if sizes else 0
+
+    @staticmethod
+    def _column(batch: Batch, name: str):
+        if isinstance(batch, pd.DataFrame):
+            return batch[name] if name in batch.columns else None
+        return batch.get(name)
+
+    @staticmethod
+    def _lookup(values, func: Callable, default, size: int) -> np.ndarray:
+        """جدول بحث: func لكل قيمة مميزة ثم فهرسة الأكواد (القيم الفارغة = func(default))"""
+        if values is None:
+            return np.full(size, func(default))
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object) if isinstance(values, list) else values,
+                                      use_na_sentinel=True)
+        table = np.array([func(u) for u in uniques] + [func(default)])
+        return table[codes]
+
+    @staticmethod
+    def _equipment_bonus(values, size: int) -> np.ndarray:
+        """
+        مكافأة التجهيزات لكل صف: مكافأة كل عنصر من جدول بحث، ثم الجمع حسب موضع العنصر في القائمة
+        (نفس ترتيب الجمع في calculate_equipment_bonus، والحشو بـ 0.0 لا يغيّر المجموع)
+        """
+        if values is None:
+            return np.ones(size)
+        items = pd.Series(values, dtype=object, index=range(size)).explode()
+        items = items[items.notna()]
+        if items.empty:
+            return np.ones(size)
+        codes, uniques = pd.factorize(items)
+        item_bonus = np.array([Config.EQUIPMENT_BONUSES.get(u.lower().strip().replace(" ", "_"), 0.0) for u in uniques])
+
+        rows = items.index.to_numpy()
+        positions = items.groupby(level=0).cumcount().to_numpy()
+        bonuses = np.zeros((size, positions.max() + 1))
+        bonuses[rows, positions] = item_bonus[codes]
+
+        total = np.zeros(size)
+        for column in bonuses.T:
+            total = total + column
+        return 1.0 + np.minimum(total, 0.25)
+
+    def _numeric(self, batch: Batch, name: str, default: float, size: int) -> np.ndarray:
+        values = self._column(batch, name)
+        if values is None:
+            return np.full(size, float(default))
+        values = np.asarray(pd.to_numeric(values, errors='raise'), dtype=np.float64)
+        return np.where(np.isnan(values), float(default), values)
+
+    def _integer(self, batch: Batch, name: str, default: int, size: int) -> np.ndarray:
+        """مثل int() في المسار الفردي: القيم العشرية تُقتطع نحو الصفر"""
+        return np.trunc(self._numeric(batch, name, default, size)).astype(np.int64)
 
     def get_price_range(self, estimated_price: float) -> tuple:
         """إرجاع نطاق سعري (هامش 5%) لتقديم عرض مرن للعميل"""
@@ -173,51 +287,54 @@ class PricePredictor:
         """
         car_type = analysis_data.get('car_type', 'sedan')
         brand = analysis_data.get('brand', 'other')
-        base_price = Config.get_base_price(car_type)
-        
+        factors = self._price_factors(analysis_data)
+
         breakdown = {
-            "base_price": base_price,
+            "base_price": factors['base_price'],
             "brand": brand,
-            "brand_factor": Config.get_brand_factor(brand),
+            "brand_factor": factors['brand_factor'],
             "car_type": car_type,
         }
 
         # إضافة كل العوامل المتوفرة
         factor_map = {
-            "transmission": ("transmission", Config.get_transmission_factor),
-            "drivetrain": ("drivetrain", Config.get_drivetrain_factor),
-            "color": ("color", Config.get_color_factor),
-            "emissions_class": ("emissions_class", Config.get_emissions_factor),
-            "accident_history": ("accident_history", Config.get_accident_factor),
-            "warranty": ("warranty", Config.get_warranty_factor),
-            "service_book": ("service_book", Config.get_service_book_factor),
+            "transmission": ("transmission", 'transmission_factor'),
+            "drivetrain": ("drivetrain", 'drivetrain_factor'),
+            "color": ("color", 'color_factor'),
+            "emissions_class": ("emissions_class", 'emissions_factor'),
+            "accident_history": ("accident_history", 'accident_factor'),
+            "warranty": ("warranty", 'warranty_factor'),
+            "service_book": ("service_book", 'service_book_factor'),
         }
 
-        for data_key, (display_key, getter) in factor_map.items():
+        for data_key, (display_key, factor_name) in factor_map.items():
             value = analysis_data.get(data_key, '')
             if value:
                 breakdown[f"{display_key}_value"] = value
-                breakdown[f"{display_key}_factor"] = getter(value)
+                breakdown[f"{display_key}_factor"] = factors[factor_name]
 
         # العوامل العددية
         engine_cc = int(analysis_data.get('engine_cc', 0))
         if engine_cc > 0:
             breakdown["engine_cc"] = engine_cc
-            breakdown["engine_size_factor"] = Config.get_engine_size_factor(engine_cc)
+            breakdown["engine_size_factor"] = factors['engine_size_factor']
 
         horsepower = int(analysis_data.get('horsepower', 0))
         if horsepower > 0:
             breakdown["horsepower"] = horsepower
-            breakdown["horsepower_factor"] = Config.get_horsepower_factor(horsepower)
+            breakdown["horsepower_factor"] = factors['hp_factor']
 
         # التجهيزات
         equipment = analysis_data.get('equipment', [])
         if equipment:
             breakdown["equipment_list"] = equipment
-            breakdown["equipment_bonus"] = Config.calculate_equipment_bonus(equipment)
+            breakdown["equipment_bonus"] = factors['equipment_bonus']
 
-        # السعر النهائي
-        breakdown["final_price"] = self.predict_price(analysis_data)
+        # السعر النهائي (من نفس المعاملات بدون إعادة حسابها)
+        final_price = factors['base_price']
+        for name in FACTOR_ORDER[1:]:
+            final_price = final_price * factors[name]
+        breakdown["final_price"] = round(final_price, 2)
         low, high = self.get_price_range(breakdown["final_price"])
         breakdown["price_range"] = {"low": low, "high": high}
 
@@ -2,8 +2,7 @@
 utils/profit_analyzer.py - Profit Analysis
 SmartCar AI-Dealer - تحليل الأرباح
 """
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 
 
 class ProfitAnalyzer:
@@ -11,10 +10,7 @@ class ProfitAnalyzer:
 
     @staticmethod
     def get_car_profit(transaction_id: int) -> dict:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        row = conn.execute("SELECT * FROM transactions WHERE id=?", (transaction_id,)).fetchone()
-        conn.close()
+        row = DatabaseManager().fetch_one("SELECT * FROM transactions WHERE id=?", (transaction_id,))
         if not row: return {'has_data': False}
         
         price = row['estimated_price'] or 0
@@ -31,38 +27,37 @@ class ProfitAnalyzer:
 
     @staticmethod
     def get_total_profit_report() -> dict:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        c = conn.cursor()
+        with DatabaseManager().get_read_connection() as conn:
+            c = conn.cursor()
         
-        c.execute("""
-            SELECT COUNT(*) as total,
-                   COALESCE(SUM(estimated_price), 0) as revenue,
-                   COALESCE(AVG(profit_margin), 0) as avg_margin,
-                   COALESCE(SUM(estimated_price * profit_margin / 100), 0) as total_profit
-            FROM transactions WHERE estimated_price > 0
-        """)
-        overall = c.fetchone()
+            # All three breakdowns read the sales rollup tables (one row per bucket)
+            c.execute("""
+                SELECT COALESCE(SUM(priced_count), 0) as total,
+                       COALESCE(SUM(total_sales), 0) as revenue,
+                       COALESCE(SUM(margin_sum) / NULLIF(SUM(margin_count), 0), 0) as avg_margin,
+                       COALESCE(SUM(margin_sales / 100), 0) as total_profit
+                FROM sales_rollup_monthly
+            """)
+            overall = c.fetchone()
         
-        c.execute("""
-            SELECT brand, COUNT(*) as cnt,
-                   SUM(estimated_price) as revenue,
-                   AVG(profit_margin) as avg_margin,
-                   SUM(estimated_price * COALESCE(profit_margin,0) / 100) as profit
-            FROM transactions WHERE estimated_price > 0
-            GROUP BY brand ORDER BY profit DESC LIMIT 10
-        """)
-        by_brand = c.fetchall()
+            c.execute("""
+                SELECT NULLIF(brand, '') as brand, SUM(priced_count) as cnt,
+                       SUM(total_sales) as revenue,
+                       SUM(margin_sum) / NULLIF(SUM(margin_count), 0) as avg_margin,
+                       SUM(margin_sales / 100) as profit
+                FROM sales_rollup_brand WHERE priced_count > 0
+                GROUP BY brand ORDER BY profit DESC LIMIT 10
+            """)
+            by_brand = c.fetchall()
         
-        c.execute("""
-            SELECT strftime('%Y-%m', created_at) as month,
-                   SUM(estimated_price) as revenue,
-                   SUM(estimated_price * COALESCE(profit_margin,0) / 100) as profit
-            FROM transactions WHERE estimated_price > 0
-            GROUP BY month ORDER BY month DESC LIMIT 12
-        """)
-        by_month = c.fetchall()
-        
-        conn.close()
+            c.execute("""
+                SELECT NULLIF(month, '') as month,
+                       total_sales as revenue,
+                       margin_sales / 100 as profit
+                FROM sales_rollup_monthly WHERE priced_count > 0
+                ORDER BY month DESC LIMIT 12
+            """)
+            by_month = c.fetchall()
         return {
             'total_cars': overall[0],
             'total_revenue': overall[1],
@@ -2,9 +2,9 @@
 utils/report_generator.py - Auto Monthly PDF Reports
 SmartCar AI-Dealer
 """
-import sqlite3, json
+import json
 from datetime import datetime, timedelta
-from config import Config
+from db_manager import DatabaseManager, _period_bounds, _previous_month
 
 
 class ReportGenerator:
@@ -17,47 +17,47 @@ class ReportGenerator:
             now = datetime.now()
             year, month = now.year, now.month
 
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        c = conn.cursor()
+        # Half-open [start, end) ranges keep the created_at index usable
+        start, end = _period_bounds(year, month)
+        prev_start, _ = _period_bounds(*_previous_month(year, month))
 
-        # Transactions this month
-        c.execute("""
-            SELECT COUNT(*), COALESCE(SUM(estimated_price), 0), 
-                   COALESCE(AVG(estimated_price), 0), COALESCE(MAX(estimated_price), 0)
-            FROM transactions 
-            WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
-        """, (str(year), f"{month:02d}"))
-        row = c.fetchone()
-        
-        # Top brands this month
-        c.execute("""
-            SELECT brand, COUNT(*) as cnt FROM transactions
-            WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
-            GROUP BY brand ORDER BY cnt DESC LIMIT 5
-        """, (str(year), f"{month:02d}"))
-        top_brands = c.fetchall()
+        with DatabaseManager().get_read_connection() as conn:
+            c = conn.cursor()
 
-        # New users this month
-        c.execute("""
-            SELECT COUNT(*) FROM users
-            WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
-        """, (str(year), f"{month:02d}"))
-        new_users = c.fetchone()[0]
+            # Transactions this month (counts and sums come from the monthly rollup)
+            c.execute("""
+                SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(total_sales), 0),
+                       COALESCE(SUM(total_sales) / NULLIF(SUM(sales_count), 0), 0)
+                FROM sales_rollup_monthly WHERE month = ?
+            """, (start[:7],))
+            totals = c.fetchone()
+            c.execute("""
+                SELECT COALESCE(MAX(estimated_price), 0) FROM transactions
+                WHERE created_at >= ? AND created_at < ?
+            """, (start, end))
+            row = (*totals, c.fetchone()[0])
 
-        # Previous month comparison
-        if month == 1:
-            prev_year, prev_month = year - 1, 12
-        else:
-            prev_year, prev_month = year, month - 1
+            # Top brands this month
+            c.execute("""
+                SELECT NULLIF(brand, ''), sales_count as cnt FROM sales_rollup_brand
+                WHERE month = ?
+                ORDER BY cnt DESC LIMIT 5
+            """, (start[:7],))
+            top_brands = [tuple(r) for r in c.fetchall()]
 
-        c.execute("""
-            SELECT COUNT(*), COALESCE(SUM(estimated_price), 0)
-            FROM transactions 
-            WHERE strftime('%Y', created_at) = ? AND strftime('%m', created_at) = ?
-        """, (str(prev_year), f"{prev_month:02d}"))
-        prev = c.fetchone()
-        
-        conn.close()
+            # New users this month
+            c.execute("""
+                SELECT COUNT(*) FROM users
+                WHERE created_at >= ? AND created_at < ?
+            """, (start, end))
+            new_users = c.fetchone()[0]
+
+            # Previous month comparison
+            c.execute("""
+                SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(total_sales), 0)
+                FROM sales_rollup_monthly WHERE month = ?
+            """, (prev_start[:7],))
+            prev = c.fetchone()
 
         return {
             'year': year, 'month': month,
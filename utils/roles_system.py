@@ -2,8 +2,7 @@
 utils/roles_system.py - Role-Based Access Control
 SmartCar AI-Dealer - نظام الصلاحيات
 """
-import sqlite3
-from config import Config
+from db_manager import DatabaseManager
 
 
 class RolesSystem:
@@ -75,9 +74,7 @@ class RolesSystem:
     def update_user_role(user_id: int, new_role: str):
         if new_role not in RolesSystem.ROLES:
             raise ValueError(f"Invalid role: {new_role}")
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        conn.execute("UPDATE users SET role=? WHERE id=?", (new_role, user_id))
-        conn.commit(); conn.close()
+        DatabaseManager().execute("UPDATE users SET role=? WHERE id=?", (new_role, user_id))
 
     @staticmethod
     def render_role_badge(role: str) -> str:
@@ -0,0 +1,254 @@
+"""
+utils/smtp_pool.py - مجمع جلسات SMTP مشترك على مستوى العملية
+SmartCar AI-Dealer
+كل جلسة تُفتح مرة واحدة (اتصال + STARTTLS + login) وتُرسل عليها دفعات من الرسائل حتى
+SMTP_MAX_MESSAGES_PER_CONNECTION أو انتهاء مدة الخمول، مع حد لمعدل الإرسال لكل خادم (مزود).
+رفض مستلم واحد لا يُفشل الدفعة: الخادم يُعاد ضبطه (RSET) وتكمل الجلسة، وانقطاع الاتصال يُعاد معه
+فتح جلسة جديدة ومحاولة الرسالة مرة أخرى.
+"""
+
+import atexit
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+from utils import metrics
+
+
+class RateLimiter:
+    """دلو رموز (token bucket) بسيط: rate رسالة في الثانية مع سماح بدفعة قصيرة بنفس الحجم"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+class _Session:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+def _recipient(msg: Message) -> str:
+    return str(msg.get('To', ''))
+
+
+class SMTPPool:
+    """
+    مجمع محدود الحجم لجلسات SMTP مسجلة الدخول. الخيوط المتزامنة تأخذ جلسات مختلفة،
+    والدفعة الواحدة تستخدم جلسة واحدة (مصافحة TLS واحدة) لكل SMTP_MAX_MESSAGES_PER_CONNECTION رسالة.
+    """
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '', security: str = 'starttls',
+                 size: int = 2, max_per_connection: int = 100, idle_seconds: float = 60, timeout: float = 30,
+                 limiter: Optional[RateLimiter] = None, smtp_factory: Optional[Callable[[], smtplib.SMTP]] = None):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.security = security
+        self.max_per_connection = max(1, max_per_connection)
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self.limiter = limiter or RateLimiter(0)
+        self._factory = smtp_factory
+        self._idle: List[_Session] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self.stats = {'connections_opened': 0, 'messages_sent': 0, 'messages_failed': 0, 'reconnects': 0}
+
+    # ===== الجلسات =====
+
+    def _open(self) -> _Session:
+        if self._factory:
+            smtp = self._factory()
+        elif self.security == 'ssl':
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == 'starttls':
+                smtp.starttls(context=ssl.create_default_context())
+        try:
+            if self.password:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self.stats['connections_opened'] += 1
+        return _Session(smtp)
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _acquire(self) -> _Session:
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    session = self._idle.pop() if self._idle else None
+                if session is None:
+                    return self._open()
+                # الجلسات الخاملة طويلاً أغلقها الخادم غالباً: تُغلق محلياً بدل اكتشاف ذلك عند الإرسال
+                if time.monotonic() - session.last_used < self.idle_seconds:
+                    return session
+                self._close(session.smtp)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, session: _Session, broken: bool = False):
+        try:
+            if broken or session.sent >= self.max_per_connection:
+                self._close(session.smtp)
+            else:
+                session.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(session)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self) -> Iterator[smtplib.SMTP]:
+        """جلسة مسجلة الدخول للاستخدام المباشر؛ تُعاد للمجمع إلا إذا انقطعت"""
+        session = self._acquire()
+        broken = True
+        try:
+            yield session.smtp
+            broken = False
+        finally:
+            self._release(session, broken)
+
+    def close(self):
+        """إغلاق الجلسات الخاملة (عند إيقاف العملية أو تغيير الإعدادات)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._close(session.smtp)
+
+    # ===== الإرسال =====
+
+    def send(self, msg: Message) -> Dict:
+        return self.send_batch([msg])[0]
+
+    def send_batch(self, messages: Iterable[Message]) -> List[Dict]:
+        """
+        إرسال الرسائل بالترتيب على جلسة واحدة (تُجدد كل max_per_connection رسالة) وإرجاع نتيجة لكل رسالة:
+        {'recipient', 'success', 'error'}. فشل فتح الجلسة (خادم متوقف، كلمة مرور خاطئة) يُفشل الرسائل المتبقية دون تكرار المحاولة.
+        """
+        messages = list(messages)
+        results: List[Dict] = []
+        session: Optional[_Session] = None
+        try:
+            for index, msg in enumerate(messages):
+                if session is None:
+                    try:
+                        session = self._acquire()
+                    except (smtplib.SMTPException, OSError) as e:
+                        results.extend(self._failed(m, e) for m in messages[index:])
+                        break
+                ok, error, session = self._deliver(session, msg)
+                results.append(self._success(msg) if ok else self._failed(msg, error))
+                if session is not None and session.sent >= self.max_per_connection:
+                    self._release(session)
+                    session = None
+        finally:
+            if session is not None:
+                self._release(session)
+        return results
+
+    def _deliver(self, session: _Session, msg: Message) -> Tuple[bool, Optional[Exception], Optional[_Session]]:
+        """رسالة واحدة مع إعادة محاولة واحدة على جلسة جديدة عند انقطاع الاتصال"""
+        for attempt in (1, 2):
+            self.limiter.wait()
+            try:
+                with metrics.timer('email_send_seconds'):
+                    session.smtp.send_message(msg)
+                session.sent += 1
+                return True, None, session
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPNotSupportedError,
+                    ValueError) as e:
+                # رفض يخص هذه الرسالة فقط (أو رسالة بلا مستلمين)؛ smtplib أرسل RSET والجلسة ما زالت صالحة
+                return False, e, session
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code != 421:
+                    return False, e, session
+                error = e  # 421: الخادم يغلق الجلسة
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                error = e
+            self._release(session, broken=True)
+            if attempt == 2:
+                return False, error, None
+            with self._lock:
+                self.stats['reconnects'] += 1
+            try:
+                session = self._acquire()
+            except (smtplib.SMTPException, OSError) as e:
+                return False, e, None
+        return False, error, None
+
+    def _success(self, msg: Message) -> Dict:
+        with self._lock:
+            self.stats['messages_sent'] += 1
+        return {'recipient': _recipient(msg), 'success': True, 'error': None}
+
+    def _failed(self, msg: Message, error: Exception) -> Dict:
+        with self._lock:
+            self.stats['messages_failed'] += 1
+        if Config.logger:
+            Config.logger.warning(f"📧 Delivery to {_recipient(msg)} failed: {error}")
+        return {'recipient': _recipient(msg), 'success': False, 'error': str(error)}
+
+
+_pools: Dict[Tuple, SMTPPool] = {}
+_limiters: Dict[str, RateLimiter] = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool:
+    """المجمع المشترك لإعدادات البريد الحالية (حد المعدل مشترك لكل خادم SMTP)"""
+    key = (Config.SMTP_SERVER, Config.SMTP_PORT, Config.SENDER_EMAIL, Config.SENDER_PASSWORD, Config.SMTP_SECURITY)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                limiter = _limiters.setdefault(Config.SMTP_SERVER, RateLimiter(Config.SMTP_RATE_PER_SECOND))
+                pool = SMTPPool(Config.SMTP_SERVER, Config.SMTP_PORT, Config.SENDER_EMAIL, Config.SENDER_PASSWORD,
+                                security=Config.SMTP_SECURITY, size=Config.SMTP_POOL_SIZE,
+                                max_per_connection=Config.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                                idle_seconds=Config.SMTP_IDLE_SECONDS, timeout=Config.SMTP_TIMEOUT, limiter=limiter)
+                _pools[key] = pool
+    return pool
+
+
+@atexit.register
+def close_smtp_pools():
+    for pool in list(_pools.values()):
+        pool.close()
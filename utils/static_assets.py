@@ -0,0 +1,170 @@
+"""
+utils/static_assets.py - أصول الواجهة الثابتة (CSS، الشعار، الخطوط)
+SmartCar AI-Dealer
+تُبنى كتل CSS مرة واحدة لكل عملية (تصغير + استبدال روابط الأصول) بدل إعادة بنائها في كل إعادة تشغيل للسكربت.
+الصور والخطوط تُنشر في static/assets/ بأسماء تحتوي بصمة المحتوى وتُقدَّم عبر app/static (server.enableStaticServing)،
+فيحمّلها المتصفح مرة واحدة؛ وبدون خدمة الملفات الثابتة تُضمَّن كـ data URI محفوظ في الذاكرة.
+كتلة CSS ثابتة البايتات بين الإعادات، لذا يرسل Streamlit مرجع hash بدل المحتوى للمتصفح الذي يحتفظ بها.
+"""
+
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import streamlit as st
+
+from config import Config
+
+ASSETS_DIR = Config.STATIC_DIR / "assets"
+# المسار الذي يخدم منه Streamlit مجلد static/ بجانب app.py (نسبي لعنوان الصفحة)
+ASSETS_URL = "app/static/assets"
+
+_TOKENS = re.compile(r'(/\*.*?\*/)|("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', re.S)
+_SPACE_AROUND = re.compile(r'\s*([{};,>])\s*')
+_WHITESPACE = re.compile(r'\s+')
+# المسافة قبل ':' لها معنى في المحددات ('.a :hover') لذا تُحذف المسافة بعدها فقط
+_SPACE_AFTER_COLON = re.compile(r':\s+')
+
+_lock = threading.Lock()
+_style_blocks: Dict[str, Tuple[str, str]] = {}
+_published: Dict[Tuple[str, int], str] = {}
+
+
+def minify_css(css: str) -> str:
+    """حذف التعليقات والمسافات الزائدة (النصوص بين علامات التنصيص تبقى كما هي)"""
+    out, pending = [], []
+    position = 0
+    for match in _TOKENS.finditer(css):
+        pending.append(css[position:match.start()])
+        position = match.end()
+        if match.group(1):
+            # التعليق يُستبدل بمسافة حتى لا يلتصق ما قبله بما بعده
+            pending.append(' ')
+            continue
+        out.append(_minify_chunk(''.join(pending)))
+        out.append(match.group(2))
+        pending = []
+    pending.append(css[position:])
+    out.append(_minify_chunk(''.join(pending)))
+    return ''.join(out).strip()
+
+
+def _minify_chunk(chunk: str) -> str:
+    chunk = _SPACE_AROUND.sub(r'\1', _WHITESPACE.sub(' ', chunk))
+    return _SPACE_AFTER_COLON.sub(':', chunk).replace(';}', '}')
+
+
+def static_serving_enabled() -> bool:
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def publish_file(path: Path) -> Optional[str]:
+    """
+    نسخ الملف إلى static/assets/<الاسم>.<بصمة><الامتداد> وإرجاع رابطه
+    (None إذا كانت خدمة الملفات الثابتة معطلة أو الملف غير موجود أو المجلد غير قابل للكتابة)
+    """
+    path = Path(path)
+    mtime = _mtime(path)
+    if mtime is None or not static_serving_enabled():
+        return None
+    key = (str(path), mtime)
+    if key in _published:
+        return _published[key]
+
+    with _lock:
+        if key in _published:
+            return _published[key]
+        try:
+            data = path.read_bytes()
+            name = f"{path.stem}.{hashlib.sha256(data).hexdigest()[:12]}{path.suffix.lower()}"
+            target = ASSETS_DIR / name
+            if not target.exists():
+                ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=ASSETS_DIR, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, target)
+                # حذف النسخ السابقة من نفس الملف
+                for old in ASSETS_DIR.glob(f"{path.stem}.*{path.suffix.lower()}"):
+                    if old.name != name and re.fullmatch(rf"{re.escape(path.stem)}\.[0-9a-f]{{12}}\.\w+", old.name):
+                        old.unlink(missing_ok=True)
+        except OSError:
+            return None
+        url = f"{ASSETS_URL}/{name}"
+        _published[key] = url
+        return url
+
+
+@lru_cache(maxsize=16)
+def _data_uri(path: str, mtime: int) -> str:
+    mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    with open(path, 'rb') as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode()}"
+
+
+def data_uri(path: Path) -> str:
+    """محتوى الملف كـ data URI محفوظ في الذاكرة لكل العملية ('' إذا لم يوجد الملف)"""
+    mtime = _mtime(Path(path))
+    return _data_uri(str(path), mtime) if mtime is not None else ""
+
+
+def asset_url(path: Path) -> str:
+    """رابط ملف ثابت قابل للتخزين في المتصفح، أو data URI عند عدم توفر خدمة الملفات الثابتة"""
+    return publish_file(path) or data_uri(path)
+
+
+def _font_faces(fonts: Dict[str, Dict[int, Path]]) -> str:
+    """قواعد @font-face للخطوط الموجودة محلياً (فقط كملفات ثابتة؛ الخطوط أكبر من أن تُضمَّن)"""
+    rules = []
+    for family, weights in fonts.items():
+        for weight, path in weights.items():
+            url = publish_file(path)
+            if url:
+                rules.append(f"@font-face{{font-family:'{family}';src:url('{url}');"
+                             f"font-weight:{weight};font-display:swap}}")
+    return ''.join(rules)
+
+
+def build_style_block(css: str, assets: Optional[Dict[str, Path]] = None,
+                      fonts: Optional[Dict[str, Dict[int, Path]]] = None) -> str:
+    """وسم <style> مصغّر مع استبدال [NAME] برابط كل أصل"""
+    for token, path in (assets or {}).items():
+        css = css.replace(f"[{token}]", asset_url(path))
+    return f"<style>{minify_css(css)}{_font_faces(fonts or {})}</style>"
+
+
+def inject_css(name: str, css: str, assets: Optional[Dict[str, Path]] = None,
+               fonts: Optional[Dict[str, Dict[int, Path]]] = None):
+    """
+    حقن كتلة CSS مبنية مرة واحدة لكل عملية ومشتركة بين الجلسات.
+    css نص ثابت في الكود، لذا يكفي التحقق من هويته (is) لمعرفة أن الكتلة المحفوظة ما زالت صالحة.
+    """
+    cached = _style_blocks.get(name)
+    if cached is None or cached[0] is not css:
+        cached = (css, build_style_block(css, assets, fonts))
+        _style_blocks[name] = cached
+    st.markdown(cached[1], unsafe_allow_html=True)
+
+
+def clear_style_cache():
+    """إعادة بناء كتل CSS عند الاستدعاء التالي (بعد تغيير الشعار أو الخطوط مثلاً)"""
+    _style_blocks.clear()
+    _published.clear()
+    _data_uri.cache_clear()
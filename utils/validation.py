@@ -4,11 +4,9 @@ SmartCar AI-Dealer
 ضمان صلاحية الصور المرفوعة قبل إرسالها للتحليل لتقليل التكاليف ومنع الأخطاء
 """
 
-import io
-from PIL import Image
-import numpy as np
 from typing import Dict, Tuple, Union
 from config import Config
+from utils.image_gate import get_image_gate
 
 class ImageValidator:
     """كلاس متخصص في فحص جودة وصحة صور السيارات والوثائق"""
@@ -31,29 +29,15 @@ class ImageValidator:
             }
 
         try:
-            # 2. فحص إمكانية فتح الصورة (ليست تالفة)
-            img = Image.open(io.BytesIO(image_bytes))
-            img.verify() # فحص أولي للبيانات
-            
-            # إعادة فتح الصورة للعمليات المتقدمة لأن verify() تغلق الملف
-            img = Image.open(io.BytesIO(image_bytes))
-            
-            # 3. فحص الأبعاد (لضمان وضوح كافٍ للذكاء الاصطناعي)
-            width, height = img.size
-            if width < 300 or height < 300:
-                return {'is_valid': False, 'msg_key': 'err_low_resolution'}
-
-            # 4. فحص الإضاءة (Brightness)
-            # نحول الصورة إلى تدرج الرمادي ونحسب المتوسط
-            data = np.array(img.convert('L'))
-            brightness = np.mean(data)
-            
-            if brightness < 40: # معتمة جداً
-                return {'is_valid': True, 'has_warning': True, 'msg_key': 'warn_too_dark'}
-            elif brightness > 230: # ساطعة جداً
-                return {'is_valid': True, 'has_warning': True, 'msg_key': 'warn_too_bright'}
-
-            return {'is_valid': True, 'msg_key': 'success'}
+            # 2. فك الصورة مرة واحدة (فشل الفك = صورة تالفة)؛ نفس الصورة المجهزة تُعاد
+            # لاحقاً عند الإرسال لـ Groq دون فك جديد (utils/image_preprocessor.py)
+            # 3. الأبعاد، الحدة، التعريض وبصمة pHash من البوابة المحلية (utils/image_gate.py)
+            gate = get_image_gate().assess(image_bytes)
+            if gate.verdict == 'reject':
+                return {'is_valid': False, 'msg_key': gate.msg_key, 'gate': gate.as_dict()}
+            if gate.warnings:
+                return {'is_valid': True, 'has_warning': True, 'msg_key': gate.warnings[0], 'gate': gate.as_dict()}
+            return {'is_valid': True, 'msg_key': 'success', 'gate': gate.as_dict()}
 
         except Exception as e:
             return {'is_valid': False, 'msg_key': 'err_corrupted', 'details': str(e)}
@@ -71,6 +55,10 @@ def validate_car_image(image_bytes: bytes) -> Tuple[bool, str]:
         'success': "صورة صالحة للتحليل",
         'err_file_too_large': "حجم الملف كبير جداً",
         'err_low_resolution': "دقة الصورة منخفضة جداً، يرجى رفع صورة أوضح",
+        'err_blank': "الصورة شبه موحدة اللون ولا يمكن التعرف على سيارة فيها",
+        'err_blurry': "الصورة ضبابية جداً، يرجى التقاط صورة أوضح",
+        'err_exposure': "الصورة مفرطة أو ضعيفة الإضاءة، يرجى التقاطها في إضاءة أفضل",
+        'warn_blurry': "الصورة ضبابية قليلاً، قد تكون النتائج أقل دقة",
         'warn_too_dark': "الصورة معتمة، قد تكون النتائج غير دقيقة",
         'warn_too_bright': "إضاءة الصورة قوية جداً",
         'err_corrupted': "ملف الصورة تالف أو غير مدعوم"
@@ -0,0 +1,116 @@
+"""
+worker.py - عامل المهام الخلفية (utils/job_queue.py)
+SmartCar AI-Dealer
+يسحب المهام من جدول jobs حسب الأولوية وينفذها (PDF، بريد، تذكيرات) خارج جلسات Streamlit،
+ويرسل heartbeat دورياً حتى تعرف الصفحات أن هناك عاملاً حياً، ويعيد المهام العالقة لعامل انهار إلى الطابور.
+يجب أن يصل لنفس ملف قاعدة البيانات ومجلداتها (نفس الجهاز أو الحاوية) لأن SQLite في وضع WAL.
+قم بتشغيله من مجلد المشروع: python worker.py [--once] [--poll SECONDS]
+"""
+
+import argparse
+import signal
+import threading
+import time
+from typing import Optional
+
+from config import Config
+from utils.logger import set_correlation_id  # (يهيئ Config.logger أيضاً)
+from utils.job_queue import (claim_next, heartbeat, purge_finished, requeue_stale, run_job, unregister_worker,
+                             worker_name)
+from utils.event_writer import archive_old_events, prune_archives
+
+# الصيانة (المهام العالقة وحذف القديم) مرة كل دقيقة
+MAINTENANCE_INTERVAL = 60
+# أرشفة أشهر سجل التدقيق وجلسات الدخول القديمة مرة كل ساعة
+ARCHIVE_INTERVAL = 3600
+
+
+class Worker:
+    def __init__(self, poll_seconds: float):
+        self.worker_id = worker_name()
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+        self.current_job: Optional[int] = None
+        self.last_archive = 0.0
+
+    def stop(self, *_):
+        """إيقاف بعد انتهاء المهمة الجارية (SIGTERM / Ctrl+C)"""
+        if Config.logger:
+            Config.logger.info(f"Worker {self.worker_id} stopping after the current job")
+        self.stop_event.set()
+
+    def _heartbeat_loop(self):
+        # خيط منفصل: مهمة PDF طويلة لا تجعل العامل يبدو متوقفاً
+        interval = max(1.0, Config.JOB_WORKER_TIMEOUT_SECONDS / 3)
+        while not self.stop_event.wait(interval):
+            try:
+                heartbeat(self.worker_id, self.current_job)
+            except Exception as e:
+                if Config.logger:
+                    Config.logger.warning(f"Worker heartbeat failed: {e}")
+
+    def _maintenance(self):
+        stale = requeue_stale()
+        purged = purge_finished()
+        if Config.logger and (stale or purged):
+            Config.logger.info(f"Job maintenance: {stale} stale job(s) recovered, {purged} old job(s) purged")
+        if time.monotonic() - self.last_archive >= ARCHIVE_INTERVAL:
+            self.last_archive = time.monotonic()
+            try:
+                archive_old_events()
+                prune_archives()
+            except Exception as e:
+                if Config.logger:
+                    Config.logger.warning(f"Event archiving failed: {e}")
+
+    def run(self, once: bool = False) -> int:
+        """تنفيذ المهام حتى الإيقاف (أو حتى فراغ الطابور مع once)؛ يعيد عدد المهام المنفذة"""
+        heartbeat(self.worker_id)
+        beat = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        beat.start()
+        if Config.logger:
+            Config.logger.info(f"Worker {self.worker_id} started")
+
+        processed, last_maintenance = 0, 0.0
+        try:
+            while not self.stop_event.is_set():
+                if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                    self._maintenance()
+                    last_maintenance = time.monotonic()
+
+                job = claim_next(self.worker_id)
+                if job is None:
+                    if once:
+                        break
+                    self.stop_event.wait(self.poll_seconds)
+                    continue
+
+                self.current_job = job['id']
+                set_correlation_id(f"job-{job['id']}")
+                heartbeat(self.worker_id, job['id'])
+                finished = run_job(job, notify=True)
+                self.current_job = None
+                processed += 1
+                if Config.logger and finished:
+                    Config.logger.info(f"Job {job['id']} ({job['kind']}) -> {finished['status']}")
+        finally:
+            self.stop_event.set()
+            unregister_worker(self.worker_id)
+        return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SmartCar background job worker")
+    parser.add_argument('--once', action='store_true', help="process the jobs that are ready now, then exit")
+    parser.add_argument('--poll', type=float, default=Config.JOB_POLL_SECONDS, help="seconds between polls when idle")
+    args = parser.parse_args()
+
+    worker = Worker(args.poll)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    processed = worker.run(once=args.once)
+    print(f"✅ {processed} job(s) processed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+"""
+wsgi.py - نقطة دخول WSGI لواجهة REST للقراءة (utils/api_server.py)
+SmartCar AI-Dealer
+لكل عملية عامل مجمع اتصالات قراءة خاص بها (يُنشأ DatabaseManager عند أول طلب، أي بعد fork)،
+وSQLite في وضع WAL يسمح لعدة قراء بالعمل بالتوازي مع كاتب واحد.
+قم بتشغيله من مجلد المشروع: gunicorn -w 4 -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from utils.api_server import create_app
+
+app = create_app()